@@ -16,7 +16,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import json
 
-from .models import SystemConfig, SystemLog, SecurityEvent, PerformanceMetric
+from .models import SystemConfig, SystemLog, SecurityEvent, PerformanceMetric, APIMetricAggregate
 from apps.users.models import User, KYCDocument
 from apps.finance.models import Transaction, UserBalance
 from apps.rewards.models import VIPLevel, RebateRecord, ReferralRewardRecord
@@ -516,6 +516,32 @@ class PerformanceMetricAdmin(admin.ModelAdmin):
         return False
 
 
+
+@admin.register(APIMetricAggregate, site=admin_site)
+class APIMetricAggregateAdmin(admin.ModelAdmin):
+    """
+    接口指标管理（每分钟聚合）
+    """
+    list_display = [
+        'minute', 'method', 'endpoint', 'count', 'avg_display',
+        'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'client_error_count',
+        'server_error_count', 'source'
+    ]
+    list_filter = ['method', 'minute']
+    search_fields = ['endpoint', 'source']
+    date_hierarchy = 'minute'
+    
+    def avg_display(self, obj):
+        """显示平均耗时"""
+        return f"{obj.avg_ms:.2f}"
+    avg_display.short_description = '平均耗时(ms)'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # 注册所有应用的模型到自定义管理站点
 from apps.users.admin import *
 from apps.finance.admin import *
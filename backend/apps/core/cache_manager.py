@@ -6,9 +6,15 @@ Redis缓存管理器
 
 from django.core.cache import cache, caches
 from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from collections import OrderedDict
+from .cache_serializer import cache_serializer
 import redis
+import threading
 import json
 import hashlib
+import base64
+import uuid
 import logging
 from typing import Any, Dict, List, Optional, Union
 from functools import wraps
@@ -16,6 +22,9 @@ import time
 
 logger = logging.getLogger(__name__)
 
+# 缓存未命中标记
+_MISSING = object()
+
 
 class CacheManager:
     """缓存管理器"""
@@ -26,6 +35,12 @@ class CacheManager:
     FINANCE_PREFIX = 'finance'
     SYSTEM_PREFIX = 'system'
     API_PREFIX = 'api'
+    TAG_PREFIX = 'tag'
+    
+    # 标签集合过期时间（秒）
+    TAG_TIMEOUT = 86400
+    # SCAN/SSCAN/UNLINK 每批键数
+    SCAN_BATCH_SIZE = 1000
     
     # 缓存超时时间(秒)
     CACHE_TIMEOUTS = {
@@ -47,16 +62,26 @@ class CacheManager:
         return ':'.join(key_parts)
     
     @classmethod
-    def set_cache(cls, key: str, value: Any, timeout: Optional[int] = None, cache_type: str = 'default') -> bool:
-        """设置缓存"""
+    def set_cache(cls, key: str, value: Any, timeout: Optional[int] = None, cache_type: str = 'default',
+                  tags: Optional[List[str]] = None) -> bool:
+        """
+        设置缓存，tags 为该键所属的失效标签
+        值经 cache_serializer 编码；Redis后端直接写入编码结果，不再经过django_redis序列化和压缩
+        """
         try:
             cache_instance = caches[cache_type] if cache_type != 'default' else cache
+            data = cache_serializer.dumps(value)
             
-            # 序列化复杂对象
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value, ensure_ascii=False)
+            redis_client = cls.get_redis_client(cache_instance)
+            if redis_client is None:
+                cache_instance.set(key, data, timeout)
+            elif timeout is not None and timeout <= 0:
+                cache_instance.delete(key)
+            else:
+                redis_client.set(cache_instance.make_key(key), data, ex=timeout)
             
-            cache_instance.set(key, value, timeout)
+            if tags:
+                cls.tag_keys(tags, [key], cache_type)
             return True
         except Exception as e:
             logger.error(f"设置缓存失败 {key}: {e}")
@@ -67,20 +92,33 @@ class CacheManager:
         """获取缓存"""
         try:
             cache_instance = caches[cache_type] if cache_type != 'default' else cache
-            value = cache_instance.get(key)
             
-            # 尝试反序列化JSON
-            if isinstance(value, str):
-                try:
-                    return json.loads(value)
-                except (json.JSONDecodeError, TypeError):
-                    return value
+            redis_client = cls.get_redis_client(cache_instance)
+            if redis_client is None:
+                data = cache_instance.get(key)
+            else:
+                data = redis_client.get(cache_instance.make_key(key))
             
-            return value
+            if data is None:
+                return None
+            if cache_serializer.is_encoded(data):
+                return cache_serializer.loads(data)
+            
+            return cls._load_legacy(cache_instance.get(key) if redis_client is not None else data)
         except Exception as e:
             logger.error(f"获取缓存失败 {key}: {e}")
             return None
     
+    @staticmethod
+    def _load_legacy(value: Any) -> Any:
+        """读取升级前写入的缓存值（字典、列表曾以JSON字符串保存）"""
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except (json.JSONDecodeError, TypeError):
+                return value
+        return value
+    
     @classmethod
     def delete_cache(cls, key: str, cache_type: str = 'default') -> bool:
         """删除缓存"""
@@ -94,22 +132,125 @@ class CacheManager:
     
     @classmethod
     def clear_pattern(cls, pattern: str, cache_type: str = 'default') -> int:
-        """按模式清除缓存"""
+        """
+        按模式清除缓存
+        SCAN 分批遍历、UNLINK 异步删除，不阻塞Redis；需遍历整个键空间，
+        已知键集合的失效应使用 invalidate_tags
+        """
         try:
             cache_instance = caches[cache_type] if cache_type != 'default' else cache
+            redis_client = cls.get_redis_client(cache_instance)
             
-            if hasattr(cache_instance, 'delete_pattern'):
-                return cache_instance.delete_pattern(pattern)
-            else:
-                # 手动实现模式删除
-                redis_client = cache_instance._cache.get_client()
-                keys = redis_client.keys(pattern)
-                if keys:
-                    return redis_client.delete(*keys)
+            if redis_client is None:
+                if hasattr(cache_instance, 'delete_pattern'):
+                    return cache_instance.delete_pattern(pattern)
+                logger.warning(f"缓存后端不支持按模式清除: {pattern}")
                 return 0
+            
+            deleted = 0
+            batch = []
+            for key in redis_client.scan_iter(match=cache_instance.make_key(pattern), count=cls.SCAN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= cls.SCAN_BATCH_SIZE:
+                    deleted += redis_client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += redis_client.unlink(*batch)
+            return deleted
         except Exception as e:
             logger.error(f"按模式清除缓存失败 {pattern}: {e}")
             return 0
+    
+    @classmethod
+    def get_tag_key(cls, tag: str) -> str:
+        """生成标签集合键"""
+        return cls.get_cache_key(cls.TAG_PREFIX, tag)
+    
+    @classmethod
+    def tag_keys(cls, tags: List[str], keys: List[str], cache_type: str = 'default') -> bool:
+        """
+        将缓存键登记到标签集合（Redis SET），失效时只需遍历标签内的键
+        标签集合每次登记时续期 TAG_TIMEOUT，带标签缓存的超时不应超过该值
+        """
+        try:
+            cache_instance = caches[cache_type] if cache_type != 'default' else cache
+            redis_client = cls.get_redis_client(cache_instance)
+            
+            if redis_client is None:
+                # 非Redis后端（开发、测试）以列表保存标签内的键
+                for tag in tags:
+                    tag_key = cls.get_tag_key(tag)
+                    members = set(cache_instance.get(tag_key, []))
+                    members.update(keys)
+                    cache_instance.set(tag_key, sorted(members), cls.TAG_TIMEOUT)
+                return True
+            
+            full_keys = [cache_instance.make_key(key) for key in keys]
+            pipeline = redis_client.pipeline(transaction=False)
+            for tag in tags:
+                tag_key = cache_instance.make_key(cls.get_tag_key(tag))
+                pipeline.sadd(tag_key, *full_keys)
+                pipeline.expire(tag_key, cls.TAG_TIMEOUT)
+            pipeline.execute()
+            return True
+        except Exception as e:
+            logger.error(f"登记缓存标签失败 {tags}: {e}")
+            return False
+    
+    @classmethod
+    def invalidate_tags(cls, *tags: str, cache_type: str = 'default') -> int:
+        """
+        按标签清除缓存，耗时与标签内的键数成正比
+        标签集合先改名再分批 SSCAN + UNLINK，清除期间新登记的键进入新集合，不会遗漏
+        """
+        cache_instance = caches[cache_type] if cache_type != 'default' else cache
+        redis_client = cls.get_redis_client(cache_instance)
+        deleted = 0
+        
+        for tag in tags:
+            try:
+                if redis_client is None:
+                    tag_key = cls.get_tag_key(tag)
+                    keys = cache_instance.get(tag_key, [])
+                    cache_instance.delete_many(keys + [tag_key])
+                    deleted += len(keys)
+                    continue
+                
+                tag_key = cache_instance.make_key(cls.get_tag_key(tag))
+                snapshot_key = f'{tag_key}:invalidating:{uuid.uuid4().hex}'
+                try:
+                    redis_client.rename(tag_key, snapshot_key)
+                except redis.exceptions.ResponseError:
+                    # 标签集合不存在
+                    continue
+                
+                for keys in cls._iter_set_batches(redis_client, snapshot_key):
+                    deleted += redis_client.unlink(*keys)
+                redis_client.unlink(snapshot_key)
+            except Exception as e:
+                logger.error(f"按标签清除缓存失败 {tag}: {e}")
+        
+        return deleted
+    
+    @classmethod
+    def _iter_set_batches(cls, redis_client, set_key: str):
+        """分批遍历集合成员"""
+        batch = []
+        for member in redis_client.sscan_iter(set_key, count=cls.SCAN_BATCH_SIZE):
+            batch.append(member)
+            if len(batch) >= cls.SCAN_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def get_redis_client(cache_instance):
+        """获取缓存后端的Redis客户端，非django_redis后端返回 None"""
+        client = getattr(cache_instance, 'client', None)
+        if client is None or not hasattr(client, 'get_client'):
+            return None
+        return client.get_client(write=True)
 
 
 class UserCacheManager(CacheManager):
@@ -119,7 +260,7 @@ class UserCacheManager(CacheManager):
     def cache_user_balance(cls, user_id: int, balance_data: Dict) -> bool:
         """缓存用户余额"""
         key = cls.get_cache_key(cls.USER_PREFIX, user_id, 'balance')
-        return cls.set_cache(key, balance_data, cls.CACHE_TIMEOUTS['user_balance'])
+        return cls.set_cache(key, balance_data, cls.CACHE_TIMEOUTS['user_balance'], tags=[cls.get_user_tag(user_id)])
     
     @classmethod
     def get_user_balance(cls, user_id: int) -> Optional[Dict]:
@@ -131,7 +272,7 @@ class UserCacheManager(CacheManager):
     def cache_user_profile(cls, user_id: int, profile_data: Dict) -> bool:
         """缓存用户资料"""
         key = cls.get_cache_key(cls.USER_PREFIX, user_id, 'profile')
-        return cls.set_cache(key, profile_data, cls.CACHE_TIMEOUTS['user_profile'])
+        return cls.set_cache(key, profile_data, cls.CACHE_TIMEOUTS['user_profile'], tags=[cls.get_user_tag(user_id)])
     
     @classmethod
     def get_user_profile(cls, user_id: int) -> Optional[Dict]:
@@ -143,18 +284,17 @@ class UserCacheManager(CacheManager):
     def cache_user_vip_status(cls, user_id: int, vip_data: Dict) -> bool:
         """缓存用户VIP状态"""
         key = cls.get_cache_key(cls.USER_PREFIX, user_id, 'vip')
-        return cls.set_cache(key, vip_data, cls.CACHE_TIMEOUTS['vip_levels'])
+        return cls.set_cache(key, vip_data, cls.CACHE_TIMEOUTS['vip_levels'], tags=[cls.get_user_tag(user_id)])
     
     @classmethod
-    def invalidate_user_cache(cls, user_id: int) -> None:
-        """清除用户相关缓存"""
-        patterns = [
-            f"{cls.USER_PREFIX}:{user_id}:*",
-            f"{cls.FINANCE_PREFIX}:{user_id}:*"
-        ]
-        
-        for pattern in patterns:
-            cls.clear_pattern(pattern)
+    def get_user_tag(cls, user_id) -> str:
+        """用户缓存标签"""
+        return cls.get_cache_key(cls.USER_PREFIX, user_id)
+    
+    @classmethod
+    def invalidate_user_cache(cls, user_id: int) -> int:
+        """清除用户相关缓存（用户、财务缓存写入时均需登记用户标签）"""
+        return cls.invalidate_tags(cls.get_user_tag(user_id))
 
 
 class GameCacheManager(CacheManager):
@@ -164,7 +304,7 @@ class GameCacheManager(CacheManager):
     def cache_lottery_draw(cls, draw_id: str, draw_data: Dict) -> bool:
         """缓存彩票期次信息"""
         key = cls.get_cache_key(cls.GAME_PREFIX, 'lottery', draw_id)
-        return cls.set_cache(key, draw_data, cls.CACHE_TIMEOUTS['lottery_draw'])
+        return cls.set_cache(key, draw_data, cls.CACHE_TIMEOUTS['lottery_draw'], tags=[cls.get_game_tag('lottery')])
     
     @classmethod
     def get_lottery_draw(cls, draw_id: str) -> Optional[Dict]:
@@ -176,13 +316,23 @@ class GameCacheManager(CacheManager):
     def cache_game_config(cls, game_type: str, config_data: Dict) -> bool:
         """缓存游戏配置"""
         key = cls.get_cache_key(cls.GAME_PREFIX, 'config', game_type)
-        return cls.set_cache(key, config_data, cls.CACHE_TIMEOUTS['game_config'])
+        return cls.set_cache(key, config_data, cls.CACHE_TIMEOUTS['game_config'], tags=[cls.get_game_tag(game_type)])
     
     @classmethod
     def cache_hot_numbers(cls, game_type: str, numbers_data: List) -> bool:
         """缓存热门号码"""
         key = cls.get_cache_key(cls.GAME_PREFIX, 'hot_numbers', game_type)
-        return cls.set_cache(key, numbers_data, cls.CACHE_TIMEOUTS['hot_data'])
+        return cls.set_cache(key, numbers_data, cls.CACHE_TIMEOUTS['hot_data'], tags=[cls.get_game_tag(game_type)])
+    
+    @classmethod
+    def get_game_tag(cls, game_type: str) -> str:
+        """游戏缓存标签"""
+        return cls.get_cache_key(cls.GAME_PREFIX, game_type)
+    
+    @classmethod
+    def invalidate_game_cache(cls, game_type: str) -> int:
+        """清除游戏相关缓存"""
+        return cls.invalidate_tags(cls.get_game_tag(game_type))
 
 
 class APICacheManager(CacheManager):
@@ -210,36 +360,367 @@ class APICacheManager(CacheManager):
         return cls.get_cache(key)
 
 
-def cache_api_response(timeout: int = 180, cache_type: str = 'default'):
-    """API响应缓存装饰器"""
+class LocalLRUCache:
+    """进程内LRU缓存（条目带过期时间，线程安全）"""
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """获取缓存，过期条目视为未命中"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any, timeout: float) -> None:
+        """设置缓存，超出容量时淘汰最久未使用的条目"""
+        if timeout <= 0:
+            return
+        
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def delete(self, key: str) -> None:
+        """删除缓存"""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+    """
+    两级缓存：进程内LRU + Redis
+    读取依次查询本进程LRU、Redis，均未命中时调用加载函数并回填两级缓存。
+    删除时清除Redis并递增代数，各进程至多每 GENERATION_CHECK_INTERVAL 秒
+    读取一次代数，发现变化即清空本进程LRU，从而跨进程失效。
+    超时参数可为秒数或以缓存值为参数返回秒数的函数。
+    """
+    
+    # 跨进程失效检查间隔（秒）
+    GENERATION_CHECK_INTERVAL = 1.0
+    
+    def __init__(self, namespace: str, local_timeout: float = 30, remote_timeout: int = 600,
+                 max_size: int = 1024, cache_type: str = 'default'):
+        self.namespace = namespace
+        self.local_timeout = local_timeout
+        self.remote_timeout = remote_timeout
+        self.cache_type = cache_type
+        self._local = LocalLRUCache(max_size)
+        self._generation = None
+        self._generation_checked_at = 0.0
+    
+    @property
+    def remote(self):
+        return caches[self.cache_type] if self.cache_type != 'default' else cache
+    
+    def _key(self, key: str) -> str:
+        return f'{self.namespace}:{key}'
+    
+    def _generation_key(self) -> str:
+        return f'{self.namespace}:generation'
+    
+    @staticmethod
+    def _resolve_timeout(timeout, value) -> float:
+        return timeout(value) if callable(timeout) else timeout
+    
+    def _sync_generation(self) -> None:
+        """检查失效代数，其他进程已失效时清空本进程LRU"""
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.GENERATION_CHECK_INTERVAL:
+            return
+        self._generation_checked_at = now
+        
+        try:
+            generation = self.remote.get(self._generation_key(), 0)
+        except Exception as e:
+            logger.error(f"读取缓存代数失败 {self.namespace}: {e}")
+            return
+        
+        if generation != self._generation:
+            self._local.clear()
+            self._generation = generation
+    
+    def get(self, key: str, default: Any = None, local_timeout=None) -> Any:
+        """获取缓存"""
+        self._sync_generation()
+        
+        value = self._local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        try:
+            value = self.remote.get(self._key(key), _MISSING)
+        except Exception as e:
+            logger.error(f"获取缓存失败 {key}: {e}")
+            value = _MISSING
+        
+        if value is _MISSING:
+            return default
+        
+        timeout = local_timeout if local_timeout is not None else self.local_timeout
+        self._local.set(key, value, self._resolve_timeout(timeout, value))
+        return value
+    
+    def set(self, key: str, value: Any, local_timeout=None, remote_timeout=None) -> None:
+        """写入两级缓存"""
+        local_timeout = local_timeout if local_timeout is not None else self.local_timeout
+        remote_timeout = remote_timeout if remote_timeout is not None else self.remote_timeout
+        
+        remote_timeout = self._resolve_timeout(remote_timeout, value)
+        if remote_timeout > 0:
+            try:
+                self.remote.set(self._key(key), value, int(remote_timeout) or 1)
+            except Exception as e:
+                logger.error(f"设置缓存失败 {key}: {e}")
+        
+        self._local.set(key, value, self._resolve_timeout(local_timeout, value))
+    
+    def get_or_set(self, key: str, loader, local_timeout=None, remote_timeout=None) -> Any:
+        """获取缓存，未命中时调用loader加载并回填（loader返回None时不缓存）"""
+        value = self.get(key, _MISSING, local_timeout=local_timeout)
+        if value is not _MISSING:
+            return value
+        
+        value = loader()
+        if value is not None:
+            self.set(key, value, local_timeout, remote_timeout)
+        return value
+    
+    def delete(self, *keys: str) -> None:
+        """删除缓存并通知其他进程清空LRU"""
+        for key in keys:
+            self._local.delete(key)
+        
+        try:
+            self.remote.delete_many([self._key(key) for key in keys])
+            try:
+                self._generation = self.remote.incr(self._generation_key())
+            except ValueError:
+                self.remote.set(self._generation_key(), 1, None)
+                self._generation = 1
+        except Exception as e:
+            logger.error(f"删除缓存失败 {keys}: {e}")
+    
+    def clear_local(self) -> None:
+        """清空本进程LRU"""
+        self._local.clear()
+    
+    @staticmethod
+    def dump_instance(instance) -> Dict:
+        """将模型实例转为可缓存的字段字典"""
+        return {
+            field.attname: field.get_prep_value(getattr(instance, field.attname))
+            for field in instance._meta.concrete_fields
+        }
+    
+    @staticmethod
+    def load_instance(model, data: Dict):
+        """由字段字典还原模型实例（不访问数据库）"""
+        fields = model._meta.concrete_fields
+        values = [field.to_python(data.get(field.attname)) for field in fields]
+        return model.from_db(DEFAULT_DB_ALIAS, [field.attname for field in fields], values)
+
+
+class ResponseCache:
+    """
+    API响应缓存
+    缓存条目为渲染后的响应体、状态码、内容类型、ETag及新鲜截止时间，
+    Redis过期时间为 新鲜期 + 容忍期，容忍期内的旧响应可直接返回（stale-while-revalidate）
+    """
+    
+    # 重新计算锁超时（秒）
+    LOCK_TIMEOUT = 10
+    # 未命中时等待其他请求计算结果的最长时间（秒）
+    LOCK_WAIT = 2.0
+    LOCK_POLL_INTERVAL = 0.05
+    
+    @staticmethod
+    def build_key(request, scope: str) -> str:
+        """
+        生成响应缓存键：路径 + 查询参数 + 作用域（public 所有用户共享，user 按用户区分）
+        """
+        params = {key: request.GET.getlist(key) for key in request.GET.keys()}
+        key = APICacheManager.generate_api_cache_key(request.path, params)
+        
+        if scope == 'public':
+            return f'{key}:public'
+        
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'{key}:user:{user.pk}'
+        return f'{key}:anon'
+    
+    @staticmethod
+    def render(request, response, timeout: int) -> Optional[Dict]:
+        """
+        将成功响应转换为缓存条目，非200或流式响应返回 None
+        """
+        if getattr(response, 'status_code', None) != 200 or getattr(response, 'streaming', False):
+            return None
+        
+        if hasattr(response, 'data') and not getattr(response, 'is_rendered', True):
+            # DRF响应在视图返回后才渲染，这里按已协商的渲染器提前渲染
+            from rest_framework.renderers import JSONRenderer
+            response.accepted_renderer = getattr(request, 'accepted_renderer', None) or JSONRenderer()
+            response.accepted_media_type = getattr(request, 'accepted_media_type', None) or 'application/json'
+            response.renderer_context = {'request': request, 'response': response}
+            response.render()
+        
+        body = response.content
+        try:
+            content, encoding = body.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            content, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+        
+        return {
+            'body': content,
+            'encoding': encoding,
+            'status': response.status_code,
+            'content_type': response.get('Content-Type', 'application/json'),
+            'etag': f'"{hashlib.md5(body).hexdigest()}"',
+            'fresh_until': time.time() + timeout,
+        }
+    
+    @staticmethod
+    def to_response(request, entry: Dict, state: str):
+        """
+        由缓存条目生成响应，If-None-Match 命中时返回304
+        """
+        from django.http import HttpResponse, HttpResponseNotModified
+        
+        if ResponseCache.etag_matches(request, entry['etag']):
+            response = HttpResponseNotModified()
+        else:
+            body = entry['body'].encode('utf-8') if entry['encoding'] == 'utf-8' else base64.b64decode(entry['body'])
+            response = HttpResponse(body, status=entry['status'], content_type=entry['content_type'])
+        
+        response['ETag'] = entry['etag']
+        response['Cache-Control'] = 'private, no-cache'
+        response['X-Cache'] = state
+        return response
+    
+    @staticmethod
+    def etag_matches(request, etag: str) -> bool:
+        """检查 If-None-Match 是否与 ETag 一致（忽略弱校验前缀）"""
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        
+        candidates = [candidate.strip() for candidate in header.split(',')]
+        return '*' in candidates or etag in [
+            candidate[2:] if candidate.startswith('W/') else candidate for candidate in candidates
+        ]
+    
+    @staticmethod
+    def get(cache_instance, key: str) -> Optional[Dict]:
+        try:
+            return cache_instance.get(key)
+        except Exception as e:
+            logger.error(f"获取响应缓存失败 {key}: {e}")
+            return None
+    
+    @staticmethod
+    def set(cache_instance, key: str, entry: Dict, timeout: int) -> None:
+        try:
+            cache_instance.set(key, entry, timeout)
+        except Exception as e:
+            logger.error(f"设置响应缓存失败 {key}: {e}")
+    
+    @staticmethod
+    def acquire(cache_instance, lock_key: str) -> bool:
+        """获取重新计算锁，缓存不可用时视为获取成功"""
+        try:
+            return cache_instance.add(lock_key, 1, ResponseCache.LOCK_TIMEOUT)
+        except Exception as e:
+            logger.error(f"获取响应缓存锁失败 {lock_key}: {e}")
+            return True
+    
+    @staticmethod
+    def release(cache_instance, lock_key: str) -> None:
+        try:
+            cache_instance.delete(lock_key)
+        except Exception as e:
+            logger.error(f"释放响应缓存锁失败 {lock_key}: {e}")
+    
+    @staticmethod
+    def wait(cache_instance, key: str) -> Optional[Dict]:
+        """等待持锁请求写入缓存"""
+        deadline = time.monotonic() + ResponseCache.LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(ResponseCache.LOCK_POLL_INTERVAL)
+            entry = ResponseCache.get(cache_instance, key)
+            if entry is not None:
+                return entry
+        return None
+
+
+def cache_api_response(timeout: int = 180, cache_type: str = 'default', scope: str = 'user',
+                       stale_timeout: int = 0, tags: Optional[List[str]] = None):
+    """
+    API响应缓存装饰器
+    scope='public' 时所有用户共享同一份响应，'user' 时按用户区分；
+    未命中时同一缓存键只有一个请求执行视图，其余请求等待结果；
+    过期后 stale_timeout 秒内继续返回旧响应，由获取到锁的请求刷新；
+    tags 为缓存键登记的标签，数据变化时用 CacheManager.invalidate_tags 清除。
+    DRF视图需放在 @api_view 之下（类视图用 method_decorator 装饰处理方法），
+    使认证和权限检查先于缓存执行
+    """
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
             # 只缓存GET请求
-            if request.method != 'GET':
+            if request.method not in ('GET', 'HEAD'):
                 return view_func(request, *args, **kwargs)
             
-            # 生成缓存键
-            cache_key = APICacheManager.generate_api_cache_key(
-                request.path, 
-                dict(request.GET.items())
-            )
-            
-            # 尝试从缓存获取
-            cached_response = APICacheManager.get_cache(cache_key, cache_type)
-            if cached_response:
-                logger.debug(f"API缓存命中: {request.path}")
-                return cached_response
+            cache_instance = caches[cache_type] if cache_type != 'default' else cache
+            cache_key = ResponseCache.build_key(request, scope)
+            lock_key = f'{cache_key}:lock'
             
-            # 执行视图函数
-            response = view_func(request, *args, **kwargs)
+            entry = ResponseCache.get(cache_instance, cache_key)
+            if entry is not None:
+                if entry['fresh_until'] > time.time():
+                    return ResponseCache.to_response(request, entry, 'HIT')
+                # 已过期：其他请求正在刷新时返回旧响应
+                if not ResponseCache.acquire(cache_instance, lock_key):
+                    return ResponseCache.to_response(request, entry, 'STALE')
+            elif not ResponseCache.acquire(cache_instance, lock_key):
+                entry = ResponseCache.wait(cache_instance, cache_key)
+                if entry is not None:
+                    return ResponseCache.to_response(request, entry, 'HIT')
+                logger.warning(f"等待API响应缓存超时: {request.path}")
+                return view_func(request, *args, **kwargs)
             
-            # 缓存成功响应
-            if hasattr(response, 'status_code') and response.status_code == 200:
-                APICacheManager.set_cache(cache_key, response, timeout, cache_type)
+            try:
+                response = view_func(request, *args, **kwargs)
+                entry = ResponseCache.render(request, response, timeout)
+                if entry is None:
+                    return response
+                ResponseCache.set(cache_instance, cache_key, entry, timeout + stale_timeout)
+                if tags:
+                    CacheManager.tag_keys(tags, [cache_key], cache_type)
                 logger.debug(f"API响应已缓存: {request.path}")
+            finally:
+                ResponseCache.release(cache_instance, lock_key)
             
-            return response
+            return ResponseCache.to_response(request, entry, 'MISS')
         return wrapper
     return decorator
 
@@ -293,14 +774,19 @@ class RedisClusterManager:
             logger.error(f"监控Redis内存失败: {e}")
             return {}
     
-    def cleanup_expired_keys(self) -> int:
-        """清理过期键"""
+    def cleanup_expired_keys(self, batch_size: int = 1000) -> int:
+        """
+        清理过期键
+        SCAN 分批遍历键空间，Redis在遍历时删除已过期的键；每批为独立命令，不阻塞其他请求
+        """
         try:
-            # 获取所有键的数量
             total_keys = self.redis_client.dbsize()
             
-            # 执行过期键清理
-            self.redis_client.execute_command('MEMORY', 'PURGE')
+            cursor = 0
+            while True:
+                cursor, _ = self.redis_client.scan(cursor, count=batch_size)
+                if cursor == 0:
+                    break
             
             # 返回清理后的键数量差异
             remaining_keys = self.redis_client.dbsize()
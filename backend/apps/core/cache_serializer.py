@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+缓存值序列化
+CacheManager 写入的值编码为: 标识字节 + 序列化类型 + 压缩类型 + 数据，
+读取时按类型直接解码，字符串不再尝试 json.loads；序列化库和压缩算法可配置
+"""
+
+import datetime
+import decimal
+import json
+import logging
+import uuid
+import zlib
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# 0xC1 不是合法的 msgpack/UTF-8 起始字节，也不会出现在 django_redis 的序列化结果开头
+MAGIC = b'\xc1'
+
+# 序列化类型
+TYPE_STR = b's'
+TYPE_BYTES = b'b'
+TYPE_MSGPACK = b'm'
+TYPE_ORJSON = b'o'
+TYPE_JSON = b'j'
+
+# 压缩类型
+COMPRESS_NONE = b'-'
+COMPRESS_ZLIB = b'z'
+COMPRESS_LZ4 = b'l'
+
+HEADER_SIZE = 3
+
+
+def _default(value: Any) -> Any:
+    """
+    非基本类型的转换规则，与 DjangoJSONEncoder 一致
+    """
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f'无法序列化的类型: {type(value).__name__}')
+
+
+class CacheSerializer:
+    """
+    缓存值序列化器
+    """
+
+    def __init__(self, serializer: str = 'orjson', compression: str = 'zlib',
+                 compress_min_size: int = 1024, compress_level: int = 6):
+        if serializer == 'msgpack' and msgpack is None:
+            logger.warning("未安装 msgpack，缓存序列化改用 orjson/json")
+            serializer = 'orjson'
+        if serializer == 'orjson' and orjson is None:
+            logger.warning("未安装 orjson，缓存序列化改用 json")
+            serializer = 'json'
+        if compression == 'lz4' and lz4_frame is None:
+            logger.warning("未安装 lz4，缓存压缩改用 zlib")
+            compression = 'zlib'
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_size = compress_min_size
+        self.compress_level = compress_level
+
+    @classmethod
+    def from_settings(cls) -> 'CacheSerializer':
+        options = getattr(settings, 'CACHE_SERIALIZATION', {})
+        return cls(
+            serializer=options.get('SERIALIZER', 'orjson'),
+            compression=options.get('COMPRESSION', 'zlib'),
+            compress_min_size=options.get('COMPRESS_MIN_SIZE', 1024),
+        )
+
+    @staticmethod
+    def is_encoded(data: Any) -> bool:
+        """是否为本序列化器写入的值"""
+        return isinstance(data, bytes) and len(data) >= HEADER_SIZE and data[:1] == MAGIC
+
+    def dumps(self, value: Any) -> bytes:
+        """
+        编码缓存值
+        """
+        if isinstance(value, str):
+            value_type, payload = TYPE_STR, value.encode('utf-8')
+        elif isinstance(value, bytes):
+            value_type, payload = TYPE_BYTES, value
+        elif self.serializer == 'msgpack':
+            value_type, payload = TYPE_MSGPACK, msgpack.packb(value, default=_default, use_bin_type=True)
+        elif self.serializer == 'orjson':
+            value_type, payload = TYPE_ORJSON, orjson.dumps(
+                value, default=_default, option=orjson.OPT_NON_STR_KEYS
+            )
+        else:
+            value_type, payload = TYPE_JSON, json.dumps(
+                value, default=_default, ensure_ascii=False, separators=(',', ':')
+            ).encode('utf-8')
+
+        compression = COMPRESS_NONE
+        if self.compression != 'none' and len(payload) >= self.compress_min_size:
+            if self.compression == 'lz4':
+                compressed = lz4_frame.compress(payload)
+                compression_type = COMPRESS_LZ4
+            else:
+                compressed = zlib.compress(payload, self.compress_level)
+                compression_type = COMPRESS_ZLIB
+            # 压缩无收益时保存原文
+            if len(compressed) < len(payload):
+                payload, compression = compressed, compression_type
+
+        return MAGIC + value_type + compression + payload
+
+    def loads(self, data: bytes) -> Any:
+        """
+        解码缓存值
+        """
+        if not self.is_encoded(data):
+            raise ValueError('不是已编码的缓存值')
+
+        value_type, compression, payload = data[1:2], data[2:3], data[HEADER_SIZE:]
+
+        if compression == COMPRESS_ZLIB:
+            payload = zlib.decompress(payload)
+        elif compression == COMPRESS_LZ4:
+            if lz4_frame is None:
+                raise ValueError('未安装 lz4，无法解压缓存值')
+            payload = lz4_frame.decompress(payload)
+
+        if value_type == TYPE_STR:
+            return payload.decode('utf-8')
+        if value_type == TYPE_BYTES:
+            return payload
+        if value_type == TYPE_MSGPACK:
+            if msgpack is None:
+                raise ValueError('未安装 msgpack，无法解码缓存值')
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        if value_type in (TYPE_ORJSON, TYPE_JSON):
+            return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+        raise ValueError(f'未知的缓存值类型: {value_type!r}')
+
+
+# 全局缓存序列化器
+cache_serializer = CacheSerializer.from_settings()
@@ -20,43 +20,16 @@ class DatabaseOptimizer:
     
     @staticmethod
     def create_indexes():
-        """创建性能优化索引"""
-        indexes = [
-            # 用户相关索引
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_phone_active ON users_user(phone, is_active);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_vip_turnover ON users_user(vip_level, total_turnover);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_referral_code ON users_user(referral_code);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_country_active ON users_user(country, is_active);",
-            
-            # 交易记录索引
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_time ON finance_transaction(user_id, created_at DESC);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_type_status ON finance_transaction(type, status);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_amount_time ON finance_transaction(amount, created_at);",
-            
-            # 投注记录索引
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lottery_bets_user_draw ON games_lottery11x5_lotterybet(user_id, draw_id);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lottery_bets_draw_time ON games_lottery11x5_lotterybet(draw_id, created_at);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lottery_bets_status ON games_lottery11x5_lotterybet(status);",
-            
-            # 余额记录索引
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_balance_updated ON finance_userbalance(updated_at);",
-            
-            # 奖励记录索引
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rewards_user_type ON rewards_reward(user_id, reward_type);",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rewards_created_at ON rewards_reward(created_at DESC);",
-            
-            # 复合索引优化
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_vip_country ON users_user(vip_level, country) WHERE is_active = true;",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_type_time ON finance_transaction(user_id, type, created_at DESC);",
-        ]
+        """
+        检查性能优化索引
+        索引已在各模型 Meta 中声明并由迁移创建，这里只报告声明了但尚未创建的索引（迁移未执行）
+        """
+        from .index_advisor import IndexAdvisor
         
-        with connection.cursor() as cursor:
-            for index_sql in indexes:
-                try:
-                    cursor.execute(index_sql)
-                    logger.info(f"创建索引成功: {index_sql[:50]}...")
-                except Exception as e:
-                    logger.error(f"创建索引失败: {e}")
+        missing = IndexAdvisor.missing_declared_indexes()
+        for item in missing:
+            logger.warning(f"索引未创建，请执行迁移: {item['table']}.{item['index']}")
+        return missing
     
     @staticmethod
     def analyze_slow_queries():
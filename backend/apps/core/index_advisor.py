@@ -0,0 +1,241 @@
+"""
+索引顾问
+对登记的热点查询取执行计划，报告顺序扫描的表、实际使用的索引以及未命中的预期索引；
+PostgreSQL 下另外读取 pg_stat_statements 慢语句和 pg_stat_user_indexes 中从未使用的索引
+"""
+
+import json
+import logging
+import re
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# SQLite EXPLAIN QUERY PLAN 文本
+SQLITE_INDEX_RE = re.compile(r'\bUSING (?:COVERING )?INDEX (\w+)')
+SQLITE_SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?(\w+)')
+
+
+class IndexAdvisor:
+    """
+    索引顾问
+    热点查询登记为 (名称, 构造查询集的函数, 预期使用的索引)，查询集只用于取执行计划，不会执行
+    """
+
+    _hot_queries: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+
+    @classmethod
+    def register(cls, name: str, expected_indexes: Tuple[str, ...] = ()):
+        """
+        登记热点查询（装饰器），被装饰函数返回查询集
+        """
+        def decorator(builder: Callable):
+            cls._hot_queries[name] = (builder, tuple(expected_indexes))
+            return builder
+        return decorator
+
+    @classmethod
+    def hot_queries(cls) -> Dict[str, Tuple[Callable, Tuple[str, ...]]]:
+        return dict(cls._hot_queries)
+
+    @staticmethod
+    def parse_plan(plan: str) -> Dict[str, List[str]]:
+        """
+        解析执行计划，返回 {'seq_scans': [表名], 'indexes': [索引名]}
+        """
+        seq_scans, indexes = [], []
+
+        if connection.vendor == 'postgresql':
+            nodes = [json.loads(plan)[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                if node.get('Node Type') == 'Seq Scan':
+                    seq_scans.append(node['Relation Name'])
+                if 'Index Name' in node:
+                    indexes.append(node['Index Name'])
+                nodes.extend(node.get('Plans', []))
+        else:
+            for line in plan.splitlines():
+                match = SQLITE_INDEX_RE.search(line)
+                if match:
+                    indexes.append(match.group(1))
+                    continue
+                match = SQLITE_SCAN_RE.search(line)
+                if match and match.group(1) != 'CONSTANT':
+                    seq_scans.append(match.group(1))
+
+        return {'seq_scans': sorted(set(seq_scans)), 'indexes': sorted(set(indexes))}
+
+    @staticmethod
+    def explain_queryset(queryset) -> Dict[str, List[str]]:
+        if connection.vendor == 'postgresql':
+            plan = queryset.explain(format='json')
+        else:
+            plan = queryset.explain()
+        return IndexAdvisor.parse_plan(plan)
+
+    @classmethod
+    def check_hot_queries(cls) -> List[Dict[str, Any]]:
+        """
+        对全部热点查询取执行计划
+        返回 [{'name', 'seq_scans', 'indexes', 'missing', 'ok'}]，missing 为未使用的预期索引
+        """
+        results = []
+        for name, (builder, expected_indexes) in sorted(cls._hot_queries.items()):
+            try:
+                plan = cls.explain_queryset(builder())
+            except Exception as e:
+                logger.error(f"获取执行计划失败 {name}: {e}")
+                results.append({'name': name, 'error': str(e), 'ok': False})
+                continue
+
+            missing = [index for index in expected_indexes if index not in plan['indexes']]
+            results.append({
+                'name': name,
+                'seq_scans': plan['seq_scans'],
+                'indexes': plan['indexes'],
+                'missing': missing,
+                'ok': not missing and not plan['seq_scans'],
+            })
+        return results
+
+    @staticmethod
+    def missing_declared_indexes() -> List[Dict[str, str]]:
+        """
+        模型 Meta 中声明但数据库中不存在的索引（迁移未执行）
+        """
+        missing = []
+        with connection.cursor() as cursor:
+            existing_tables = set(connection.introspection.table_names(cursor))
+            for model in apps.get_models():
+                if not model._meta.managed or not model._meta.indexes:
+                    continue
+                table = model._meta.db_table
+                if table not in existing_tables:
+                    continue
+                constraints = connection.introspection.get_constraints(cursor, table)
+                for index in model._meta.indexes:
+                    if index.name not in constraints:
+                        missing.append({'table': table, 'index': index.name})
+        return missing
+
+    @staticmethod
+    def unused_indexes(min_size_bytes: int = 0) -> List[Dict[str, Any]]:
+        """
+        统计周期内从未被扫描的非唯一索引（仅PostgreSQL）
+        """
+        if connection.vendor != 'postgresql':
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid) AS size
+                FROM pg_stat_user_indexes s
+                JOIN pg_index i ON i.indexrelid = s.indexrelid
+                WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+                  AND pg_relation_size(s.indexrelid) >= %s
+                ORDER BY size DESC
+            """, [min_size_bytes])
+            return [
+                {'table': table, 'index': index, 'size': size}
+                for table, index, size in cursor.fetchall()
+            ]
+
+    @staticmethod
+    def slow_statements(limit: int = 20, min_mean_ms: float = 50) -> List[Dict[str, Any]]:
+        """
+        pg_stat_statements 中平均耗时最高的语句，未安装扩展时返回空列表
+        """
+        if connection.vendor != 'postgresql':
+            return []
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+                if cursor.fetchone() is None:
+                    return []
+                # PostgreSQL 13 起列名为 mean_exec_time/total_exec_time
+                cursor.execute(
+                    "SELECT column_name FROM information_schema.columns "
+                    "WHERE table_name = 'pg_stat_statements' AND column_name = 'mean_exec_time'"
+                )
+                prefix = 'exec_' if cursor.fetchone() else ''
+                cursor.execute(f"""
+                    SELECT query, calls, total_{prefix}time, mean_{prefix}time, rows
+                    FROM pg_stat_statements
+                    WHERE mean_{prefix}time >= %s
+                    ORDER BY mean_{prefix}time DESC
+                    LIMIT %s
+                """, [min_mean_ms, limit])
+                return [
+                    {'query': query, 'calls': calls, 'total_ms': total, 'mean_ms': mean, 'rows': rows}
+                    for query, calls, total, mean, rows in cursor.fetchall()
+                ]
+        except Exception as e:
+            logger.warning(f"读取 pg_stat_statements 失败: {e}")
+            return []
+
+
+# 热点查询登记：参数取任意占位值，只用于生成执行计划
+
+SAMPLE_ID = uuid.UUID(int=1)
+
+
+@IndexAdvisor.register('开奖结算-待开奖投注', ('bet_draw_pending_idx',))
+def _pending_bets_by_draw():
+    from apps.games.models import Bet
+    return Bet.objects.filter(draw_id=1, status='PENDING')
+
+
+@IndexAdvisor.register('大乐透结算-待开奖投注')
+def _superlotto_pending_bets():
+    from apps.games.superlotto.models import SuperLottoBet
+    return SuperLottoBet.objects.filter(draw_id=SAMPLE_ID, status='PENDING').order_by('id')
+
+
+@IndexAdvisor.register('有效流水-用户投注', ('txn_user_type_done_idx',))
+def _user_turnover():
+    from apps.finance.models import Transaction
+    return Transaction.objects.filter(
+        user_id=SAMPLE_ID, type='BET', status='COMPLETED', created_at__gte=timezone.now() - timedelta(days=30)
+    ).values('user_id').annotate(total=Sum('amount'))
+
+
+@IndexAdvisor.register('交易分析-分桶聚合')
+def _transaction_buckets():
+    from apps.finance.services import TransactionAnalyticsService
+    return TransactionAnalyticsService.bucket_queryset(SAMPLE_ID, timezone.localdate() - timedelta(days=365))
+
+
+@IndexAdvisor.register('交易导出-用户时间范围')
+def _transaction_export():
+    from apps.finance.models import Transaction
+    return Transaction.objects.filter(
+        user_id=SAMPLE_ID, created_at__gte=timezone.now() - timedelta(days=365)
+    ).order_by('-created_at')
+
+
+@IndexAdvisor.register('待处理交易-超时扫描', ('txn_pending_idx',))
+def _pending_transactions():
+    from apps.finance.models import Transaction
+    return Transaction.objects.filter(
+        type='WITHDRAW', status='PENDING', created_at__lt=timezone.now() - timedelta(minutes=30)
+    )
+
+
+@IndexAdvisor.register('返水-用户历史')
+def _rebate_history():
+    from apps.rewards.models import RebateRecord
+    return RebateRecord.objects.filter(user_id=SAMPLE_ID).order_by('-period_date')[:20]
+
+
+@IndexAdvisor.register('返水-已发放检查')
+def _rebate_existing():
+    from apps.rewards.models import RebateRecord
+    return RebateRecord.objects.filter(user_id__in=[SAMPLE_ID], period_date=timezone.localdate())
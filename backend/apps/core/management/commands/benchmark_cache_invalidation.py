@@ -0,0 +1,124 @@
+"""
+缓存失效基准测试管理命令
+在填充大量键的Redis中对比 KEYS + DEL、SCAN + UNLINK 与标签失效的耗时，
+并以并发 PING 的最大延迟衡量对其他请求的阻塞
+"""
+
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.cache_manager import CacheManager
+
+
+class LatencyProbe(threading.Thread):
+    """
+    后台持续 PING，记录最大延迟（毫秒）
+    """
+
+    def __init__(self, redis_client):
+        super().__init__(daemon=True)
+        self.redis_client = redis_client
+        self.max_latency = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            self.redis_client.ping()
+            self.max_latency = max(self.max_latency, (time.perf_counter() - start) * 1000)
+            time.sleep(0.001)
+
+    def stop(self) -> float:
+        self._stop_event.set()
+        self.join()
+        return self.max_latency
+
+
+class Command(BaseCommand):
+    help = '缓存失效基准测试（需要默认缓存为Redis）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keys',
+            type=int,
+            default=1000000,
+            help='填充的键总数',
+        )
+        parser.add_argument(
+            '--tagged',
+            type=int,
+            default=1000,
+            help='每种方式待清除的键数（模拟单个用户或游戏的缓存）',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='填充时每批写入的键数',
+        )
+
+    def handle(self, *args, **options):
+        redis_client = CacheManager.get_redis_client(cache)
+        if redis_client is None:
+            raise CommandError('默认缓存不是Redis，无法执行基准测试')
+
+        prefix = f'benchmark:{uuid.uuid4().hex[:8]}'
+        methods = [
+            ('KEYS + DEL', self.keys_delete),
+            ('SCAN + UNLINK', self.scan_unlink),
+            ('标签失效', self.invalidate_tag),
+        ]
+
+        try:
+            filler = options['keys'] - options['tagged'] * len(methods)
+            self.stdout.write(f'填充 {filler} 个键...')
+            self.fill(redis_client, (f'{prefix}:filler:{i}' for i in range(filler)), options['batch_size'])
+
+            for index, (name, method) in enumerate(methods):
+                group = f'{prefix}:group{index}'
+                keys = [f'{group}:item:{i}' for i in range(options['tagged'])]
+                self.fill(redis_client, keys, options['batch_size'])
+                CacheManager.tag_keys([group], keys)
+
+                probe = LatencyProbe(redis_client)
+                probe.start()
+                start = time.perf_counter()
+                deleted = method(redis_client, group)
+                elapsed = (time.perf_counter() - start) * 1000
+                max_latency = probe.stop()
+
+                self.stdout.write(
+                    f'{name}: 删除 {deleted} 个键，耗时 {elapsed:.1f}ms，并发PING最大延迟 {max_latency:.1f}ms'
+                )
+        finally:
+            CacheManager.invalidate_tags(*[f'{prefix}:group{index}' for index in range(len(methods))])
+            deleted = CacheManager.clear_pattern(f'{prefix}:*')
+            self.stdout.write(f'已清理测试键 {deleted} 个')
+
+    @staticmethod
+    def fill(redis_client, keys, batch_size):
+        """按批流水线写入测试键"""
+        pipeline = redis_client.pipeline(transaction=False)
+        for index, key in enumerate(keys, 1):
+            pipeline.set(cache.make_key(key), b'1', ex=3600)
+            if index % batch_size == 0:
+                pipeline.execute()
+        pipeline.execute()
+
+    @staticmethod
+    def keys_delete(redis_client, group):
+        """原实现：KEYS 匹配后一次性 DEL"""
+        keys = redis_client.keys(cache.make_key(f'{group}:*'))
+        return redis_client.delete(*keys) if keys else 0
+
+    @staticmethod
+    def scan_unlink(redis_client, group):
+        return CacheManager.clear_pattern(f'{group}:*')
+
+    @staticmethod
+    def invalidate_tag(redis_client, group):
+        return CacheManager.invalidate_tags(group)
@@ -0,0 +1,133 @@
+"""
+缓存序列化基准测试管理命令
+对比原实现（json.dumps 字符串再经 django_redis JSON序列化 + zlib压缩）与各序列化、压缩组合
+在走势图、VIP等级表等大对象上的存储字节数和编解码耗时
+"""
+
+import json
+import time
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from apps.core import cache_serializer as serializer_module
+from apps.core.cache_serializer import CacheSerializer
+
+
+def build_trend_chart(rows: int = 100):
+    """构造与完整走势图结构一致的数据"""
+    now = timezone.now()
+    chart = {
+        'headers': [{'key': f'num_{num}', 'title': f'{num:02d}', 'type': 'number', 'number': num}
+                    for num in range(1, 12)],
+        'rows': [],
+        'statistics': {},
+    }
+    for index in range(rows):
+        numbers = [(index * 7 + offset * 3) % 11 + 1 for offset in range(5)]
+        chart['rows'].append({
+            'draw_number': f'20240101{index:03d}',
+            'draw_time': (now - timedelta(minutes=20 * index)).isoformat(),
+            'numbers': numbers,
+            'sum_value': sum(numbers),
+            'span_value': max(numbers) - min(numbers),
+            'cells': [
+                {'number': num, 'hit': num in numbers, 'missing': 0 if num in numbers else (index + num) % 13}
+                for num in range(1, 12)
+            ],
+        })
+    chart['statistics'] = {
+        str(num): {'hits': rows // 3, 'max_missing': 17, 'avg_missing': 4.5} for num in range(1, 12)
+    }
+    return chart
+
+
+def build_vip_table():
+    """构造VIP等级表数据"""
+    return [
+        {
+            'level': level,
+            'name': f'VIP{level}',
+            'required_turnover': str(Decimal(10000) * level * level),
+            'rebate_rate': str(Decimal('0.0030') + Decimal('0.0005') * level),
+            'daily_withdraw_limit': str(Decimal(50000) * (level + 1)),
+            'daily_withdraw_times': level + 1,
+            'withdraw_fee_rate': str(Decimal('0.0100') - Decimal('0.0010') * level),
+            'monthly_bonus': str(Decimal(1000) * level),
+            'birthday_bonus': str(Decimal(500) * level),
+            'description': f'VIP{level} 会员专享返水、提现及节日福利',
+        }
+        for level in range(8)
+    ]
+
+
+def legacy_dumps(value) -> bytes:
+    """原实现：JSON字符串经 django_redis JSON序列化后 zlib 压缩"""
+    data = json.dumps(json.dumps(value, ensure_ascii=False), cls=DjangoJSONEncoder).encode()
+    return zlib.compress(data, 6)
+
+
+def legacy_loads(data: bytes):
+    return json.loads(json.loads(zlib.decompress(data).decode()))
+
+
+class Command(BaseCommand):
+    help = '缓存序列化基准测试'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='每种组合的编解码次数',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100,
+            help='走势图期数',
+        )
+
+    def handle(self, *args, **options):
+        payloads = [
+            ('走势图', build_trend_chart(options['rows'])),
+            ('VIP等级表', build_vip_table()),
+        ]
+
+        serializers = ['json'] + [
+            name for name, module in (('orjson', serializer_module.orjson), ('msgpack', serializer_module.msgpack))
+            if module is not None
+        ]
+        compressions = ['none', 'zlib'] + (['lz4'] if serializer_module.lz4_frame is not None else [])
+
+        for payload_name, payload in payloads:
+            self.stdout.write(f'\n{payload_name}（字节数 / 编码微秒 / 解码微秒）')
+            self.report('原实现', payload, legacy_dumps, legacy_loads, options['iterations'])
+
+            for name in serializers:
+                for compression in compressions:
+                    serializer = CacheSerializer(serializer=name, compression=compression)
+                    self.report(
+                        f'{name} + {compression}', payload, serializer.dumps, serializer.loads, options['iterations']
+                    )
+
+    def report(self, label, payload, dumps, loads, iterations):
+        data = dumps(payload)
+        if loads(data) != json.loads(json.dumps(payload)):
+            raise CommandError(f'{label} 解码结果不一致')
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            dumps(payload)
+        encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            loads(data)
+        decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+        self.stdout.write(f'  {label:<16} {len(data):>8} {encode_us:>10.1f} {decode_us:>10.1f}')
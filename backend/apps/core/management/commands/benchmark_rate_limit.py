@@ -0,0 +1,117 @@
+"""
+频率限制基准测试管理命令
+对比原 cache.get/cache.set 计数器、时间戳列表滑动窗口与Lua令牌桶的单次耗时和并发超放行情况
+"""
+
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.core.rate_limit import RateLimiter
+
+
+def legacy_counter(key: str, limit: int, window: int) -> bool:
+    """
+    原中间件、装饰器实现：读取计数后写回
+    """
+    current = cache.get(key, 0)
+    if current >= limit:
+        return False
+    cache.set(key, current + 1, window)
+    return True
+
+
+def legacy_sliding_window(key: str, limit: int, window: int) -> bool:
+    """
+    原 AdvancedRateLimiter 实现：读取时间戳列表、过滤后写回
+    """
+    now = int(time.time())
+    requests_data = [t for t in cache.get(key, []) if t > now - window]
+    if len(requests_data) >= limit:
+        return False
+    requests_data.append(now)
+    cache.set(key, requests_data, window)
+    return True
+
+
+def token_bucket(key: str, limit: int, window: int) -> bool:
+    return RateLimiter.hit('benchmark', key, limit, window)['allowed']
+
+
+class Command(BaseCommand):
+    help = '频率限制基准测试（使用当前默认缓存）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='单线程调用次数',
+        )
+        parser.add_argument(
+            '--history',
+            type=int,
+            default=5000,
+            help='滑动窗口预置的请求记录数（模拟高限额键，如全局限制）',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='并发测试线程数',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='并发测试的限额',
+        )
+
+    def handle(self, *args, **options):
+        implementations = [
+            ('计数器(get/set)', legacy_counter),
+            ('滑动窗口(列表)', legacy_sliding_window),
+            ('令牌桶', token_bucket),
+        ]
+        backend = '进程内（非Redis缓存）' if RateLimiter._get_script() is None else 'Redis Lua'
+        self.stdout.write(f'令牌桶执行方式: {backend}')
+
+        self.stdout.write('\n单次调用耗时（毫秒）')
+        for name, func in implementations:
+            key = f'benchmark:{uuid.uuid4().hex}'
+            if func is legacy_sliding_window:
+                # 预置历史记录，模拟限额较高的键
+                cache.set(key, [int(time.time())] * options['history'], 3600)
+
+            durations = []
+            for _ in range(options['iterations']):
+                start = time.perf_counter()
+                func(key, 10 ** 9, 3600)
+                durations.append((time.perf_counter() - start) * 1000)
+
+            durations.sort()
+            self.stdout.write(
+                f'  {name}: 平均 {statistics.mean(durations):.3f}, '
+                f'P50 {durations[len(durations) // 2]:.3f}, '
+                f'P99 {durations[int(len(durations) * 0.99) - 1]:.3f}, '
+                f'{len(durations) / (sum(durations) / 1000):.0f} 次/秒'
+            )
+            cache.delete(key)
+
+        self.stdout.write(f'\n并发放行数（限额 {options["limit"]}，{options["threads"]} 线程）')
+        for name, func in implementations:
+            key = f'benchmark:{uuid.uuid4().hex}'
+            attempts = options['limit'] * 4
+
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                allowed = sum(executor.map(lambda _: func(key, options['limit'], 3600), range(attempts)))
+
+            over = allowed - options['limit']
+            style = self.style.SUCCESS if over <= 0 else self.style.WARNING
+            self.stdout.write(style(f'  {name}: 放行 {allowed}/{attempts}，超出限额 {max(0, over)}'))
+            cache.delete(key)
+            RateLimiter.reset('benchmark', key)
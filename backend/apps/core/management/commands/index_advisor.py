@@ -0,0 +1,65 @@
+"""
+索引顾问管理命令
+检查热点查询的执行计划、未创建的声明索引，PostgreSQL 下报告慢语句和未使用的索引
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.core.index_advisor import IndexAdvisor
+
+
+class Command(BaseCommand):
+    help = '索引顾问：报告缺失或未使用的索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--statements',
+            type=int,
+            default=10,
+            help='显示 pg_stat_statements 中平均耗时最高的语句数（0 不显示）',
+        )
+        parser.add_argument(
+            '--min-mean-ms',
+            type=float,
+            default=50,
+            help='慢语句平均耗时下限（毫秒）',
+        )
+        parser.add_argument(
+            '--unused-min-size',
+            type=int,
+            default=1024 * 1024,
+            help='只报告不小于该字节数的未使用索引',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('热点查询执行计划')
+        for result in IndexAdvisor.check_hot_queries():
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f"  {result['name']}: 获取执行计划失败 {result['error']}"))
+                continue
+            line = f"  {result['name']}: 使用索引 {', '.join(result['indexes']) or '无'}"
+            if result['seq_scans']:
+                line += f"；顺序扫描 {', '.join(result['seq_scans'])}"
+            if result['missing']:
+                line += f"；未命中预期索引 {', '.join(result['missing'])}"
+            self.stdout.write(self.style.SUCCESS(line) if result['ok'] else self.style.WARNING(line))
+
+        missing = IndexAdvisor.missing_declared_indexes()
+        self.stdout.write(f'\n已声明未创建的索引: {len(missing)}')
+        for item in missing:
+            self.stdout.write(self.style.WARNING(f"  {item['table']}.{item['index']}（请执行迁移）"))
+
+        unused = IndexAdvisor.unused_indexes(options['unused_min_size'])
+        if unused:
+            self.stdout.write(f'\n未使用的索引: {len(unused)}')
+            for item in unused:
+                self.stdout.write(f"  {item['table']}.{item['index']} {item['size'] / 1024 / 1024:.1f}MB")
+
+        if options['statements']:
+            statements = IndexAdvisor.slow_statements(options['statements'], options['min_mean_ms'])
+            if statements:
+                self.stdout.write('\n慢语句（pg_stat_statements）')
+                for item in statements:
+                    self.stdout.write(
+                        f"  平均 {item['mean_ms']:.1f}ms × {item['calls']} 次: {' '.join(item['query'].split())[:160]}"
+                    )
@@ -0,0 +1,317 @@
+"""
+请求指标缓冲区
+中间件只在进程内按（分钟, 方法, 接口）累加耗时直方图和错误计数，
+后台线程定期将已结束分钟的聚合结果批量写库（每分钟每接口一行），请求路径上不再有数据库写入
+"""
+
+import atexit
+import bisect
+import logging
+import os
+import re
+import socket
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# 耗时区间上界（毫秒），最后一个区间为超出上界的请求
+LATENCY_BUCKETS_MS = (
+    5, 10, 25, 50, 75, 100, 150, 250, 400, 600,
+    1000, 1500, 2500, 4000, 6000, 10000, 20000, 30000,
+)
+
+# 路径中的ID段（纯数字、UUID），无路由信息时归一化为占位符，避免接口维度无限增长
+_PATH_ID_PATTERN = re.compile(
+    r'/(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})(?=/|$)'
+)
+
+
+class MetricsBuffer:
+    """
+    进程内请求指标缓冲区
+    """
+
+    def __init__(self, flush_interval: Optional[int] = None, max_keys: Optional[int] = None):
+        monitoring = getattr(settings, 'PERFORMANCE_MONITORING', {})
+        self.flush_interval = monitoring.get('METRICS_FLUSH_INTERVAL', 10) if flush_interval is None else flush_interval
+        self.max_keys = monitoring.get('METRICS_MAX_KEYS', 5000) if max_keys is None else max_keys
+
+        self.lock = threading.Lock()
+        # (分钟, 方法, 接口) -> 聚合数据
+        self._stats: Dict[tuple, Dict[str, Any]] = {}
+        # (分钟, 方法, 接口, 状态码) -> 次数
+        self._errors: Dict[tuple, int] = {}
+        self._dropped = 0
+
+        self._pid = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def source(self) -> str:
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    @staticmethod
+    def get_endpoint(request) -> str:
+        """
+        获取请求的接口标识
+        优先使用URL路由模板（如 api/v1/games/<int:pk>/），否则将路径中的ID段替换为占位符
+        """
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = getattr(resolver_match, 'route', None)
+        if route:
+            return '/' + route.lstrip('^')[:254]
+        return _PATH_ID_PATTERN.sub('/:id', request.path)[:255]
+
+    def record(self, method: str, endpoint: str, duration_ms: float, status_code: int, now: datetime = None):
+        """
+        记录一次请求耗时
+        """
+        self._ensure_started()
+        minute = self._minute(now)
+        index = bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+        status_key = str(status_code)
+
+        with self.lock:
+            stats = self._stats.get((minute, method, endpoint))
+            if stats is None:
+                if len(self._stats) >= self.max_keys:
+                    self._dropped += 1
+                    return
+                stats = self._stats[(minute, method, endpoint)] = {
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    'status_counts': {},
+                }
+
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['histogram'][index] += 1
+            stats['status_counts'][status_key] = stats['status_counts'].get(status_key, 0) + 1
+
+    def record_error(self, method: str, endpoint: str, status_code: int, now: datetime = None):
+        """
+        记录一次错误响应（按分钟、接口、状态码合并为一条系统日志）
+        """
+        self._ensure_started()
+        key = (self._minute(now), method, endpoint, status_code)
+
+        with self.lock:
+            if key not in self._errors and len(self._errors) >= self.max_keys:
+                self._dropped += 1
+                return
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def flush(self, force: bool = False) -> Dict[str, int]:
+        """
+        写入已结束分钟的聚合数据
+        force=True 时写入全部数据（进程退出时使用）
+        返回写入的指标行数、日志行数
+        """
+        from .models import APIMetricAggregate, SystemLog, PerformanceMetric
+
+        current_minute = self._minute()
+        with self.lock:
+            stats = {key: value for key, value in self._stats.items() if force or key[0] < current_minute}
+            errors = {key: value for key, value in self._errors.items() if force or key[0] < current_minute}
+            for key in stats:
+                del self._stats[key]
+            for key in errors:
+                del self._errors[key]
+            dropped, self._dropped = self._dropped, 0
+
+        if dropped:
+            logger.warning(f"请求指标缓冲区已满，丢弃 {dropped} 条记录")
+        if not stats and not errors:
+            return {'metrics': 0, 'logs': 0}
+
+        source = self.source
+        metrics = []
+        for (minute, method, endpoint), value in stats.items():
+            p50, p95, p99 = MetricsBuffer.percentiles(value['histogram'], value['max_ms'], (0.5, 0.95, 0.99))
+            status_counts = value['status_counts']
+            metrics.append(APIMetricAggregate(
+                minute=minute,
+                method=method,
+                endpoint=endpoint,
+                source=source,
+                count=value['count'],
+                client_error_count=sum(count for code, count in status_counts.items() if code.startswith('4')),
+                server_error_count=sum(count for code, count in status_counts.items() if code.startswith('5')),
+                total_ms=value['total_ms'],
+                max_ms=value['max_ms'],
+                p50_ms=p50,
+                p95_ms=p95,
+                p99_ms=p99,
+                histogram=value['histogram'],
+                status_counts=status_counts,
+            ))
+
+        logs = [
+            SystemLog(
+                level='ERROR' if status_code >= 500 else 'WARNING',
+                module='HTTP_ERROR',
+                message=f'HTTP错误: {status_code} {method} {endpoint}（{count}次）',
+                extra_data={
+                    'method': method,
+                    'path': endpoint,
+                    'status_code': status_code,
+                    'count': count,
+                    'minute': minute.isoformat(),
+                    'source': source,
+                }
+            )
+            for (minute, method, endpoint, status_code), count in errors.items()
+        ]
+
+        APIMetricAggregate.objects.bulk_create(metrics, batch_size=500)
+        SystemLog.objects.bulk_create(logs, batch_size=500)
+
+        # 进程内存每次写库时采样一次，替代逐请求读取
+        try:
+            import psutil
+            PerformanceMetric.record_metric(
+                'process_memory_rss',
+                psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024,
+                'MB',
+                server_name=source[:50],
+            )
+        except Exception as e:
+            logger.warning(f"采集进程内存失败: {e}")
+
+        return {'metrics': len(metrics), 'logs': len(logs)}
+
+    @staticmethod
+    def percentiles(histogram: List[int], max_ms: float, quantiles: Iterable[float]) -> List[float]:
+        """
+        按耗时分布估算分位数（区间内线性插值，不超过最大耗时）
+        """
+        total = sum(histogram)
+        if not total:
+            return [0.0 for _ in quantiles]
+
+        results = []
+        for quantile in quantiles:
+            target = quantile * total
+            cumulative = 0
+            for index, count in enumerate(histogram):
+                if count and cumulative + count >= target:
+                    lower = LATENCY_BUCKETS_MS[index - 1] if index > 0 else 0
+                    upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else max_ms
+                    value = lower + (upper - lower) * (target - cumulative) / count
+                    results.append(round(min(value, max_ms), 3))
+                    break
+                cumulative += count
+        return results
+
+    @staticmethod
+    def summarize(start: datetime, end: datetime, endpoint: str = None) -> List[Dict[str, Any]]:
+        """
+        汇总时间段内各接口指标
+        合并各进程、各分钟的耗时分布后重新计算分位数，按请求数倒序返回
+        """
+        from .models import APIMetricAggregate
+
+        queryset = APIMetricAggregate.objects.filter(minute__gte=start, minute__lt=end)
+        if endpoint:
+            queryset = queryset.filter(endpoint=endpoint)
+
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        for row in queryset.values_list(
+            'method', 'endpoint', 'count', 'client_error_count', 'server_error_count',
+            'total_ms', 'max_ms', 'histogram'
+        ).iterator(chunk_size=2000):
+            method, path, count, client_errors, server_errors, total_ms, max_ms, histogram = row
+            item = merged.setdefault((method, path), {
+                'method': method,
+                'endpoint': path,
+                'count': 0,
+                'client_error_count': 0,
+                'server_error_count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            })
+            item['count'] += count
+            item['client_error_count'] += client_errors
+            item['server_error_count'] += server_errors
+            item['total_ms'] += total_ms
+            item['max_ms'] = max(item['max_ms'], max_ms)
+            for index, bucket_count in enumerate(histogram[:len(item['histogram'])]):
+                item['histogram'][index] += bucket_count
+
+        results = []
+        for item in merged.values():
+            p50, p95, p99 = MetricsBuffer.percentiles(item.pop('histogram'), item['max_ms'], (0.5, 0.95, 0.99))
+            item.update({
+                'avg_ms': round(item['total_ms'] / item['count'], 3) if item['count'] else 0,
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'error_rate': (item['client_error_count'] + item['server_error_count']) / item['count'] * 100
+                if item['count'] else 0,
+            })
+            results.append(item)
+
+        return sorted(results, key=lambda item: item['count'], reverse=True)
+
+    def stop(self):
+        """
+        停止后台线程并写入剩余数据
+        """
+        self._stop_event.set()
+        try:
+            self.flush(force=True)
+        except Exception as e:
+            logger.error(f"写入请求指标失败: {e}")
+
+    def _ensure_started(self):
+        """
+        按需启动后台写库线程（进程fork后在子进程中重新启动）
+        """
+        if self.flush_interval <= 0 or self._pid == os.getpid():
+            return
+
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # fork继承的父进程数据由父进程负责写入
+                self._stats.clear()
+                self._errors.clear()
+                self._dropped = 0
+                self._stop_event = threading.Event()
+
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='metrics-buffer-flush', daemon=True)
+            self._thread.start()
+
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"写入请求指标失败: {e}")
+            finally:
+                close_old_connections()
+
+    @staticmethod
+    def _minute(now: datetime = None) -> datetime:
+        now = now or timezone.now()
+        return now.replace(second=0, microsecond=0)
+
+
+# 全局请求指标缓冲区
+metrics_buffer = MetricsBuffer()
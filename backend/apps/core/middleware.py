@@ -15,6 +15,7 @@ from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 from django.utils import timezone
 from .utils import get_client_ip
+from .rate_limit import RateLimiter
 from .security import (
     AdvancedRateLimiter, 
     SecurityAuditor, 
@@ -51,20 +52,16 @@ class RateLimitMiddleware(MiddlewareMixin):
         path = request.path
         if path in rate_limits:
             limit_config = rate_limits[path]
-            cache_key = f'rate_limit_{client_ip}_{path}'
+            result = RateLimiter.hit('path', f'{client_ip}:{path}', limit_config['requests'], limit_config['window'])
             
-            # 获取当前请求计数
-            current_requests = cache.get(cache_key, 0)
-            
-            if current_requests >= limit_config['requests']:
-                return JsonResponse({
+            if not result['allowed']:
+                response = JsonResponse({
                     'success': False,
                     'message': '请求过于频繁，请稍后再试',
                     'error_code': 'RATE_LIMIT_EXCEEDED'
                 }, status=429)
-            
-            # 增加请求计数
-            cache.set(cache_key, current_requests + 1, limit_config['window'])
+                response['Retry-After'] = result['retry_after']
+                return response
         
         return None
 
@@ -242,22 +239,13 @@ class SystemMonitoringMiddleware(MiddlewareMixin):
                     }
                 )
             
-            # 记录错误响应
+            # 记录错误响应（进程内按分钟、接口、状态码合并，由后台线程批量写入系统日志）
             if response.status_code >= 400:
-                level = 'ERROR' if response.status_code >= 500 else 'WARNING'
-                SystemLog.log(
-                    level,
-                    'HTTP_ERROR',
-                    f'HTTP错误: {response.status_code} {request.method} {request.path}',
-                    user=getattr(request, 'user', None) if hasattr(request, 'user') and request.user.is_authenticated else None,
-                    ip_address=request.client_ip,
-                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    extra_data={
-                        'method': request.method,
-                        'path': request.path,
-                        'status_code': response.status_code,
-                        'duration': duration
-                    }
+                from .metrics import metrics_buffer
+                metrics_buffer.record_error(
+                    request.method,
+                    metrics_buffer.get_endpoint(request),
+                    response.status_code
                 )
             
             # 检测可疑活动
@@ -392,17 +380,14 @@ class MaintenanceModeMiddleware(MiddlewareMixin):
 class PerformanceMonitoringMiddleware(MiddlewareMixin):
     """
     性能监控中间件
+    API耗时写入进程内缓冲区，由后台线程按分钟聚合批量写库（见 core.metrics）
     """
     
     def process_request(self, request):
         """
-        记录请求开始时间和内存使用
+        记录请求开始时间
         """
-        import psutil
-        import os
-        
-        request.start_time = time.time()
-        request.start_memory = psutil.Process(os.getpid()).memory_info().rss
+        request.perf_start = time.perf_counter()
         return None
     
     def process_response(self, request, response):
@@ -410,43 +395,15 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
         记录性能指标
         """
         try:
-            import psutil
-            import os
-            from .models import PerformanceMetric
-            
-            # 计算处理时间
-            duration = time.time() - getattr(request, 'start_time', time.time())
+            from .metrics import metrics_buffer
             
-            # 计算内存使用变化
-            current_memory = psutil.Process(os.getpid()).memory_info().rss
-            memory_delta = current_memory - getattr(request, 'start_memory', current_memory)
-            
-            # 记录API性能指标
-            if request.path.startswith('/api/'):
-                PerformanceMetric.record_metric(
-                    'api_response_time',
-                    duration * 1000,  # 转换为毫秒
-                    'ms',
-                    metadata={
-                        'method': request.method,
-                        'path': request.path,
-                        'status_code': response.status_code,
-                        'memory_delta': memory_delta
-                    }
+            if request.path.startswith('/api/') and hasattr(request, 'perf_start'):
+                metrics_buffer.record(
+                    request.method,
+                    metrics_buffer.get_endpoint(request),
+                    (time.perf_counter() - request.perf_start) * 1000,  # 转换为毫秒
+                    response.status_code
                 )
-                
-                # 记录内存使用
-                if abs(memory_delta) > 1024 * 1024:  # 超过1MB的内存变化
-                    PerformanceMetric.record_metric(
-                        'memory_usage_delta',
-                        memory_delta / 1024 / 1024,  # 转换为MB
-                        'MB',
-                        metadata={
-                            'method': request.method,
-                            'path': request.path,
-                            'duration': duration
-                        }
-                    )
             
         except Exception as e:
             import logging
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIMetricAggregate',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('minute', models.DateTimeField(verbose_name='统计分钟')),
+                ('method', models.CharField(max_length=10, verbose_name='请求方法')),
+                ('endpoint', models.CharField(max_length=255, verbose_name='接口路由')),
+                ('source', models.CharField(max_length=100, verbose_name='来源进程')),
+                ('count', models.IntegerField(default=0, verbose_name='请求数')),
+                ('client_error_count', models.IntegerField(default=0, verbose_name='4xx数')),
+                ('server_error_count', models.IntegerField(default=0, verbose_name='5xx数')),
+                ('total_ms', models.FloatField(default=0, verbose_name='总耗时(ms)')),
+                ('max_ms', models.FloatField(default=0, verbose_name='最大耗时(ms)')),
+                ('p50_ms', models.FloatField(default=0, verbose_name='P50耗时(ms)')),
+                ('p95_ms', models.FloatField(default=0, verbose_name='P95耗时(ms)')),
+                ('p99_ms', models.FloatField(default=0, verbose_name='P99耗时(ms)')),
+                ('histogram', models.JSONField(default=list, verbose_name='耗时分布')),
+                ('status_counts', models.JSONField(default=dict, verbose_name='状态码分布')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': '接口指标聚合',
+                'verbose_name_plural': '接口指标聚合',
+                'db_table': 'api_metric_aggregates',
+                'ordering': ['-minute'],
+                'indexes': [models.Index(fields=['minute'], name='api_metric__minute_0e66b5_idx'), models.Index(fields=['endpoint', 'minute'], name='api_metric__endpoin_69b93c_idx')],
+                'unique_together': {('minute', 'method', 'endpoint', 'source')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_apimetricaggregate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action',
+            field=models.CharField(choices=[('LOGIN', '登录'), ('LOGOUT', '登出'), ('REGISTER', '注册'), ('KYC_SUBMIT', 'KYC提交'), ('KYC_APPROVE', 'KYC通过'), ('KYC_REJECT', 'KYC拒绝'), ('VIP_UPGRADE', 'VIP升级'), ('DEPOSIT', '存款'), ('WITHDRAW', '提款'), ('BET_PLACE', '投注'), ('BET_WIN', '中奖'), ('REWARD_RECEIVE', '奖励发放'), ('BALANCE_MISMATCH', '余额对账不一致')], db_index=True, max_length=20),
+        ),
+    ]
@@ -28,6 +28,7 @@ class ActivityLog(models.Model):
         ('BET_PLACE', '投注'),
         ('BET_WIN', '中奖'),
         ('REWARD_RECEIVE', '奖励发放'),
+        ('BALANCE_MISMATCH', '余额对账不一致'),
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -347,6 +348,49 @@ class PerformanceMetric(models.Model):
         )
 
 
+class APIMetricAggregate(models.Model):
+    """
+    接口请求指标分钟聚合
+    由进程内指标缓冲区按（分钟, 方法, 接口）预聚合后批量写入，每个进程每分钟每接口一行；
+    histogram 为各耗时区间请求数，跨进程、跨分钟合并后可重新计算分位数
+    """
+    id = models.BigAutoField(primary_key=True)
+    minute = models.DateTimeField(verbose_name='统计分钟')
+    method = models.CharField(max_length=10, verbose_name='请求方法')
+    endpoint = models.CharField(max_length=255, verbose_name='接口路由')
+    source = models.CharField(max_length=100, verbose_name='来源进程')
+    count = models.IntegerField(default=0, verbose_name='请求数')
+    client_error_count = models.IntegerField(default=0, verbose_name='4xx数')
+    server_error_count = models.IntegerField(default=0, verbose_name='5xx数')
+    total_ms = models.FloatField(default=0, verbose_name='总耗时(ms)')
+    max_ms = models.FloatField(default=0, verbose_name='最大耗时(ms)')
+    p50_ms = models.FloatField(default=0, verbose_name='P50耗时(ms)')
+    p95_ms = models.FloatField(default=0, verbose_name='P95耗时(ms)')
+    p99_ms = models.FloatField(default=0, verbose_name='P99耗时(ms)')
+    histogram = models.JSONField(default=list, verbose_name='耗时分布')
+    status_counts = models.JSONField(default=dict, verbose_name='状态码分布')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'api_metric_aggregates'
+        verbose_name = '接口指标聚合'
+        verbose_name_plural = '接口指标聚合'
+        ordering = ['-minute']
+        unique_together = ['minute', 'method', 'endpoint', 'source']
+        indexes = [
+            models.Index(fields=['minute']),
+            models.Index(fields=['endpoint', 'minute']),
+        ]
+    
+    def __str__(self):
+        return f"{self.minute:%Y-%m-%d %H:%M} {self.method} {self.endpoint}: {self.count}次 P95 {self.p95_ms:.1f}ms"
+    
+    @property
+    def avg_ms(self):
+        """平均耗时"""
+        return self.total_ms / self.count if self.count else 0
+
+
 class GameConfig(models.Model):
     """
     游戏配置模型
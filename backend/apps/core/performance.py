@@ -25,6 +25,8 @@ from collections import defaultdict
 import psutil
 import gc
 
+from .rate_limit import RateLimiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -155,21 +157,14 @@ def rate_limit(max_requests: int = 100, window_seconds: int = 60):
             # 获取客户端IP
             client_ip = get_client_ip(request)
             
-            # 生成限制键
-            rate_key = f"rate_limit:{client_ip}:{func.__name__}"
-            
-            # 检查当前请求数
-            current_requests = cache.get(rate_key, 0)
+            result = RateLimiter.hit('view', f'{client_ip}:{func.__name__}', max_requests, window_seconds)
             
-            if current_requests >= max_requests:
+            if not result['allowed']:
                 return JsonResponse({
                     'error': '请求过于频繁，请稍后重试',
-                    'retry_after': window_seconds
+                    'retry_after': result['retry_after']
                 }, status=429)
             
-            # 增加请求计数
-            cache.set(rate_key, current_requests + 1, window_seconds)
-            
             return func(request, *args, **kwargs)
         return wrapper
     return decorator
@@ -0,0 +1,152 @@
+"""
+频率限制引擎
+基于Redis Lua脚本的令牌桶，每次检查一次往返、原子执行，每个限制键只占用一个哈希（令牌数、更新时间），
+中间件、装饰器及安全模块的频率限制统一使用本引擎
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+# KEYS[1] 限制键；ARGV: 每秒补充令牌数, 桶容量, 本次消耗令牌数
+# 使用Redis服务器时间，避免各应用服务器时钟不一致
+TOKEN_BUCKET_SCRIPT = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local updated_at = tonumber(bucket[2])
+if tokens == nil or updated_at == nil then
+    tokens = capacity
+    updated_at = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HMSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RateLimiter:
+    """
+    令牌桶频率限制器
+
+    limit 次/window 秒 换算为每秒补充 limit/window 个令牌，桶容量为 burst（默认等于 limit），
+    即允许一次性突发 burst 次请求，之后按平均速率放行
+    """
+
+    KEY_PREFIX = 'ratelimit'
+
+    _script = None
+    _script_lock = threading.Lock()
+
+    # 非Redis缓存后端（开发、测试）使用进程内令牌桶
+    _local_buckets: Dict[str, list] = {}
+    _local_lock = threading.Lock()
+
+    @staticmethod
+    def hit(scope: str, identifier: str, limit: int, window: int,
+            burst: Optional[int] = None, cost: int = 1) -> Dict[str, Any]:
+        """
+        消耗令牌并返回检查结果
+        返回 {'allowed', 'limit', 'window', 'remaining', 'retry_after', 'reset_after'}，时间单位为秒
+        """
+        rate = limit / window
+        capacity = burst or limit
+        key = cache.make_key(f'{RateLimiter.KEY_PREFIX}:{scope}:{identifier}')
+
+        try:
+            script = RateLimiter._get_script()
+            if script is not None:
+                allowed, tokens, retry_after = script(keys=[key], args=[rate, capacity, cost])
+                allowed, tokens, retry_after = bool(allowed), float(tokens), float(retry_after)
+            else:
+                allowed, tokens, retry_after = RateLimiter._local_hit(key, rate, capacity, cost)
+        except Exception as e:
+            # Redis不可用时放行，避免限流故障导致全站不可用
+            logger.warning(f"频率限制检查失败，已放行: {scope}:{identifier} {e}")
+            allowed, tokens, retry_after = True, float(capacity), 0.0
+
+        return {
+            'allowed': allowed,
+            'limit': limit,
+            'window': window,
+            'remaining': int(tokens),
+            'retry_after': math.ceil(retry_after),
+            'reset_after': math.ceil((capacity - tokens) / rate),
+        }
+
+    @staticmethod
+    def reset(scope: str, identifier: str):
+        """
+        清除限制状态
+        """
+        key = cache.make_key(f'{RateLimiter.KEY_PREFIX}:{scope}:{identifier}')
+        try:
+            script = RateLimiter._get_script()
+            if script is not None:
+                script.registered_client.delete(key)
+            else:
+                with RateLimiter._local_lock:
+                    RateLimiter._local_buckets.pop(key, None)
+        except Exception as e:
+            logger.warning(f"清除频率限制失败: {scope}:{identifier} {e}")
+
+    @staticmethod
+    def _get_script():
+        """
+        获取已注册的Lua脚本（EVALSHA执行，脚本未加载时自动回退为EVAL）
+        默认缓存不是Redis时返回 None
+        """
+        if RateLimiter._script is None:
+            with RateLimiter._script_lock:
+                if RateLimiter._script is None:
+                    try:
+                        from django_redis import get_redis_connection
+                        client = get_redis_connection('default')
+                    except (ImportError, NotImplementedError):
+                        client = None
+                    RateLimiter._script = client.register_script(TOKEN_BUCKET_SCRIPT) if client else False
+        return RateLimiter._script or None
+
+    @staticmethod
+    def _local_hit(key: str, rate: float, capacity: int, cost: int):
+        """
+        进程内令牌桶（与Lua脚本逻辑一致）
+        """
+        now = time.monotonic()
+        with RateLimiter._local_lock:
+            tokens, updated_at = RateLimiter._local_buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+            allowed, retry_after = False, (cost - tokens) / rate
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+
+            RateLimiter._local_buckets[key] = (tokens, now)
+        return allowed, tokens, retry_after
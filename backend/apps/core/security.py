@@ -4,6 +4,7 @@
 """
 
 import hashlib
+import math
 import time
 import hmac
 import base64
@@ -20,6 +21,7 @@ from functools import wraps
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from .rate_limit import RateLimiter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -114,20 +116,14 @@ class SecurityManager:
             return {'allowed': True}
         
         limit_config = rate_limits[action]
-        cache_key = f"rate_limit_{user.id}_{action}"
+        result = RateLimiter.hit('action', f'{user.id}:{action}', limit_config['count'], limit_config['window'])
         
-        # 获取当前计数
-        current_count = cache.get(cache_key, 0)
-        
-        if current_count >= limit_config['count']:
+        if not result['allowed']:
             return {
                 'allowed': False,
-                'message': f'操作过于频繁，请{limit_config["window"]//60}分钟后重试'
+                'message': f'操作过于频繁，请{max(1, math.ceil(result["retry_after"] / 60))}分钟后重试'
             }
         
-        # 增加计数
-        cache.set(cache_key, current_count + 1, limit_config['window'])
-        
         return {'allowed': True}
     
     @staticmethod
@@ -476,35 +472,21 @@ class AdvancedRateLimiter:
             return True, {'allowed': True}
         
         config = limits[limit_type]
-        cache_key = f"rate_limit:{limit_type}:{identifier}"
-        
-        # 使用滑动窗口算法
-        current_time = int(time.time())
-        window_start = current_time - config['window']
+        result = RateLimiter.hit(limit_type, identifier, config['requests'], config['window'])
         
-        # 获取当前窗口内的请求记录
-        requests_data = cache.get(cache_key, [])
-        
-        # 清理过期记录
-        valid_requests = [req_time for req_time in requests_data if req_time > window_start]
-        
-        # 检查是否超过限制
-        if len(valid_requests) >= config['requests']:
+        if not result['allowed']:
             return False, {
                 'allowed': False,
                 'limit': config['requests'],
                 'window': config['window'],
-                'retry_after': valid_requests[0] + config['window'] - current_time
+                'retry_after': result['retry_after']
             }
         
-        # 添加当前请求
-        valid_requests.append(current_time)
-        cache.set(cache_key, valid_requests, config['window'])
-        
         return True, {
             'allowed': True,
-            'remaining': config['requests'] - len(valid_requests),
-            'reset_time': window_start + config['window']
+            'limit': config['requests'],
+            'remaining': result['remaining'],
+            'reset_time': int(time.time()) + result['reset_after']
         }
     
     @staticmethod
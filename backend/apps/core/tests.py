@@ -0,0 +1,248 @@
+"""
+核心模块测试
+"""
+
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from datetime import timedelta
+import uuid
+
+User = get_user_model()
+
+
+class APIMetricsBufferTest(TestCase):
+    """
+    请求指标缓冲区测试
+    """
+
+    def test_flush_writes_closed_minutes_as_aggregates(self):
+        """
+        测试请求按分钟、接口聚合，只写入已结束分钟，错误响应合并为一条系统日志
+        """
+        from apps.core.metrics import MetricsBuffer
+        from apps.core.models import APIMetricAggregate, SystemLog
+
+        buffer = MetricsBuffer(flush_interval=0)
+        last_minute = timezone.now() - timedelta(minutes=1)
+
+        for duration in range(1, 101):
+            buffer.record('GET', '/api/v1/games/<int:pk>/', float(duration), 200, now=last_minute)
+        buffer.record('GET', '/api/v1/games/<int:pk>/', 3.0, 404, now=last_minute)
+        buffer.record_error('GET', '/api/v1/games/<int:pk>/', 404, now=last_minute)
+        buffer.record_error('GET', '/api/v1/games/<int:pk>/', 404, now=last_minute)
+        buffer.record('GET', '/api/v1/games/<int:pk>/', 8.0, 200, now=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(buffer.flush(), {'metrics': 1, 'logs': 1})
+
+        metric = APIMetricAggregate.objects.get()
+        self.assertEqual(metric.count, 101)
+        self.assertEqual(metric.client_error_count, 1)
+        self.assertEqual(metric.status_counts, {'200': 100, '404': 1})
+        self.assertEqual(metric.max_ms, 100.0)
+        self.assertTrue(40 <= metric.p50_ms <= 60)
+        self.assertTrue(90 <= metric.p95_ms <= 100)
+
+        log = SystemLog.objects.get(module='HTTP_ERROR')
+        self.assertEqual(log.extra_data['count'], 2)
+
+        # 未结束的分钟在进程退出时写入
+        self.assertEqual(buffer.flush(force=True), {'metrics': 1, 'logs': 0})
+        self.assertEqual(APIMetricAggregate.objects.count(), 2)
+
+        summary = MetricsBuffer.summarize(last_minute - timedelta(minutes=1), timezone.now() + timedelta(minutes=2))
+        self.assertEqual(summary[0]['count'], 102)
+
+    def test_endpoint_falls_back_to_normalized_path(self):
+        """
+        测试无路由信息时路径中的ID被归一化
+        """
+        from django.test import RequestFactory
+        from apps.core.metrics import MetricsBuffer
+
+        request = RequestFactory().get(f'/api/v1/bets/{uuid.uuid4()}/items/42/')
+        self.assertEqual(MetricsBuffer.get_endpoint(request), '/api/v1/bets/:id/items/:id/')
+
+
+class RateLimiterTest(TestCase):
+    """
+    令牌桶频率限制测试
+    """
+
+    def test_burst_then_reject_until_refill(self):
+        """
+        测试突发额度用完后拒绝，并返回重试等待时间
+        """
+        from apps.core.rate_limit import RateLimiter
+
+        identifier = uuid.uuid4().hex
+        results = [RateLimiter.hit('test', identifier, 3, 60) for _ in range(4)]
+
+        self.assertEqual([result['allowed'] for result in results], [True, True, True, False])
+        self.assertEqual(results[2]['remaining'], 0)
+        self.assertTrue(1 <= results[3]['retry_after'] <= 20)
+
+        # 突发额度独立于平均速率
+        burst = [RateLimiter.hit('test', identifier + 'b', 3, 60, burst=5)['allowed'] for _ in range(6)]
+        self.assertEqual(burst.count(True), 5)
+
+        RateLimiter.reset('test', identifier)
+        self.assertTrue(RateLimiter.hit('test', identifier, 3, 60)['allowed'])
+
+
+class CachedAPIResponseTest(TestCase):
+    """
+    API响应缓存测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        from django.core.cache import cache
+        from rest_framework.decorators import api_view
+        from rest_framework.response import Response
+        from apps.core.cache_manager import cache_api_response
+
+        cache.clear()
+        self.calls = []
+
+        @api_view(['GET'])
+        @cache_api_response(timeout=60, scope='public', stale_timeout=60)
+        def public_view(request):
+            self.calls.append(request.user.pk)
+            return Response({'success': True, 'data': {'name': '11选5', 'calls': len(self.calls)}})
+
+        @api_view(['GET'])
+        @cache_api_response(timeout=60)
+        def user_view(request):
+            self.calls.append(request.user.pk)
+            return Response({'user': str(request.user.pk)})
+
+        self.public_view = public_view
+        self.user_view = user_view
+        self.users = [
+            User.objects.create_user(username=f'cache_user{i}', phone=f'+23480100002{i:02d}', password='testpass123')
+            for i in range(2)
+        ]
+
+    def get(self, view, user, **headers):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        request = APIRequestFactory().get('/api/v1/test/cached/', {'limit': 10}, **headers)
+        force_authenticate(request, user=user)
+        return view(request)
+
+    def test_public_response_cached_with_etag(self):
+        """
+        测试公共响应跨用户共享、缓存渲染后的响应体并支持304
+        """
+        first = self.get(self.public_view, self.users[0])
+        second = self.get(self.public_view, self.users[1])
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertIn('11选5', second.content.decode('utf-8'))
+        self.assertEqual(len(self.calls), 1)
+
+        not_modified = self.get(self.public_view, self.users[0], HTTP_IF_NONE_MATCH=f'W/{first["ETag"]}')
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_user_scope_and_stale_while_revalidate(self):
+        """
+        测试用户作用域按用户缓存；过期后刷新期间其他请求返回旧响应
+        """
+        from django.core.cache import cache
+        from rest_framework.test import APIRequestFactory
+        from apps.core.cache_manager import ResponseCache
+
+        self.get(self.user_view, self.users[0])
+        response = self.get(self.user_view, self.users[1])
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn(str(self.users[1].pk), response.content.decode('utf-8'))
+        self.assertEqual(len(self.calls), 2)
+
+        self.get(self.public_view, self.users[0])
+        key = ResponseCache.build_key(APIRequestFactory().get('/api/v1/test/cached/', {'limit': 10}), 'public')
+        entry = cache.get(key)
+        entry['fresh_until'] = 0
+        cache.set(key, entry, 60)
+
+        # 其他请求持有刷新锁时返回旧响应
+        cache.add(f'{key}:lock', 1, 10)
+        self.assertEqual(self.get(self.public_view, self.users[1])['X-Cache'], 'STALE')
+        self.assertEqual(len(self.calls), 3)
+
+        cache.delete(f'{key}:lock')
+        self.assertEqual(self.get(self.public_view, self.users[1])['X-Cache'], 'MISS')
+        self.assertEqual(len(self.calls), 4)
+
+
+class CacheTagInvalidationTest(TestCase):
+    """
+    缓存标签失效测试
+    """
+
+    def test_invalidate_user_tag_only_clears_tagged_keys(self):
+        """
+        测试按用户标签清除缓存，不影响其他用户
+        """
+        from django.core.cache import cache
+        from apps.core.cache_manager import CacheManager, UserCacheManager
+        from apps.games.lottery11x5.cart import Lottery11x5Cart
+
+        UserCacheManager.cache_user_balance(1, {'balance': 100})
+        UserCacheManager.cache_user_profile(1, {'username': 'u1'})
+        UserCacheManager.cache_user_balance(2, {'balance': 200})
+
+        self.assertEqual(UserCacheManager.invalidate_user_cache(1), 2)
+        self.assertIsNone(UserCacheManager.get_user_balance(1))
+        self.assertIsNone(UserCacheManager.get_user_profile(1))
+        self.assertEqual(UserCacheManager.get_user_balance(2), {'balance': 200})
+
+        # 标签已清空，再次清除不重复删除
+        self.assertEqual(UserCacheManager.invalidate_user_cache(1), 0)
+
+        cart = Lottery11x5Cart('cart-user')
+        cart._save_cart([])
+        self.assertIsNotNone(cache.get(cart.cache_key))
+        CacheManager.invalidate_tags(Lottery11x5Cart.CACHE_TAG)
+        self.assertIsNone(cache.get(cart.cache_key))
+
+
+class CacheSerializerTest(TestCase):
+    """
+    缓存值序列化测试
+    """
+
+    def test_round_trip_with_type_tag_and_compression(self):
+        """
+        测试按类型标记编解码：字符串原样返回，大对象压缩，旧格式仍可读取
+        """
+        from django.core.cache import cache
+        from apps.core.cache_manager import CacheManager
+        from apps.core.cache_serializer import CacheSerializer
+
+        serializer = CacheSerializer(serializer='json', compression='zlib', compress_min_size=64)
+        chart = {'rows': [{'draw_number': f'20240101{i:03d}', 'numbers': [1, 3, 5, 7, 9]} for i in range(50)]}
+
+        data = serializer.dumps(chart)
+        self.assertEqual(data[2:3], b'z')
+        self.assertEqual(serializer.loads(data), chart)
+
+        small = serializer.dumps({'amount': Decimal('1.50'), 'id': uuid.UUID(int=1)})
+        self.assertEqual(small[2:3], b'-')
+        self.assertEqual(serializer.loads(small), {'amount': '1.50', 'id': str(uuid.UUID(int=1))})
+
+        CacheManager.set_cache('serializer:text', '{"looks": "like json"}')
+        self.assertEqual(CacheManager.get_cache('serializer:text'), '{"looks": "like json"}')
+
+        CacheManager.set_cache('serializer:chart', chart)
+        self.assertEqual(CacheManager.get_cache('serializer:chart'), chart)
+
+        # 升级前以JSON字符串写入的值
+        cache.set('serializer:legacy', '{"balance": 100}')
+        self.assertEqual(CacheManager.get_cache('serializer:legacy'), {'balance': 100})
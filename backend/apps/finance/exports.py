@@ -0,0 +1,176 @@
+"""
+交易记录导出
+按 (user, created_at) 索引范围过滤，服务器端游标分批读取，逐块生成 CSV/NDJSON（可选gzip），
+内存占用与导出行数无关
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from django.utils import timezone
+
+from .models import Transaction
+
+
+class TransactionExportService:
+    """
+    交易记录导出服务
+    """
+
+    FORMATS = ('csv', 'ndjson')
+    # 服务器端游标每次读取的行数
+    CHUNK_SIZE = 2000
+    # 每个输出块包含的行数
+    ROWS_PER_BLOCK = 500
+
+    FIELDS = (
+        'id', 'reference_id', 'type', 'amount', 'fee', 'actual_amount',
+        'status', 'description', 'created_at', 'processed_at',
+    )
+    CSV_HEADER = (
+        '交易ID', '参考ID', '交易类型', '金额', '手续费', '实际金额',
+        '状态', '描述', '创建时间', '处理时间',
+    )
+
+    TYPE_DISPLAY = dict(Transaction.TYPE_CHOICES)
+    STATUS_DISPLAY = dict(Transaction.STATUS_CHOICES)
+
+    @staticmethod
+    def parse_date(value: str) -> datetime:
+        """YYYY-MM-DD 转为本地时区当天零点"""
+        return timezone.make_aware(datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), time.min))
+
+    @staticmethod
+    def build_queryset(user, params) -> Dict[str, Any]:
+        """
+        按查询参数构建导出查询
+        日期转换为 created_at 的时间范围（结束日期含当天），不对列做日期转换，可使用索引及分区裁剪
+        返回 {'success', 'message', 'queryset'}
+        """
+        queryset = Transaction.objects.filter(user=user)
+
+        start_date = params.get('start_date')
+        if start_date:
+            try:
+                queryset = queryset.filter(created_at__gte=TransactionExportService.parse_date(start_date))
+            except ValueError:
+                return {'success': False, 'message': '开始日期格式错误，请使用YYYY-MM-DD格式'}
+
+        end_date = params.get('end_date')
+        if end_date:
+            try:
+                queryset = queryset.filter(
+                    created_at__lt=TransactionExportService.parse_date(end_date) + timedelta(days=1)
+                )
+            except ValueError:
+                return {'success': False, 'message': '结束日期格式错误，请使用YYYY-MM-DD格式'}
+
+        types = [value for value in params.get('types', '').split(',') if value]
+        if types:
+            queryset = queryset.filter(type__in=types)
+
+        statuses = [value for value in params.get('status', '').split(',') if value]
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+
+        return {'success': True, 'queryset': queryset.order_by('-created_at')}
+
+    @staticmethod
+    def iter_rows(queryset, chunk_size: Optional[int] = None) -> Iterator[tuple]:
+        """
+        逐行读取导出字段（PostgreSQL下使用服务器端游标）
+        """
+        return queryset.values_list(*TransactionExportService.FIELDS).iterator(
+            chunk_size=chunk_size or TransactionExportService.CHUNK_SIZE
+        )
+
+    @staticmethod
+    def format_time(value) -> str:
+        return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+    @staticmethod
+    def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+        """
+        逐块生成CSV，列与原导出一致
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(TransactionExportService.CSV_HEADER)
+
+        for index, (transaction_id, reference_id, transaction_type, amount, fee, actual_amount,
+                    status, description, created_at, processed_at) in enumerate(rows, 1):
+            writer.writerow([
+                str(transaction_id),
+                reference_id,
+                TransactionExportService.TYPE_DISPLAY.get(transaction_type, transaction_type),
+                float(amount),
+                float(fee),
+                float(actual_amount),
+                TransactionExportService.STATUS_DISPLAY.get(status, status),
+                description,
+                TransactionExportService.format_time(created_at),
+                TransactionExportService.format_time(processed_at),
+            ])
+            if index % TransactionExportService.ROWS_PER_BLOCK == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
+    @staticmethod
+    def iter_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+        """
+        逐块生成NDJSON，每行一个交易，金额保留为字符串避免精度损失
+        """
+        lines = []
+        for (transaction_id, reference_id, transaction_type, amount, fee, actual_amount,
+             status, description, created_at, processed_at) in rows:
+            lines.append(json.dumps({
+                'id': str(transaction_id),
+                'reference_id': reference_id,
+                'type': transaction_type,
+                'type_display': TransactionExportService.TYPE_DISPLAY.get(transaction_type, transaction_type),
+                'amount': str(amount),
+                'fee': str(fee),
+                'actual_amount': str(actual_amount),
+                'status': status,
+                'status_display': TransactionExportService.STATUS_DISPLAY.get(status, status),
+                'description': description,
+                'created_at': created_at.isoformat(),
+                'processed_at': processed_at.isoformat() if processed_at else None,
+            }, ensure_ascii=False))
+            if len(lines) == TransactionExportService.ROWS_PER_BLOCK:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def iter_gzip(blocks: Iterable[str]) -> Iterator[bytes]:
+        """
+        增量gzip压缩
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for block in blocks:
+            data = compressor.compress(block.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def stream(queryset, export_format: str = 'csv', compress: bool = False) -> Iterator:
+        """
+        生成导出内容
+        """
+        rows = TransactionExportService.iter_rows(queryset)
+        if export_format == 'ndjson':
+            blocks = TransactionExportService.iter_ndjson(rows)
+        else:
+            blocks = TransactionExportService.iter_csv(rows)
+        return TransactionExportService.iter_gzip(blocks) if compress else blocks
@@ -0,0 +1,165 @@
+"""
+余额账本并发基准测试
+多线程并发扣款/入账同一热点账户，统计吞吐量并校验余额与日志一致性
+"""
+
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, close_old_connections
+
+from apps.finance.models import UserBalance, BalanceLog
+
+
+class Command(BaseCommand):
+    help = '余额账本并发基准测试（条件UPDATE vs 读-改-写）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='并发线程数',
+        )
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=200,
+            help='每线程操作次数',
+        )
+        parser.add_argument(
+            '--amount',
+            type=str,
+            default='1.00',
+            help='单次变动金额',
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='同时运行读-改-写方式作对比',
+        )
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        operations = options['operations']
+        amount = Decimal(options['amount'])
+
+        self.stdout.write(f'数据库: {connection.vendor}，线程数: {threads}，每线程操作: {operations}')
+        self.stdout.write(f'{"方式":<10}{"耗时":>10}{"操作/秒":>12}{"成功":>8}{"余额不足":>10}{"出错":>8}{"丢失更新":>10}')
+
+        self.run('条件UPDATE', self.ledger_operation, threads, operations, amount)
+        if options['legacy']:
+            self.run('读-改-写', self.legacy_operation, threads, operations, amount)
+
+        self.stdout.write(self.style.SUCCESS('基准测试完成'))
+
+    def run(self, name, operation, threads, operations, amount):
+        """
+        运行一轮基准测试
+        初始余额只够一半扣款，每4次操作中1次为入账
+        """
+        user = self.create_user()
+        initial = amount * threads * operations / 2
+        UserBalance.objects.create(user=user, main_balance=initial)
+
+        counters = {'success_add': 0, 'success_deduct': 0, 'insufficient': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker():
+            close_old_connections()
+            local = {key: 0 for key in counters}
+            try:
+                for index in range(operations):
+                    is_add = index % 4 == 3
+                    try:
+                        if operation(user.id, amount, is_add):
+                            local['success_add' if is_add else 'success_deduct'] += 1
+                        else:
+                            local['insufficient'] += 1
+                    except Exception:
+                        local['errors'] += 1
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in local.items():
+                        counters[key] += value
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        try:
+            balance = UserBalance.objects.get(user=user)
+            expected = initial + amount * (counters['success_add'] - counters['success_deduct'])
+            lost_updates = int(abs(expected - balance.main_balance) / amount)
+            log_count = BalanceLog.objects.filter(user=user).count()
+            successes = counters['success_add'] + counters['success_deduct']
+
+            rate = threads * operations / elapsed if elapsed > 0 else 0
+            self.stdout.write(
+                f'{name:<10}{elapsed:9.3f}s{rate:12.0f}{successes:8d}{counters["insufficient"]:10d}'
+                f'{counters["errors"]:8d}{lost_updates:10d}'
+            )
+
+            if balance.main_balance < 0:
+                self.stdout.write(self.style.ERROR(f'{name}: 余额为负 ₦{balance.main_balance}'))
+            if lost_updates:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: 余额 ₦{balance.main_balance}，按成功操作应为 ₦{expected}'
+                ))
+            if log_count != successes:
+                self.stdout.write(self.style.WARNING(f'{name}: 余额日志 {log_count} 条，成功操作 {successes} 次'))
+        finally:
+            user.delete()
+
+    @staticmethod
+    def ledger_operation(user_id, amount, is_add):
+        """
+        条件UPDATE方式
+        """
+        balance = UserBalance(user_id=user_id)
+        if is_add:
+            return balance.add_balance(amount, 'main', '基准测试入账')
+        return balance.deduct_balance(amount, 'main', '基准测试扣款')
+
+    @staticmethod
+    def legacy_operation(user_id, amount, is_add):
+        """
+        读-改-写方式（读取余额、内存中修改后整行保存）
+        """
+        balance = UserBalance.objects.get(user_id=user_id)
+        if is_add:
+            balance.main_balance += amount
+        elif balance.main_balance >= amount:
+            balance.main_balance -= amount
+        else:
+            return False
+
+        balance.save()
+        BalanceLog.objects.create(
+            user_id=user_id,
+            type='ADD' if is_add else 'DEDUCT',
+            amount=amount,
+            balance_after=balance.main_balance + balance.bonus_balance,
+            description='基准测试'
+        )
+        return True
+
+    @staticmethod
+    def create_user():
+        """
+        创建基准测试用户（测试结束后删除）
+        """
+        suffix = uuid.uuid4().hex[:10]
+        return get_user_model().objects.create(
+            username=f'ledger_bench_{suffix}',
+            phone=f'+234{int(suffix, 16) % 10 ** 10:010d}',
+        )
@@ -0,0 +1,180 @@
+"""
+交易表分区基准测试
+以相同的合成交易数据分别建立普通表与按月分区表，对比按日期范围过滤的典型查询耗时、
+扫描的表（分区）数，以及按月清理 DELETE 与分离分区的耗时
+"""
+
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.finance.partitioning import PartitionManager
+
+
+FLAT_TABLE = 'benchmark_transactions_flat'
+PARTITIONED_TABLE = 'benchmark_transactions_partitioned'
+
+QUERIES = [
+    (
+        '用户近30天流水',
+        'SELECT count(*), sum(amount) FROM {table} '
+        'WHERE user_id = %(user_id)s AND created_at >= %(recent)s',
+    ),
+    (
+        '单日按类型统计',
+        "SELECT type, count(*), sum(amount) FROM {table} "
+        "WHERE status = 'COMPLETED' AND created_at >= %(day_start)s AND created_at < %(day_end)s GROUP BY type",
+    ),
+    (
+        '当月失败交易',
+        "SELECT count(*) FROM {table} WHERE status = 'FAILED' AND created_at >= %(month_start)s",
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = '交易表分区基准测试（需要PostgreSQL，测试表在结束后删除）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=2000000,
+            help='合成交易行数',
+        )
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=24,
+            help='数据覆盖的月数',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50000,
+            help='用户数',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='每条查询执行次数',
+        )
+
+    def handle(self, *args, **options):
+        if not PartitionManager.is_supported():
+            raise CommandError('当前数据库不支持声明式分区，需要PostgreSQL')
+
+        current = PartitionManager.current_month()
+        first_month = PartitionManager.add_months(current, -(options['months'] - 1))
+        months = [PartitionManager.add_months(first_month, offset) for offset in range(options['months'])]
+        now = PartitionManager.month_bound(PartitionManager.add_months(current, 1))
+        day_start = PartitionManager.month_bound(current)
+        params = {
+            'user_id': 1,
+            'recent': now - timedelta(days=30),
+            'day_start': day_start,
+            'day_end': day_start + timedelta(days=1),
+            'month_start': day_start,
+        }
+
+        try:
+            self.stdout.write(f"生成 {options['rows']} 行、{options['months']} 个月的合成数据...")
+            self.build_tables(months, options['rows'], options['users'])
+
+            self.stdout.write(f'\n{"查询":<16}{"布局":<8}{"平均毫秒":>10}{"扫描表数":>10}')
+            for name, sql in QUERIES:
+                for label, table in (('普通表', FLAT_TABLE), ('分区表', PARTITIONED_TABLE)):
+                    elapsed, scanned = self.measure(sql.format(table=table), params, options['iterations'])
+                    self.stdout.write(f'{name:<16}{label:<8}{elapsed:>10.2f}{scanned:>10}')
+
+            # 清理最早一个月：逐行 DELETE 与分离分区
+            oldest = months[0]
+            with connection.cursor() as cursor:
+                start = time.perf_counter()
+                cursor.execute(
+                    f'DELETE FROM {FLAT_TABLE} WHERE created_at < %s',
+                    [PartitionManager.month_bound(PartitionManager.add_months(oldest, 1))]
+                )
+                delete_ms = (time.perf_counter() - start) * 1000
+                deleted = cursor.rowcount
+
+                start = time.perf_counter()
+                partition = PartitionManager.partition_name(PARTITIONED_TABLE, oldest)
+                cursor.execute(f'ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {partition}')
+                cursor.execute(f'DROP TABLE {partition}')
+                detach_ms = (time.perf_counter() - start) * 1000
+
+            self.stdout.write(
+                f'\n清理最早一个月（{deleted} 行）: DELETE {delete_ms:.1f}ms，分离并删除分区 {detach_ms:.1f}ms'
+            )
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {FLAT_TABLE}')
+                cursor.execute(f'DROP TABLE IF EXISTS {PARTITIONED_TABLE} CASCADE')
+
+        self.stdout.write(self.style.SUCCESS('基准测试完成'))
+
+    @staticmethod
+    def build_tables(months, rows, users):
+        """建立结构、索引相同的普通表与分区表，写入相同数据"""
+        columns = (
+            'id uuid NOT NULL, user_id integer NOT NULL, type varchar(20) NOT NULL, '
+            'amount numeric(15, 2) NOT NULL, status varchar(20) NOT NULL, created_at timestamptz NOT NULL'
+        )
+        start = PartitionManager.month_bound(months[0])
+        end = PartitionManager.month_bound(PartitionManager.add_months(months[-1], 1))
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FLAT_TABLE}')
+            cursor.execute(f'DROP TABLE IF EXISTS {PARTITIONED_TABLE} CASCADE')
+            cursor.execute(f'CREATE TABLE {FLAT_TABLE} ({columns}, PRIMARY KEY (id))')
+            cursor.execute(
+                f'CREATE TABLE {PARTITIONED_TABLE} ({columns}, PRIMARY KEY (id, created_at)) '
+                f'PARTITION BY RANGE (created_at)'
+            )
+            for month in months:
+                PartitionManager.create_partition(PARTITIONED_TABLE, month)
+
+            cursor.execute(
+                f"INSERT INTO {FLAT_TABLE} "
+                f"SELECT md5(i::text || random()::text)::uuid, 1 + (i %% %(users)s), "
+                f"(ARRAY['DEPOSIT', 'WITHDRAW', 'BET', 'WIN'])[1 + i %% 4], "
+                f"round((random() * 1000)::numeric, 2), "
+                f"CASE WHEN i %% 20 = 0 THEN 'FAILED' ELSE 'COMPLETED' END, "
+                f"%(start)s::timestamptz + (%(end)s::timestamptz - %(start)s::timestamptz) * random() "
+                f"FROM generate_series(1, %(rows)s) AS i",
+                {'users': users, 'rows': rows, 'start': start, 'end': end}
+            )
+            cursor.execute(f'INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {FLAT_TABLE}')
+
+            for table in (FLAT_TABLE, PARTITIONED_TABLE):
+                cursor.execute(f'CREATE INDEX ON {table} (user_id, created_at)')
+                cursor.execute(f'CREATE INDEX ON {table} (created_at, status)')
+                cursor.execute(f'ANALYZE {table}')
+
+    @staticmethod
+    def measure(sql, params, iterations):
+        """
+        返回 (平均执行毫秒, 执行计划中扫描的表数)
+        """
+        with connection.cursor() as cursor:
+            total = 0.0
+            for _ in range(iterations):
+                cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                total += plan[0]['Execution Time']
+
+        relations = set()
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if 'Relation Name' in node:
+                relations.add(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+        return total / iterations, len(relations)
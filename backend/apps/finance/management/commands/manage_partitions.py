@@ -0,0 +1,93 @@
+"""
+交易表分区管理命令
+查看分区状态、转换现有表、预建未来分区、分离过期分区
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.finance.partitioning import PartitionManager
+
+
+class Command(BaseCommand):
+    help = '交易表分区管理（仅PostgreSQL）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='将 transactions、balance_logs 转换为按月分区表（复制期间锁定写入）',
+        )
+        parser.add_argument(
+            '--ensure',
+            action='store_true',
+            help='预建当前月及未来分区',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=None,
+            help='预建未来分区月数（默认取配置）',
+        )
+        parser.add_argument(
+            '--detach-expired',
+            action='store_true',
+            help='分离早于保留期的分区',
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=None,
+            help='保留月数（默认取配置）',
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='分离后删除过期分区',
+        )
+        parser.add_argument(
+            '--drop-legacy',
+            action='store_true',
+            help='删除转换后保留的原表',
+        )
+
+    def handle(self, *args, **options):
+        if not PartitionManager.is_supported():
+            raise CommandError('当前数据库不支持声明式分区，需要PostgreSQL')
+
+        if options['convert']:
+            for table in PartitionManager.PARTITIONED_TABLES:
+                result = PartitionManager.convert_table(table, options['months_ahead'])
+                if result['success']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{result['message']}: {len(result['partitions'])} 个分区, {result['rows']} 行，"
+                        f"原表保留为 {result['legacy_table']}"
+                    ))
+                else:
+                    self.stdout.write(self.style.WARNING(result['message']))
+
+        if options['ensure']:
+            for table, names in PartitionManager.ensure_partitions(options['months_ahead']).items():
+                self.stdout.write(f"{table}: 新建分区 {', '.join(names) or '无'}")
+
+        if options['detach_expired']:
+            detached = PartitionManager.detach_expired(
+                options['retention_months'], True if options['drop'] else None
+            )
+            for table, names in detached.items():
+                self.stdout.write(f"{table}: 过期分区 {', '.join(names) or '无'}")
+
+        if options['drop_legacy']:
+            for table in PartitionManager.PARTITIONED_TABLES:
+                if PartitionManager.drop_legacy(table):
+                    self.stdout.write(f'已删除原表 {table}{PartitionManager.LEGACY_SUFFIX}')
+
+        for table in PartitionManager.PARTITIONED_TABLES:
+            if not PartitionManager.is_partitioned(table):
+                self.stdout.write(f'{table}: 未分区')
+                continue
+            partitions = PartitionManager.list_partitions(table)
+            months = [month for _, month in partitions if month is not None]
+            self.stdout.write(
+                f"{table}: {len(partitions)} 个分区"
+                + (f"（{months[0]:%Y-%m} ~ {months[-1]:%Y-%m}）" if months else '')
+            )
@@ -0,0 +1,46 @@
+"""
+余额对账管理命令
+按用户ID区间分组聚合核对余额与已完成交易，不一致账户写入活动日志
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.finance.reconciliation import BalanceReconciliationService
+
+
+class Command(BaseCommand):
+    help = '余额对账（全量或增量）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='只检查上次对账后交易或余额有变动的用户',
+        )
+        parser.add_argument(
+            '--chunks',
+            type=int,
+            default=None,
+            help='全量对账按用户ID区间分块数（默认取配置）',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='并行线程数（默认取配置）',
+        )
+
+    def handle(self, *args, **options):
+        result = BalanceReconciliationService.run(
+            incremental=options['incremental'],
+            chunks=options['chunks'],
+            workers=options['workers'],
+        )
+
+        checked = '全部' if result['checked_users'] is None else result['checked_users']
+        self.stdout.write(
+            f"模式: {result['mode']}，分块: {result['batches']}，检查用户: {checked}，"
+            f"新建余额: {result['created_balances']}，耗时: {result['duration']:.2f}秒"
+        )
+        style = self.style.SUCCESS if result['mismatched'] == 0 else self.style.WARNING
+        self.stdout.write(style(f"不一致账户: {result['mismatched']}"))
@@ -4,7 +4,9 @@
 
 from django.db import models
 from django.utils import timezone
-from datetime import date, timedelta
+from datetime import datetime, time, timedelta
+
+from .partitioning import PartitionManager
 
 
 class TransactionManager(models.Manager):
@@ -13,49 +15,15 @@ class TransactionManager(models.Manager):
     """
     
     def get_table_name(self, date_obj):
-        """获取按月分表的表名"""
-        return f"transactions_{date_obj.strftime('%Y_%m')}"
+        """获取按月分区的分区名"""
+        return PartitionManager.partition_name(self.model._meta.db_table, date_obj.replace(day=1))
     
     def create_monthly_table(self, date_obj):
-        """创建月度交易表（如果需要）"""
-        from django.db import connection
-        from django.core.management.color import no_style
-        from django.db import models
-        
-        table_name = self.get_table_name(date_obj)
-        
-        # 检查表是否已存在
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = %s
-                );
-            """, [table_name])
-            
-            if not cursor.fetchone()[0]:
-                # 创建分表，继承主表结构
-                cursor.execute(f"""
-                    CREATE TABLE {table_name} (
-                        LIKE finance_transaction INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES
-                    );
-                """)
-                
-                # 添加分区约束（可选）
-                start_date = date_obj.replace(day=1)
-                if date_obj.month == 12:
-                    end_date = start_date.replace(year=start_date.year + 1, month=1)
-                else:
-                    end_date = start_date.replace(month=start_date.month + 1)
-                
-                cursor.execute(f"""
-                    ALTER TABLE {table_name} 
-                    ADD CONSTRAINT {table_name}_date_check 
-                    CHECK (created_at >= %s AND created_at < %s);
-                """, [start_date, end_date])
-                
-                return True
-        return False
+        """创建月度交易分区（仅已转换为分区表的PostgreSQL生效）"""
+        table = self.model._meta.db_table
+        if not PartitionManager.is_partitioned(table):
+            return False
+        return PartitionManager.create_partition(table, date_obj.replace(day=1))
     
     def get_user_transactions(self, user, days=30):
         """获取用户最近交易记录"""
@@ -72,10 +40,13 @@ class TransactionManager(models.Manager):
     def get_daily_stats(self, date_obj=None):
         """获取每日交易统计"""
         if date_obj is None:
-            date_obj = date.today()
+            date_obj = timezone.localdate()
         
+        # 按本地日期的时间范围过滤，可利用分区裁剪
+        day_start = timezone.make_aware(datetime.combine(date_obj, time.min))
         return self.filter(
-            created_at__date=date_obj,
+            created_at__gte=day_start,
+            created_at__lt=day_start + timedelta(days=1),
             status='COMPLETED'
         ).aggregate(
             total_count=models.Count('id'),
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:23
+
+import logging
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+logger = logging.getLogger(__name__)
+
+# 按月范围分区的表（迁移内固定，不随代码变化）
+PARTITIONED_TABLES = ('transactions', 'balance_logs')
+
+
+def check_partitioning(apps, schema_editor):
+    """
+    检查 transactions、balance_logs 是否已转换为按月范围分区表（仅PostgreSQL）
+    转换需锁表并复制全部数据，不在迁移中执行；未转换时提示在维护窗口执行
+    manage.py manage_partitions --convert
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    pending = []
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+                [table]
+            )
+            if not cursor.fetchone()[0]:
+                pending.append(table)
+
+    if pending:
+        logger.warning(
+            f"{', '.join(pending)} 尚未按月分区，请在维护窗口执行: "
+            f"python manage.py manage_partitions --convert"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balancelog',
+            name='transaction',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance.transaction'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='related_transaction',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance.transaction'),
+        ),
+        migrations.RunPython(check_partitioning, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_transaction_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'COMPLETED')), fields=['user', 'type', 'created_at'], include=('amount',), name='txn_user_type_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['type', 'created_at'], name='txn_pending_idx'),
+        ),
+    ]
@@ -9,7 +9,7 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.core.cache import cache
-from django.db import transaction
+from django.db import transaction, connection
 
 User = get_user_model()
 
@@ -59,139 +59,204 @@ class UserBalance(models.Model):
         """获取可用余额（总余额 - 冻结余额）"""
         return self.get_total_balance() - self.frozen_balance
     
+    # 余额变动规则：(SET子句, WHERE条件, 日志类型, 总余额变动方向)
+    # SET子句中的字段引用均为更新前的值；{amount} 为变动金额占位
+    # 可用余额扣除及冻结：优先扣主余额，不足部分扣奖金余额
+    _TAKE_AVAILABLE = (
+        "main_balance = CASE WHEN main_balance >= {amount} THEN main_balance - {amount} ELSE 0 END, "
+        "bonus_balance = CASE WHEN main_balance >= {amount} THEN bonus_balance "
+        "ELSE bonus_balance - ({amount} - main_balance) END"
+    )
+    _AVAILABLE_ENOUGH = "main_balance + bonus_balance - frozen_balance >= {amount}"
+    LEDGER_OPERATIONS = {
+        ('ADD', 'main'): ("main_balance = main_balance + {amount}", None, 'ADD', 1),
+        ('ADD', 'bonus'): ("bonus_balance = bonus_balance + {amount}", None, 'ADD', 1),
+        ('DEDUCT', 'main'): (
+            "main_balance = main_balance - {amount}", "main_balance >= {amount}", 'DEDUCT', -1
+        ),
+        ('DEDUCT', 'bonus'): (
+            "bonus_balance = bonus_balance - {amount}", "bonus_balance >= {amount}", 'DEDUCT', -1
+        ),
+        ('DEDUCT', 'available'): (_TAKE_AVAILABLE, _AVAILABLE_ENOUGH, 'DEDUCT', -1),
+        ('FREEZE', 'available'): (
+            _TAKE_AVAILABLE + ", frozen_balance = frozen_balance + {amount}", _AVAILABLE_ENOUGH, 'FREEZE', -1
+        ),
+        ('UNFREEZE', 'main'): (
+            "frozen_balance = frozen_balance - {amount}, main_balance = main_balance + {amount}",
+            "frozen_balance >= {amount}", 'UNFREEZE', 1
+        ),
+        ('UNFREEZE', 'bonus'): (
+            "frozen_balance = frozen_balance - {amount}, bonus_balance = bonus_balance + {amount}",
+            "frozen_balance >= {amount}", 'UNFREEZE', 1
+        ),
+    }
+    
     def freeze_balance(self, amount: Decimal, reason: str = '') -> bool:
         """冻结余额"""
-        if amount <= 0:
-            return False
-        
-        available = self.get_available_balance()
-        if available < amount:
-            return False
-        
-        with transaction.atomic():
-            # 优先从主余额冻结
-            if self.main_balance >= amount:
-                self.main_balance -= amount
-            else:
-                # 主余额不足，从奖金余额冻结
-                remaining = amount - self.main_balance
-                self.main_balance = Decimal('0.00')
-                self.bonus_balance -= remaining
-            
-            self.frozen_balance += amount
-            self.save()
-            
-            # 记录冻结操作
-            BalanceLog.objects.create(
-                user=self.user,
-                type='FREEZE',
-                amount=amount,
-                balance_after=self.get_total_balance(),
-                description=reason or '余额冻结'
-            )
-            
-            self.clear_cache()
-            return True
+        return self._apply_ledger('FREEZE', 'available', amount, reason or '余额冻结')
     
     def unfreeze_balance(self, amount: Decimal, to_main: bool = True) -> bool:
         """解冻余额"""
-        if amount <= 0 or self.frozen_balance < amount:
-            return False
-        
-        with transaction.atomic():
-            self.frozen_balance -= amount
-            
-            if to_main:
-                self.main_balance += amount
-            else:
-                self.bonus_balance += amount
-            
-            self.save()
-            
-            # 记录解冻操作
-            BalanceLog.objects.create(
-                user=self.user,
-                type='UNFREEZE',
-                amount=amount,
-                balance_after=self.get_total_balance(),
-                description='余额解冻'
-            )
-            
-            self.clear_cache()
-            return True
+        return self._apply_ledger('UNFREEZE', 'main' if to_main else 'bonus', amount, '余额解冻')
     
     def add_balance(self, amount: Decimal, balance_type: str = 'main', 
                    description: str = '') -> bool:
         """增加余额"""
-        if amount <= 0:
-            return False
-        
-        with transaction.atomic():
-            if balance_type == 'main':
-                self.main_balance += amount
-            elif balance_type == 'bonus':
-                self.bonus_balance += amount
-            else:
-                return False
-            
-            self.save()
-            
-            # 记录余额变动
-            BalanceLog.objects.create(
-                user=self.user,
-                type='ADD',
-                amount=amount,
-                balance_after=self.get_total_balance(),
-                description=description or f'{balance_type}余额增加'
-            )
-            
-            self.clear_cache()
-            return True
+        return self._apply_ledger('ADD', balance_type, amount, description or f'{balance_type}余额增加')
     
     def deduct_balance(self, amount: Decimal, balance_type: str = 'available', 
                       description: str = '') -> bool:
         """扣除余额"""
-        if amount <= 0:
+        return self._apply_ledger('DEDUCT', balance_type, amount, description or f'{balance_type}余额扣除')
+    
+    def _apply_ledger(self, operation: str, balance_type: str, amount: Decimal, description: str) -> bool:
+        """
+        执行余额变动
+        单条条件UPDATE完成校验与变动（无需锁行、无丢失更新），RETURNING返回变动后余额，
+        PostgreSQL下余额日志在同一语句中写入；余额不足时不更新并返回False
+        """
+        rule = self.LEDGER_OPERATIONS.get((operation, balance_type))
+        if rule is None or amount is None or amount <= 0:
             return False
         
+        set_sql, where_sql, log_type, direction = rule
+        # 显式转为NUMERIC，避免SQLite将参数按文本比较
+        amount_sql = 'CAST(%(amount)s AS NUMERIC)'
+        set_sql = set_sql.format(amount=amount_sql)
+        where_sql = where_sql.format(amount=amount_sql) if where_sql else None
+        amount = Decimal(str(amount))
+        now = timezone.now()
+        params = {
+            'amount': amount,
+            'user_id': self._meta.pk.get_db_prep_value(self.user_id, connection),
+            'now': connection.ops.adapt_datetimefield_value(now),
+            'log_id': BalanceLog._meta.pk.get_db_prep_value(uuid.uuid4(), connection),
+            'log_type': log_type,
+            'delta': amount * direction,
+            'description': description,
+        }
+        
+        balance_table = connection.ops.quote_name(self._meta.db_table)
+        update_sql = (
+            f"UPDATE {balance_table} SET {set_sql}, updated_at = %(now)s "
+            f"WHERE user_id = %(user_id)s" + (f" AND {where_sql}" if where_sql else "")
+        )
+        
         with transaction.atomic():
-            if balance_type == 'main':
-                if self.main_balance < amount:
-                    return False
-                self.main_balance -= amount
-            elif balance_type == 'bonus':
-                if self.bonus_balance < amount:
-                    return False
-                self.bonus_balance -= amount
-            elif balance_type == 'available':
-                # 从可用余额扣除，优先扣除主余额
-                available = self.get_available_balance()
-                if available < amount:
-                    return False
-                
-                if self.main_balance >= amount:
-                    self.main_balance -= amount
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    # 数据修改CTE：更新余额与写入日志一次往返完成
+                    log_table = connection.ops.quote_name(BalanceLog._meta.db_table)
+                    cursor.execute(
+                        f"WITH updated AS ({update_sql} "
+                        f"RETURNING user_id, main_balance, bonus_balance, frozen_balance), "
+                        f"logged AS (INSERT INTO {log_table} "
+                        f"(id, user_id, type, amount, balance_before, balance_after, description, created_at) "
+                        f"SELECT %(log_id)s, user_id, %(log_type)s, %(amount)s, "
+                        f"main_balance + bonus_balance - %(delta)s, main_balance + bonus_balance, "
+                        f"%(description)s, %(now)s FROM updated) "
+                        f"SELECT main_balance, bonus_balance, frozen_balance FROM updated",
+                        params
+                    )
+                    row = cursor.fetchone()
                 else:
-                    remaining = amount - self.main_balance
-                    self.main_balance = Decimal('0.00')
-                    self.bonus_balance -= remaining
-            else:
-                return False
+                    cursor.execute(f"{update_sql} RETURNING main_balance, bonus_balance, frozen_balance", params)
+                    row = cursor.fetchone()
+                    if row is not None:
+                        total_after = self._to_amount(row[0]) + self._to_amount(row[1])
+                        BalanceLog.objects.create(
+                            user_id=self.user_id,
+                            type=log_type,
+                            amount=amount,
+                            balance_before=total_after - params['delta'],
+                            balance_after=total_after,
+                            description=description
+                        )
             
-            self.save()
+            if row is None:
+                return False
             
-            # 记录余额变动
-            BalanceLog.objects.create(
-                user=self.user,
-                type='DEDUCT',
-                amount=amount,
-                balance_after=self.get_total_balance(),
-                description=description or f'{balance_type}余额扣除'
+            self.main_balance, self.bonus_balance, self.frozen_balance = (
+                self._to_amount(value) for value in row
             )
-            
-            self.clear_cache()
+            self.updated_at = now
+            self.refresh_cache()
             return True
     
+    @staticmethod
+    def _to_amount(value) -> Decimal:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    
+    @classmethod
+    def bulk_add_balance(cls, credits: dict, description: str = '', balance_type: str = 'main') -> dict:
+        """
+        批量增加余额
+        credits: {user_id: amount}，每个用户只执行一次聚合更新，
+        余额日志通过bulk_create一次写入
+        balance_type: main（主余额）或 bonus（奖金余额）
+        返回 {user_id: balance_after}
+        """
+        if balance_type not in ('main', 'bonus'):
+            raise ValueError(f'不支持的余额类型: {balance_type}')
+
+        credits = {user_id: amount for user_id, amount in credits.items() if amount > 0}
+        if not credits:
+            return {}
+
+        user_ids = list(credits.keys())
+        field = f'{balance_type}_balance'
+
+        with transaction.atomic():
+            # 单条UPDATE完成所有用户的入账
+            cls.objects.filter(user_id__in=user_ids).update(
+                **{field: models.F(field) + models.Case(
+                    *[models.When(user_id=user_id, then=models.Value(amount))
+                      for user_id, amount in credits.items()],
+                    default=models.Value(Decimal('0.00')),
+                    output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                )},
+                updated_at=timezone.now(),
+            )
+
+            # 读取入账后的余额用于日志
+            balances_after = {
+                user_id: main_balance + bonus_balance
+                for user_id, main_balance, bonus_balance in cls.objects.filter(
+                    user_id__in=user_ids
+                ).values_list('user_id', 'main_balance', 'bonus_balance')
+            }
+
+            BalanceLog.objects.bulk_create([
+                BalanceLog(
+                    user_id=user_id,
+                    type='ADD',
+                    amount=credits[user_id],
+                    balance_before=balance_after - credits[user_id],
+                    balance_after=balance_after,
+                    description=description or f'{balance_type}余额增加',
+                )
+                for user_id, balance_after in balances_after.items()
+            ])
+
+            # 按入账后余额刷新缓存
+            transaction.on_commit(lambda: cls._write_balance_cache(balances_after))
+
+        return balances_after
+
+    @staticmethod
+    def _write_balance_cache(totals: dict):
+        """
+        写入总余额缓存 {user_id: 总余额}
+        user_balance_* 缓存包含模型对象，无法由余额值重建，仍需删除
+        """
+        cache.set_many({f'user_total_balance_{user_id}': total for user_id, total in totals.items()}, 300)
+        cache.delete_many([f'user_balance_{user_id}' for user_id in totals])
+    
+    def refresh_cache(self):
+        """按当前余额刷新缓存（事务提交后执行，回滚时不写入）"""
+        totals = {self.user_id: self.main_balance + self.bonus_balance}
+        transaction.on_commit(lambda: UserBalance._write_balance_cache(totals))
+    
     def clear_cache(self):
         """清除余额缓存"""
         cache_keys = [
@@ -243,7 +308,8 @@ class Transaction(models.Model):
     
     # 关联信息
     reference_id = models.CharField(max_length=100, blank=True, help_text="外部参考ID")
-    related_transaction = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL)
+    # 交易表按月分区后主键为 (id, created_at)，无法再建立数据库外键约束
+    related_transaction = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False)
     
     # 详细信息
     description = models.TextField(blank=True)
@@ -272,6 +338,14 @@ class Transaction(models.Model):
             models.Index(fields=['type', 'status']),
             models.Index(fields=['reference_id']),
             models.Index(fields=['created_at', 'status']),
+            models.Index(fields=['updated_at']),  # 增量对账按更新时间查找有变动的用户
+            # 流水、交易分析按用户、类型及时间范围统计已完成交易，包含金额可仅扫描索引
+            models.Index(
+                fields=['user', 'type', 'created_at'], include=['amount'],
+                condition=models.Q(status='COMPLETED'), name='txn_user_type_done_idx'
+            ),
+            # 超时存款、待处理提款扫描
+            models.Index(fields=['type', 'created_at'], condition=models.Q(status='PENDING'), name='txn_pending_idx'),
         ]
         ordering = ['-created_at']
     
@@ -281,6 +355,9 @@ class Transaction(models.Model):
             self.actual_amount = self.amount - self.fee
         
         super().save(*args, **kwargs)
+        
+        from .services import TransactionAnalyticsService
+        TransactionAnalyticsService.invalidate_users([self.user_id])
     
     def mark_completed(self, processor=None):
         """标记交易完成"""
@@ -321,7 +398,7 @@ class BalanceLog(models.Model):
     balance_before = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
     balance_after = models.DecimalField(max_digits=15, decimal_places=2)
     description = models.TextField()
-    transaction = models.ForeignKey(Transaction, null=True, blank=True, on_delete=models.SET_NULL)
+    transaction = models.ForeignKey(Transaction, null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     
     class Meta:
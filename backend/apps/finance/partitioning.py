@@ -0,0 +1,312 @@
+"""
+交易表按月范围分区
+PostgreSQL 原生声明式分区：transactions、balance_logs 按 created_at 每月一个分区，
+按日期范围过滤的查询只扫描相关分区；定期预建未来分区，过期数据整分区分离或删除
+"""
+
+import logging
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionManager:
+    """
+    分区管理
+    分区命名为 {表名}_YYYY_MM，边界为本地时区的月初零点；
+    超出已建分区范围的写入落入默认分区 {表名}_default，maintain_partitions 建新月分区时
+    把默认分区中属于该月的行移入新分区
+    """
+
+    # 按顺序转换：balance_logs 引用 transactions
+    PARTITIONED_TABLES = ('transactions', 'balance_logs')
+    PARTITION_KEY = 'created_at'
+    LEGACY_SUFFIX = '_unpartitioned'
+    STAGING_SUFFIX = '_partitioned'
+    DEFAULT_SUFFIX = '_default'
+
+    @staticmethod
+    def is_supported() -> bool:
+        """仅 PostgreSQL 支持声明式分区"""
+        return connection.vendor == 'postgresql'
+
+    @staticmethod
+    def get_options() -> Dict:
+        options = getattr(settings, 'TRANSACTION_PARTITIONING', {})
+        return {
+            'PREMAKE_MONTHS': options.get('PREMAKE_MONTHS', 3),
+            'RETENTION_MONTHS': options.get('RETENTION_MONTHS', 0),
+            'DROP_DETACHED': options.get('DROP_DETACHED', False),
+        }
+
+    @staticmethod
+    def add_months(month: date, months: int) -> date:
+        """月份加减，返回月初日期"""
+        index = month.year * 12 + month.month - 1 + months
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def current_month() -> date:
+        return timezone.localdate().replace(day=1)
+
+    @staticmethod
+    def partition_name(table: str, month: date) -> str:
+        return f"{table}_{month.strftime('%Y_%m')}"
+
+    @staticmethod
+    def parse_partition_month(table: str, name: str) -> Optional[date]:
+        """由分区名解析月份，非本模块命名的分区返回 None"""
+        try:
+            return datetime.strptime(name[len(table) + 1:], '%Y_%m').date()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def month_bound(month: date) -> datetime:
+        """分区边界：本地时区的月初零点"""
+        return timezone.make_aware(datetime.combine(month, time.min))
+
+    @staticmethod
+    def is_partitioned(table: str) -> bool:
+        if not PartitionManager.is_supported():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+                [table]
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def list_partitions(table: str) -> List[Tuple[str, Optional[date]]]:
+        """
+        列出分区 [(分区名, 月份)]，按月份排序
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+                [table]
+            )
+            return [
+                (name, PartitionManager.parse_partition_month(table, name))
+                for name, in cursor.fetchall()
+            ]
+
+    @staticmethod
+    def table_exists(name: str) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def create_partition(table: str, month: date, parent: Optional[str] = None) -> bool:
+        """
+        创建月度分区，已存在时返回 False
+        parent 为实际挂载的分区表（转换过程中为临时表），分区名始终按 table 命名；
+        已有默认分区时先建独立表，移入默认分区中该月的行后再挂载
+        """
+        name = PartitionManager.partition_name(table, month)
+        if PartitionManager.table_exists(name):
+            return False
+
+        bounds = [
+            PartitionManager.month_bound(month),
+            PartitionManager.month_bound(PartitionManager.add_months(month, 1)),
+        ]
+        default = f'{table}{PartitionManager.DEFAULT_SUFFIX}'
+        key = PartitionManager.PARTITION_KEY
+        with transaction.atomic(), connection.cursor() as cursor:
+            if parent is None and PartitionManager.table_exists(default):
+                cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING STORAGE)')
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM "{default}" WHERE "{key}" >= %s AND "{key}" < %s RETURNING *) '
+                    f'INSERT INTO "{name}" SELECT * FROM moved',
+                    bounds
+                )
+                if cursor.rowcount:
+                    logger.warning(f"默认分区中 {cursor.rowcount} 行移入新分区: {name}")
+                cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', bounds)
+            else:
+                cursor.execute(
+                    f'CREATE TABLE "{name}" PARTITION OF "{parent or table}" FOR VALUES FROM (%s) TO (%s)',
+                    bounds
+                )
+        return True
+
+    @staticmethod
+    def create_default_partition(table: str, parent: Optional[str] = None) -> bool:
+        """
+        创建默认分区，接收超出已建月分区范围的写入，已存在时返回 False
+        """
+        name = f'{table}{PartitionManager.DEFAULT_SUFFIX}'
+        if PartitionManager.table_exists(name):
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{parent or table}" DEFAULT')
+        return True
+
+    @staticmethod
+    def ensure_partitions(months_ahead: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        预建当前月及未来 months_ahead 个月的分区，缺少默认分区时补建
+        返回 {表名: [新建分区名]}，未分区的表跳过
+        """
+        if months_ahead is None:
+            months_ahead = PartitionManager.get_options()['PREMAKE_MONTHS']
+
+        current = PartitionManager.current_month()
+        created = {}
+        for table in PartitionManager.PARTITIONED_TABLES:
+            if not PartitionManager.is_partitioned(table):
+                continue
+            created[table] = [
+                PartitionManager.partition_name(table, month)
+                for month in (PartitionManager.add_months(current, offset) for offset in range(months_ahead + 1))
+                if PartitionManager.create_partition(table, month)
+            ]
+            if PartitionManager.create_default_partition(table):
+                created[table].append(f'{table}{PartitionManager.DEFAULT_SUFFIX}')
+        return created
+
+    @staticmethod
+    def detach_expired(retention_months: Optional[int] = None, drop: Optional[bool] = None) -> Dict[str, List[str]]:
+        """
+        分离（drop 时删除）早于保留期的整月分区，代替逐行 DELETE
+        retention_months 为 0 时不清理；返回 {表名: [分区名]}
+        """
+        options = PartitionManager.get_options()
+        if retention_months is None:
+            retention_months = options['RETENTION_MONTHS']
+        if drop is None:
+            drop = options['DROP_DETACHED']
+        if retention_months <= 0:
+            return {}
+
+        cutoff = PartitionManager.add_months(PartitionManager.current_month(), -retention_months)
+        detached = {}
+        for table in PartitionManager.PARTITIONED_TABLES:
+            if not PartitionManager.is_partitioned(table):
+                continue
+            detached[table] = []
+            for name, month in PartitionManager.list_partitions(table):
+                if month is None or month >= cutoff:
+                    continue
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+                    if drop:
+                        cursor.execute(f'DROP TABLE "{name}"')
+                detached[table].append(name)
+                logger.info(f"{'删除' if drop else '分离'}过期分区: {name}")
+        return detached
+
+    @staticmethod
+    def convert_table(table: str, months_ahead: Optional[int] = None) -> Dict:
+        """
+        将普通表转换为按月范围分区表
+        建立同结构的分区表并复制全部数据后替换原表，原表重命名为 {表名}_unpartitioned 保留备查；
+        复制期间锁定原表写入，大表应在维护窗口执行
+        分区表主键必须包含分区键，主键改为 (id, created_at)，引用本表的外键随之删除
+        """
+        if not PartitionManager.is_supported():
+            return {'success': False, 'message': '当前数据库不支持声明式分区'}
+        if PartitionManager.is_partitioned(table):
+            return {'success': False, 'message': f'{table} 已是分区表'}
+        if months_ahead is None:
+            months_ahead = PartitionManager.get_options()['PREMAKE_MONTHS']
+
+        legacy = f'{table}{PartitionManager.LEGACY_SUFFIX}'
+        staging = f'{table}{PartitionManager.STAGING_SUFFIX}'
+        key = PartitionManager.PARTITION_KEY
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE "{table}" IN EXCLUSIVE MODE')
+
+            # 记录原表的主键、外键及普通索引定义
+            cursor.execute(
+                "SELECT conname, contype, confrelid::regclass::text, pg_get_constraintdef(oid) "
+                "FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f')",
+                [table]
+            )
+            constraints = cursor.fetchall()
+            constraint_names = {name for name, contype, _, _ in constraints if contype in ('p', 'u')}
+            foreign_keys = [
+                (name, definition) for name, contype, referenced, definition in constraints
+                if contype == 'f' and referenced not in PartitionManager.PARTITIONED_TABLES
+            ]
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes "
+                "WHERE schemaname = current_schema() AND tablename = %s",
+                [table]
+            )
+            indexes = [(name, definition) for name, definition in cursor.fetchall() if name not in constraint_names]
+
+            # 引用本表的外键（分区表无法被单列外键引用）
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE confrelid = to_regclass(%s) AND contype = 'f'",
+                [table]
+            )
+            for referencing, name in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {referencing} DROP CONSTRAINT "{name}"')
+
+            # 建立分区表并按数据覆盖的月份建分区
+            cursor.execute(
+                f'CREATE TABLE "{staging}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING STORAGE) '
+                f'PARTITION BY RANGE ("{key}")'
+            )
+            cursor.execute(f'SELECT min("{key}") FROM "{table}"')
+            first = cursor.fetchone()[0]
+            current = PartitionManager.current_month()
+            month = timezone.localdate(first).replace(day=1) if first else current
+            partitions = []
+            while month <= PartitionManager.add_months(current, months_ahead):
+                PartitionManager.create_partition(table, month, parent=staging)
+                partitions.append(PartitionManager.partition_name(table, month))
+                month = PartitionManager.add_months(month, 1)
+            PartitionManager.create_default_partition(table, parent=staging)
+            partitions.append(f'{table}{PartitionManager.DEFAULT_SUFFIX}')
+
+            cursor.execute(f'INSERT INTO "{staging}" SELECT * FROM "{table}"')
+            rows = cursor.rowcount
+
+            # 替换原表，索引名让给分区表
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX "{name}"')
+            for name in constraint_names:
+                cursor.execute(f'ALTER TABLE "{table}" RENAME CONSTRAINT "{name}" TO "{name[:48]}{PartitionManager.LEGACY_SUFFIX}"')
+            cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+            cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ("id", "{key}")')
+            for name, definition in indexes:
+                if definition.startswith('CREATE UNIQUE'):
+                    logger.warning(f"唯一索引不含分区键，分区表上未重建: {name}")
+                    continue
+                cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+        logger.info(f"{table} 已转换为分区表: {len(partitions)} 个分区, {rows} 行")
+        return {
+            'success': True,
+            'message': f'{table} 已转换为分区表',
+            'rows': rows,
+            'partitions': partitions,
+            'legacy_table': legacy,
+        }
+
+    @staticmethod
+    def drop_legacy(table: str) -> bool:
+        """删除转换后保留的原表"""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [f'{table}{PartitionManager.LEGACY_SUFFIX}'])
+            if not cursor.fetchone()[0]:
+                return False
+            cursor.execute(f'DROP TABLE "{table}{PartitionManager.LEGACY_SUFFIX}"')
+        return True
@@ -0,0 +1,132 @@
+"""
+派奖聚合器
+结算期间按用户累计中奖金额，结束时每个用户只入账一次并生成一条中奖交易，
+逐注奖金明细保存在交易 metadata 中以便追溯
+"""
+
+import logging
+import uuid
+from decimal import Decimal
+from typing import Dict, Any, Optional
+
+from django.db import transaction
+
+from .models import UserBalance, Transaction
+from .services import TransactionAnalyticsService
+
+logger = logging.getLogger(__name__)
+
+
+class PayoutAccumulator:
+    """
+    派奖聚合器
+
+    用法：
+        payouts = PayoutAccumulator('11选5中奖 20240101001', metadata={...})
+        bet.win_transaction_id = payouts.add(bet.user_id, win_amount, bet.id, bet_method='...')
+        ...
+        payouts.flush()
+
+    add 时即分配用户的中奖交易ID，投注记录可在 flush 前写入 win_transaction_id；
+    flush 在同一事务内批量创建交易记录并聚合入账
+    """
+
+    def __init__(self, description: str, metadata: Optional[Dict[str, Any]] = None,
+                 transaction_type: str = 'WIN'):
+        self.description = description
+        self.metadata = metadata or {}
+        self.transaction_type = transaction_type
+        self._payouts: Dict[Any, Dict[str, Any]] = {}
+
+    def add(self, user_id, amount: Decimal, bet_id, **details) -> uuid.UUID:
+        """
+        累计一笔投注奖金
+        details 为该注的附加信息（需可JSON序列化），写入交易 metadata 的 bets 明细
+        返回该用户本次派奖的交易ID
+        """
+        payout = self._payouts.get(user_id)
+        if payout is None:
+            payout = self._payouts[user_id] = {
+                'transaction_id': uuid.uuid4(),
+                'amount': Decimal('0.00'),
+                'bets': [],
+            }
+
+        payout['amount'] += amount
+        payout['bets'].append({'bet_id': str(bet_id), 'amount': float(amount), **details})
+        return payout['transaction_id']
+
+    @property
+    def user_count(self) -> int:
+        return len(self._payouts)
+
+    @property
+    def bet_count(self) -> int:
+        return sum(len(payout['bets']) for payout in self._payouts.values())
+
+    @property
+    def total_amount(self) -> Decimal:
+        return sum((payout['amount'] for payout in self._payouts.values()), Decimal('0.00'))
+
+    def flush(self) -> Dict[Any, Transaction]:
+        """
+        提交累计的奖金
+        按用户ID顺序锁定余额行后，批量创建中奖交易并以单条UPDATE入账；
+        有用户缺少余额记录时抛出ValueError，不创建任何交易（结算前应先排除这些用户的投注）
+        返回 {user_id: 中奖交易}，提交后聚合器清空，可继续累计
+        """
+        payouts = {user_id: payout for user_id, payout in self._payouts.items() if payout['amount'] > 0}
+        if not payouts:
+            self._payouts = {}
+            return {}
+
+        win_transactions = {
+            user_id: Transaction(
+                id=payout['transaction_id'],
+                user_id=user_id,
+                type=self.transaction_type,
+                amount=payout['amount'],
+                fee=Decimal('0.00'),
+                actual_amount=payout['amount'],
+                status='COMPLETED',
+                reference_id=str(uuid.uuid4()),
+                description=self.description,
+                metadata={
+                    **self.metadata,
+                    'bet_count': len(payout['bets']),
+                    'win_amount': float(payout['amount']),
+                    'bets': payout['bets'],
+                }
+            )
+            for user_id, payout in payouts.items()
+        }
+
+        with transaction.atomic():
+            # 按用户ID顺序锁定余额，避免并行结算互相死锁
+            locked_user_ids = set(
+                UserBalance.objects.select_for_update().filter(
+                    user_id__in=payouts.keys()
+                ).order_by('user_id').values_list('user_id', flat=True)
+            )
+            # 无余额记录的用户无法入账，不能生成已完成的中奖交易；整批回滚，由调用方保持投注待结算
+            missing_user_ids = set(payouts.keys()) - locked_user_ids
+            if missing_user_ids:
+                raise ValueError(
+                    f"{self.description} 派奖失败: {len(missing_user_ids)} 位用户余额信息不存在 "
+                    f"({', '.join(sorted(str(user_id) for user_id in missing_user_ids))})"
+                )
+            Transaction.objects.bulk_create(win_transactions.values(), batch_size=500)
+            TransactionAnalyticsService.invalidate_users(payouts.keys())
+            UserBalance.bulk_add_balance(
+                {user_id: payout['amount'] for user_id, payout in payouts.items()},
+                self.description
+            )
+
+        logger.info(
+            f"{self.description} 派奖完成: {len(payouts)} 位用户, "
+            f"{sum(len(payout['bets']) for payout in payouts.values())} 注, "
+            f"₦{sum(payout['amount'] for payout in payouts.values())}"
+        )
+
+        self._payouts = {}
+        return win_transactions
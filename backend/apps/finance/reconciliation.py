@@ -0,0 +1,229 @@
+"""
+余额对账
+按用户ID区间对 user_balances 与已完成交易做一次分组聚合，数据库内比较期望余额与实际余额，
+只返回不一致的账户并批量写入活动日志；增量模式只检查水位线之后交易或余额有变动的用户
+"""
+
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.core.models import ActivityLog, SystemConfig
+from .models import BalanceLog, Transaction, UserBalance
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class BalanceReconciliationService:
+    """
+    余额对账服务
+    """
+
+    # 期望余额 = 存款实际到账 - 提款 - 投注 + 中奖实际到账
+    BALANCE_RULES = (
+        ('DEPOSIT', 'actual_amount', 1),
+        ('WITHDRAW', 'amount', -1),
+        ('BET', 'amount', -1),
+        ('WIN', 'actual_amount', 1),
+    )
+    TOLERANCE = Decimal('0.01')
+
+    WATERMARK_KEY = 'finance.balance_reconciliation_watermark'
+    # 水位线回退时间，覆盖水位线前开始、之后才提交的交易
+    WATERMARK_OVERLAP = timedelta(minutes=5)
+
+    @staticmethod
+    def get_options() -> Dict[str, int]:
+        options = getattr(settings, 'BALANCE_RECONCILIATION', {})
+        return {
+            'CHUNKS': options.get('CHUNKS', 16),
+            'WORKERS': options.get('WORKERS', 4),
+            'INCREMENTAL_BATCH_SIZE': options.get('INCREMENTAL_BATCH_SIZE', 5000),
+        }
+
+    @staticmethod
+    def id_ranges(chunks: int) -> List[Tuple[Optional[uuid.UUID], Optional[uuid.UUID]]]:
+        """
+        将UUID空间均分为 chunks 个左闭右开区间（用户ID为随机UUID，各区间用户数接近）
+        """
+        bounds = [uuid.UUID(int=index * (1 << 128) // chunks) for index in range(1, chunks)]
+        return list(zip([None] + bounds, bounds + [None]))
+
+    @staticmethod
+    def expected_balance():
+        """每个用户已完成交易推算的期望余额（聚合表达式）"""
+        output_field = DecimalField(max_digits=15, decimal_places=2)
+        return Coalesce(
+            Sum(Case(
+                *[
+                    When(
+                        user__transactions__status='COMPLETED',
+                        user__transactions__type=transaction_type,
+                        then=F(f'user__transactions__{field}') * sign,
+                    )
+                    for transaction_type, field, sign in BalanceReconciliationService.BALANCE_RULES
+                ],
+                default=Value(Decimal('0.00')),
+                output_field=output_field,
+            )),
+            Value(Decimal('0.00')),
+            output_field=output_field,
+        )
+
+    @staticmethod
+    def find_mismatches(user_filter: Q) -> List[Dict[str, Any]]:
+        """
+        单条分组查询找出不一致账户
+        余额表连接用户和交易后按用户分组，差额过滤在 HAVING 中完成
+        """
+        tolerance = BalanceReconciliationService.TOLERANCE
+        rows = UserBalance.objects.filter(user_filter, user__is_active=True).values('user_id').annotate(
+            expected=BalanceReconciliationService.expected_balance(),
+            actual=F('main_balance') + F('bonus_balance'),
+        ).annotate(
+            difference=F('expected') - F('actual'),
+        ).filter(
+            Q(difference__gt=tolerance) | Q(difference__lt=-tolerance)
+        ).values_list('user_id', 'expected', 'actual', 'difference').order_by()
+
+        return [
+            {'user_id': user_id, 'expected': expected, 'actual': actual, 'difference': difference}
+            for user_id, expected, actual, difference in rows
+        ]
+
+    @staticmethod
+    def create_missing_balances(user_filter: Q) -> int:
+        """为缺少余额记录的活跃用户批量创建余额"""
+        user_ids = list(
+            User.objects.filter(user_filter, is_active=True, balance__isnull=True).values_list('id', flat=True)
+        )
+        UserBalance.objects.bulk_create([UserBalance(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        return len(user_ids)
+
+    @staticmethod
+    def record_mismatches(mismatches: List[Dict[str, Any]]):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(
+                user_id=mismatch['user_id'],
+                action='BALANCE_MISMATCH',
+                details={
+                    'calculated_balance': float(mismatch['expected']),
+                    'actual_balance': float(mismatch['actual']),
+                    'difference': float(mismatch['difference']),
+                }
+            )
+            for mismatch in mismatches
+        ], batch_size=500)
+
+    @staticmethod
+    def reconcile(balance_filter: Q, user_filter: Q) -> Dict[str, int]:
+        """
+        对账一批用户
+        balance_filter 作用于余额表（user_id），user_filter 作用于用户表（id）
+        """
+        created = BalanceReconciliationService.create_missing_balances(user_filter)
+        mismatches = BalanceReconciliationService.find_mismatches(balance_filter)
+        BalanceReconciliationService.record_mismatches(mismatches)
+        return {'mismatched': len(mismatches), 'created_balances': created}
+
+    @staticmethod
+    def _run_in_thread(task):
+        """在线程池中执行，结束后关闭该线程的数据库连接"""
+        func, args = task
+        try:
+            return func(*args)
+        finally:
+            connections.close_all()
+
+    @staticmethod
+    def reconcile_range(start: Optional[uuid.UUID], end: Optional[uuid.UUID]) -> Dict[str, int]:
+        """对账用户ID区间 [start, end)"""
+        balance_filter, user_filter = Q(), Q()
+        if start is not None:
+            balance_filter &= Q(user_id__gte=start)
+            user_filter &= Q(id__gte=start)
+        if end is not None:
+            balance_filter &= Q(user_id__lt=end)
+            user_filter &= Q(id__lt=end)
+        return BalanceReconciliationService.reconcile(balance_filter, user_filter)
+
+    @staticmethod
+    def reconcile_users(user_ids: List) -> Dict[str, int]:
+        return BalanceReconciliationService.reconcile(Q(user_id__in=user_ids), Q(id__in=user_ids))
+
+    @staticmethod
+    def changed_user_ids(since: datetime) -> List:
+        """水位线之后交易有新增、状态变化或余额有变动的用户"""
+        user_ids = set(Transaction.objects.filter(updated_at__gte=since).values_list('user_id', flat=True).distinct())
+        user_ids.update(BalanceLog.objects.filter(created_at__gte=since).values_list('user_id', flat=True).distinct())
+        return sorted(user_ids)
+
+    @staticmethod
+    def get_watermark() -> Optional[datetime]:
+        value = SystemConfig.get_config(BalanceReconciliationService.WATERMARK_KEY)
+        return datetime.fromisoformat(value) if value else None
+
+    @staticmethod
+    def run(incremental: bool = False, chunks: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        执行对账
+        全量模式按用户ID区间分块，workers > 1 时并行执行；
+        增量模式只检查水位线之后有变动的用户，无水位线时执行全量对账
+        成功后以本次开始时间更新水位线
+        """
+        options = BalanceReconciliationService.get_options()
+        chunks = chunks or options['CHUNKS']
+        workers = workers or options['WORKERS']
+        started_at = timezone.now()
+
+        watermark = BalanceReconciliationService.get_watermark() if incremental else None
+        if watermark is not None:
+            user_ids = BalanceReconciliationService.changed_user_ids(
+                watermark - BalanceReconciliationService.WATERMARK_OVERLAP
+            )
+            batch_size = options['INCREMENTAL_BATCH_SIZE']
+            batches = [user_ids[index:index + batch_size] for index in range(0, len(user_ids), batch_size)]
+            tasks = [(BalanceReconciliationService.reconcile_users, (batch,)) for batch in batches]
+            mode = 'incremental'
+        else:
+            user_ids = None
+            tasks = [
+                (BalanceReconciliationService.reconcile_range, bounds)
+                for bounds in BalanceReconciliationService.id_ranges(chunks)
+            ]
+            mode = 'full'
+
+        if workers > 1 and len(tasks) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(BalanceReconciliationService._run_in_thread, tasks))
+        else:
+            results = [func(*args) for func, args in tasks]
+
+        SystemConfig.set_config(
+            BalanceReconciliationService.WATERMARK_KEY, started_at.isoformat(),
+            description='余额对账水位线'
+        )
+
+        result = {
+            'success': True,
+            'mode': mode,
+            'batches': len(tasks),
+            'checked_users': len(user_ids) if user_ids is not None else None,
+            'mismatched': sum(item['mismatched'] for item in results),
+            'created_balances': sum(item['created_balances'] for item in results),
+            'duration': (timezone.now() - started_at).total_seconds(),
+        }
+        logger.info(f"余额对账完成: {result}")
+        return result
@@ -4,12 +4,16 @@
 
 import uuid
 import requests
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
 from django.conf import settings
 from django.db import transaction, models
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from .models import UserBalance, Transaction, BankAccount, PaymentMethod
+from apps.core.cache_manager import CacheManager
 from apps.core.utils import generate_transaction_id
 
 
@@ -279,6 +283,136 @@ class FinanceService:
             return {'success': False, 'message': f'处理失败: {str(e)}'}
 
 
+class TransactionAnalyticsService:
+    """
+    用户交易聚合服务
+    单条 GROUP BY (类型, 本地日期, 游戏类型) 查询得到已完成交易的分桶计数与金额，
+    按用户缓存最近 HORIZON_DAYS 天的分桶，交易分析、流水统计等接口均由分桶汇总
+    """
+    
+    HORIZON_DAYS = 365
+    CACHE_TIMEOUT = 300
+    
+    @staticmethod
+    def get_cache_key(user_id, today: date) -> str:
+        # 键中包含当天日期，跨日后自动使用新的分桶
+        return CacheManager.get_cache_key(CacheManager.FINANCE_PREFIX, 'transaction_buckets', user_id, today.isoformat())
+    
+    @staticmethod
+    def bucket_queryset(user_id, start_date: date):
+        """按 (类型, 本地日期, 游戏类型) 分组的聚合查询"""
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+        return Transaction.objects.filter(
+            user_id=user_id,
+            status='COMPLETED',
+            created_at__gte=start
+        ).annotate(
+            day=TruncDate('created_at'),
+            game_type=KeyTextTransform('game_type', 'metadata')
+        ).values('type', 'day', 'game_type').annotate(
+            count=models.Count('id'),
+            total=models.Sum('amount')
+        ).order_by()
+    
+    @staticmethod
+    def query_buckets(user_id, start_date: date) -> List[Dict[str, Any]]:
+        """
+        查询 start_date（本地日期）起的交易分桶
+        返回 [{'type', 'day', 'game_type', 'count', 'total'}]
+        """
+        rows = TransactionAnalyticsService.bucket_queryset(user_id, start_date)
+        
+        return [
+            {
+                'type': row['type'],
+                'day': row['day'],
+                'game_type': row['game_type'],
+                'count': row['count'],
+                'total': row['total'] or Decimal('0.00'),
+            }
+            for row in rows
+        ]
+    
+    @staticmethod
+    def get_buckets(user_id, days: int) -> List[Dict[str, Any]]:
+        """
+        获取最近 days 天（含今天，按本地日期对齐）的交易分桶
+        不超过 HORIZON_DAYS 时读取缓存，否则直接查询
+        """
+        today = timezone.localdate()
+        start_date = today - timedelta(days=days)
+        
+        if days > TransactionAnalyticsService.HORIZON_DAYS:
+            return TransactionAnalyticsService.query_buckets(user_id, start_date)
+        
+        key = TransactionAnalyticsService.get_cache_key(user_id, today)
+        cached = CacheManager.get_cache(key)
+        if cached is None:
+            buckets = TransactionAnalyticsService.query_buckets(
+                user_id, today - timedelta(days=TransactionAnalyticsService.HORIZON_DAYS)
+            )
+            CacheManager.set_cache(key, [
+                [bucket['type'], bucket['day'], bucket['game_type'], bucket['count'], bucket['total']]
+                for bucket in buckets
+            ], TransactionAnalyticsService.CACHE_TIMEOUT)
+        else:
+            buckets = [
+                {
+                    'type': transaction_type,
+                    'day': date.fromisoformat(day),
+                    'game_type': game_type,
+                    'count': count,
+                    'total': Decimal(total),
+                }
+                for transaction_type, day, game_type, count, total in cached
+            ]
+        
+        return [bucket for bucket in buckets if bucket['day'] >= start_date]
+    
+    @staticmethod
+    def invalidate_users(user_ids: Iterable):
+        """
+        清除用户的交易分桶缓存（事务提交后执行）
+        """
+        today = timezone.localdate()
+        keys = [TransactionAnalyticsService.get_cache_key(user_id, today) for user_id in set(user_ids)]
+        if keys:
+            transaction.on_commit(lambda: [CacheManager.delete_cache(key) for key in keys])
+    
+    @staticmethod
+    def summarize(buckets: List[Dict[str, Any]], start_date: Optional[date] = None,
+                  transaction_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        汇总分桶，可按起始日期、交易类型过滤
+        返回 {'count', 'total'}
+        """
+        count, total = 0, Decimal('0.00')
+        for bucket in buckets:
+            if start_date is not None and bucket['day'] < start_date:
+                continue
+            if transaction_type is not None and bucket['type'] != transaction_type:
+                continue
+            count += bucket['count']
+            total += bucket['total']
+        return {'count': count, 'total': total}
+    
+    @staticmethod
+    def group_by(buckets: List[Dict[str, Any]], field: str,
+                 transaction_type: Optional[str] = None) -> Dict[Any, Dict[str, Any]]:
+        """
+        按分桶字段（type/day/game_type）分组汇总
+        返回 {字段值: {'count', 'total'}}
+        """
+        groups = {}
+        for bucket in buckets:
+            if transaction_type is not None and bucket['type'] != transaction_type:
+                continue
+            group = groups.setdefault(bucket[field], {'count': 0, 'total': Decimal('0.00')})
+            group['count'] += bucket['count']
+            group['total'] += bucket['total']
+        return groups
+
+
 class PaystackService:
     """
     Paystack支付服务
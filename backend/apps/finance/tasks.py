@@ -11,6 +11,8 @@ from datetime import timedelta
 
 from .models import Transaction, UserBalance, BankAccount
 from .services import FinanceService, BankVerificationService
+from .partitioning import PartitionManager
+from .reconciliation import BalanceReconciliationService
 from apps.users.models import User
 from apps.core.models import Notification
 
@@ -250,67 +252,15 @@ def calculate_daily_transaction_stats():
 
 
 @shared_task
-def sync_balance_with_transactions():
+def sync_balance_with_transactions(incremental=False):
     """
     同步余额与交易记录
+    按用户ID区间分组聚合对账，不一致账户批量写入活动日志；incremental 时只检查水位线后有变动的用户
     """
     try:
-        # 检查余额与交易记录的一致性
-        inconsistent_count = 0
-        
-        for user in User.objects.filter(is_active=True).iterator(chunk_size=100):
-            try:
-                balance = user.balance
-                
-                # 计算基于交易记录的余额
-                completed_deposits = Transaction.objects.filter(
-                    user=user,
-                    type='DEPOSIT',
-                    status='COMPLETED'
-                ).aggregate(total=Sum('actual_amount'))['total'] or Decimal('0')
-                
-                completed_withdraws = Transaction.objects.filter(
-                    user=user,
-                    type='WITHDRAW',
-                    status='COMPLETED'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                completed_bets = Transaction.objects.filter(
-                    user=user,
-                    type='BET',
-                    status='COMPLETED'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                completed_wins = Transaction.objects.filter(
-                    user=user,
-                    type='WIN',
-                    status='COMPLETED'
-                ).aggregate(total=Sum('actual_amount'))['total'] or Decimal('0')
-                
-                calculated_balance = completed_deposits - completed_withdraws - completed_bets + completed_wins
-                actual_balance = balance.get_total_balance()
-                
-                # 检查差异
-                if abs(calculated_balance - actual_balance) > Decimal('0.01'):
-                    inconsistent_count += 1
-                    
-                    # 记录不一致情况
-                    from apps.core.models import ActivityLog
-                    ActivityLog.objects.create(
-                        user=user,
-                        action='BALANCE_INCONSISTENCY',
-                        details={
-                            'calculated_balance': float(calculated_balance),
-                            'actual_balance': float(actual_balance),
-                            'difference': float(calculated_balance - actual_balance)
-                        }
-                    )
-                    
-            except UserBalance.DoesNotExist:
-                # 创建缺失的余额记录
-                UserBalance.objects.create(user=user)
-        
-        return f"余额同步完成 - 发现不一致账户: {inconsistent_count}"
+        result = BalanceReconciliationService.run(incremental=incremental)
+        
+        return f"余额同步完成 - 发现不一致账户: {result['mismatched']}"
         
     except Exception as e:
         return f"余额同步异常: {str(e)}"
@@ -336,6 +286,24 @@ def cleanup_old_transactions():
         return f"清理旧交易记录异常: {str(e)}"
 
 
+@shared_task
+def maintain_partitions():
+    """
+    维护交易表分区：预建未来分区，分离过期分区
+    """
+    try:
+        created = PartitionManager.ensure_partitions()
+        detached = PartitionManager.detach_expired()
+        
+        return (
+            f"分区维护完成 - 新建分区: {sum(len(names) for names in created.values())}, "
+            f"过期分区: {sum(len(names) for names in detached.values())}"
+        )
+        
+    except Exception as e:
+        return f"分区维护异常: {str(e)}"
+
+
 @shared_task
 def send_low_balance_alert(user_id, current_balance):
     """
@@ -0,0 +1,444 @@
+"""
+财务模块测试
+"""
+
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from datetime import timedelta
+
+from .models import UserBalance, Transaction
+
+User = get_user_model()
+
+
+class TransactionAnalyticsTest(TestCase):
+    """
+    用户交易聚合测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='analytics_user',
+            phone='+2348010000200',
+            password='testpass123'
+        )
+        self.create_transaction('DEPOSIT', Decimal('500.00'))
+        self.create_transaction('BET', Decimal('20.00'), '11选5')
+        self.create_transaction('BET', Decimal('10.00'), '11选5')
+        self.create_transaction('BET', Decimal('30.00'), '大乐透', days_ago=2)
+        self.create_transaction('WIN', Decimal('45.00'), '11选5')
+        self.create_transaction('BET', Decimal('99.00'), '11选5', days_ago=40)
+        self.create_transaction('BET', Decimal('5.00'), '11选5', status='FAILED')
+
+    def create_transaction(self, transaction_type, amount, game_type=None, days_ago=0, status='COMPLETED'):
+        record = Transaction.objects.create(
+            user=self.user,
+            type=transaction_type,
+            amount=amount,
+            status=status,
+            metadata={'game_type': game_type} if game_type else {}
+        )
+        if days_ago:
+            Transaction.objects.filter(id=record.id).update(
+                created_at=timezone.now() - timedelta(days=days_ago)
+            )
+        return record
+
+    def test_buckets_group_by_type_day_and_game(self):
+        """
+        测试单条查询按类型、日期、游戏分桶，已完成交易才计入
+        """
+        from apps.finance.services import TransactionAnalyticsService
+
+        today = timezone.localdate()
+        with self.assertNumQueries(1):
+            buckets = TransactionAnalyticsService.get_buckets(self.user.id, 30)
+
+        bets = TransactionAnalyticsService.group_by(buckets, 'game_type', 'BET')
+        self.assertEqual(bets['11选5'], {'count': 2, 'total': Decimal('30.00')})
+        self.assertEqual(bets['大乐透'], {'count': 1, 'total': Decimal('30.00')})
+        self.assertEqual(
+            TransactionAnalyticsService.summarize(buckets, today, 'BET'),
+            {'count': 2, 'total': Decimal('30.00')}
+        )
+
+        # 命中缓存，日期、金额类型保持不变
+        with self.assertNumQueries(0):
+            cached = TransactionAnalyticsService.get_buckets(self.user.id, 30)
+        self.assertCountEqual(cached, buckets)
+        self.assertEqual(
+            TransactionAnalyticsService.summarize(TransactionAnalyticsService.get_buckets(self.user.id, 365), None, 'BET'),
+            {'count': 4, 'total': Decimal('159.00')}
+        )
+
+    def test_views_run_at_constant_query_count_and_invalidate(self):
+        """
+        测试交易分析接口查询次数固定，新交易提交后缓存失效
+        """
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from apps.finance.transaction_views import TransactionAnalyticsView
+
+        factory = APIRequestFactory()
+        view = TransactionAnalyticsView.as_view()
+
+        def get_analytics():
+            request = factory.get('/api/v1/finance/analytics/', {'period': 'month'})
+            force_authenticate(request, user=self.user)
+            return view(request).data['data']
+
+        with self.assertNumQueries(1):
+            data = get_analytics()
+        self.assertEqual(data['total_stats']['total_bet'], 60.0)
+        self.assertEqual(data['total_stats']['net_gaming'], -15.0)
+        self.assertEqual(data['type_stats']['BET']['count'], 3)
+        self.assertEqual(data['type_stats']['BET']['avg_amount'], 20.0)
+        self.assertEqual(data['daily_stats'][-1]['bet_amount'], 30.0)
+        self.assertEqual(data['daily_stats'][-1]['transaction_count'], 4)
+
+        with self.assertNumQueries(0):
+            get_analytics()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_transaction('WITHDRAW', Decimal('100.00'))
+
+        with self.assertNumQueries(1):
+            data = get_analytics()
+        self.assertEqual(data['total_stats']['net_deposit'], 400.0)
+
+
+class TransactionPartitioningTest(TestCase):
+    """
+    交易表分区测试
+    """
+
+    def test_partition_naming_and_sqlite_fallback(self):
+        """
+        测试分区命名、月份计算，非PostgreSQL数据库下分区维护为空操作
+        """
+        from datetime import date
+        from apps.finance.partitioning import PartitionManager
+
+        self.assertEqual(PartitionManager.add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(PartitionManager.add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(PartitionManager.partition_name('transactions', date(2024, 5, 1)), 'transactions_2024_05')
+        self.assertEqual(PartitionManager.parse_partition_month('transactions', 'transactions_2024_05'), date(2024, 5, 1))
+        self.assertIsNone(PartitionManager.parse_partition_month('transactions', 'transactions_default'))
+
+        self.assertFalse(PartitionManager.is_supported())
+        self.assertEqual(PartitionManager.ensure_partitions(), {})
+        self.assertEqual(PartitionManager.detach_expired(retention_months=12), {})
+        self.assertFalse(PartitionManager.convert_table('transactions')['success'])
+
+    def test_maintenance_task_is_scheduled(self):
+        """
+        测试分区维护任务已加入Celery定时调度
+        """
+        from lottery_platform.celery import app
+
+        tasks = {entry['task'] for entry in app.conf.beat_schedule.values()}
+        self.assertIn('apps.finance.tasks.maintain_partitions', tasks)
+
+
+class TransactionExportTest(TestCase):
+    """
+    交易记录流式导出测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        self.user = User.objects.create_user(
+            username='export_user',
+            phone='+2348010000400',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='export_other',
+            phone='+2348010000401',
+            password='testpass123'
+        )
+        for index in range(7):
+            Transaction.objects.create(
+                user=self.user, type='BET' if index % 2 else 'DEPOSIT', amount=Decimal('10.00') + index,
+                status='COMPLETED', description=f'记录 {index}'
+            )
+        old = Transaction.objects.create(user=self.user, type='BET', amount=Decimal('99.00'), status='FAILED')
+        Transaction.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=40))
+        Transaction.objects.create(user=self.other, type='BET', amount=Decimal('5.00'), status='COMPLETED')
+
+    def export(self, **params):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from apps.finance.transaction_views import TransactionExportView
+
+        request = APIRequestFactory().get('/api/v1/finance/transactions/export/', params)
+        force_authenticate(request, user=self.user)
+        return TransactionExportView.as_view()(request)
+
+    def test_stream_csv_ndjson_and_gzip(self):
+        """
+        测试流式导出CSV、NDJSON及gzip压缩，日期、类型、状态过滤生效
+        """
+        import gzip
+        import json
+        from apps.finance.exports import TransactionExportService
+
+        response = self.export(stream='true')
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode('utf-8').strip().splitlines()
+        self.assertEqual(len(lines), 1 + 8)
+        self.assertTrue(lines[0].startswith('交易ID,参考ID,交易类型'))
+
+        start_date = (timezone.localdate() - timedelta(days=1)).isoformat()
+        response = self.export(
+            stream='1', export_format='ndjson', compress='gzip', start_date=start_date, types='BET', status='COMPLETED'
+        )
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        records = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual({record['type'] for record in records}, {'BET'})
+        self.assertEqual(sorted(record['amount'] for record in records), ['11.00', '13.00', '15.00'])
+
+        # 多块输出
+        original = TransactionExportService.ROWS_PER_BLOCK
+        TransactionExportService.ROWS_PER_BLOCK = 3
+        try:
+            blocks = list(self.export(stream='1', export_format='ndjson').streaming_content)
+        finally:
+            TransactionExportService.ROWS_PER_BLOCK = original
+        self.assertEqual(len(blocks), 3)
+
+        self.assertEqual(self.export(stream='1', export_format='xml').status_code, 400)
+
+    def test_json_export_and_end_date_includes_whole_day(self):
+        """
+        测试原JSON导出保持不变，结束日期包含当天
+        """
+        response = self.export(end_date=timezone.localdate().isoformat())
+        self.assertEqual(response.data['data']['record_count'], 8)
+
+        response = self.export(end_date=(timezone.localdate() - timedelta(days=30)).isoformat())
+        self.assertEqual(response.data['data']['record_count'], 1)
+        self.assertEqual(self.export(start_date='2024/01/01').status_code, 400)
+
+
+class UserBalanceLedgerTest(TestCase):
+    """
+    余额变动测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        self.user = User.objects.create_user(
+            username='ledger_user',
+            phone='+2348010000600',
+            password='testpass123'
+        )
+        UserBalance.objects.get_or_create(user=self.user)
+        UserBalance.objects.filter(user=self.user).update(
+            main_balance=Decimal('100.00'), bonus_balance=Decimal('20.00'), frozen_balance=Decimal('0.00')
+        )
+        self.balance = UserBalance.objects.get(user=self.user)
+
+    def assert_balance(self, main, bonus, frozen):
+        balance = UserBalance.objects.get(user=self.user)
+        self.assertEqual(
+            (balance.main_balance, balance.bonus_balance, balance.frozen_balance),
+            (Decimal(main), Decimal(bonus), Decimal(frozen))
+        )
+
+    def last_log(self):
+        from .models import BalanceLog
+
+        return BalanceLog.objects.filter(user=self.user).order_by('-created_at').first()
+
+    def test_add_and_deduct(self):
+        """
+        测试增加、扣除余额及余额日志
+        """
+        self.assertTrue(self.balance.add_balance(Decimal('50.00'), 'main', '充值'))
+        self.assert_balance('150.00', '20.00', '0.00')
+        log = self.last_log()
+        self.assertEqual((log.type, log.amount, log.description), ('ADD', Decimal('50.00'), '充值'))
+        self.assertEqual((log.balance_before, log.balance_after), (Decimal('120.00'), Decimal('170.00')))
+
+        self.assertTrue(self.balance.add_balance(Decimal('5.00'), 'bonus'))
+        self.assert_balance('150.00', '25.00', '0.00')
+
+        # 可用余额扣除优先扣主余额，不足部分扣奖金余额
+        self.assertTrue(self.balance.deduct_balance(Decimal('160.00'), 'available', '投注'))
+        self.assert_balance('0.00', '15.00', '0.00')
+        self.assertEqual(self.balance.main_balance, Decimal('0.00'))
+        log = self.last_log()
+        self.assertEqual((log.type, log.amount, log.description), ('DEDUCT', Decimal('160.00'), '投注'))
+        self.assertEqual((log.balance_before, log.balance_after), (Decimal('175.00'), Decimal('15.00')))
+
+    def test_insufficient_funds(self):
+        """
+        测试余额不足时不变动且不写日志
+        """
+        from .models import BalanceLog
+
+        self.assertFalse(self.balance.deduct_balance(Decimal('120.01'), 'available'))
+        self.assertFalse(self.balance.deduct_balance(Decimal('100.01'), 'main'))
+        self.assertFalse(self.balance.deduct_balance(Decimal('20.01'), 'bonus'))
+        self.assertFalse(self.balance.deduct_balance(Decimal('0.00'), 'main'))
+        self.assertFalse(self.balance.freeze_balance(Decimal('120.01')))
+        self.assertFalse(self.balance.unfreeze_balance(Decimal('0.01')))
+        self.assert_balance('100.00', '20.00', '0.00')
+        self.assertFalse(BalanceLog.objects.filter(user=self.user).exists())
+
+        # 扣至恰好为0
+        self.assertTrue(self.balance.deduct_balance(Decimal('120.00'), 'available'))
+        self.assert_balance('0.00', '0.00', '0.00')
+
+    def test_freeze_and_unfreeze(self):
+        """
+        测试冻结、解冻余额及余额日志
+        """
+        self.assertTrue(self.balance.freeze_balance(Decimal('30.00'), '提现冻结'))
+        self.assert_balance('70.00', '20.00', '30.00')
+        log = self.last_log()
+        self.assertEqual((log.type, log.amount, log.description), ('FREEZE', Decimal('30.00'), '提现冻结'))
+        self.assertEqual((log.balance_before, log.balance_after), (Decimal('120.00'), Decimal('90.00')))
+
+        # 解冻金额不能超过冻结余额
+        self.assertFalse(self.balance.unfreeze_balance(Decimal('30.01')))
+
+        self.assertTrue(self.balance.unfreeze_balance(Decimal('30.00')))
+        self.assert_balance('100.00', '20.00', '0.00')
+        log = self.last_log()
+        self.assertEqual((log.type, log.amount), ('UNFREEZE', Decimal('30.00')))
+        self.assertEqual((log.balance_before, log.balance_after), (Decimal('90.00'), Decimal('120.00')))
+
+        self.assertTrue(self.balance.freeze_balance(Decimal('10.00')))
+        self.assertTrue(self.balance.unfreeze_balance(Decimal('10.00'), to_main=False))
+        self.assert_balance('90.00', '30.00', '0.00')
+
+
+class BalanceReconciliationTest(TestCase):
+    """
+    余额对账测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        self.users = [
+            User.objects.create_user(
+                username=f'reconcile_user_{index}',
+                phone=f'+23480100005{index:02d}',
+                password='testpass123'
+            )
+            for index in range(4)
+        ]
+        for user in self.users:
+            UserBalance.objects.get_or_create(user=user)
+            for transaction_type, amount in (('DEPOSIT', '100.00'), ('BET', '30.00'), ('WIN', '12.50')):
+                Transaction.objects.create(
+                    user=user, type=transaction_type, amount=Decimal(amount), status='COMPLETED'
+                )
+            Transaction.objects.create(user=user, type='WITHDRAW', amount=Decimal('50.00'), status='FAILED')
+        # 前三个用户余额与交易一致，最后一个用户少入账 10
+        UserBalance.objects.filter(user__in=self.users[:3]).update(main_balance=Decimal('80.00'), bonus_balance=Decimal('2.50'))
+        UserBalance.objects.filter(user=self.users[3]).update(main_balance=Decimal('72.50'))
+
+    def test_full_and_incremental_reconciliation(self):
+        """
+        测试全量对账每个区间一条聚合查询、增量对账只检查水位线后有变动的用户
+        """
+        from apps.core.models import ActivityLog
+        from apps.finance.reconciliation import BalanceReconciliationService
+
+        ranges = BalanceReconciliationService.id_ranges(4)
+        self.assertEqual(len(ranges), 4)
+        self.assertIsNone(ranges[0][0])
+        self.assertIsNone(ranges[-1][1])
+
+        # 缺失余额检查、分组聚合、批量写日志各一条
+        with self.assertNumQueries(3):
+            self.assertEqual(BalanceReconciliationService.reconcile_range(None, None)['mismatched'], 1)
+
+        ActivityLog.objects.all().delete()
+        result = BalanceReconciliationService.run(chunks=4, workers=1)
+        self.assertEqual((result['mode'], result['batches'], result['mismatched']), ('full', 4, 1))
+        log = ActivityLog.objects.get(action='BALANCE_MISMATCH')
+        self.assertEqual(log.user_id, self.users[3].id)
+        self.assertEqual(log.details['difference'], 10.0)
+
+        # 水位线之后只有一个用户有新交易
+        BalanceReconciliationService.WATERMARK_OVERLAP, overlap = timedelta(0), BalanceReconciliationService.WATERMARK_OVERLAP
+        try:
+            Transaction.objects.create(
+                user=self.users[0], type='DEPOSIT', amount=Decimal('20.00'), status='COMPLETED'
+            )
+            result = BalanceReconciliationService.run(incremental=True, workers=1)
+        finally:
+            BalanceReconciliationService.WATERMARK_OVERLAP = overlap
+        self.assertEqual((result['mode'], result['checked_users'], result['mismatched']), ('incremental', 1, 1))
+        self.assertTrue(ActivityLog.objects.filter(action='BALANCE_MISMATCH', user=self.users[0]).exists())
+
+
+class IndexAdvisorTest(TestCase):
+    """
+    索引顾问测试
+    """
+
+    def test_hot_queries_use_declared_indexes(self):
+        """
+        测试热点查询命中部分索引、迁移已创建全部声明索引
+        """
+        from apps.core.index_advisor import IndexAdvisor
+
+        results = {result['name']: result for result in IndexAdvisor.check_hot_queries()}
+        for name, index in (
+            ('开奖结算-待开奖投注', 'bet_draw_pending_idx'),
+            ('有效流水-用户投注', 'txn_user_type_done_idx'),
+            ('待处理交易-超时扫描', 'txn_pending_idx'),
+        ):
+            self.assertIn(index, results[name]['indexes'])
+            self.assertEqual(results[name]['missing'], [])
+
+        self.assertEqual(IndexAdvisor.missing_declared_indexes(), [])
+
+    def test_parse_sqlite_plan(self):
+        """
+        测试解析SQLite执行计划
+        """
+        from apps.core.index_advisor import IndexAdvisor
+
+        plan = IndexAdvisor.parse_plan(
+            '2 0 0 SEARCH games_bet USING INDEX bet_draw_pending_idx (draw_id=?)\n'
+            '5 0 0 SCAN transactions\n'
+            '9 0 0 SCAN CONSTANT ROW'
+        )
+        self.assertEqual(plan, {'seq_scans': ['transactions'], 'indexes': ['bet_draw_pending_idx']})
+
+    def test_new_bets_match_pending_index_condition(self):
+        """
+        测试新建投注的默认状态与部分索引条件、结算查询一致
+        """
+        from apps.games.models import Bet, Draw, Game
+
+        user = User.objects.create_user(username='index_user', phone='+2348010000901', password='testpass123')
+        game = Game.objects.create(name='11选5', game_type='lottery11x5')
+        draw = Draw.objects.create(game=game, draw_number='20250101001', draw_time=timezone.now())
+        bet = Bet.objects.create(
+            user=user, game=game, draw=draw, bet_content={'numbers': [1, 2, 3]},
+            bet_amount=Decimal('2.00'), potential_win=Decimal('4.40'),
+        )
+
+        self.assertEqual(bet.status, 'PENDING')
+        self.assertEqual(list(Bet.objects.filter(draw=draw, status='PENDING')), [bet])
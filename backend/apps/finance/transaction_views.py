@@ -6,14 +6,17 @@ from rest_framework import status, permissions, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db import models
 from django.db.models import Q, Sum, Count
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from .models import Transaction, UserBalance, BalanceLog
+from .services import TransactionAnalyticsService
+from .exports import TransactionExportService
 from .serializers import (
     TransactionSerializer, 
     TransactionFilterSerializer,
@@ -38,79 +41,54 @@ class TransactionAnalyticsView(APIView):
         user = request.user
         period = request.query_params.get('period', 'month')
         
-        # 确定时间范围
+        # 确定时间范围（按本地日期对齐）
         now = timezone.now()
-        if period == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'week':
-            start_date = now - timedelta(days=7)
-        elif period == 'month':
-            start_date = now - timedelta(days=30)
-        elif period == 'year':
-            start_date = now - timedelta(days=365)
-        else:
-            start_date = now - timedelta(days=30)
+        today = timezone.localdate()
+        days = {'today': 0, 'week': 7, 'month': 30, 'year': 365}.get(period, 30)
+        start_date = today - timedelta(days=days)
         
-        # 获取交易数据
-        transactions = Transaction.objects.filter(
-            user=user,
-            created_at__gte=start_date,
-            status='COMPLETED'
-        )
+        # 单条分组查询（按用户缓存）得到交易分桶，周期统计与每日统计均由分桶汇总
+        buckets = TransactionAnalyticsService.get_buckets(user.id, max(days, 6))
+        period_buckets = [bucket for bucket in buckets if bucket['day'] >= start_date]
         
         # 按类型统计
+        type_groups = TransactionAnalyticsService.group_by(period_buckets, 'type')
         type_stats = {}
         for transaction_type, display_name in Transaction.TYPE_CHOICES:
-            type_transactions = transactions.filter(type=transaction_type)
+            group = type_groups.get(transaction_type, {'count': 0, 'total': Decimal('0')})
             type_stats[transaction_type] = {
                 'display_name': display_name,
-                'count': type_transactions.count(),
-                'total_amount': float(type_transactions.aggregate(
-                    total=Sum('amount')
-                )['total'] or Decimal('0')),
-                'avg_amount': float(type_transactions.aggregate(
-                    avg=models.Avg('amount')
-                )['avg'] or Decimal('0')),
+                'count': group['count'],
+                'total_amount': float(group['total']),
+                'avg_amount': float(group['total'] / group['count']) if group['count'] else 0.0,
             }
         
         # 每日统计（最近7天）
+        day_groups = {
+            transaction_type: TransactionAnalyticsService.group_by(buckets, 'day', transaction_type)
+            for transaction_type in ('DEPOSIT', 'WITHDRAW', 'BET', 'WIN')
+        }
+        day_counts = TransactionAnalyticsService.group_by(buckets, 'day')
+        empty = {'count': 0, 'total': Decimal('0')}
         daily_stats = []
         for i in range(7):
-            day = (now - timedelta(days=i)).date()
-            day_transactions = transactions.filter(created_at__date=day)
-            
+            day = today - timedelta(days=i)
             daily_stats.append({
                 'date': day.isoformat(),
-                'deposit_amount': float(day_transactions.filter(
-                    type='DEPOSIT'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
-                'withdraw_amount': float(day_transactions.filter(
-                    type='WITHDRAW'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
-                'bet_amount': float(day_transactions.filter(
-                    type='BET'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
-                'win_amount': float(day_transactions.filter(
-                    type='WIN'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
-                'transaction_count': day_transactions.count(),
+                'deposit_amount': float(day_groups['DEPOSIT'].get(day, empty)['total']),
+                'withdraw_amount': float(day_groups['WITHDRAW'].get(day, empty)['total']),
+                'bet_amount': float(day_groups['BET'].get(day, empty)['total']),
+                'win_amount': float(day_groups['WIN'].get(day, empty)['total']),
+                'transaction_count': day_counts.get(day, empty)['count'],
             })
         
         # 总体统计
         total_stats = {
-            'total_transactions': transactions.count(),
-            'total_deposit': float(transactions.filter(
-                type='DEPOSIT'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
-            'total_withdraw': float(transactions.filter(
-                type='WITHDRAW'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
-            'total_bet': float(transactions.filter(
-                type='BET'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
-            'total_win': float(transactions.filter(
-                type='WIN'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')),
+            'total_transactions': sum(group['count'] for group in type_groups.values()),
+            'total_deposit': type_stats['DEPOSIT']['total_amount'],
+            'total_withdraw': type_stats['WITHDRAW']['total_amount'],
+            'total_bet': type_stats['BET']['total_amount'],
+            'total_win': type_stats['WIN']['total_amount'],
             'net_deposit': 0,  # 将在下面计算
             'net_gaming': 0,   # 将在下面计算
         }
@@ -123,7 +101,7 @@ class TransactionAnalyticsView(APIView):
             'success': True,
             'data': {
                 'period': period,
-                'start_date': start_date.isoformat(),
+                'start_date': timezone.make_aware(datetime.combine(start_date, time.min)).isoformat(),
                 'end_date': now.isoformat(),
                 'total_stats': total_stats,
                 'type_stats': type_stats,
@@ -263,90 +241,67 @@ class TransactionExportView(APIView):
     
     @extend_schema(
         summary="导出交易记录",
-        description="导出用户的交易记录为CSV格式",
+        description="导出用户的交易记录；stream=true 时以流式下载完整CSV/NDJSON，否则在JSON中返回最近1000条CSV",
         parameters=[
             OpenApiParameter('start_date', str, description='开始日期'),
             OpenApiParameter('end_date', str, description='结束日期'),
             OpenApiParameter('types', str, description='交易类型，逗号分隔'),
+            OpenApiParameter('status', str, description='交易状态，逗号分隔'),
+            OpenApiParameter('stream', bool, description='流式下载，不限制条数'),
+            OpenApiParameter('export_format', str, description='流式下载格式：csv/ndjson'),
+            OpenApiParameter('compress', str, description='流式下载压缩：gzip'),
         ]
     )
     def get(self, request):
-        user = request.user
+        result = TransactionExportService.build_queryset(request.user, request.query_params)
+        if not result['success']:
+            return Response({
+                'success': False,
+                'message': result['message']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        queryset = result['queryset']
         
-        # 获取参数
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        types = request.query_params.get('types', '').split(',') if request.query_params.get('types') else []
-        
-        # 构建查询
-        queryset = Transaction.objects.filter(user=user)
-        
-        if start_date:
-            try:
-                start_date_obj = timezone.datetime.strptime(start_date, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__gte=start_date_obj)
-            except ValueError:
-                return Response({
-                    'success': False,
-                    'message': '开始日期格式错误，请使用YYYY-MM-DD格式'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if end_date:
-            try:
-                end_date_obj = timezone.datetime.strptime(end_date, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__lte=end_date_obj)
-            except ValueError:
-                return Response({
-                    'success': False,
-                    'message': '结束日期格式错误，请使用YYYY-MM-DD格式'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if types:
-            queryset = queryset.filter(type__in=types)
+        if request.query_params.get('stream', '').lower() in ('1', 'true'):
+            return self.stream_export(request, queryset)
         
         # 限制导出数量
-        queryset = queryset.order_by('-created_at')[:1000]
-        
-        # 生成CSV数据
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # 写入表头
-        writer.writerow([
-            '交易ID', '参考ID', '交易类型', '金额', '手续费', '实际金额',
-            '状态', '描述', '创建时间', '处理时间'
-        ])
-        
-        # 写入数据
-        for transaction in queryset:
-            writer.writerow([
-                str(transaction.id),
-                transaction.reference_id,
-                transaction.get_type_display(),
-                float(transaction.amount),
-                float(transaction.fee),
-                float(transaction.actual_amount),
-                transaction.get_status_display(),
-                transaction.description,
-                transaction.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                transaction.processed_at.strftime('%Y-%m-%d %H:%M:%S') if transaction.processed_at else '',
-            ])
-        
-        # 返回CSV内容
-        csv_content = output.getvalue()
-        output.close()
+        rows = list(TransactionExportService.iter_rows(queryset[:1000]))
+        csv_content = ''.join(TransactionExportService.iter_csv(rows))
         
         return Response({
             'success': True,
             'data': {
                 'csv_content': csv_content,
-                'record_count': queryset.count(),
+                'record_count': len(rows),
                 'export_time': timezone.now().isoformat(),
             }
         }, status=status.HTTP_200_OK)
+    
+    def stream_export(self, request, queryset):
+        """
+        流式导出：服务器端游标分批读取，边查询边输出
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in TransactionExportService.FORMATS:
+            return Response({
+                'success': False,
+                'message': f'不支持的导出格式: {export_format}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('compress') == 'gzip'
+        
+        filename = f"transactions_{timezone.localtime():%Y%m%d%H%M%S}.{export_format}"
+        content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8'
+        if compress:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        
+        response = StreamingHttpResponse(
+            TransactionExportService.stream(queryset, export_format, compress),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
 
 
 @api_view(['GET'])
@@ -461,45 +416,34 @@ def turnover_stats(request):
     
     # 获取时间范围参数
     days = int(request.query_params.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
+    today = timezone.localdate()
+    
+    # 投注分桶（单条分组查询，按用户缓存），覆盖统计周期及最近7天
+    bet_buckets = [
+        bucket for bucket in TransactionAnalyticsService.get_buckets(user.id, max(days, 6))
+        if bucket['type'] == 'BET'
+    ]
+    period_buckets = [bucket for bucket in bet_buckets if bucket['day'] >= today - timedelta(days=days)]
     
     # 计算有效流水（通常是投注金额）
-    valid_turnover = Transaction.objects.filter(
-        user=user,
-        type='BET',
-        status='COMPLETED',
-        created_at__gte=start_date
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    valid_turnover = TransactionAnalyticsService.summarize(period_buckets)['total']
     
     # 按游戏类型统计
+    game_groups = TransactionAnalyticsService.group_by(period_buckets, 'game_type')
     game_turnover = {}
     game_types = ['11选5', '大乐透', '刮刮乐', '体育']
     
     for game_type in game_types:
-        game_amount = Transaction.objects.filter(
-            user=user,
-            type='BET',
-            status='COMPLETED',
-            created_at__gte=start_date,
-            metadata__game_type=game_type
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        game_turnover[game_type] = float(game_amount)
+        game_turnover[game_type] = float(game_groups.get(game_type, {'total': Decimal('0')})['total'])
     
     # 每日流水统计（最近7天）
+    day_groups = TransactionAnalyticsService.group_by(bet_buckets, 'day')
     daily_turnover = []
     for i in range(7):
-        day = (timezone.now() - timedelta(days=i)).date()
-        day_amount = Transaction.objects.filter(
-            user=user,
-            type='BET',
-            status='COMPLETED',
-            created_at__date=day
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
+        day = today - timedelta(days=i)
         daily_turnover.append({
             'date': day.isoformat(),
-            'amount': float(day_amount)
+            'amount': float(day_groups.get(day, {'total': Decimal('0')})['total'])
         })
     
     # VIP信息
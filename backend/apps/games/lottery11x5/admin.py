@@ -43,6 +43,18 @@ class Lottery11x5GameAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        from .services import Lottery11x5Service
+        
+        super().save_model(request, obj, form, change)
+        Lottery11x5Service.invalidate_config_cache()
+    
+    def delete_model(self, request, obj):
+        from .services import Lottery11x5Service
+        
+        super().delete_model(request, obj)
+        Lottery11x5Service.invalidate_config_cache()
 
 
 @admin.register(Lottery11x5Bet)
@@ -241,11 +253,14 @@ manual_draw_lottery.short_description = "手动开奖选中的期次"
 
 def close_draws(modeladmin, request, queryset):
     """关闭期次动作"""
+    from .services import Lottery11x5Service
+    
     count = 0
     for draw in queryset:
         if draw.status == 'OPEN':
             draw.status = 'CLOSED'
             draw.save()
+            Lottery11x5Service.invalidate_draw_cache(str(draw.id))
             count += 1
     
     modeladmin.message_user(
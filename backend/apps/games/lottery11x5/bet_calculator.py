@@ -499,11 +499,7 @@ class Lottery11x5BetValidator:
             errors.append('用户账户已被禁用')
         
         # 检查KYC状态
-        try:
-            kyc = user.kyc_profile
-            if kyc.status != 'APPROVED':
-                errors.append('请先完成身份验证')
-        except:
+        if getattr(user, 'kyc_status', None) != 'APPROVED':
             errors.append('请先完成身份验证')
         
         # 检查余额
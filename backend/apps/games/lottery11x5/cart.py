@@ -7,6 +7,8 @@ from typing import Dict, List, Any, Optional
 from decimal import Decimal
 from django.core.cache import cache
 from django.contrib.auth import get_user_model
+
+from apps.core.cache_manager import CacheManager
 from .services import Lottery11x5Service
 
 User = get_user_model()
@@ -17,6 +19,9 @@ class Lottery11x5Cart:
     11选5投注购物车
     """
     
+    # 购物车缓存标签，开奖后按标签清空所有购物车
+    CACHE_TAG = 'lottery11x5_cart'
+    
     def __init__(self, user_id: str):
         self.user_id = user_id
         self.cache_key = f'lottery11x5_cart_{user_id}'
@@ -250,59 +255,27 @@ class Lottery11x5Cart:
                     'message': '购彩篮为空'
                 }
             
-            # 检查用户余额
-            total_amount = self._calculate_cart_total(cart_items)
-            user_balance = user.balance.get_available_balance()
-            
-            if user_balance < total_amount:
-                return {
-                    'success': False,
-                    'message': f'余额不足，需要 ₦{total_amount}，当前余额 ₦{user_balance}'
+            # 批量提交投注（全部成功或全部不提交）
+            result = Lottery11x5Service.place_bets(user, [
+                {
+                    'cart_item_id': item['id'],
+                    'draw_id': item['draw_id'],
+                    'bet_type_id': item['bet_type_id'],
+                    'numbers': item['numbers'],
+                    'amount': Decimal(str(item['amount'])),
+                    'bet_method': item['bet_method'],
+                    'positions': item['positions'],
+                    'selected_count': item['selected_count'],
+                    'multiplier': item.get('multiplier', 1),
                 }
+                for item in cart_items
+            ])
             
-            # 逐个提交投注
-            successful_bets = []
-            failed_bets = []
-            
-            for item in cart_items:
-                bet_result = Lottery11x5Service.place_bet(
-                    user=user,
-                    draw_id=item['draw_id'],
-                    bet_type_id=item['bet_type_id'],
-                    numbers=item['numbers'],
-                    amount=Decimal(str(item['amount'])),
-                    bet_method=item['bet_method'],
-                    positions=item['positions'],
-                    selected_count=item['selected_count']
-                )
-                
-                if bet_result['success']:
-                    successful_bets.append({
-                        'cart_item_id': item['id'],
-                        'bet_id': bet_result['data']['bet_id'],
-                        'draw_number': bet_result['data']['draw_number'],
-                        'amount': bet_result['data']['total_amount']
-                    })
-                else:
-                    failed_bets.append({
-                        'cart_item_id': item['id'],
-                        'error': bet_result['message']
-                    })
-            
-            # 如果有成功的投注，清空购物车
-            if successful_bets:
+            # 投注成功后清空购物车
+            if result['success']:
                 self.clear_cart()
             
-            return {
-                'success': len(successful_bets) > 0,
-                'message': f'成功投注 {len(successful_bets)} 注，失败 {len(failed_bets)} 注',
-                'data': {
-                    'successful_bets': successful_bets,
-                    'failed_bets': failed_bets,
-                    'total_successful': len(successful_bets),
-                    'total_failed': len(failed_bets)
-                }
-            }
+            return result
             
         except Exception as e:
             return {
@@ -450,6 +423,7 @@ class Lottery11x5Cart:
         保存购物车到缓存
         """
         cache.set(self.cache_key, json.dumps(cart_items), self.cache_timeout)
+        CacheManager.tag_keys([self.CACHE_TAG], [self.cache_key])
 
 
 class Lottery11x5QuickPick:
@@ -309,16 +309,22 @@ class Lottery11x5ProfitController:
         分析期次盈利能力
         """
         try:
-            from apps.games.models import Draw, Bet
-            from .services import Lottery11x5Service
+            from apps.games.models import Draw
+            from .liability import Lottery11x5LiabilityMatrix
             
             # 获取期次信息
             draw = Draw.objects.get(id=draw_id)
             
-            # 获取所有投注
-            bets = Bet.objects.filter(draw=draw, status='PENDING')
+            # 优先使用负债表，O(1)查询指定号码的派彩
+            liability = Lottery11x5LiabilityMatrix.get_liability(draw)
+            if liability is not None:
+                total_bets = liability.total_bets
+                total_amount = liability.total_amount
+                total_payout = Lottery11x5LiabilityMatrix.payout_for(liability, potential_numbers)
+            else:
+                total_bets, total_amount, total_payout = self._simulate_draw_payout(draw, potential_numbers)
             
-            if not bets.exists():
+            if total_bets == 0:
                 return {
                     'total_bets': 0,
                     'total_amount': Decimal('0.00'),
@@ -329,28 +335,6 @@ class Lottery11x5ProfitController:
                     'recommendation': 'no_bets'
                 }
             
-            # 计算总投注金额
-            total_amount = sum(bet.amount * bet.lottery11x5_detail.multiple_count for bet in bets)
-            
-            # 模拟结算，计算潜在派彩
-            total_payout = Decimal('0.00')
-            
-            for bet in bets:
-                lottery_bet = bet.lottery11x5_detail
-                is_win, win_amount = Lottery11x5Service.check_win(
-                    bet_numbers=bet.numbers,
-                    winning_numbers=potential_numbers,
-                    bet_method=lottery_bet.bet_method,
-                    positions=lottery_bet.positions,
-                    selected_count=lottery_bet.selected_count,
-                    odds=bet.odds,
-                    bet_amount=bet.amount,
-                    multiple_count=lottery_bet.multiple_count
-                )
-                
-                if is_win:
-                    total_payout += win_amount
-            
             # 计算利润
             profit = total_amount - total_payout
             profit_rate = (profit / total_amount) if total_amount > 0 else Decimal('0.00')
@@ -362,7 +346,7 @@ class Lottery11x5ProfitController:
             recommendation = self._generate_recommendation(profit_rate)
             
             return {
-                'total_bets': bets.count(),
+                'total_bets': total_bets,
                 'total_amount': total_amount,
                 'potential_payout': total_payout,
                 'profit': profit,
@@ -380,6 +364,66 @@ class Lottery11x5ProfitController:
                 'recommendation': 'error'
             }
     
+    def analyze_outcome_distribution(self, draw_id: str) -> Dict[str, Any]:
+        """
+        分析期次全部开奖结果的派彩分布
+        """
+        try:
+            from apps.games.models import Draw
+            from .liability import Lottery11x5LiabilityMatrix
+            
+            draw = Draw.objects.get(id=draw_id)
+            
+            liability = Lottery11x5LiabilityMatrix.get_liability(draw)
+            if liability is None:
+                liability = Lottery11x5LiabilityMatrix.rebuild(draw)
+            
+            distribution = Lottery11x5LiabilityMatrix.get_distribution(liability)
+            distribution['recommendation'] = self._generate_recommendation(distribution['expected_profit_rate'])
+            distribution['target_profit_rate'] = self.target_profit_rate
+            return distribution
+            
+        except Exception as e:
+            logger.error(f"分析期次派彩分布失败: {str(e)}")
+            return {
+                'error': str(e),
+                'recommendation': 'error'
+            }
+    
+    def _simulate_draw_payout(self, draw, potential_numbers: List[int]) -> Tuple[int, Decimal, Decimal]:
+        """
+        逐注模拟结算（无负债表时使用）
+        """
+        from apps.games.models import Bet
+        from .services import Lottery11x5Service
+        
+        bets = Bet.objects.filter(draw=draw, status='PENDING').select_related('lottery11x5_detail')
+        
+        total_bets = 0
+        total_amount = Decimal('0.00')
+        total_payout = Decimal('0.00')
+        
+        bet_data = []
+        for bet in bets:
+            lottery_bet = bet.lottery11x5_detail
+            total_bets += 1
+            total_amount += bet.amount * lottery_bet.multiple_count
+            bet_data.append({
+                'bet_numbers': bet.numbers,
+                'bet_method': lottery_bet.bet_method,
+                'positions': lottery_bet.positions,
+                'selected_count': lottery_bet.selected_count,
+                'odds': bet.odds,
+                'bet_amount': bet.amount,
+                'multiple_count': lottery_bet.multiple_count,
+            })
+        
+        for is_win, win_amount in Lottery11x5Service.check_win_batch(bet_data, potential_numbers):
+            if is_win:
+                total_payout += win_amount
+        
+        return total_bets, total_amount, total_payout
+    
     def _generate_recommendation(self, profit_rate: Decimal) -> str:
         """
         生成利润控制建议
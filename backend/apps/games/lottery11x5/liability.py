@@ -0,0 +1,295 @@
+"""
+11选5派彩负债表
+按开奖组合预先累计每期派彩，任意开奖号码的派彩查询为O(1)
+每期分片存储，投注随机锁定一个分片累加，读取时合并各分片
+"""
+
+import random
+from itertools import combinations
+from typing import Dict, List, Any, Optional, Tuple
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Lottery11x5Liability
+
+
+# 开奖号码为1-11中升序的5个号码，共462种组合
+OUTCOMES: List[Tuple[int, ...]] = list(combinations(range(1, 12), 5))
+OUTCOME_COUNT = len(OUTCOMES)
+OUTCOME_INDEX: Dict[Tuple[int, ...], int] = {outcome: i for i, outcome in enumerate(OUTCOMES)}
+
+# 号码位掩码（号码n对应第n位）
+OUTCOME_MASKS: List[int] = [sum(1 << n for n in outcome) for outcome in OUTCOMES]
+POPCOUNT: List[int] = [bin(i).count('1') for i in range(1 << 12)]
+
+# 定位索引：POSITION_OUTCOMES[位置][号码] -> 该位置开出该号码的组合索引
+POSITION_OUTCOMES: Dict[int, Dict[int, List[int]]] = {
+    pos: {number: [] for number in range(1, 12)} for pos in range(1, 6)
+}
+for _index, _outcome in enumerate(OUTCOMES):
+    for _pos, _number in enumerate(_outcome, start=1):
+        POSITION_OUTCOMES[_pos][_number].append(_index)
+
+# 派彩以0.0001奈拉为单位的整数存储，避免浮点误差
+LIABILITY_SCALE = 10000
+
+
+def outcome_index(numbers: List[int]) -> int:
+    """
+    获取开奖号码对应的组合索引
+    """
+    return OUTCOME_INDEX[tuple(sorted(numbers))]
+
+
+def to_units(amount: Decimal) -> int:
+    """
+    金额转换为负债表存储单位
+    """
+    return int((Decimal(amount) * LIABILITY_SCALE).to_integral_value())
+
+
+def from_units(units: int) -> Decimal:
+    """
+    负债表存储单位转换为金额
+    """
+    return (Decimal(units) / LIABILITY_SCALE).quantize(Decimal('0.0001'))
+
+
+class Lottery11x5LiabilityMatrix:
+    """
+    11选5派彩负债表
+    投注时增量更新，开奖前即可得到全部开奖结果的派彩分布
+    """
+
+    @staticmethod
+    def bet_payout_vector(bet_numbers: List[int], bet_method: str, positions: List[int] = None,
+                          selected_count: int = 0, odds: Decimal = None,
+                          bet_amount: Decimal = None, multiple_count: int = 1) -> Dict[int, int]:
+        """
+        计算单注在各开奖组合下的派彩
+        返回 {组合索引: 派彩单位}，仅包含中奖组合，判奖规则与check_win一致
+        """
+        unit_payout = to_units(bet_amount * odds * multiple_count)
+        if unit_payout <= 0:
+            return {}
+
+        if bet_method == 'POSITION':
+            if not positions:
+                return {}
+
+            hits: Dict[int, int] = {}
+            for i, pos in enumerate(positions):
+                if i >= len(bet_numbers):
+                    break
+                for index in POSITION_OUTCOMES.get(pos, {}).get(bet_numbers[i], ()):
+                    hits[index] = hits.get(index, 0) + 1
+
+            # 按中奖位置数计算奖金
+            return {index: unit_payout * count for index, count in hits.items()}
+
+        if bet_method == 'ANY':
+            required = selected_count
+        elif bet_method == 'GROUP':
+            required = len(bet_numbers)
+        else:
+            return {}
+
+        bet_mask = 0
+        for number in bet_numbers:
+            if 1 <= number <= 11:
+                bet_mask |= 1 << number
+
+        return {
+            index: unit_payout
+            for index, outcome_mask in enumerate(OUTCOME_MASKS)
+            if POPCOUNT[bet_mask & outcome_mask] >= required
+        }
+
+    @staticmethod
+    def shard_count() -> int:
+        return max(1, getattr(settings, 'LOTTERY11X5_LIABILITY_SHARDS', 16))
+
+    @staticmethod
+    def _apply(draw, payout_vector: Dict[int, int], total_amount: Decimal, bet_count: int,
+               sign: int, max_loss: Optional[Decimal] = None,
+               shard: Optional[int] = None) -> Lottery11x5Liability:
+        """
+        在一个分片上累加（sign=1）或扣减（sign=-1）投注，只锁定该分片行
+        """
+        if shard is None:
+            shard = random.randrange(Lottery11x5LiabilityMatrix.shard_count())
+
+        with transaction.atomic():
+            liability, _ = Lottery11x5Liability.objects.select_for_update().get_or_create(
+                draw=draw,
+                shard=shard,
+                defaults={'payouts': [0] * OUTCOME_COUNT}
+            )
+
+            payouts = liability.payouts or [0] * OUTCOME_COUNT
+            for index, units in payout_vector.items():
+                payouts[index] += sign * units
+
+            liability.payouts = payouts
+            liability.total_bets += sign * bet_count
+            liability.total_amount += sign * total_amount
+
+            if max_loss is not None and max_loss > 0:
+                # 其他分片按已提交数据合并（不加锁），并发投注可能合计略超限额
+                merged = Lottery11x5LiabilityMatrix.merge(
+                    draw,
+                    [liability] + list(Lottery11x5Liability.objects.filter(draw=draw).exclude(pk=liability.pk))
+                )
+                worst_loss = from_units(max(merged.payouts)) - merged.total_amount
+                if worst_loss > max_loss:
+                    raise ValueError(f'超出本期风险限额 ₦{max_loss}')
+
+            liability.save(update_fields=['payouts', 'total_bets', 'total_amount', 'updated_at'])
+
+        return liability
+
+    @staticmethod
+    def record_bet(draw, payout_vector: Dict[int, int], total_amount: Decimal,
+                   bet_count: int = 1, max_loss: Optional[Decimal] = None,
+                   shard: Optional[int] = None) -> Lottery11x5Liability:
+        """
+        将投注计入期次负债表（随机一个分片）
+        max_loss 设置时，若计入后最坏开奖结果的亏损超过限额则抛出ValueError
+        """
+        return Lottery11x5LiabilityMatrix._apply(
+            draw, payout_vector, total_amount, bet_count, 1, max_loss=max_loss, shard=shard
+        )
+
+    @staticmethod
+    def remove_bet(draw, payout_vector: Dict[int, int], total_amount: Decimal,
+                   bet_count: int = 1, shard: Optional[int] = None) -> Lottery11x5Liability:
+        """
+        从期次负债表扣除投注（撤单）
+        扣减可落在任意分片，单个分片可能为负，合并后与未计入该投注时一致
+        """
+        return Lottery11x5LiabilityMatrix._apply(
+            draw, payout_vector, total_amount, bet_count, -1, shard=shard
+        )
+
+    @staticmethod
+    def merge(draw, shards: List[Lottery11x5Liability]) -> Lottery11x5Liability:
+        """
+        合并分片（返回未保存的实例）
+        """
+        payouts = [0] * OUTCOME_COUNT
+        total_bets = 0
+        total_amount = Decimal('0.00')
+        for liability in shards:
+            for index, units in enumerate(liability.payouts or ()):
+                payouts[index] += units
+            total_bets += liability.total_bets
+            total_amount += liability.total_amount
+
+        return Lottery11x5Liability(
+            draw=draw,
+            payouts=payouts,
+            total_bets=total_bets,
+            total_amount=total_amount,
+            updated_at=max((liability.updated_at for liability in shards if liability.updated_at), default=None),
+        )
+
+    @staticmethod
+    def get_liability(draw) -> Optional[Lottery11x5Liability]:
+        """
+        获取期次负债表（各分片合并）
+        """
+        shards = list(Lottery11x5Liability.objects.filter(draw=draw))
+        if not shards:
+            return None
+        return Lottery11x5LiabilityMatrix.merge(draw, shards)
+
+    @staticmethod
+    def payout_for(liability: Lottery11x5Liability, numbers: List[int]) -> Decimal:
+        """
+        查询指定开奖号码的总派彩
+        """
+        if not liability.payouts:
+            return Decimal('0.0000')
+        return from_units(liability.payouts[outcome_index(numbers)])
+
+    @staticmethod
+    def get_distribution(liability: Lottery11x5Liability, top: int = 5) -> Dict[str, Any]:
+        """
+        获取全部开奖结果的派彩分布
+        各组合开出概率相同，期望派彩为算术平均
+        """
+        payouts = liability.payouts or [0] * OUTCOME_COUNT
+        total_amount = liability.total_amount
+
+        min_units = min(payouts)
+        max_units = max(payouts)
+        expected_payout = from_units(sum(payouts)) / OUTCOME_COUNT
+
+        def profit_rate(payout: Decimal) -> Decimal:
+            return ((total_amount - payout) / total_amount) if total_amount > 0 else Decimal('0.00')
+
+        ranked = sorted(range(OUTCOME_COUNT), key=lambda i: payouts[i], reverse=True)
+        profitable_count = sum(1 for units in payouts if from_units(units) <= total_amount)
+
+        return {
+            'total_bets': liability.total_bets,
+            'total_amount': total_amount,
+            'outcome_count': OUTCOME_COUNT,
+            'min_payout': from_units(min_units),
+            'max_payout': from_units(max_units),
+            'expected_payout': expected_payout,
+            'min_profit_rate': profit_rate(from_units(max_units)),
+            'max_profit_rate': profit_rate(from_units(min_units)),
+            'expected_profit_rate': profit_rate(expected_payout),
+            'profitable_outcome_ratio': profitable_count / OUTCOME_COUNT,
+            'worst_outcomes': [
+                {'numbers': list(OUTCOMES[i]), 'payout': from_units(payouts[i])}
+                for i in ranked[:top]
+            ],
+            'best_outcomes': [
+                {'numbers': list(OUTCOMES[i]), 'payout': from_units(payouts[i])}
+                for i in ranked[::-1][:top]
+            ],
+            'updated_at': liability.updated_at.isoformat() if liability.updated_at else timezone.now().isoformat(),
+        }
+
+    @staticmethod
+    def rebuild(draw) -> Lottery11x5Liability:
+        """
+        根据期次投注重建负债表（用于历史期次或数据修复）
+        """
+        from apps.games.models import Bet
+
+        payouts = [0] * OUTCOME_COUNT
+        total_bets = 0
+        total_amount = Decimal('0.00')
+
+        bets = Bet.objects.filter(draw=draw).exclude(status='CANCELLED').select_related('lottery11x5_detail')
+        for bet in bets.iterator(chunk_size=2000):
+            lottery_bet = bet.lottery11x5_detail
+            vector = Lottery11x5LiabilityMatrix.bet_payout_vector(
+                bet_numbers=bet.numbers,
+                bet_method=lottery_bet.bet_method,
+                positions=lottery_bet.positions,
+                selected_count=lottery_bet.selected_count,
+                odds=bet.odds,
+                bet_amount=bet.amount,
+                multiple_count=lottery_bet.multiple_count
+            )
+            for index, units in vector.items():
+                payouts[index] += units
+            total_bets += 1
+            total_amount += bet.amount * lottery_bet.multiple_count
+
+        with transaction.atomic():
+            Lottery11x5Liability.objects.filter(draw=draw).delete()
+            liability = Lottery11x5Liability.objects.create(
+                draw=draw,
+                shard=0,
+                payouts=payouts,
+                total_bets=total_bets,
+                total_amount=total_amount,
+            )
+        return liability
@@ -0,0 +1,215 @@
+"""
+11选5结算性能基准测试
+在事务中生成模拟投注数据，测量单期结算耗时，结束后回滚
+"""
+
+import random
+import time
+from decimal import Decimal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from apps.games.models import Game, Draw, BetType, Bet
+from apps.finance.models import UserBalance
+from apps.games.lottery11x5.models import Lottery11x5Bet
+from apps.games.lottery11x5.services import Lottery11x5Service
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """用于回滚基准测试数据"""
+
+
+class QueryCounter:
+    """统计执行的SQL条数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = '11选5单期结算性能基准测试（逐注结算 vs 批量结算）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 1000000],
+            help='每期投注数量列表',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=5000,
+            help='模拟用户数量',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=Lottery11x5Service.SETTLEMENT_CHUNK_SIZE,
+            help='批量结算每批投注数',
+        )
+        parser.add_argument(
+            '--legacy-max',
+            type=int,
+            default=10000,
+            help='逐注结算对比的最大投注数量（超过则跳过逐注结算）',
+        )
+
+    def handle(self, *args, **options):
+        results = []
+
+        for size in options['sizes']:
+            modes = ['bulk']
+            if size <= options['legacy_max']:
+                modes.insert(0, 'legacy')
+
+            for mode in modes:
+                elapsed, queries, settlement = self.run_once(
+                    size, options['users'], mode, options['chunk_size']
+                )
+                results.append({
+                    'size': size,
+                    'mode': mode,
+                    'elapsed': elapsed,
+                    'queries': queries,
+                    'winners': settlement['total_winners'],
+                })
+                self.stdout.write(
+                    f'{size:>9} 注  {mode:<6}  {elapsed:8.2f}s  '
+                    f'{queries:>9} 条SQL  中奖 {settlement["total_winners"]} 注'
+                )
+
+        self.stdout.write(self.style.SUCCESS('\n基准测试完成'))
+        self.stdout.write(f'{"投注数":>9}  {"模式":<6}  {"耗时":>8}  {"注/秒":>10}')
+        for item in results:
+            rate = item['size'] / item['elapsed'] if item['elapsed'] > 0 else 0
+            self.stdout.write(
+                f'{item["size"]:>9}  {item["mode"]:<6}  {item["elapsed"]:7.2f}s  {rate:10.0f}'
+            )
+
+    def run_once(self, size, user_count, mode, chunk_size):
+        """
+        生成数据并执行一次结算，返回 (耗时, SQL条数, 结算结果)
+        """
+        outcome = {}
+        try:
+            with transaction.atomic():
+                draw, winning_numbers = self.create_fixture(size, user_count)
+
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    start = time.perf_counter()
+                    if mode == 'bulk':
+                        settlement = Lottery11x5Service.bulk_settle_bets(
+                            draw, winning_numbers, chunk_size=chunk_size
+                        )
+                    else:
+                        settlement = Lottery11x5Service.settle_bets(draw, winning_numbers)
+                    outcome['elapsed'] = time.perf_counter() - start
+
+                outcome['queries'] = counter.count
+                outcome['settlement'] = settlement
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        return outcome['elapsed'], outcome['queries'], outcome['settlement']
+
+    def create_fixture(self, size, user_count):
+        """
+        创建基准测试所需的游戏、期次、用户和投注
+        """
+        rng = random.Random(size)
+        now = timezone.now()
+        tag = f'bench{size}'
+
+        game = Game.objects.create(
+            name=f'11选5基准测试{size}',
+            code=f'11x5_{tag}',
+            game_type='11选5',
+        )
+        bet_type = BetType.objects.create(
+            game=game,
+            name='任选',
+            code='ANY',
+            odds=Decimal('2.20'),
+        )
+        draw = Draw.objects.create(
+            game=game,
+            draw_number=f'{tag}-001',
+            draw_time=now,
+            close_time=now - timedelta(minutes=5),
+            status='CLOSED',
+        )
+
+        user_count = min(user_count, size)
+        users = User.objects.bulk_create([
+            User(
+                username=f'{tag}_{i}',
+                phone=f'+234{size % 100:02d}{i:08d}',
+                referral_code=f'B{size % 1000:03d}{i:06d}'[:20],
+            )
+            for i in range(user_count)
+        ], batch_size=5000)
+        UserBalance.objects.bulk_create(
+            [UserBalance(user=user) for user in users], batch_size=5000
+        )
+
+        methods = ['POSITION', 'ANY', 'GROUP']
+        batch_size = 5000
+        for offset in range(0, size, batch_size):
+            count = min(batch_size, size - offset)
+            bets = []
+            details = []
+            for _ in range(count):
+                method = rng.choice(methods)
+                if method == 'POSITION':
+                    positions = rng.sample(range(1, 6), rng.randint(1, 3))
+                    numbers = [rng.randint(1, 11) for _ in positions]
+                    selected_count = 0
+                elif method == 'ANY':
+                    selected_count = rng.randint(1, 5)
+                    numbers = rng.sample(range(1, 12), rng.randint(selected_count, 8))
+                    positions = []
+                else:
+                    selected_count = 0
+                    numbers = rng.sample(range(1, 12), rng.randint(2, 3))
+                    positions = []
+
+                bets.append(Bet(
+                    user=users[rng.randrange(user_count)],
+                    game=game,
+                    draw=draw,
+                    bet_type=bet_type,
+                    bet_content={'numbers': numbers, 'bet_method': method},
+                    bet_amount=Decimal('2.00'),
+                    potential_win=Decimal('4.40'),
+                    numbers=numbers,
+                    amount=Decimal('2.00'),
+                    odds=Decimal('2.20'),
+                    potential_payout=Decimal('4.40'),
+                ))
+                details.append({
+                    'bet_method': method,
+                    'positions': positions,
+                    'selected_count': selected_count,
+                })
+
+            Bet.objects.bulk_create(bets)
+            Lottery11x5Bet.objects.bulk_create([
+                Lottery11x5Bet(bet=bet, **detail) for bet, detail in zip(bets, details)
+            ])
+
+        winning_numbers = sorted(rng.sample(range(1, 12), 5))
+        return draw, winning_numbers
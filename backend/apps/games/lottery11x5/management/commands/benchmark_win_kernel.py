@@ -0,0 +1,102 @@
+"""
+11选5判奖吞吐量基准测试
+对比逐注check_win与批量向量化判奖
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.games.lottery11x5.services import Lottery11x5Service
+from apps.games.lottery11x5.win_kernel import Lottery11x5WinKernel
+
+
+class Command(BaseCommand):
+    help = '11选5判奖吞吐量基准测试（check_win vs 批量判奖内核）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 1000000],
+            help='投注数量列表',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=11,
+            help='随机种子',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        winning_numbers = sorted(rng.sample(range(1, 12), 5))
+
+        self.stdout.write(f'开奖号码: {winning_numbers}')
+        self.stdout.write(
+            f'{"投注数":>9}  {"check_win":>10}  {"批量判奖":>10}  {"其中内核":>10}  {"内核 注/秒":>14}  {"加速比":>7}'
+        )
+
+        for size in options['sizes']:
+            bets = [self.generate_bet(rng) for _ in range(size)]
+
+            start = time.perf_counter()
+            expected = [
+                Lottery11x5Service.check_win(winning_numbers=winning_numbers, **bet)
+                for bet in bets
+            ]
+            loop_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = Lottery11x5Service.check_win_batch(bets, winning_numbers)
+            batch_elapsed = time.perf_counter() - start
+
+            # 单独计量向量化内核（不含编码与Decimal奖金计算）
+            encoded = Lottery11x5WinKernel.encode_bets(bets)
+            start = time.perf_counter()
+            Lottery11x5WinKernel.evaluate(encoded, winning_numbers)
+            kernel_elapsed = time.perf_counter() - start
+
+            if results != expected:
+                self.stdout.write(self.style.ERROR(f'{size} 注: 批量判奖结果与check_win不一致'))
+                continue
+
+            kernel_rate = size / kernel_elapsed if kernel_elapsed > 0 else 0
+            speedup = loop_elapsed / batch_elapsed if batch_elapsed > 0 else 0
+            self.stdout.write(
+                f'{size:>9}  {loop_elapsed:9.3f}s  {batch_elapsed:9.3f}s  {kernel_elapsed:9.4f}s  '
+                f'{kernel_rate:14.0f}  {speedup:6.1f}x'
+            )
+
+        self.stdout.write(self.style.SUCCESS('基准测试完成'))
+
+    def generate_bet(self, rng):
+        """
+        生成随机投注
+        """
+        bet_method = rng.choice(['POSITION', 'ANY', 'GROUP'])
+        if bet_method == 'POSITION':
+            positions = rng.sample(range(1, 6), rng.randint(1, 3))
+            numbers = [rng.randint(1, 11) for _ in positions]
+            selected_count = 0
+        elif bet_method == 'ANY':
+            selected_count = rng.randint(1, 5)
+            numbers = rng.sample(range(1, 12), rng.randint(selected_count, 8))
+            positions = []
+        else:
+            selected_count = 0
+            numbers = rng.sample(range(1, 12), rng.randint(2, 3))
+            positions = []
+
+        return {
+            'bet_numbers': numbers,
+            'bet_method': bet_method,
+            'positions': positions,
+            'selected_count': selected_count,
+            'odds': Decimal('2.20'),
+            'bet_amount': Decimal('2.00'),
+            'multiple_count': 1,
+        }
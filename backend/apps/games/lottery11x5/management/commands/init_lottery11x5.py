@@ -237,6 +237,10 @@ class Command(BaseCommand):
                     self.style.WARNING('今日期次已存在或创建失败')
                 )
             
+            # 失效游戏配置热点缓存
+            from apps.games.lottery11x5.services import Lottery11x5Service
+            Lottery11x5Service.invalidate_config_cache()
+            
             self.stdout.write(
                 self.style.SUCCESS('11选5彩票游戏初始化完成！')
             )
@@ -0,0 +1,28 @@
+"""
+重建11选5盈亏汇总
+按已开奖期次回填小时/日汇总行（上线或数据修复时使用）
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.games.models import Draw
+from apps.games.profit_rollup import DrawProfitRollupService
+from apps.games.lottery11x5.services import Lottery11x5Service
+
+
+class Command(BaseCommand):
+    help = '按已开奖期次重建11选5小时/日盈亏汇总'
+
+    def handle(self, *args, **options):
+        game = Lottery11x5Service.get_game()
+        if not game:
+            self.stdout.write(self.style.ERROR('游戏不存在'))
+            return
+
+        draws = Draw.objects.filter(
+            game=game,
+            status='COMPLETED'
+        ).only('draw_time', 'total_bets', 'total_amount', 'total_payout').iterator(chunk_size=2000)
+
+        count = DrawProfitRollupService.rebuild(game, draws)
+        self.stdout.write(self.style.SUCCESS(f'盈亏汇总重建完成: {count} 行'))
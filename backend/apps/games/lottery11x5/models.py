@@ -274,4 +274,64 @@ class Lottery11x5UserNumber(models.Model):
             'ANY': '任选',
             'GROUP': '组选',
         }
-        return method_map.get(self.bet_method, self.bet_method)
\ No newline at end of file
+        return method_map.get(self.bet_method, self.bet_method)
+
+class Lottery11x5Liability(models.Model):
+    """
+    11选5期次派彩负债表
+    每期分为多个分片行，payouts按开奖组合索引记录该组合开出时的总派彩，期次负债为各分片之和；
+    投注只锁定一个分片，同期投注不再在同一行上排队
+    开奖号码为升序5码组合，共C(11,5)=462种结果
+    """
+    draw = models.ForeignKey(Draw, on_delete=models.CASCADE, related_name='lottery11x5_liabilities')
+    shard = models.IntegerField(default=0, help_text="分片号")
+    
+    # 投注汇总
+    total_bets = models.IntegerField(default=0, help_text="投注数")
+    total_amount = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0.00'),
+        help_text="投注总额"
+    )
+    
+    # 各开奖组合的派彩（单位：0.0001奈拉的整数）
+    payouts = models.JSONField(default=list, help_text="各开奖组合派彩")
+    
+    # 时间戳
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'lottery11x5_liability'
+        unique_together = ['draw', 'shard']
+        verbose_name = '11选5派彩负债表'
+        verbose_name_plural = '11选5派彩负债表'
+    
+    def __str__(self):
+        return f"{self.draw.draw_number} 负债表"
+
+
+class Lottery11x5TrendState(models.Model):
+    """
+    11选5走势滚动统计状态
+    每个游戏一行，开奖后增量更新当前遗漏、最大遗漏、连出、窗口频率及位置统计
+    """
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, related_name='lottery11x5_trend_state')
+    
+    # 最后计入的期次
+    last_draw_number = models.CharField(max_length=50, blank=True, default='', help_text="最后计入期号")
+    total_periods = models.IntegerField(default=0, help_text="累计期数")
+    
+    # 滚动统计数据
+    state = models.JSONField(default=dict, help_text="走势统计状态")
+    
+    # 时间戳
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'lottery11x5_trend_state'
+        verbose_name = '11选5走势统计状态'
+        verbose_name_plural = '11选5走势统计状态'
+    
+    def __str__(self):
+        return f"{self.game.name} 走势状态 ({self.last_draw_number})"
@@ -3,17 +3,25 @@
 """
 
 import random
+import time
 import uuid
+import logging
 from typing import Dict, List, Any, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime, date, timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Sum, Count, F, Q
 from django.core.cache import cache
 
 from apps.games.models import Game, Draw, BetType, Bet
+from apps.games.profit_rollup import DrawProfitRollupService
+from apps.core.cache_manager import TieredCache
 from apps.finance.models import Transaction, UserBalance
+from apps.finance.services import TransactionAnalyticsService
+from apps.finance.payouts import PayoutAccumulator
+from apps.rewards.turnover import DailyTurnoverService
 from .models import (
     Lottery11x5Game, 
     Lottery11x5Bet, 
@@ -22,23 +30,44 @@ from .models import (
     Lottery11x5HotCold,
     Lottery11x5UserNumber
 )
+from .liability import Lottery11x5LiabilityMatrix
+from .trend_store import Lottery11x5TrendStore
+
+logger = logging.getLogger(__name__)
 
 
 class Lottery11x5Service:
     """
     11选5彩票游戏服务
     """
+
+    # 批量结算每批处理的投注数
+    SETTLEMENT_CHUNK_SIZE = 2000
+    
+    # 结算回写的投注字段
+    SETTLED_BET_FIELDS = ('status', 'payout', 'result', 'settled_at', 'win_transaction_id')
+
+    # 热点数据两级缓存（进程内LRU + Redis），由期数状态变更及后台配置修改失效
+    HOT_CACHE = TieredCache('lottery11x5_hot', local_timeout=30, remote_timeout=600)
+    # 依赖开奖结果的API响应缓存标签，开奖完成后清除
+    DRAW_RESPONSE_TAG = 'lottery11x5_draw_responses'
     
+    # 期数在本进程最长缓存时间（秒），且不超过封盘时间
+    DRAW_LOCAL_TIMEOUT = 60
+
     @staticmethod
     def get_game():
         """
         获取11选5游戏
         """
-        try:
-            game = Game.objects.get(code='11x5', game_type='11选5')
-            return game
-        except Game.DoesNotExist:
-            return None
+        def load():
+            try:
+                return TieredCache.dump_instance(Game.objects.get(code='11x5', game_type='11选5'))
+            except Game.DoesNotExist:
+                return None
+        
+        data = Lottery11x5Service.HOT_CACHE.get_or_set('game', load)
+        return TieredCache.load_instance(Game, data) if data else None
     
     @staticmethod
     def get_game_config():
@@ -49,22 +78,134 @@ class Lottery11x5Service:
         if not game:
             return None
         
-        try:
-            config = Lottery11x5Game.objects.get(game=game)
-            return config
-        except Lottery11x5Game.DoesNotExist:
+        def load():
+            try:
+                return TieredCache.dump_instance(Lottery11x5Game.objects.get(game=game))
+            except Lottery11x5Game.DoesNotExist:
+                return None
+        
+        data = Lottery11x5Service.HOT_CACHE.get_or_set('config', load)
+        if not data:
+            return None
+        
+        config = TieredCache.load_instance(Lottery11x5Game, data)
+        config.game = game
+        return config
+    
+    @staticmethod
+    def _draw_cache_timeout(cached: Dict[str, Any], cap: int = None) -> float:
+        """
+        期数缓存时间：不超过距封盘的秒数
+        """
+        remaining = cached['close_timestamp'] - time.time()
+        return min(cap, remaining) if cap is not None else remaining
+    
+    @staticmethod
+    def _cache_draw(key: str, draw: Draw) -> None:
+        """
+        缓存可投注期数（封盘后自动过期）
+        """
+        if draw.status != 'OPEN' or not draw.close_time or draw.close_time <= timezone.now():
+            return
+        
+        Lottery11x5Service.HOT_CACHE.set(
+            key,
+            {'draw': TieredCache.dump_instance(draw), 'close_timestamp': draw.close_time.timestamp()},
+            local_timeout=lambda cached: Lottery11x5Service._draw_cache_timeout(
+                cached, Lottery11x5Service.DRAW_LOCAL_TIMEOUT
+            ),
+            remote_timeout=Lottery11x5Service._draw_cache_timeout
+        )
+    
+    @staticmethod
+    def _load_cached_draw(key: str) -> Optional[Draw]:
+        """
+        读取缓存的期数，已封盘的视为未命中
+        """
+        cached = Lottery11x5Service.HOT_CACHE.get(
+            key,
+            local_timeout=lambda cached: Lottery11x5Service._draw_cache_timeout(
+                cached, Lottery11x5Service.DRAW_LOCAL_TIMEOUT
+            )
+        )
+        if not cached or Lottery11x5Service._draw_cache_timeout(cached) <= 0:
             return None
+        
+        draw = TieredCache.load_instance(Draw, cached['draw'])
+        game = Lottery11x5Service.get_game()
+        if game and draw.game_id == game.pk:
+            draw.game = game
+        return draw
     
     @staticmethod
     def get_current_draw():
         """
         获取当前可投注的期数
+        两次期数切换之间直接由进程内缓存返回
         """
+        draw = Lottery11x5Service._load_cached_draw('current_draw')
+        if draw:
+            return draw
+        
         config = Lottery11x5Service.get_game_config()
         if not config:
             return None
         
-        return config.get_current_draw()
+        draw = config.get_current_draw()
+        if draw:
+            Lottery11x5Service._cache_draw('current_draw', draw)
+        return draw
+    
+    @staticmethod
+    def get_draw(draw_id: str) -> Optional[Draw]:
+        """
+        获取期数（可投注期数走缓存）
+        """
+        key = f'draw:{draw_id}'
+        draw = Lottery11x5Service._load_cached_draw(key)
+        if draw:
+            return draw
+        
+        draw = Draw.objects.filter(id=draw_id).select_related('game').first()
+        if draw:
+            Lottery11x5Service._cache_draw(key, draw)
+        return draw
+    
+    @staticmethod
+    def get_bet_type(bet_type_id: str) -> Optional[BetType]:
+        """
+        获取投注类型
+        """
+        def load():
+            bet_type = BetType.objects.filter(id=bet_type_id).first()
+            return TieredCache.dump_instance(bet_type) if bet_type else None
+        
+        data = Lottery11x5Service.HOT_CACHE.get_or_set(f'bet_type:{bet_type_id}', load)
+        return TieredCache.load_instance(BetType, data) if data else None
+    
+    @staticmethod
+    def invalidate_draw_cache(draw_id: str = None):
+        """
+        期数状态变更后失效期数缓存（事务提交后执行）
+        """
+        keys = ['current_draw']
+        if draw_id:
+            keys.append(f'draw:{draw_id}')
+        transaction.on_commit(lambda: Lottery11x5Service.HOT_CACHE.delete(*keys))
+    
+    @staticmethod
+    def invalidate_config_cache():
+        """
+        游戏配置、投注类型修改后失效配置缓存（事务提交后执行）
+        """
+        keys = ['game', 'config', 'bet_types', 'current_draw']
+        keys.extend(
+            f'bet_type:{bet_type_id}'
+            for bet_type_id in BetType.objects.filter(
+                game__code='11x5', game__game_type='11选5'
+            ).values_list('id', flat=True)
+        )
+        transaction.on_commit(lambda: Lottery11x5Service.HOT_CACHE.delete(*keys))
     
     @staticmethod
     def get_next_draw_time():
@@ -87,7 +228,10 @@ class Lottery11x5Service:
             return []
         
         today = timezone.now().date()
-        return config.create_draws_for_date(today)
+        draws = config.create_draws_for_date(today)
+        if draws:
+            Lottery11x5Service.invalidate_draw_cache()
+        return draws
     
     @staticmethod
     def create_draws_for_tomorrow():
@@ -99,7 +243,10 @@ class Lottery11x5Service:
             return []
         
         tomorrow = timezone.now().date() + timedelta(days=1)
-        return config.create_draws_for_date(tomorrow)
+        draws = config.create_draws_for_date(tomorrow)
+        if draws:
+            Lottery11x5Service.invalidate_draw_cache()
+        return draws
     
     @staticmethod
     def get_bet_types():
@@ -110,7 +257,14 @@ class Lottery11x5Service:
         if not game:
             return []
         
-        return BetType.objects.filter(game=game, is_active=True).order_by('sort_order')
+        def load():
+            return [
+                TieredCache.dump_instance(bet_type)
+                for bet_type in BetType.objects.filter(game=game, is_active=True).order_by('sort_order')
+            ]
+        
+        data = Lottery11x5Service.HOT_CACHE.get_or_set('bet_types', load)
+        return [TieredCache.load_instance(BetType, item) for item in data]
     
     @staticmethod
     def get_recent_results(limit: int = 10):
@@ -204,31 +358,24 @@ class Lottery11x5Service:
         if not game:
             return False
         
-        # 获取最近的开奖结果
-        recent_results = Lottery11x5Result.objects.filter(
-            draw__game=game,
-            draw__status='COMPLETED'
-        ).order_by('-draw__draw_time')
+        # 读取走势滚动统计（窗口频率及当前遗漏均已预计算）
+        trend_state = Lottery11x5TrendStore.get_state(game)
+        current_missing = trend_state.state.get('missing', {})
         
         # 定义统计周期
         periods = [10, 30, 50, 100]
         
         # 对每个周期进行统计
         for period in periods:
-            # 获取指定期数的结果
-            period_results = recent_results[:period]
-            if period_results.count() < period:
+            if trend_state.total_periods < period:
                 continue  # 数据不足，跳过
             
             # 统计每个号码的出现次数
-            number_counts = {i: 0 for i in range(1, 12)}  # 初始化1-11号码计数
-            last_appearance = {i: period for i in range(1, 12)}  # 初始化最后出现期数
-            
-            for i, result in enumerate(period_results):
-                for number in result.numbers:
-                    number_counts[number] = number_counts.get(number, 0) + 1
-                    if last_appearance[number] == period:  # 如果还没有记录过
-                        last_appearance[number] = i  # 记录最后出现期数
+            number_counts = Lottery11x5TrendStore.number_counts(trend_state, period)
+            # 最后出现期数即当前遗漏（窗口内未出现记为period）
+            last_appearance = {
+                i: min(current_missing.get(str(i), period), period) for i in range(1, 12)
+            }
             
             # 计算热号和冷号
             avg_frequency = period / 11 * 5  # 平均每个号码在period期内应该出现的次数
@@ -262,6 +409,116 @@ class Lottery11x5Service:
         """
         return random.sample(range(1, 12), count)
     
+    @staticmethod
+    def _prepare_bet(draw: Draw, bet_type: BetType, bet_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        校验单注投注并计算投注详情及负债向量（不访问数据库）
+        """
+        from .bet_calculator import Lottery11x5BetValidator, Lottery11x5BetCalculator
+        
+        # 检查期数是否可投注
+        if not draw.is_open_for_betting():
+            return {
+                'success': False,
+                'message': '当前期数已封盘或不可投注'
+            }
+        
+        # 验证投注请求
+        validation_result = Lottery11x5BetValidator.validate_bet_request(bet_data)
+        if not validation_result['valid']:
+            return {
+                'success': False,
+                'message': '; '.join(validation_result['errors'])
+            }
+        
+        # 计算投注详情
+        bet_details = Lottery11x5BetCalculator.calculate_bet_details(bet_data)
+        
+        # 验证投注限额
+        bet_type_limits = {
+            'min_bet': bet_type.min_bet,
+            'max_bet': bet_type.max_bet,
+            'max_payout': bet_type.max_payout,
+        }
+        
+        limits_validation = Lottery11x5BetCalculator.validate_bet_limits(bet_details, bet_type_limits)
+        if not limits_validation['valid']:
+            return {
+                'success': False,
+                'message': '; '.join(limits_validation['errors'])
+            }
+        
+        multiple_count = bet_details['total_bet_count']
+        odds = Decimal(str(bet_details['odds']))
+        
+        # 计算该注在各开奖组合下的派彩，用于更新负债表
+        payout_vector = Lottery11x5LiabilityMatrix.bet_payout_vector(
+            bet_numbers=bet_data['numbers'],
+            bet_method=bet_data['bet_method'],
+            positions=bet_data.get('positions'),
+            selected_count=bet_data.get('selected_count', 0),
+            odds=odds,
+            bet_amount=bet_data['amount'],
+            multiple_count=multiple_count
+        )
+        
+        return {
+            'success': True,
+            'data': {
+                'bet_details': bet_details,
+                'total_amount': Decimal(str(bet_details['total_amount'])),
+                'multiple_count': multiple_count,
+                'is_multiple': bet_details['is_multiple'],
+                'potential_payout': Decimal(str(bet_details['potential_payout'])),
+                'odds': odds,
+                'payout_vector': payout_vector,
+            }
+        }
+    
+    @staticmethod
+    def _bet_content(bet_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        投注内容（写入基础投注模型）
+        """
+        return {
+            'numbers': bet_data['numbers'],
+            'bet_method': bet_data['bet_method'],
+            'positions': bet_data.get('positions') or [],
+            'selected_count': bet_data.get('selected_count', 0),
+            'multiplier': bet_data.get('multiplier', 1),
+        }
+    
+    @staticmethod
+    def _build_bet_transaction(user, game: Game, draw: Draw, bet_type: BetType,
+                               bet_data: Dict[str, Any], prepared: Dict[str, Any]) -> Transaction:
+        """
+        构造投注交易记录（未保存）
+        """
+        return Transaction(
+            user=user,
+            type='BET',
+            amount=prepared['total_amount'],
+            fee=Decimal('0.00'),
+            actual_amount=prepared['total_amount'],
+            status='COMPLETED',
+            reference_id=str(uuid.uuid4()),
+            description=f'投注 {game.name} {draw.draw_number}',
+            metadata={
+                'game_type': game.game_type,
+                'game_name': game.name,
+                'draw_number': draw.draw_number,
+                'bet_type': bet_type.name,
+                'bet_method': bet_data['bet_method'],
+                'numbers': bet_data['numbers'],
+                'positions': bet_data.get('positions'),
+                'selected_count': bet_data.get('selected_count', 0),
+                'is_multiple': prepared['is_multiple'],
+                'multiple_count': prepared['multiple_count'],
+                'multiplier': bet_data.get('multiplier', 1),
+                'bet_details': prepared['bet_details'],
+            }
+        )
+    
     @staticmethod
     def place_bet(user, draw_id: str, bet_type_id: str, numbers: List[int], 
                  amount: Decimal, bet_method: str, positions: List[int] = None, 
@@ -270,19 +527,17 @@ class Lottery11x5Service:
         投注
         """
         try:
-            from .bet_calculator import Lottery11x5BetValidator, Lottery11x5BetCalculator
-            
-            # 获取游戏和期数
-            draw = Draw.objects.get(id=draw_id)
-            bet_type = BetType.objects.get(id=bet_type_id)
-            game = draw.game
+            from .bet_calculator import Lottery11x5BetValidator
             
-            # 检查期数是否可投注
-            if not draw.is_open_for_betting():
+            # 获取游戏和期数（走热点缓存）
+            draw = Lottery11x5Service.get_draw(draw_id)
+            bet_type = Lottery11x5Service.get_bet_type(bet_type_id)
+            if draw is None or bet_type is None:
                 return {
                     'success': False,
-                    'message': '当前期数已封盘或不可投注'
+                    'message': '期数或投注类型不存在'
                 }
+            game = draw.game
             
             # 准备投注数据进行验证
             bet_data = {
@@ -296,13 +551,11 @@ class Lottery11x5Service:
                 'multiplier': multiplier,
             }
             
-            # 验证投注请求
-            validation_result = Lottery11x5BetValidator.validate_bet_request(bet_data)
-            if not validation_result['valid']:
-                return {
-                    'success': False,
-                    'message': '; '.join(validation_result['errors'])
-                }
+            # 校验投注并计算投注详情
+            prepare_result = Lottery11x5Service._prepare_bet(draw, bet_type, bet_data)
+            if not prepare_result['success']:
+                return prepare_result
+            prepared = prepare_result['data']
             
             # 验证用户资格
             user_validation = Lottery11x5BetValidator.validate_user_eligibility(user, bet_data)
@@ -312,28 +565,13 @@ class Lottery11x5Service:
                     'message': '; '.join(user_validation['errors'])
                 }
             
-            # 计算投注详情
-            bet_details = Lottery11x5BetCalculator.calculate_bet_details(bet_data)
-            
-            # 验证投注限额
-            bet_type_limits = {
-                'min_bet': bet_type.min_bet,
-                'max_bet': bet_type.max_bet,
-                'max_payout': bet_type.max_payout,
-            }
-            
-            limits_validation = Lottery11x5BetCalculator.validate_bet_limits(bet_details, bet_type_limits)
-            if not limits_validation['valid']:
-                return {
-                    'success': False,
-                    'message': '; '.join(limits_validation['errors'])
-                }
-            
             # 获取计算结果
-            total_amount = Decimal(str(bet_details['total_amount']))
-            multiple_count = bet_details['total_bet_count']
-            is_multiple = bet_details['is_multiple']
-            potential_payout = Decimal(str(bet_details['potential_payout']))
+            bet_details = prepared['bet_details']
+            total_amount = prepared['total_amount']
+            multiple_count = prepared['multiple_count']
+            is_multiple = prepared['is_multiple']
+            potential_payout = prepared['potential_payout']
+            odds = prepared['odds']
             
             # 检查用户余额
             try:
@@ -352,33 +590,14 @@ class Lottery11x5Service:
             # 创建投注记录
             with transaction.atomic():
                 # 扣除余额
-                balance.deduct_balance(total_amount, 'available', f'投注 {game.name} {draw.draw_number}')
+                if not balance.deduct_balance(total_amount, 'available', f'投注 {game.name} {draw.draw_number}'):
+                    raise ValueError('扣除余额失败')
                 
                 # 创建交易记录
-                bet_transaction = Transaction.objects.create(
-                    user=user,
-                    type='BET',
-                    amount=total_amount,
-                    fee=Decimal('0.00'),
-                    actual_amount=total_amount,
-                    status='COMPLETED',
-                    reference_id=str(uuid.uuid4()),
-                    description=f'投注 {game.name} {draw.draw_number}',
-                    metadata={
-                        'game_type': game.game_type,
-                        'game_name': game.name,
-                        'draw_number': draw.draw_number,
-                        'bet_type': bet_type.name,
-                        'bet_method': bet_method,
-                        'numbers': numbers,
-                        'positions': positions,
-                        'selected_count': selected_count,
-                        'is_multiple': is_multiple,
-                        'multiple_count': multiple_count,
-                        'multiplier': multiplier,
-                        'bet_details': bet_details,
-                    }
+                bet_transaction = Lottery11x5Service._build_bet_transaction(
+                    user, game, draw, bet_type, bet_data, prepared
                 )
+                bet_transaction.save()
                 
                 # 创建投注记录
                 bet = Bet.objects.create(
@@ -386,9 +605,12 @@ class Lottery11x5Service:
                     game=game,
                     draw=draw,
                     bet_type=bet_type,
+                    bet_content=Lottery11x5Service._bet_content(bet_data),
+                    bet_amount=total_amount,
+                    potential_win=potential_payout,
                     numbers=numbers,
                     amount=amount,
-                    odds=Decimal(str(bet_details['odds'])),
+                    odds=odds,
                     potential_payout=potential_payout,
                     transaction_id=bet_transaction.id
                 )
@@ -408,6 +630,14 @@ class Lottery11x5Service:
                 draw.total_amount = F('total_amount') + total_amount
                 draw.save(update_fields=['total_bets', 'total_amount'])
                 
+                # 更新期次负债表（超出风险限额时整笔投注回滚）
+                Lottery11x5LiabilityMatrix.record_bet(
+                    draw,
+                    prepared['payout_vector'],
+                    amount * multiple_count,
+                    max_loss=Decimal(str(settings.LOTTERY11X5_MAX_DRAW_LOSS))
+                )
+                
                 return {
                     'success': True,
                     'message': '投注成功',
@@ -433,6 +663,308 @@ class Lottery11x5Service:
                 'message': f'投注失败: {str(e)}'
             }
     
+    @staticmethod
+    def place_bets(user, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        批量投注（购彩篮结算）
+        先校验全部投注，再在单个事务内锁定余额一次扣款、批量写入投注记录，
+        每个期次只更新一次统计和负债表；任一投注不合法或扣款失败则全部不提交
+        items 元素字段同place_bet参数，可附带 cart_item_id
+        """
+        try:
+            from .bet_calculator import Lottery11x5BetValidator
+            
+            if not items:
+                return {
+                    'success': False,
+                    'message': '没有可提交的投注'
+                }
+            
+            # 获取全部期数和投注类型（走热点缓存）
+            draws = {
+                draw_id: Lottery11x5Service.get_draw(draw_id)
+                for draw_id in {str(item['draw_id']) for item in items}
+            }
+            bet_types = {
+                bet_type_id: Lottery11x5Service.get_bet_type(bet_type_id)
+                for bet_type_id in {str(item['bet_type_id']) for item in items}
+            }
+            
+            # 逐项校验并计算（不访问数据库）
+            prepared_items = []
+            failed_bets = []
+            for item in items:
+                bet_data = {
+                    'draw_id': str(item['draw_id']),
+                    'bet_type_id': str(item['bet_type_id']),
+                    'numbers': item['numbers'],
+                    'amount': Decimal(str(item['amount'])),
+                    'bet_method': item['bet_method'],
+                    'positions': item.get('positions'),
+                    'selected_count': item.get('selected_count', 0),
+                    'multiplier': item.get('multiplier', 1),
+                }
+                draw = draws.get(bet_data['draw_id'])
+                bet_type = bet_types.get(bet_data['bet_type_id'])
+                
+                if draw is None or bet_type is None:
+                    prepare_result = {'success': False, 'message': '期数或投注类型不存在'}
+                else:
+                    prepare_result = Lottery11x5Service._prepare_bet(draw, bet_type, bet_data)
+                
+                if not prepare_result['success']:
+                    failed_bets.append({
+                        'cart_item_id': item.get('cart_item_id'),
+                        'error': prepare_result['message']
+                    })
+                    continue
+                
+                prepared_items.append((item, bet_data, draw, bet_type, prepare_result['data']))
+            
+            if failed_bets:
+                return {
+                    'success': False,
+                    'message': f'{len(failed_bets)} 注投注校验失败，全部投注未提交',
+                    'data': {
+                        'successful_bets': [],
+                        'failed_bets': failed_bets,
+                        'total_successful': 0,
+                        'total_failed': len(failed_bets)
+                    }
+                }
+            
+            total_amount = sum((prepared['total_amount'] for *_, prepared in prepared_items), Decimal('0.00'))
+            
+            # 验证用户资格（按合计金额校验一次）
+            user_validation = Lottery11x5BetValidator.validate_user_eligibility(
+                user, {'total_amount': total_amount}
+            )
+            if not user_validation['valid']:
+                return {
+                    'success': False,
+                    'message': '; '.join(user_validation['errors'])
+                }
+            
+            max_loss = Decimal(str(settings.LOTTERY11X5_MAX_DRAW_LOSS))
+            
+            with transaction.atomic():
+                # 锁定余额并一次扣除合计金额
+                try:
+                    balance = UserBalance.objects.select_for_update().get(user=user)
+                except UserBalance.DoesNotExist:
+                    return {
+                        'success': False,
+                        'message': '用户余额信息不存在'
+                    }
+                
+                available_balance = balance.get_available_balance()
+                if available_balance < total_amount:
+                    return {
+                        'success': False,
+                        'message': f'余额不足，需要 ₦{total_amount}，当前可用余额 ₦{available_balance}'
+                    }
+                
+                if not balance.deduct_balance(total_amount, 'available', f'购彩篮投注 {len(prepared_items)} 注'):
+                    raise ValueError('扣除余额失败')
+                
+                # 批量写入交易记录
+                bet_transactions = Transaction.objects.bulk_create([
+                    Lottery11x5Service._build_bet_transaction(
+                        user, draw.game, draw, bet_type, bet_data, prepared
+                    )
+                    for _, bet_data, draw, bet_type, prepared in prepared_items
+                ])
+                TransactionAnalyticsService.invalidate_users([user.id])
+                
+                # 批量写入投注记录
+                bets = Bet.objects.bulk_create([
+                    Bet(
+                        user=user,
+                        game=draw.game,
+                        draw=draw,
+                        bet_type=bet_type,
+                        bet_content=Lottery11x5Service._bet_content(bet_data),
+                        bet_amount=prepared['total_amount'],
+                        potential_win=prepared['potential_payout'],
+                        numbers=bet_data['numbers'],
+                        amount=bet_data['amount'],
+                        odds=prepared['odds'],
+                        potential_payout=prepared['potential_payout'],
+                        transaction_id=bet_transaction.id
+                    )
+                    for (_, bet_data, draw, bet_type, prepared), bet_transaction
+                    in zip(prepared_items, bet_transactions)
+                ])
+                
+                Lottery11x5Bet.objects.bulk_create([
+                    Lottery11x5Bet(
+                        bet=bet,
+                        bet_method=bet_data['bet_method'],
+                        positions=bet_data['positions'] or [],
+                        selected_count=bet_data['selected_count'],
+                        is_multiple=prepared['is_multiple'],
+                        multiple_count=prepared['multiple_count']
+                    )
+                    for (_, bet_data, _, _, prepared), bet in zip(prepared_items, bets)
+                ])
+                
+                # 按期次合并统计及负债向量
+                draw_totals = {}
+                for _, bet_data, draw, _, prepared in prepared_items:
+                    totals = draw_totals.setdefault(draw.id, {
+                        'draw': draw,
+                        'bet_count': 0,
+                        'total_bets': 0,
+                        'total_amount': Decimal('0.00'),
+                        'liability_amount': Decimal('0.00'),
+                        'payout_vector': {},
+                    })
+                    totals['bet_count'] += 1
+                    totals['total_bets'] += prepared['multiple_count']
+                    totals['total_amount'] += prepared['total_amount']
+                    totals['liability_amount'] += bet_data['amount'] * prepared['multiple_count']
+                    payout_vector = totals['payout_vector']
+                    for index, units in prepared['payout_vector'].items():
+                        payout_vector[index] = payout_vector.get(index, 0) + units
+                
+                for draw_id, totals in draw_totals.items():
+                    # 每个期次一次F表达式更新
+                    Draw.objects.filter(id=draw_id).update(
+                        total_bets=F('total_bets') + totals['total_bets'],
+                        total_amount=F('total_amount') + totals['total_amount']
+                    )
+                    
+                    # 更新期次负债表（超出风险限额时全部投注回滚）
+                    Lottery11x5LiabilityMatrix.record_bet(
+                        totals['draw'],
+                        totals['payout_vector'],
+                        totals['liability_amount'],
+                        bet_count=totals['bet_count'],
+                        max_loss=max_loss
+                    )
+            
+            successful_bets = [
+                {
+                    'cart_item_id': item.get('cart_item_id'),
+                    'bet_id': str(bet.id),
+                    'draw_number': draw.draw_number,
+                    'amount': float(prepared['total_amount'])
+                }
+                for (item, _, draw, _, prepared), bet in zip(prepared_items, bets)
+            ]
+            
+            return {
+                'success': True,
+                'message': f'成功投注 {len(successful_bets)} 注',
+                'data': {
+                    'successful_bets': successful_bets,
+                    'failed_bets': [],
+                    'total_successful': len(successful_bets),
+                    'total_failed': 0,
+                    'total_amount': float(total_amount)
+                }
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'投注失败: {str(e)}'
+            }
+    
+    @staticmethod
+    def cancel_bet(bet_id, description: str = '') -> Dict[str, Any]:
+        """
+        撤销待开奖投注
+        退还投注金额，扣减期数投注统计并从负债表扣除该注派彩
+        """
+        try:
+            with transaction.atomic():
+                try:
+                    bet = Bet.objects.select_for_update().select_related(
+                        'draw', 'game', 'lottery11x5_detail'
+                    ).get(id=bet_id)
+                except Bet.DoesNotExist:
+                    return {
+                        'success': False,
+                        'message': '投注记录不存在'
+                    }
+                
+                if bet.status != 'PENDING':
+                    return {
+                        'success': False,
+                        'message': '投注已结算或已撤销'
+                    }
+                
+                lottery_bet = bet.lottery11x5_detail
+                total_amount = bet.amount * lottery_bet.multiple_count
+                description = description or f'撤销投注 {bet.game.name} {bet.draw.draw_number}'
+                
+                try:
+                    balance = UserBalance.objects.get(user_id=bet.user_id)
+                except UserBalance.DoesNotExist:
+                    return {
+                        'success': False,
+                        'message': '用户余额信息不存在'
+                    }
+                if not balance.add_balance(total_amount, 'main', description):
+                    raise ValueError('退还余额失败')
+                
+                Transaction.objects.create(
+                    user_id=bet.user_id,
+                    type='REFUND',
+                    amount=total_amount,
+                    fee=Decimal('0.00'),
+                    actual_amount=total_amount,
+                    status='COMPLETED',
+                    reference_id=str(uuid.uuid4()),
+                    description=description,
+                    metadata={
+                        'game_type': bet.game.game_type,
+                        'game_name': bet.game.name,
+                        'draw_number': bet.draw.draw_number,
+                        'bet_id': str(bet.id),
+                        'bet_transaction_id': str(bet.transaction_id) if bet.transaction_id else None,
+                    }
+                )
+                
+                bet.status = 'CANCELLED'
+                bet.settled_at = timezone.now()
+                bet.save(update_fields=['status', 'settled_at'])
+                
+                Draw.objects.filter(id=bet.draw_id).update(
+                    total_bets=F('total_bets') - lottery_bet.multiple_count,
+                    total_amount=F('total_amount') - total_amount
+                )
+                
+                Lottery11x5LiabilityMatrix.remove_bet(
+                    bet.draw,
+                    Lottery11x5LiabilityMatrix.bet_payout_vector(
+                        bet_numbers=bet.numbers,
+                        bet_method=lottery_bet.bet_method,
+                        positions=lottery_bet.positions,
+                        selected_count=lottery_bet.selected_count,
+                        odds=bet.odds,
+                        bet_amount=bet.amount,
+                        multiple_count=lottery_bet.multiple_count
+                    ),
+                    total_amount
+                )
+            
+            return {
+                'success': True,
+                'message': '撤单成功',
+                'data': {
+                    'bet_id': str(bet.id),
+                    'refund_amount': float(total_amount),
+                }
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'撤单失败: {str(e)}'
+            }
+    
     @staticmethod
     def validate_numbers(numbers: List[int], bet_method: str, positions: List[int] = None, 
                         selected_count: int = 0) -> bool:
@@ -533,6 +1065,11 @@ class Lottery11x5Service:
             # 分析盈利能力
             profit_controller = Lottery11x5ProfitController()
             profit_analysis = profit_controller.analyze_draw_profitability(draw_id, winning_numbers)
+            # 开奖结果存入JSONField，金额转为浮点数
+            profit_analysis = {
+                key: float(value) if isinstance(value, Decimal) else value
+                for key, value in profit_analysis.items()
+            }
             
             # 记录盈利分析结果
             logger.info(f"期次 {draw.draw_number} 盈利分析: 利润率 {profit_analysis.get('profit_rate', 0):.2%}")
@@ -540,6 +1077,7 @@ class Lottery11x5Service:
             with transaction.atomic():
                 # 更新期数状态和结果
                 draw.status = 'COMPLETED'
+                Lottery11x5Service.invalidate_draw_cache(draw_id)
                 
                 # 获取统计信息
                 statistics = draw_result.get('statistics', {})
@@ -572,7 +1110,7 @@ class Lottery11x5Service:
                 )
                 
                 # 结算投注
-                settlement_result = Lottery11x5Service.settle_bets(draw, winning_numbers)
+                settlement_result = Lottery11x5Service.settle_bets(draw, winning_numbers, bulk=True)
                 total_payout = settlement_result['total_payout']
                 total_winners = settlement_result['total_winners']
                 
@@ -581,18 +1119,10 @@ class Lottery11x5Service:
                 draw.profit = draw.total_amount - total_payout
                 draw.save(update_fields=['total_payout', 'profit'])
                 
-                # 创建游戏结果记录
-                GameResult.objects.create(
-                    game=draw.game,
-                    draw=draw,
-                    result_data=draw.result,
-                    winning_numbers=draw.winning_numbers,
-                    total_bets=draw.total_bets,
-                    total_winners=total_winners,
-                    total_amount=draw.total_amount,
-                    total_payout=total_payout,
-                    profit=draw.profit,
-                    profit_rate=(draw.profit / draw.total_amount * 100) if draw.total_amount > 0 else Decimal('0.00')
+                # 计入小时/日盈亏汇总
+                DrawProfitRollupService.record_draw(
+                    draw.game, draw.draw_time, draw.total_bets,
+                    draw.total_amount, total_payout, total_winners
                 )
                 
                 # 更新走势数据
@@ -601,9 +1131,10 @@ class Lottery11x5Service:
                 # 更新冷热号码统计
                 Lottery11x5Service.update_hot_cold_numbers()
                 
-                # 发送开奖通知
-                from .tasks import send_draw_notifications
-                send_draw_notifications.delay(draw_id)
+                # 事务提交后发送开奖通知、发布开奖完成事件（刷新走势缓存）
+                from .tasks import send_draw_notifications, on_draw_completed
+                transaction.on_commit(lambda: send_draw_notifications.delay(draw_id))
+                transaction.on_commit(lambda: on_draw_completed.delay(draw_id))
                 
                 return {
                     'success': True,
@@ -632,12 +1163,42 @@ class Lottery11x5Service:
             }
     
     @staticmethod
-    def settle_bets(draw: Draw, winning_numbers: List[int]) -> Dict[str, Any]:
+    def _build_payout_accumulator(draw: Draw, winning_numbers: List[int]) -> PayoutAccumulator:
+        """
+        创建期次派奖聚合器（每个用户生成一条中奖交易，逐注明细记录在 metadata.bets）
+        """
+        return PayoutAccumulator(
+            f'11选5中奖 {draw.draw_number}',
+            metadata={
+                'game_type': draw.game.game_type,
+                'game_name': draw.game.name,
+                'draw_number': draw.draw_number,
+                'winning_numbers': winning_numbers,
+            }
+        )
+
+    @staticmethod
+    def _skip_unpayable_bets(draw: Draw, bets, settlement_details: Dict[str, Any]) -> int:
+        """
+        统计无余额记录用户的待结算投注
+        这些投注不参与本次结算，记入错误明细，补建余额记录后可重新结算
+        """
+        skipped = bets.filter(user__balance__isnull=True).count()
+        if skipped:
+            error_msg = f"期次 {draw.draw_number} 有 {skipped} 注投注的用户余额信息不存在，保持待结算"
+            logger.error(error_msg)
+            settlement_details['errors'].append(error_msg)
+            settlement_details['error_bets'] += skipped
+        return skipped
+    
+    @staticmethod
+    def settle_bets(draw: Draw, winning_numbers: List[int], bulk: bool = False) -> Dict[str, Any]:
         """
         结算投注
+        bulk=True 时使用批量结算模式
         """
-        import logging
-        logger = logging.getLogger(__name__)
+        if bulk:
+            return Lottery11x5Service.bulk_settle_bets(draw, winning_numbers)
         
         total_payout = Decimal('0.00')
         total_winners = 0
@@ -651,8 +1212,10 @@ class Lottery11x5Service:
             'errors': []
         }
         
-        # 获取该期所有投注
-        bets = Bet.objects.filter(draw=draw, status='PENDING').select_related('user', 'bet_type')
+        # 获取该期所有投注（无余额记录的用户无法派奖，投注保持待结算）
+        bets = Bet.objects.filter(draw=draw, status='PENDING')
+        Lottery11x5Service._skip_unpayable_bets(draw, bets, settlement_details)
+        bets = bets.filter(user__balance__isnull=False).select_related('user', 'bet_type')
         settlement_details['total_bets'] = bets.count()
         
         if not bets.exists():
@@ -665,6 +1228,9 @@ class Lottery11x5Service:
         
         logger.info(f"开始结算期次 {draw.draw_number}，共 {bets.count()} 注投注")
         
+        payouts = Lottery11x5Service._build_payout_accumulator(draw, winning_numbers)
+        turnover_entries = []
+        
         for bet in bets:
             try:
                 # 获取投注详情
@@ -710,33 +1276,14 @@ class Lottery11x5Service:
                         'selected_count': lottery_bet.selected_count,
                     }
                     
-                    # 派发奖金到用户余额
-                    user_balance = bet.user.balance
-                    user_balance.add_balance(win_amount, 'available', f'11选5中奖 {draw.draw_number}')
-                    
-                    # 创建中奖交易记录
-                    win_transaction = Transaction.objects.create(
-                        user=bet.user,
-                        type='WIN',
-                        amount=win_amount,
-                        fee=Decimal('0.00'),
-                        actual_amount=win_amount,
-                        status='COMPLETED',
-                        reference_id=str(uuid.uuid4()),
-                        description=f'11选5中奖 {draw.draw_number}',
-                        metadata={
-                            'game_type': draw.game.game_type,
-                            'game_name': draw.game.name,
-                            'draw_number': draw.draw_number,
-                            'bet_id': str(bet.id),
-                            'winning_numbers': winning_numbers,
-                            'bet_numbers': bet.numbers,
-                            'bet_method': lottery_bet.bet_method,
-                            'win_amount': float(win_amount),
-                        }
+                    # 奖金计入派奖聚合器，结算结束后按用户一次入账
+                    bet.win_transaction_id = payouts.add(
+                        bet.user_id,
+                        win_amount,
+                        bet.id,
+                        bet_numbers=bet.numbers,
+                        bet_method=lottery_bet.bet_method,
                     )
-                    
-                    bet.win_transaction_id = win_transaction.id
                     total_payout += win_amount
                     total_winners += 1
                     settlement_details['winning_bets'] += 1
@@ -778,6 +1325,7 @@ class Lottery11x5Service:
                 
                 bet.settled_at = timezone.now()
                 bet.save()
+                turnover_entries.append((bet.user_id, bet.created_at, bet.amount * lottery_bet.multiple_count))
                 
             except Exception as e:
                 # 记录错误但继续处理其他投注
@@ -787,6 +1335,9 @@ class Lottery11x5Service:
                 settlement_details['error_bets'] += 1
                 continue
         
+        payouts.flush()
+        DailyTurnoverService.record_many('lottery11x5', turnover_entries)
+        
         # 计算各投注类型的盈利率
         for bet_type_key, stats in settlement_details['bet_type_stats'].items():
             if stats['total_amount'] > 0:
@@ -806,7 +1357,197 @@ class Lottery11x5Service:
             'total_winners': total_winners,
             'settlement_details': settlement_details
         }
+
+    @staticmethod
+    def _save_settled_bets(bets: List[Bet]) -> None:
+        """
+        回写结算结果
+        每注一行参数化UPDATE，以executemany批量执行；
+        bulk_update为每个字段生成逐行CASE表达式，编译耗时随批量增大而超过执行本身
+        """
+        if not bets:
+            return
+        
+        fields = [Bet._meta.get_field(name) for name in Lottery11x5Service.SETTLED_BET_FIELDS]
+        quote_name = connection.ops.quote_name
+        sql = 'UPDATE {table} SET {columns} WHERE {pk} = %s'.format(
+            table=quote_name(Bet._meta.db_table),
+            columns=', '.join(f'{quote_name(field.column)} = %s' for field in fields),
+            pk=quote_name(Bet._meta.pk.column),
+        )
+        params = [
+            [field.get_db_prep_save(getattr(bet, field.attname), connection) for field in fields] + [bet.pk]
+            for bet in bets
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
     
+    @staticmethod
+    def bulk_settle_bets(draw: Draw, winning_numbers: List[int],
+                         chunk_size: int = None) -> Dict[str, Any]:
+        """
+        批量结算投注
+        按主键分批加载投注及详情，在内存中判奖，
+        投注结果以executemany批量回写，奖金经派奖聚合器按用户每批一次入账
+        """
+        chunk_size = chunk_size or Lottery11x5Service.SETTLEMENT_CHUNK_SIZE
+
+        total_payout = Decimal('0.00')
+        total_winners = 0
+        settlement_details = {
+            'total_bets': 0,
+            'winning_bets': 0,
+            'losing_bets': 0,
+            'error_bets': 0,
+            'bet_type_stats': {},
+            'user_wins': [],
+            'errors': []
+        }
+
+        # 无余额记录的用户无法派奖，投注保持待结算
+        bets = Bet.objects.filter(draw=draw, status='PENDING')
+        Lottery11x5Service._skip_unpayable_bets(draw, bets, settlement_details)
+        bets = bets.filter(
+            user__balance__isnull=False
+        ).select_related('user', 'bet_type', 'lottery11x5_detail').order_by('pk')
+
+        logger.info(f"开始批量结算期次 {draw.draw_number}，每批 {chunk_size} 注")
+
+        winning_set = set(winning_numbers)
+        payouts = Lottery11x5Service._build_payout_accumulator(draw, winning_numbers)
+        last_pk = None
+
+        while True:
+            chunk_queryset = bets if last_pk is None else bets.filter(pk__gt=last_pk)
+            chunk = list(chunk_queryset[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            settled_at = timezone.now()
+            settled_bets = []
+
+            evaluable = []
+            for bet in chunk:
+                try:
+                    evaluable.append((bet, bet.lottery11x5_detail))
+                except Lottery11x5Bet.DoesNotExist as e:
+                    error_msg = f"结算投注 {bet.id} 时出错: {str(e)}"
+                    logger.error(error_msg)
+                    settlement_details['errors'].append(error_msg)
+                    settlement_details['error_bets'] += 1
+
+            # 整批向量化判奖
+            win_results = Lottery11x5Service.check_win_batch([
+                {
+                    'bet_numbers': bet.numbers,
+                    'bet_method': lottery_bet.bet_method,
+                    'positions': lottery_bet.positions,
+                    'selected_count': lottery_bet.selected_count,
+                    'odds': bet.odds,
+                    'bet_amount': bet.amount,
+                    'multiple_count': lottery_bet.multiple_count,
+                }
+                for bet, lottery_bet in evaluable
+            ], winning_numbers)
+
+            for (bet, lottery_bet), (is_win, win_amount) in zip(evaluable, win_results):
+                try:
+                    bet_type_key = f"{bet.bet_type.name}_{lottery_bet.bet_method}"
+                    if bet_type_key not in settlement_details['bet_type_stats']:
+                        settlement_details['bet_type_stats'][bet_type_key] = {
+                            'total_bets': 0,
+                            'total_amount': Decimal('0.00'),
+                            'winning_bets': 0,
+                            'total_payout': Decimal('0.00')
+                        }
+
+                    stats = settlement_details['bet_type_stats'][bet_type_key]
+                    stats['total_bets'] += 1
+                    stats['total_amount'] += bet.amount * lottery_bet.multiple_count
+
+                    is_win = is_win and win_amount > 0
+                    bet.status = 'WON' if is_win else 'LOST'
+                    bet.payout = win_amount if is_win else Decimal('0.00')
+                    bet.result = {
+                        'is_win': is_win,
+                        'win_amount': float(win_amount) if is_win else 0,
+                        'winning_numbers': winning_numbers,
+                        'matched_numbers': list(set(bet.numbers) & winning_set),
+                        'bet_method': lottery_bet.bet_method,
+                        'positions': lottery_bet.positions,
+                        'selected_count': lottery_bet.selected_count,
+                    }
+                    bet.settled_at = settled_at
+
+                    if is_win:
+                        bet.win_transaction_id = payouts.add(
+                            bet.user_id,
+                            win_amount,
+                            bet.id,
+                            bet_numbers=bet.numbers,
+                            bet_method=lottery_bet.bet_method,
+                        )
+
+                        total_payout += win_amount
+                        total_winners += 1
+                        settlement_details['winning_bets'] += 1
+                        stats['winning_bets'] += 1
+                        stats['total_payout'] += win_amount
+
+                        settlement_details['user_wins'].append({
+                            'user_id': str(bet.user_id),
+                            'user_phone': bet.user.phone,
+                            'bet_id': str(bet.id),
+                            'bet_amount': float(bet.amount * lottery_bet.multiple_count),
+                            'win_amount': float(win_amount),
+                            'bet_type': bet.bet_type.name,
+                            'bet_method': lottery_bet.bet_method,
+                            'numbers': bet.numbers,
+                            'odds': float(bet.odds),
+                        })
+                    else:
+                        settlement_details['losing_bets'] += 1
+
+                    settled_bets.append(bet)
+
+                except Exception as e:
+                    error_msg = f"结算投注 {bet.id} 时出错: {str(e)}"
+                    logger.error(error_msg)
+                    settlement_details['errors'].append(error_msg)
+                    settlement_details['error_bets'] += 1
+
+            with transaction.atomic():
+                Lottery11x5Service._save_settled_bets(settled_bets)
+                payouts.flush()
+                DailyTurnoverService.record_many('lottery11x5', [
+                    (bet.user_id, bet.created_at, bet.amount * bet.lottery11x5_detail.multiple_count)
+                    for bet in settled_bets
+                ])
+
+            settlement_details['total_bets'] += len(chunk)
+
+        if settlement_details['total_bets'] == 0:
+            logger.info(f"期次 {draw.draw_number} 没有待结算的投注")
+
+        for bet_type_key, stats in settlement_details['bet_type_stats'].items():
+            if stats['total_amount'] > 0:
+                profit = stats['total_amount'] - stats['total_payout']
+                stats['profit'] = profit
+                stats['profit_rate'] = (profit / stats['total_amount']) * 100
+            else:
+                stats['profit'] = Decimal('0.00')
+                stats['profit_rate'] = Decimal('0.00')
+
+        logger.info(f"期次 {draw.draw_number} 批量结算完成: 总投注 {settlement_details['total_bets']} 注, "
+                   f"中奖 {total_winners} 注, 派彩 ₦{total_payout}")
+
+        return {
+            'total_payout': total_payout,
+            'total_winners': total_winners,
+            'settlement_details': settlement_details
+        }
+
     @staticmethod
     def check_win(bet_numbers: List[int], winning_numbers: List[int], bet_method: str,
                  positions: List[int] = None, selected_count: int = 0, odds: Decimal = None,
@@ -847,38 +1588,42 @@ class Lottery11x5Service:
         
         return False, Decimal('0.00')
     
+    @staticmethod
+    def check_win_batch(bets: List[Dict[str, Any]], winning_numbers: List[int]) -> List[Tuple[bool, Decimal]]:
+        """
+        批量检查中奖并计算奖金
+        bets 每项字段与 check_win 参数相同，返回结果与逐注调用 check_win 一致
+        """
+        from .win_kernel import Lottery11x5WinKernel
+        
+        return Lottery11x5WinKernel.check_win_batch(bets, winning_numbers)
+    
     @staticmethod
     def update_trend_data(draw: Draw, winning_numbers: List[int]):
         """
         更新走势数据
+        增量更新走势统计状态，并记录本期各位置号码及遗漏值
         """
         try:
-            # 计算位置号码
-            positions = {}
-            for i, number in enumerate(winning_numbers):
-                positions[str(i + 1)] = number
-            
-            # 计算统计数据
-            sum_value = sum(winning_numbers)
-            odd_count = sum(1 for num in winning_numbers if num % 2 == 1)
-            even_count = 5 - odd_count
-            big_count = sum(1 for num in winning_numbers if num > 5)
-            small_count = 5 - big_count
+            trend_state = Lottery11x5TrendStore.update(draw, winning_numbers)
             
             # 创建走势记录
-            Lottery11x5Trend.objects.create(
-                game=draw.game,
-                date=draw.draw_time.date(),
-                draw_number=draw.draw_number,
-                numbers=winning_numbers,
-                positions=positions,
-                sum_value=sum_value,
-                odd_even=f"{odd_count}:{even_count}",
-                big_small=f"{big_count}:{small_count}"
+            Lottery11x5Trend.objects.update_or_create(
+                draw=draw,
+                defaults={
+                    'position1_number': winning_numbers[0],
+                    'position2_number': winning_numbers[1],
+                    'position3_number': winning_numbers[2],
+                    'position4_number': winning_numbers[3],
+                    'position5_number': winning_numbers[4],
+                    'missing_values': trend_state.state.get('missing', {}),
+                }
             )
             
+            return trend_state
+            
         except Exception as e:
-            print(f"更新走势数据时出错: {str(e)}")
+            logger.error(f"更新走势数据时出错: {str(e)}")
     
     @staticmethod
     def get_user_bet_history(user, limit: int = 20, status: str = None):
@@ -966,6 +1711,7 @@ class Lottery11x5DrawService:
         for draw in expired_draws:
             draw.status = 'CLOSED'
             draw.save(update_fields=['status'])
+            Lottery11x5Service.invalidate_draw_cache(str(draw.id))
             count += 1
         
         return count
@@ -976,7 +1722,7 @@ class Lottery11x5DrawService:
         自动开奖
         """
         config = Lottery11x5Service.get_game_config()
-        if not config or not config.auto_draw_results:
+        if not config or not config.auto_draw:
             return []
         
         now = timezone.now()
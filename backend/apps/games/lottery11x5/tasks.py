@@ -5,11 +5,17 @@
 from celery import shared_task
 from django.utils import timezone
 from django.core.cache import cache
+
+from apps.core.cache_manager import CacheManager
 from .services import Lottery11x5Service, Lottery11x5DrawService
+from .cart import Lottery11x5Cart
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 冷热号码统计周期
+HOT_COLD_PERIODS = (10, 30, 50, 100)
+
 
 @shared_task
 def create_daily_draws():
@@ -63,8 +69,8 @@ def auto_draw_lottery():
         if results:
             logger.info(f"11选5自动开奖完成，共开奖 {len(results)} 期")
             
-            # 清除相关缓存
-            cache.delete_pattern('lottery11x5_*')
+            # 清除购物车缓存（走势及冷热号码缓存由开奖完成事件刷新）
+            CacheManager.invalidate_tags(Lottery11x5Cart.CACHE_TAG)
         
         return {"success": True, "draw_results": results}
         
@@ -82,6 +88,7 @@ def settlement_verification():
     try:
         from apps.games.models import Draw, Bet
         from .draw_engine import Lottery11x5ProfitController
+        from .liability import Lottery11x5LiabilityMatrix
         
         # 获取最近完成的期次
         recent_draws = Draw.objects.filter(
@@ -94,7 +101,10 @@ def settlement_verification():
         
         for draw in recent_draws:
             try:
-                # 重新计算该期的理论派彩
+                # 从负债表读取该期的理论派彩（历史期次无负债表时先重建）
+                if Lottery11x5LiabilityMatrix.get_liability(draw) is None:
+                    Lottery11x5LiabilityMatrix.rebuild(draw)
+                
                 winning_numbers = draw.lottery11x5_result.numbers
                 theoretical_analysis = profit_controller.analyze_draw_profitability(
                     str(draw.id), winning_numbers
@@ -157,7 +167,7 @@ def update_hot_cold_numbers():
             logger.info("11选5冷热号码统计更新成功")
             
             # 清除冷热号码缓存
-            cache.delete_pattern('lottery11x5_hot_cold_*')
+            cache.delete_many([f'lottery11x5_hot_cold_{period}' for period in HOT_COLD_PERIODS])
         
         return {"success": success}
         
@@ -181,7 +191,7 @@ def cleanup_old_data():
         deleted_trends = Lottery11x5Trend.objects.filter(date__lt=cutoff_date).delete()
         
         # 清理过期的购物车数据
-        cache.delete_pattern('lottery11x5_cart_*')
+        CacheManager.invalidate_tags(Lottery11x5Cart.CACHE_TAG)
         
         logger.info(f"11选5清理了 {deleted_trends[0]} 条过期走势数据")
         
@@ -203,8 +213,7 @@ def generate_statistics_report():
     """
     try:
         from apps.games.models import GameStatistics
-        from .models import Lottery11x5Result
-        from decimal import Decimal
+        from apps.games.profit_rollup import DrawProfitRollupService
         
         game = Lottery11x5Service.get_game()
         if not game:
@@ -212,23 +221,18 @@ def generate_statistics_report():
         
         today = timezone.now().date()
         
-        # 获取今日开奖结果
-        today_results = Lottery11x5Result.objects.filter(
-            draw__game=game,
-            draw__draw_time__date=today,
-            draw__status='COMPLETED'
-        )
+        # 从日盈亏汇总读取今日统计
+        summary = DrawProfitRollupService.aggregate(game, today, today)['summary']
         
-        if not today_results.exists():
+        if not summary['total_draws']:
             return {"success": True, "message": "今日暂无开奖数据"}
         
-        # 计算统计数据
-        total_draws = today_results.count()
-        total_bets = sum(result.draw.total_bets for result in today_results)
-        total_amount = sum(result.draw.total_amount for result in today_results)
-        total_payout = sum(result.draw.total_payout for result in today_results)
-        profit = total_amount - total_payout
-        profit_rate = (profit / total_amount * 100) if total_amount > 0 else Decimal('0.00')
+        total_draws = summary['total_draws']
+        total_bets = summary['total_bets']
+        total_amount = summary['total_amount']
+        total_payout = summary['total_payout']
+        profit = summary['profit']
+        profit_rate = summary['profit_rate'] * 100
         
         # 获取参与用户数
         from apps.games.models import Bet
@@ -330,6 +334,42 @@ def send_draw_notifications(draw_id):
         return {"success": False, "message": f"发送通知出错: {str(e)}"}
 
 
+@shared_task
+def on_draw_completed(draw_id):
+    """
+    开奖完成事件任务
+    开奖事务提交后执行，刷新冷热号码缓存并预生成常用走势查询
+    """
+    try:
+        from apps.games.models import Draw
+        from .trend_analyzer import Lottery11x5TrendAnalyzer
+        
+        draw = Draw.objects.select_related('game').get(id=draw_id)
+        
+        # 冷热号码统计已在开奖时更新，重新生成缓存
+        cache.delete_many([f'lottery11x5_hot_cold_{period}' for period in HOT_COLD_PERIODS])
+        for period in HOT_COLD_PERIODS:
+            Lottery11x5Service.get_hot_cold_numbers(period)
+        
+        # 以本期期号为缓存版本预生成走势查询
+        prerendered = Lottery11x5TrendAnalyzer.refresh_cache(draw.game, draw.draw_number)
+        
+        # 清除开奖结果、走势、冷热号码等API响应缓存
+        CacheManager.invalidate_tags(Lottery11x5Service.DRAW_RESPONSE_TAG)
+        
+        logger.info(f"11选5期次 {draw.draw_number} 走势缓存已刷新，预生成 {prerendered} 项查询")
+        
+        return {
+            "success": True,
+            "draw_number": draw.draw_number,
+            "prerendered": prerendered
+        }
+        
+    except Exception as e:
+        logger.error(f"刷新11选5走势缓存时出错: {str(e)}")
+        return {"success": False, "message": f"刷新走势缓存出错: {str(e)}"}
+
+
 @shared_task
 def check_system_health():
     """
@@ -356,7 +396,7 @@ def check_system_health():
             "pending_draws_count": pending_draws,
             "config_available": config is not None,
             "auto_create_enabled": config.auto_create_draws if config else False,
-            "auto_draw_enabled": config.auto_draw_results if config else False,
+            "auto_draw_enabled": config.auto_draw if config else False,
         }
         
         # 检查是否有异常
@@ -394,25 +434,15 @@ def odds_adjustment_analysis():
     分析最近的盈利情况，建议是否需要调整赔率
     """
     try:
-        from apps.games.models import Draw
+        from apps.games.profit_rollup import DrawProfitRollupService
         from .draw_engine import Lottery11x5ProfitController
-        from datetime import timedelta
         
-        # 获取最近30期的数据
-        recent_draws = Draw.objects.filter(
-            game__game_type='11选5',
-            status='COMPLETED'
-        ).order_by('-draw_time')[:30]
-        
-        if not recent_draws:
-            return {"success": True, "message": "暂无开奖数据"}
+        game = Lottery11x5Service.get_game()
+        if not game:
+            return {"success": False, "message": "游戏不存在"}
         
-        # 计算利润率
-        profit_rates = []
-        for draw in recent_draws:
-            if draw.total_amount > 0:
-                profit_rate = draw.profit / draw.total_amount
-                profit_rates.append(profit_rate)
+        # 从小时盈亏汇总读取最近30个有投注时段的利润率（时间正序）
+        profit_rates = DrawProfitRollupService.recent_profit_rates(game, 'HOUR', 30)
         
         if not profit_rates:
             return {"success": True, "message": "暂无有效数据"}
@@ -2,6 +2,7 @@
 11选5走势分析器
 """
 
+import re
 import json
 from typing import Dict, List, Any, Optional, Tuple
 from decimal import Decimal
@@ -10,7 +11,9 @@ from django.utils import timezone
 from django.db.models import Count, Q
 from django.core.cache import cache
 
+from apps.core.cache_manager import CacheManager
 from .models import Lottery11x5Result, Lottery11x5Trend, Lottery11x5HotCold
+from .trend_store import Lottery11x5TrendStore
 from apps.games.models import Draw
 
 
@@ -19,47 +22,149 @@ class Lottery11x5TrendAnalyzer:
     11选5走势分析器
     """
     
-    def __init__(self, game):
+    # 开奖后预生成的常用查询
+    PRERENDER_LIMITS = (30, 50, 100)
+    PRERENDER_POSITION_LIMIT = 50
+    PRERENDER_MISSING_LIMIT = 100
+    PRERENDER_PREDICTION_LIMIT = 50
+    PRERENDER_HOT_COLD_PERIODS = ([10, 30, 50, 100], [30, 50])
+    
+    def __init__(self, game, cache_version: str = None):
         self.game = game
         self.cache_timeout = 1800  # 30分钟缓存
+        # 缓存版本：开奖完成后切换为最新期号，旧版本缓存随过期时间失效
+        if cache_version is None:
+            cache_version = cache.get(self.get_version_key(game), '0')
+        self.cache_version = cache_version
+        self._trend_state = None
+    
+    @staticmethod
+    def get_version_key(game) -> str:
+        """
+        获取走势缓存版本键
+        """
+        return f'lottery11x5_trend_version_{getattr(game, "pk", None)}'
+    
+    @staticmethod
+    def version_order(version) -> Tuple[int, ...]:
+        """
+        缓存版本排序键
+        期号按数字段逐段比较整数，避免按字符串比较时"10"排在"9"之前
+        """
+        return tuple(int(part) for part in re.findall(r'\d+', str(version)))
+    
+    def _cache_key(self, key: str) -> str:
+        """
+        生成带版本的缓存键
+        """
+        return f'{key}_v{self.cache_version}'
+    
+    @classmethod
+    def refresh_cache(cls, game, version: str) -> int:
+        """
+        开奖完成后刷新走势缓存
+        先以新版本预生成常用查询，再切换版本，用户请求始终命中已生成的缓存
+        """
+        version_key = cls.get_version_key(game)
+        current_version = cache.get(version_key)
+        if current_version is not None and cls.version_order(version) < cls.version_order(current_version):
+            # 已有更新期次的缓存，忽略迟到的刷新
+            return 0
+        
+        analyzer = cls(game, cache_version=version)
+        count = analyzer.prerender()
+        cache.set(version_key, version, None)
+        
+        return count
+    
+    def prerender(self) -> int:
+        """
+        预生成常用走势查询缓存
+        返回生成的查询数
+        """
+        count = 0
+        
+        for limit in self.PRERENDER_LIMITS:
+            self.get_trend_data(limit)
+            self.get_complete_trend_chart(limit)
+            count += 2
+        
+        for position in range(1, 6):
+            self.get_position_trend(position, self.PRERENDER_POSITION_LIMIT)
+            count += 1
+        
+        for period_types in self.PRERENDER_HOT_COLD_PERIODS:
+            self.get_hot_cold_analysis(period_types)
+            count += 1
+        
+        self.get_missing_analysis(self.PRERENDER_MISSING_LIMIT)
+        self.get_prediction_analysis(self.PRERENDER_PREDICTION_LIMIT)
+        count += 2
+        
+        return count
+    
+    def _get_trend_state(self):
+        """
+        获取走势滚动统计状态
+        """
+        if self._trend_state is None:
+            self._trend_state = Lottery11x5TrendStore.get_state(self.game)
+        return self._trend_state
+    
+    def _get_recent_rows(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        获取最近limit期开奖记录（新到旧）
+        保留范围内直接读取走势状态，超出时查询开奖结果
+        """
+        rows = Lottery11x5TrendStore.recent_rows(self._get_trend_state(), limit)
+        if rows is not None:
+            return rows
+        
+        results = Lottery11x5Result.objects.filter(
+            draw__game=self.game,
+            draw__status='COMPLETED'
+        ).select_related('draw').order_by('-draw__draw_time')[:limit]
+        
+        return [
+            Lottery11x5TrendStore.build_row(result.draw.draw_number, result.draw.draw_time, result.numbers)
+            for result in results
+        ]
     
     def get_trend_data(self, limit: int = 30, date_from: date = None, 
                       date_to: date = None) -> Dict[str, Any]:
         """
         获取走势数据
         """
-        cache_key = f'lottery11x5_trend_{limit}_{date_from}_{date_to}'
-        cached_data = cache.get(cache_key)
+        cache_key = self._cache_key(f'lottery11x5_trend_{limit}_{date_from}_{date_to}')
+        cached_data = CacheManager.get_cache(cache_key)
         if cached_data:
             return cached_data
         
-        # 构建查询条件
-        queryset = Lottery11x5Result.objects.filter(
-            draw__game=self.game,
-            draw__status='COMPLETED'
-        ).select_related('draw').order_by('-draw__draw_time')
-        
-        if date_from:
-            queryset = queryset.filter(draw__draw_time__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(draw__draw_time__date__lte=date_to)
-        
-        results = queryset[:limit]
+        if date_from or date_to:
+            # 按日期查询
+            queryset = Lottery11x5Result.objects.filter(
+                draw__game=self.game,
+                draw__status='COMPLETED'
+            ).select_related('draw').order_by('-draw__draw_time')
+            
+            if date_from:
+                queryset = queryset.filter(draw__draw_time__date__gte=date_from)
+            if date_to:
+                queryset = queryset.filter(draw__draw_time__date__lte=date_to)
+            
+            rows = [
+                Lottery11x5TrendStore.build_row(result.draw.draw_number, result.draw.draw_time, result.numbers)
+                for result in queryset[:limit]
+            ]
+        else:
+            rows = self._get_recent_rows(limit)
         
         # 格式化走势数据
         trend_data = []
-        for result in results:
+        for row in rows:
             trend_data.append({
-                'draw_number': result.draw.draw_number,
-                'draw_time': result.draw.draw_time,
-                'numbers': result.numbers,
-                'sum_value': result.sum_value,
-                'odd_count': result.odd_count,
-                'even_count': result.even_count,
-                'big_count': result.big_count,
-                'small_count': result.small_count,
-                'span_value': result.span_value,
-                'positions': self._get_position_numbers(result.numbers),
+                **row,
+                'positions': self._get_position_numbers(row['numbers']),
             })
         
         # 计算走势统计
@@ -78,10 +183,11 @@ class Lottery11x5TrendAnalyzer:
         }
         
         # 缓存结果
-        cache.set(cache_key, result_data, self.cache_timeout)
+        CacheManager.set_cache(cache_key, result_data, self.cache_timeout)
         
-        return result_data  
-  def _get_position_numbers(self, numbers: List[int]) -> Dict[str, int]:
+        return result_data
+    
+    def _get_position_numbers(self, numbers: List[int]) -> Dict[str, int]:
         """
         获取各位置号码
         """
@@ -172,33 +278,29 @@ class Lottery11x5TrendAnalyzer:
         distribution = {}
         for value in span_values:
             distribution[str(value)] = distribution.get(str(value), 0) + 1
-        return distribution    
-def get_position_trend(self, position: int, limit: int = 50) -> Dict[str, Any]:
+        return distribution
+    
+    def get_position_trend(self, position: int, limit: int = 50) -> Dict[str, Any]:
         """
         获取指定位置的走势
         """
         if position < 1 or position > 5:
             raise ValueError("位置必须在1-5之间")
         
-        cache_key = f'lottery11x5_position_trend_{position}_{limit}'
-        cached_data = cache.get(cache_key)
+        cache_key = self._cache_key(f'lottery11x5_position_trend_{position}_{limit}')
+        cached_data = CacheManager.get_cache(cache_key)
         if cached_data:
             return cached_data
         
         # 获取最近的开奖结果
-        results = Lottery11x5Result.objects.filter(
-            draw__game=self.game,
-            draw__status='COMPLETED'
-        ).select_related('draw').order_by('-draw__draw_time')[:limit]
-        
         position_data = []
-        for result in results:
-            if len(result.numbers) >= position:
+        for row in self._get_recent_rows(limit):
+            if len(row['numbers']) >= position:
                 position_data.append({
-                    'draw_number': result.draw.draw_number,
-                    'draw_time': result.draw.draw_time,
-                    'number': result.numbers[position - 1],
-                    'all_numbers': result.numbers,
+                    'draw_number': row['draw_number'],
+                    'draw_time': row['draw_time'],
+                    'number': row['numbers'][position - 1],
+                    'all_numbers': row['numbers'],
                 })
         
         # 计算位置统计
@@ -212,19 +314,67 @@ def get_position_trend(self, position: int, limit: int = 50) -> Dict[str, Any]:
         }
         
         # 缓存结果
-        cache.set(cache_key, result_data, self.cache_timeout)
+        CacheManager.set_cache(cache_key, result_data, self.cache_timeout)
         
         return result_data
     
     def _calculate_position_statistics(self, position_data: List[Dict], position: int) -> Dict[str, Any]:
         """
         计算位置统计
+        遗漏、最大遗漏及连出直接读取走势状态（最大遗漏、最大连出为历史值）
         """
         if not position_data:
             return {}
         
-        numbers = [item['number'] for item in position_data]
+        period_count = len(position_data)
+        trend_state = self._get_trend_state()
+        pos_key = str(position)
+        position_missing = trend_state.state.get('position_missing', {}).get(pos_key)
+        
+        if position_missing is None or trend_state.total_periods < period_count:
+            return self._calculate_position_statistics_from_numbers(
+                [item['number'] for item in position_data]
+            )
         
+        # 号码频率统计
+        counts = Lottery11x5TrendStore.number_counts(trend_state, period_count, position)
+        if counts is None:
+            counts = {num: 0 for num in range(1, 12)}
+            for item in position_data:
+                counts[item['number']] += 1
+        frequency = {str(num): counts[num] for num in range(1, 12)}
+        
+        # 当前遗漏（统计期内未出现记为统计期数）
+        missing_values = {
+            str(num): min(position_missing[str(num)], period_count) for num in range(1, 12)
+        }
+        
+        # 最大遗漏
+        max_missing = dict(trend_state.state['position_max_missing'][pos_key])
+        
+        # 连出统计
+        streaks = trend_state.state['position_streaks'][pos_key]
+        consecutive_stats = {
+            str(num): {
+                'max_consecutive': streaks[str(num)]['max'],
+                'current_consecutive': streaks[str(num)]['current'],
+            }
+            for num in range(1, 12)
+        }
+        
+        return {
+            'frequency': frequency,
+            'missing_values': missing_values,
+            'max_missing': max_missing,
+            'consecutive_stats': consecutive_stats,
+            'most_frequent': max(frequency.items(), key=lambda x: x[1]),
+            'least_frequent': min(frequency.items(), key=lambda x: x[1]),
+        }
+    
+    def _calculate_position_statistics_from_numbers(self, numbers: List[int]) -> Dict[str, Any]:
+        """
+        按号码序列计算位置统计（走势状态不可用时）
+        """
         # 号码频率统计
         frequency = {}
         for num in range(1, 12):
@@ -304,21 +454,19 @@ def get_position_trend(self, position: int, limit: int = 50) -> Dict[str, Any]:
                 'current_consecutive': current_consecutive if numbers and numbers[0] == num else 0
             }
         
-        return consecutive_stats    de
-f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
+        return consecutive_stats
+    
+    def get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         """
         获取遗漏分析
         """
-        cache_key = f'lottery11x5_missing_analysis_{limit}'
-        cached_data = cache.get(cache_key)
+        cache_key = self._cache_key(f'lottery11x5_missing_analysis_{limit}')
+        cached_data = CacheManager.get_cache(cache_key)
         if cached_data:
             return cached_data
         
         # 获取最近的开奖结果
-        results = Lottery11x5Result.objects.filter(
-            draw__game=self.game,
-            draw__status='COMPLETED'
-        ).select_related('draw').order_by('-draw__draw_time')[:limit]
+        results = self._get_recent_rows(limit)
         
         if not results:
             return {'error': '暂无开奖数据'}
@@ -341,7 +489,7 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         }
         
         # 缓存结果
-        cache.set(cache_key, result_data, self.cache_timeout)
+        CacheManager.set_cache(cache_key, result_data, self.cache_timeout)
         
         return result_data
     
@@ -355,10 +503,10 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         current_missing = 0
         
         for i, result in enumerate(results):
-            if target_num in result.numbers:
+            if target_num in result['numbers']:
                 appearances.append({
                     'period': i,
-                    'draw_number': result.draw.draw_number,
+                    'draw_number': result['draw_number'],
                     'missing_before': current_missing
                 })
                 if current_missing > 0:
@@ -411,8 +559,8 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         """
         获取冷热号码分析
         """
-        cache_key = f'lottery11x5_hot_cold_analysis_{"-".join(map(str, period_types))}'
-        cached_data = cache.get(cache_key)
+        cache_key = self._cache_key(f'lottery11x5_hot_cold_analysis_{"-".join(map(str, period_types))}')
+        cached_data = CacheManager.get_cache(cache_key)
         if cached_data:
             return cached_data
         
@@ -432,7 +580,7 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         }
         
         # 缓存结果
-        cache.set(cache_key, result_data, self.cache_timeout)
+        CacheManager.set_cache(cache_key, result_data, self.cache_timeout)
         
         return result_data
     
@@ -440,21 +588,23 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         """
         分析指定期数的冷热号码
         """
-        # 获取最近期数的开奖结果
-        results = Lottery11x5Result.objects.filter(
-            draw__game=self.game,
-            draw__status='COMPLETED'
-        ).order_by('-draw__draw_time')[:period]
-        
-        if len(results) < period:
-            return {'error': f'数据不足，需要{period}期，实际{len(results)}期'}
+        trend_state = self._get_trend_state()
+        if trend_state.total_periods < period:
+            return {'error': f'数据不足，需要{period}期，实际{trend_state.total_periods}期'}
         
-        # 统计每个号码的出现次数
-        number_counts = {i: 0 for i in range(1, 12)}
+        # 统计每个号码的出现次数（窗口期数直接读取预计算结果）
+        number_counts = Lottery11x5TrendStore.number_counts(trend_state, period)
         
-        for result in results:
-            for number in result.numbers:
-                number_counts[number] += 1
+        if number_counts is None:
+            results = Lottery11x5Result.objects.filter(
+                draw__game=self.game,
+                draw__status='COMPLETED'
+            ).order_by('-draw__draw_time')[:period]
+            
+            number_counts = {i: 0 for i in range(1, 12)}
+            for result in results:
+                for number in result.numbers:
+                    number_counts[number] += 1
         
         # 计算理论平均出现次数
         theoretical_avg = period * 5 / 11  # 每期5个号码，共11个号码
@@ -543,21 +693,19 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
                 'avoid_cold': [item['number'] for item in comprehensive_cold[:3]],
                 'balanced': [item['number'] for item in comprehensive_normal[:5]],
             }
-        } 
-   def get_complete_trend_chart(self, limit: int = 30) -> Dict[str, Any]:
+        }
+    
+    def get_complete_trend_chart(self, limit: int = 30) -> Dict[str, Any]:
         """
         获取完整走势图数据
         """
-        cache_key = f'lottery11x5_complete_trend_{limit}'
-        cached_data = cache.get(cache_key)
+        cache_key = self._cache_key(f'lottery11x5_complete_trend_{limit}')
+        cached_data = CacheManager.get_cache(cache_key)
         if cached_data:
             return cached_data
         
         # 获取最近的开奖结果
-        results = Lottery11x5Result.objects.filter(
-            draw__game=self.game,
-            draw__status='COMPLETED'
-        ).select_related('draw').order_by('-draw__draw_time')[:limit]
+        results = self._get_recent_rows(limit)
         
         if not results:
             return {'error': '暂无开奖数据'}
@@ -578,7 +726,7 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         chart_data['statistics'] = self._calculate_chart_statistics(chart_data['rows'])
         
         # 缓存结果
-        cache.set(cache_key, chart_data, self.cache_timeout)
+        CacheManager.set_cache(cache_key, chart_data, self.cache_timeout)
         
         return chart_data
     
@@ -619,30 +767,31 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         
         return headers
     
-    def _generate_chart_row(self, result: Lottery11x5Result) -> Dict[str, Any]:
+    def _generate_chart_row(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成走势图数据行
         """
+        numbers = result['numbers']
         row = {
-            'draw_number': result.draw.draw_number,
-            'draw_time': result.draw.draw_time,
-            'numbers': result.numbers,
+            'draw_number': result['draw_number'],
+            'draw_time': result['draw_time'],
+            'numbers': numbers,
         }
         
         # 位置号码
-        for i, number in enumerate(result.numbers):
+        for i, number in enumerate(numbers):
             row[f'pos_{i+1}'] = number
         
         # 号码出现标记
         for num in range(1, 12):
-            row[f'num_{num}'] = num in result.numbers
+            row[f'num_{num}'] = num in numbers
         
         # 统计数据
         row.update({
-            'sum_value': result.sum_value,
-            'odd_even': f"{result.odd_count}:{result.even_count}",
-            'big_small': f"{result.big_count}:{result.small_count}",
-            'span_value': result.span_value,
+            'sum_value': result['sum_value'],
+            'odd_even': f"{result['odd_count']}:{result['even_count']}",
+            'big_small': f"{result['big_count']}:{result['small_count']}",
+            'span_value': result['span_value'],
         })
         
         return row
@@ -716,8 +865,8 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         """
         获取预测分析（基于历史规律）
         """
-        cache_key = f'lottery11x5_prediction_{limit}'
-        cached_data = cache.get(cache_key)
+        cache_key = self._cache_key(f'lottery11x5_prediction_{limit}')
+        cached_data = CacheManager.get_cache(cache_key)
         if cached_data:
             return cached_data
         
@@ -742,7 +891,7 @@ f get_missing_analysis(self, limit: int = 100) -> Dict[str, Any]:
         }
         
         # 缓存结果
-        cache.set(cache_key, prediction, self.cache_timeout // 2)  # 预测数据缓存时间短一些
+        CacheManager.set_cache(cache_key, prediction, self.cache_timeout // 2)  # 预测数据缓存时间短一些
         
         return prediction
     
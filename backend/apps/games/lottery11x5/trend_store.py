@@ -0,0 +1,244 @@
+"""
+11选5走势统计存储
+按游戏维护滚动统计状态，每期开奖O(1)增量更新，走势接口直接读取预计算结果
+"""
+
+from typing import Dict, List, Any, Optional
+from django.db import transaction
+
+from .models import Lottery11x5Result, Lottery11x5TrendState
+
+
+NUMBERS = range(1, 12)
+POSITIONS = range(1, 6)
+
+# 频率统计窗口
+FREQUENCY_WINDOWS = (10, 30, 50, 100)
+
+# 保留最近开奖记录数（窗口滑动及走势行数据）
+RECENT_LIMIT = max(FREQUENCY_WINDOWS)
+
+
+class Lottery11x5TrendStore:
+    """
+    11选5走势统计存储
+
+    状态结构（JSON键均为字符串）：
+    missing / max_missing：号码当前遗漏、最大遗漏（任意位置开出即为出现）
+    streaks：号码连出 {'current', 'max'}
+    position_missing / position_max_missing / position_streaks：按位置统计的同类数据
+    window_counts：最近10/30/50/100期号码出现次数
+    position_window_counts：最近10/30/50/100期各位置号码出现次数
+    recent：最近100期开奖记录（新到旧）
+    """
+
+    @staticmethod
+    def empty_state() -> Dict[str, Any]:
+        """
+        初始统计状态
+        """
+        def number_map(value=0):
+            return {str(num): value for num in NUMBERS}
+
+        def streak_map():
+            return {str(num): {'current': 0, 'max': 0} for num in NUMBERS}
+
+        return {
+            'missing': number_map(),
+            'max_missing': number_map(),
+            'streaks': streak_map(),
+            'position_missing': {str(pos): number_map() for pos in POSITIONS},
+            'position_max_missing': {str(pos): number_map() for pos in POSITIONS},
+            'position_streaks': {str(pos): streak_map() for pos in POSITIONS},
+            'window_counts': {str(window): number_map() for window in FREQUENCY_WINDOWS},
+            'position_window_counts': {
+                str(window): {str(pos): number_map() for pos in POSITIONS}
+                for window in FREQUENCY_WINDOWS
+            },
+            'recent': [],
+        }
+
+    @staticmethod
+    def build_row(draw_number: str, draw_time, numbers: List[int]) -> Dict[str, Any]:
+        """
+        生成开奖记录行
+        """
+        odd_count = sum(1 for num in numbers if num % 2 == 1)
+        big_count = sum(1 for num in numbers if num > 5)
+        return {
+            'draw_number': draw_number,
+            'draw_time': draw_time.isoformat() if hasattr(draw_time, 'isoformat') else draw_time,
+            'numbers': list(numbers),
+            'sum_value': sum(numbers),
+            'odd_count': odd_count,
+            'even_count': len(numbers) - odd_count,
+            'big_count': big_count,
+            'small_count': len(numbers) - big_count,
+            'span_value': max(numbers) - min(numbers) if numbers else 0,
+        }
+
+    @staticmethod
+    def apply_draw(state: Dict[str, Any], row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        将一期开奖计入统计状态（原地更新）
+        每期固定处理11个号码×5个位置及4个窗口，与历史期数无关
+        """
+        numbers = row['numbers']
+        drawn = set(numbers)
+
+        def step(missing, max_missing, streaks, hit_numbers):
+            for num in NUMBERS:
+                key = str(num)
+                streak = streaks[key]
+                if num in hit_numbers:
+                    missing[key] = 0
+                    streak['current'] += 1
+                    streak['max'] = max(streak['max'], streak['current'])
+                else:
+                    missing[key] += 1
+                    streak['current'] = 0
+                    max_missing[key] = max(max_missing[key], missing[key])
+
+        step(state['missing'], state['max_missing'], state['streaks'], drawn)
+
+        for pos in POSITIONS:
+            pos_key = str(pos)
+            hit = {numbers[pos - 1]} if len(numbers) >= pos else set()
+            step(
+                state['position_missing'][pos_key],
+                state['position_max_missing'][pos_key],
+                state['position_streaks'][pos_key],
+                hit
+            )
+
+        # 滑动窗口：计入新一期，扣除移出窗口的一期
+        recent = state['recent']
+        recent.insert(0, row)
+        for window in FREQUENCY_WINDOWS:
+            window_key = str(window)
+            counts = state['window_counts'][window_key]
+            position_counts = state['position_window_counts'][window_key]
+
+            for pos, num in enumerate(numbers, start=1):
+                counts[str(num)] += 1
+                position_counts[str(pos)][str(num)] += 1
+
+            if len(recent) > window:
+                for pos, num in enumerate(recent[window]['numbers'], start=1):
+                    counts[str(num)] -= 1
+                    position_counts[str(pos)][str(num)] -= 1
+
+        del recent[RECENT_LIMIT:]
+        return state
+
+    @staticmethod
+    def update(draw, winning_numbers: List[int]) -> Lottery11x5TrendState:
+        """
+        开奖后增量更新走势状态
+        同一期重复调用不会重复计入
+        """
+        with transaction.atomic():
+            trend_state, created = Lottery11x5TrendState.objects.select_for_update().get_or_create(
+                game=draw.game,
+                defaults={'state': Lottery11x5TrendStore.empty_state()}
+            )
+
+            if created and Lottery11x5Result.objects.filter(
+                draw__game=draw.game, draw__status='COMPLETED'
+            ).exclude(draw=draw).exists():
+                # 首次建立状态且已有历史数据，按历史重建
+                return Lottery11x5TrendStore.rebuild(draw.game)
+
+            if trend_state.last_draw_number == draw.draw_number:
+                return trend_state
+
+            row = Lottery11x5TrendStore.build_row(draw.draw_number, draw.draw_time, winning_numbers)
+            trend_state.state = Lottery11x5TrendStore.apply_draw(
+                trend_state.state or Lottery11x5TrendStore.empty_state(), row
+            )
+            trend_state.last_draw_number = draw.draw_number
+            trend_state.total_periods += 1
+            trend_state.save(update_fields=['state', 'last_draw_number', 'total_periods', 'updated_at'])
+
+        return trend_state
+
+    @staticmethod
+    def get_state(game) -> Lottery11x5TrendState:
+        """
+        获取走势状态，不存在时按历史开奖重建
+        """
+        trend_state = Lottery11x5TrendState.objects.filter(game=game).first()
+        if trend_state is None:
+            trend_state = Lottery11x5TrendStore.rebuild(game)
+        return trend_state
+
+    @staticmethod
+    def rebuild(game) -> Lottery11x5TrendState:
+        """
+        按历史开奖结果重建走势状态（用于首次上线或数据修复）
+        """
+        state = Lottery11x5TrendStore.empty_state()
+        total_periods = 0
+        last_draw_number = ''
+
+        results = Lottery11x5Result.objects.filter(
+            draw__game=game,
+            draw__status='COMPLETED'
+        ).select_related('draw').order_by('draw__draw_time')
+
+        for result in results.iterator(chunk_size=2000):
+            row = Lottery11x5TrendStore.build_row(
+                result.draw.draw_number, result.draw.draw_time, result.numbers
+            )
+            Lottery11x5TrendStore.apply_draw(state, row)
+            total_periods += 1
+            last_draw_number = result.draw.draw_number
+
+        trend_state, _ = Lottery11x5TrendState.objects.update_or_create(
+            game=game,
+            defaults={
+                'state': state,
+                'total_periods': total_periods,
+                'last_draw_number': last_draw_number,
+            }
+        )
+        return trend_state
+
+    @staticmethod
+    def recent_rows(trend_state: Lottery11x5TrendState, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取最近limit期开奖记录（新到旧），超出保留范围返回None
+        """
+        if limit > RECENT_LIMIT:
+            return None
+        return trend_state.state.get('recent', [])[:limit]
+
+    @staticmethod
+    def number_counts(trend_state: Lottery11x5TrendState, period: int,
+                      position: int = None) -> Optional[Dict[int, int]]:
+        """
+        获取最近period期号码出现次数（position指定时为该位置）
+        窗口期数直接读取预计算结果，其他期数由保留记录统计，超出保留范围返回None
+        """
+        state = trend_state.state
+        window_key = str(period)
+
+        if window_key in state.get('window_counts', {}):
+            if position is None:
+                counts = state['window_counts'][window_key]
+            else:
+                counts = state['position_window_counts'][window_key][str(position)]
+            return {num: counts[str(num)] for num in NUMBERS}
+
+        rows = Lottery11x5TrendStore.recent_rows(trend_state, period)
+        if rows is None:
+            return None
+
+        counts = {num: 0 for num in NUMBERS}
+        for row in rows:
+            if position is None:
+                for num in row['numbers']:
+                    counts[num] += 1
+            elif len(row['numbers']) >= position:
+                counts[row['numbers'][position - 1]] += 1
+        return counts
@@ -64,4 +64,5 @@ urlpatterns = [
     path('admin/create-draws/', views.admin_create_draws, name='admin_create_draws'),
     path('admin/close-draws/', views.admin_close_draws, name='admin_close_draws'),
     path('admin/profit-analysis/', views.profit_analysis, name='profit_analysis'),
+    path('admin/liability/<str:draw_id>/', views.draw_liability, name='draw_liability'),
 ]
\ No newline at end of file
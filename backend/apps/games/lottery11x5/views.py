@@ -11,6 +11,7 @@ from django.utils import timezone
 from django.core.cache import cache
 
 from apps.games.models import Game, Draw, BetType
+from apps.core.cache_manager import cache_api_response
 from .services import Lottery11x5Service, Lottery11x5DrawService
 from .serializers import (
     Lottery11x5BetSerializer,
@@ -21,6 +22,7 @@ from .serializers import (
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=300, scope='public', stale_timeout=60)
 def game_info(request):
     """
     获取11选5游戏信息
@@ -44,13 +46,9 @@ def game_info(request):
                     'name': game.name,
                     'code': game.code,
                     'game_type': game.game_type,
-                    'description': game.description,
-                    'rules': game.rules,
                     'min_bet': float(game.min_bet),
                     'max_bet': float(game.max_bet),
-                    'status': game.status,
-                    'icon': game.icon.url if game.icon else None,
-                    'banner': game.banner.url if game.banner else None,
+                    'is_active': game.is_active,
                 },
                 'config': {
                     'draw_count_per_day': config.draw_count_per_day if config else 7,
@@ -63,12 +61,10 @@ def game_info(request):
                         'id': str(bt.id),
                         'name': bt.name,
                         'code': bt.code,
-                        'description': bt.description,
                         'odds': float(bt.odds),
                         'min_bet': float(bt.min_bet),
                         'max_bet': float(bt.max_bet),
                         'max_payout': float(bt.max_payout),
-                        'rules': bt.rules,
                     }
                     for bt in bet_types
                 ]
@@ -122,6 +118,8 @@ def current_draw(request):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=30, scope='public', stale_timeout=30,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def recent_results(request):
     """
     获取最近开奖结果
@@ -146,6 +144,8 @@ def recent_results(request):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def hot_cold_numbers(request):
     """
     获取冷热号码统计
@@ -457,8 +457,8 @@ def calculate_bet(request):
         # 计算投注详情
         bet_details = Lottery11x5BetCalculator.calculate_bet_details(request.data)
         
-        # 获取优化建议
-        suggestions = Lottery11x5BetCalculator.suggest_bet_optimization(bet_details)
+        # 获取优化建议（需要投注方式、号码等请求参数）
+        suggestions = Lottery11x5BetCalculator.suggest_bet_optimization({**request.data, **bet_details})
         
         return Response({
             'success': True,
@@ -647,6 +647,8 @@ def generate_random_numbers(request):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def trend_analysis(request):
     """
     获取走势分析数据
@@ -692,6 +694,8 @@ def trend_analysis(request):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def position_trend(request, position):
     """
     获取位置走势
@@ -729,6 +733,8 @@ def position_trend(request, position):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def missing_analysis(request):
     """
     获取遗漏分析
@@ -761,6 +767,8 @@ def missing_analysis(request):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def complete_trend_chart(request):
     """
     获取完整走势图
@@ -793,6 +801,8 @@ def complete_trend_chart(request):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def prediction_analysis(request):
     """
     获取预测分析
@@ -825,6 +835,8 @@ def prediction_analysis(request):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60,
+                    tags=[Lottery11x5Service.DRAW_RESPONSE_TAG])
 def number_statistics(request):
     """
     获取号码统计信息
@@ -1171,12 +1183,15 @@ def profit_analysis(request):
         }, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        from apps.games.models import Draw, GameStatistics
+        from apps.games.profit_rollup import DrawProfitRollupService
         from .draw_engine import Lottery11x5ProfitController
         from datetime import timedelta
         
         # 获取查询参数
         days = int(request.GET.get('days', 7))
+        granularity = request.GET.get('granularity', 'DAY').upper()
+        if granularity not in DrawProfitRollupService.GRANULARITIES:
+            granularity = 'DAY'
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days-1)
         
@@ -1187,41 +1202,36 @@ def profit_analysis(request):
                 'message': '游戏不存在'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # 获取期间内的开奖数据
-        draws = Draw.objects.filter(
-            game=game,
-            status='COMPLETED',
-            draw_time__date__range=[start_date, end_date]
-        ).order_by('-draw_time')
-        
-        # 计算总体统计
-        total_draws = draws.count()
-        total_bets = sum(draw.total_bets for draw in draws)
-        total_amount = sum(draw.total_amount for draw in draws)
-        total_payout = sum(draw.total_payout for draw in draws)
-        total_profit = total_amount - total_payout
-        avg_profit_rate = (total_profit / total_amount * 100) if total_amount > 0 else 0
-        
-        # 每日统计
+        # 从盈亏汇总读取区间合计及各时段统计
+        rollup = DrawProfitRollupService.aggregate(game, start_date, end_date, granularity)
+        summary = rollup['summary']
+        
         daily_stats = []
-        for draw in draws:
+        for period in rollup['periods']:
             daily_stats.append({
-                'draw_number': draw.draw_number,
-                'draw_time': draw.draw_time,
-                'total_bets': draw.total_bets,
-                'total_amount': float(draw.total_amount),
-                'total_payout': float(draw.total_payout),
-                'profit': float(draw.profit),
-                'profit_rate': float((draw.profit / draw.total_amount * 100) if draw.total_amount > 0 else 0),
+                'period_start': period['period_start'],
+                'total_draws': period['total_draws'],
+                'total_bets': period['total_bets'],
+                'total_amount': float(period['total_amount']),
+                'total_payout': float(period['total_payout']),
+                'profit': float(period['profit']),
+                'profit_rate': float(period['profit_rate'] * 100),
             })
         
-        # 利润率分析
-        profit_rates = [float((draw.profit / draw.total_amount * 100) if draw.total_amount > 0 else 0) for draw in draws]
+        # 利润率分析（按时段利润率，时间正序）
+        profit_rates = [period['profit_rate'] for period in rollup['periods'] if period['total_amount'] > 0]
         
         profit_controller = Lottery11x5ProfitController()
-        adjustment_analysis = profit_controller.should_adjust_odds(
-            [Decimal(str(rate/100)) for rate in profit_rates]
-        )
+        adjustment_analysis = profit_controller.should_adjust_odds(profit_rates)
+        if 'current_avg_rate' not in adjustment_analysis:
+            adjustment_analysis = {
+                'should_adjust': False,
+                'current_avg_rate': Decimal('0.00'),
+                'target_rate': profit_controller.target_profit_rate,
+                'deviation_count': 0,
+                'adjustment_direction': None,
+                'suggested_adjustment': Decimal('0.00'),
+            }
         
         return Response({
             'success': True,
@@ -1229,15 +1239,16 @@ def profit_analysis(request):
                 'period': {
                     'start_date': start_date,
                     'end_date': end_date,
-                    'days': days
+                    'days': days,
+                    'granularity': granularity
                 },
                 'summary': {
-                    'total_draws': total_draws,
-                    'total_bets': total_bets,
-                    'total_amount': float(total_amount),
-                    'total_payout': float(total_payout),
-                    'total_profit': float(total_profit),
-                    'avg_profit_rate': float(avg_profit_rate),
+                    'total_draws': summary['total_draws'],
+                    'total_bets': summary['total_bets'],
+                    'total_amount': float(summary['total_amount']),
+                    'total_payout': float(summary['total_payout']),
+                    'total_profit': float(summary['profit']),
+                    'avg_profit_rate': float(summary['profit_rate'] * 100),
                     'target_profit_rate': 18.0,
                 },
                 'daily_stats': daily_stats,
@@ -1256,4 +1267,59 @@ def profit_analysis(request):
         return Response({
             'success': False,
             'message': f'获取利润分析失败: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def draw_liability(request, draw_id):
+    """
+    获取期次派彩负债分布（全部开奖结果）
+    """
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': '权限不足'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        from .draw_engine import Lottery11x5ProfitController
+        
+        profit_controller = Lottery11x5ProfitController()
+        distribution = profit_controller.analyze_outcome_distribution(draw_id)
+        
+        if 'error' in distribution:
+            return Response({
+                'success': False,
+                'message': f'获取负债分布失败: {distribution["error"]}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': {
+                'total_bets': distribution['total_bets'],
+                'total_amount': float(distribution['total_amount']),
+                'outcome_count': distribution['outcome_count'],
+                'min_payout': float(distribution['min_payout']),
+                'max_payout': float(distribution['max_payout']),
+                'expected_payout': float(distribution['expected_payout']),
+                'min_profit_rate': float(distribution['min_profit_rate'] * 100),
+                'max_profit_rate': float(distribution['max_profit_rate'] * 100),
+                'expected_profit_rate': float(distribution['expected_profit_rate'] * 100),
+                'profitable_outcome_ratio': distribution['profitable_outcome_ratio'],
+                'worst_outcomes': [
+                    {'numbers': item['numbers'], 'payout': float(item['payout'])}
+                    for item in distribution['worst_outcomes']
+                ],
+                'best_outcomes': [
+                    {'numbers': item['numbers'], 'payout': float(item['payout'])}
+                    for item in distribution['best_outcomes']
+                ],
+                'recommendation': distribution['recommendation'],
+            }
+        })
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'获取负债分布失败: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
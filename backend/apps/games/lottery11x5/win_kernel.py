@@ -0,0 +1,142 @@
+"""
+11选5批量判奖内核
+将投注编码为号码位掩码和定位数组，一次向量化计算整期投注的中奖结果
+判奖规则与 Lottery11x5Service.check_win 完全一致
+"""
+
+from typing import Dict, List, Any, Tuple
+from decimal import Decimal
+
+import numpy as np
+
+
+METHOD_POSITION = 0
+METHOD_ANY = 1
+METHOD_GROUP = 2
+METHOD_UNKNOWN = -1
+
+METHOD_CODES = {
+    'POSITION': METHOD_POSITION,
+    'ANY': METHOD_ANY,
+    'GROUP': METHOD_GROUP,
+}
+
+# 12位掩码（号码n对应第n位）的置位数查找表
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(1 << 12)], dtype=np.int8)
+
+
+class Lottery11x5WinKernel:
+    """
+    11选5批量判奖内核
+    """
+
+    @staticmethod
+    def encode_bets(bets: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        编码投注
+        bets 中每项字段与 check_win 参数相同：
+        bet_numbers, bet_method, positions, selected_count
+        """
+        count = len(bets)
+        max_positions = max(
+            (len(bet.get('positions') or []) for bet in bets
+             if bet['bet_method'] == 'POSITION'),
+            default=0
+        )
+        max_positions = max(max_positions, 1)
+
+        methods = np.full(count, METHOD_UNKNOWN, dtype=np.int8)
+        masks = np.zeros(count, dtype=np.int32)
+        required = np.zeros(count, dtype=np.int32)
+        # 定位胆：position_index 为开奖号码下标(0-4)，-1表示无效填充
+        position_index = np.full((count, max_positions), -1, dtype=np.int8)
+        position_numbers = np.zeros((count, max_positions), dtype=np.int16)
+
+        for row, bet in enumerate(bets):
+            method = METHOD_CODES.get(bet['bet_method'], METHOD_UNKNOWN)
+            methods[row] = method
+            numbers = bet['bet_numbers']
+
+            mask = 0
+            for number in numbers:
+                if 1 <= number <= 11:
+                    mask |= 1 << number
+            masks[row] = mask
+
+            if method == METHOD_POSITION:
+                for column, (pos, number) in enumerate(zip(bet.get('positions') or [], numbers)):
+                    if 1 <= pos <= 5:
+                        position_index[row, column] = pos - 1
+                        position_numbers[row, column] = number
+            elif method == METHOD_ANY:
+                required[row] = bet.get('selected_count', 0)
+            elif method == METHOD_GROUP:
+                required[row] = len(numbers)
+
+        return {
+            'methods': methods,
+            'masks': masks,
+            'required': required,
+            'position_index': position_index,
+            'position_numbers': position_numbers,
+        }
+
+    @staticmethod
+    def evaluate(encoded: Dict[str, np.ndarray], winning_numbers: List[int]) -> Dict[str, np.ndarray]:
+        """
+        向量化判奖
+        返回 match_counts（命中号码数）、is_win（是否中奖）、multipliers（派彩倍数）
+        """
+        methods = encoded['methods']
+
+        winning_mask = 0
+        for number in winning_numbers:
+            winning_mask |= 1 << number
+        match_counts = POPCOUNT_TABLE[encoded['masks'] & winning_mask].astype(np.int32)
+
+        # 定位胆：按位置比较开奖号码，统计命中位置数
+        winning_array = np.full(6, -1, dtype=np.int16)
+        winning_array[:len(winning_numbers[:5])] = winning_numbers[:5]
+        position_index = encoded['position_index']
+        valid = position_index >= 0
+        drawn = winning_array[np.where(valid, position_index, 5)]
+        position_hits = ((drawn == encoded['position_numbers']) & valid).sum(axis=1).astype(np.int32)
+
+        is_position = methods == METHOD_POSITION
+        is_match_type = (methods == METHOD_ANY) | (methods == METHOD_GROUP)
+
+        is_win = np.where(
+            is_position,
+            position_hits > 0,
+            is_match_type & (match_counts >= encoded['required'])
+        )
+        multipliers = np.where(is_position, position_hits, 1) * is_win
+
+        return {
+            'match_counts': match_counts,
+            'position_hits': position_hits,
+            'is_win': is_win,
+            'multipliers': multipliers.astype(np.int32),
+        }
+
+    @staticmethod
+    def check_win_batch(bets: List[Dict[str, Any]], winning_numbers: List[int]) -> List[Tuple[bool, Decimal]]:
+        """
+        批量检查中奖并计算奖金
+        返回值与逐注调用 check_win 的结果逐项相同
+        """
+        if not bets:
+            return []
+
+        encoded = Lottery11x5WinKernel.encode_bets(bets)
+        evaluation = Lottery11x5WinKernel.evaluate(encoded, winning_numbers)
+
+        results = [(False, Decimal('0.00'))] * len(bets)
+        multipliers = evaluation['multipliers']
+        for row in np.flatnonzero(evaluation['is_win']).tolist():
+            bet = bets[row]
+            # 奖金使用Decimal精确计算
+            win_amount = bet['bet_amount'] * bet['odds'] * int(multipliers[row]) * bet.get('multiple_count', 1)
+            results[row] = (True, win_amount)
+
+        return results
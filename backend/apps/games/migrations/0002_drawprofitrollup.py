@@ -0,0 +1,35 @@
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawProfitRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('HOUR', '小时'), ('DAY', '日')], max_length=10, verbose_name='粒度')),
+                ('period_start', models.DateTimeField(verbose_name='时段开始时间')),
+                ('total_draws', models.IntegerField(default=0, verbose_name='开奖期数')),
+                ('total_bets', models.IntegerField(default=0, verbose_name='投注笔数')),
+                ('total_winners', models.IntegerField(default=0, verbose_name='中奖笔数')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='投注金额')),
+                ('total_payout', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='派彩金额')),
+                ('profit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='利润')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profit_rollups', to='games.game', verbose_name='游戏')),
+            ],
+            options={
+                'verbose_name': '期次盈亏汇总',
+                'verbose_name_plural': '期次盈亏汇总',
+                'ordering': ['period_start'],
+                'unique_together': {('game', 'granularity', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0002_drawprofitrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['draw'], name='bet_draw_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+BET_STATUSES = ('PENDING', 'WON', 'LOST', 'CANCELLED')
+
+
+def uppercase_statuses(apps, schema_editor):
+    Bet = apps.get_model('games', 'Bet')
+    for status in BET_STATUSES:
+        Bet.objects.filter(status=status.lower()).update(status=status)
+
+
+def lowercase_statuses(apps, schema_editor):
+    Bet = apps.get_model('games', 'Bet')
+    for status in BET_STATUSES:
+        Bet.objects.filter(status=status).update(status=status.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0003_bet_draw_pending_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bet',
+            name='status',
+            field=models.CharField(choices=[('PENDING', '待开奖'), ('WON', '中奖'), ('LOST', '未中奖'), ('CANCELLED', '已取消')], default='PENDING', max_length=20, verbose_name='状态'),
+        ),
+        migrations.RunPython(uppercase_statuses, lowercase_statuses),
+    ]
@@ -0,0 +1,168 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:47
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# 原小写状态与11选5服务使用的状态对应关系
+DRAW_STATUS_MAP = {
+    'pending': 'OPEN',
+    'drawing': 'DRAWING',
+    'completed': 'COMPLETED',
+    'cancelled': 'CANCELLED',
+}
+
+
+def uppercase_draw_statuses(apps, schema_editor):
+    Draw = apps.get_model('games', 'Draw')
+    for old, new in DRAW_STATUS_MAP.items():
+        Draw.objects.filter(status=old).update(status=new)
+
+
+def lowercase_draw_statuses(apps, schema_editor):
+    Draw = apps.get_model('games', 'Draw')
+    Draw.objects.filter(status='CLOSED').update(status='pending')
+    for old, new in DRAW_STATUS_MAP.items():
+        Draw.objects.filter(status=new).update(status=old)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0004_bet_status_uppercase'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bet',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='单注金额'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='bet_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='投注时间'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='bet_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='games.bettype', verbose_name='投注类型'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='numbers',
+            field=models.JSONField(blank=True, default=list, verbose_name='投注号码'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='odds',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='赔率'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='payout',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='派彩金额'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='potential_payout',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='最高派彩'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='result',
+            field=models.JSONField(blank=True, null=True, verbose_name='结算结果'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='结算时间'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='transaction_id',
+            field=models.UUIDField(blank=True, null=True, verbose_name='投注交易ID'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='win_transaction_id',
+            field=models.UUIDField(blank=True, null=True, verbose_name='中奖交易ID'),
+        ),
+        migrations.AddField(
+            model_name='bettype',
+            name='max_bet',
+            field=models.DecimalField(decimal_places=2, default=Decimal('10000.00'), max_digits=10, verbose_name='最大投注金额'),
+        ),
+        migrations.AddField(
+            model_name='bettype',
+            name='max_payout',
+            field=models.DecimalField(decimal_places=2, default=Decimal('1000000.00'), max_digits=15, verbose_name='最高派彩'),
+        ),
+        migrations.AddField(
+            model_name='bettype',
+            name='min_bet',
+            field=models.DecimalField(decimal_places=2, default=Decimal('1.00'), max_digits=10, verbose_name='最小投注金额'),
+        ),
+        migrations.AddField(
+            model_name='draw',
+            name='close_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='封盘时间'),
+        ),
+        migrations.AddField(
+            model_name='draw',
+            name='profit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='利润'),
+        ),
+        migrations.AddField(
+            model_name='draw',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='投注金额'),
+        ),
+        migrations.AddField(
+            model_name='draw',
+            name='total_bets',
+            field=models.IntegerField(default=0, verbose_name='投注注数'),
+        ),
+        migrations.AddField(
+            model_name='draw',
+            name='total_payout',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='派彩金额'),
+        ),
+        migrations.AddField(
+            model_name='draw',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+        migrations.AddField(
+            model_name='draw',
+            name='winning_numbers',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='开奖号码'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='code',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50, verbose_name='游戏代码'),
+        ),
+        migrations.AlterField(
+            model_name='bet',
+            name='bet_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='投注金额'),
+        ),
+        migrations.AlterField(
+            model_name='bet',
+            name='bet_content',
+            field=models.JSONField(blank=True, default=dict, verbose_name='投注内容'),
+        ),
+        migrations.AlterField(
+            model_name='bet',
+            name='potential_win',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='可能赢取金额'),
+        ),
+        migrations.AlterField(
+            model_name='draw',
+            name='status',
+            field=models.CharField(choices=[('OPEN', '投注中'), ('CLOSED', '已封盘'), ('DRAWING', '开奖中'), ('COMPLETED', '已开奖'), ('CANCELLED', '已取消')], default='OPEN', max_length=20, verbose_name='状态'),
+        ),
+        migrations.RunPython(uppercase_draw_statuses, lowercase_draw_statuses),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_lottery_draw_bet_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bettype',
+            name='sort_order',
+            field=models.IntegerField(default=0, verbose_name='排序'),
+        ),
+    ]
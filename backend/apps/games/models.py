@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from decimal import Decimal
 
 User = get_user_model()
@@ -15,6 +16,7 @@ class Game(models.Model):
     ]
     
     name = models.CharField('游戏名称', max_length=100)
+    code = models.CharField('游戏代码', max_length=50, blank=True, default='', db_index=True)
     game_type = models.CharField('游戏类型', max_length=20, choices=GAME_TYPES)
     is_active = models.BooleanField('是否启用', default=True)
     min_bet = models.DecimalField('最小投注金额', max_digits=10, decimal_places=2, default=Decimal('1.00'))
@@ -33,18 +35,26 @@ class Game(models.Model):
 class Draw(models.Model):
     """开奖基础模型"""
     STATUS_CHOICES = [
-        ('pending', '待开奖'),
-        ('drawing', '开奖中'),
-        ('completed', '已开奖'),
-        ('cancelled', '已取消'),
+        ('OPEN', '投注中'),
+        ('CLOSED', '已封盘'),
+        ('DRAWING', '开奖中'),
+        ('COMPLETED', '已开奖'),
+        ('CANCELLED', '已取消'),
     ]
     
     game = models.ForeignKey(Game, on_delete=models.CASCADE, verbose_name='游戏')
     draw_number = models.CharField('期号', max_length=50)
     draw_time = models.DateTimeField('开奖时间')
+    close_time = models.DateTimeField('封盘时间', null=True, blank=True)
     result = models.JSONField('开奖结果', null=True, blank=True)
-    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default='pending')
+    winning_numbers = models.CharField('开奖号码', max_length=100, blank=True, default='')
+    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    total_bets = models.IntegerField('投注注数', default=0)
+    total_amount = models.DecimalField('投注金额', max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    total_payout = models.DecimalField('派彩金额', max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    profit = models.DecimalField('利润', max_digits=15, decimal_places=2, default=Decimal('0.00'))
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
     
     class Meta:
         verbose_name = '开奖'
@@ -53,6 +63,20 @@ class Draw(models.Model):
         
     def __str__(self):
         return f"{self.game.name} - {self.draw_number}"
+    
+    def is_open_for_betting(self):
+        """是否可投注"""
+        return self.status == 'OPEN' and self.close_time is not None and self.close_time > timezone.now()
+    
+    def time_until_close(self):
+        """距封盘秒数"""
+        if self.close_time is None:
+            return 0
+        return max(0, int((self.close_time - timezone.now()).total_seconds()))
+    
+    def time_until_draw(self):
+        """距开奖秒数"""
+        return max(0, int((self.draw_time - timezone.now()).total_seconds()))
 
 
 class BetType(models.Model):
@@ -61,7 +85,11 @@ class BetType(models.Model):
     name = models.CharField('投注类型名称', max_length=100)
     code = models.CharField('投注类型代码', max_length=50)
     odds = models.DecimalField('赔率', max_digits=10, decimal_places=2)
+    min_bet = models.DecimalField('最小投注金额', max_digits=10, decimal_places=2, default=Decimal('1.00'))
+    max_bet = models.DecimalField('最大投注金额', max_digits=10, decimal_places=2, default=Decimal('10000.00'))
+    max_payout = models.DecimalField('最高派彩', max_digits=15, decimal_places=2, default=Decimal('1000000.00'))
     is_active = models.BooleanField('是否启用', default=True)
+    sort_order = models.IntegerField('排序', default=0)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     
     class Meta:
@@ -76,25 +104,75 @@ class BetType(models.Model):
 class Bet(models.Model):
     """投注基础模型"""
     STATUS_CHOICES = [
-        ('pending', '待开奖'),
-        ('won', '中奖'),
-        ('lost', '未中奖'),
-        ('cancelled', '已取消'),
+        ('PENDING', '待开奖'),
+        ('WON', '中奖'),
+        ('LOST', '未中奖'),
+        ('CANCELLED', '已取消'),
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户')
     game = models.ForeignKey(Game, on_delete=models.CASCADE, verbose_name='游戏')
     draw = models.ForeignKey(Draw, on_delete=models.CASCADE, verbose_name='期次')
-    bet_content = models.JSONField('投注内容')
-    bet_amount = models.DecimalField('投注金额', max_digits=10, decimal_places=2)
-    potential_win = models.DecimalField('可能赢取金额', max_digits=10, decimal_places=2)
+    bet_type = models.ForeignKey(BetType, on_delete=models.PROTECT, null=True, blank=True, verbose_name='投注类型')
+    bet_content = models.JSONField('投注内容', default=dict, blank=True)
+    bet_amount = models.DecimalField('投注金额', max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    potential_win = models.DecimalField('可能赢取金额', max_digits=15, decimal_places=2, default=Decimal('0.00'))
     actual_win = models.DecimalField('实际赢取金额', max_digits=10, decimal_places=2, default=Decimal('0.00'))
-    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default='pending')
+    # 彩票投注明细：单注金额、赔率、结算结果
+    numbers = models.JSONField('投注号码', default=list, blank=True)
+    amount = models.DecimalField('单注金额', max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    odds = models.DecimalField('赔率', max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    potential_payout = models.DecimalField('最高派彩', max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    payout = models.DecimalField('派彩金额', max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    result = models.JSONField('结算结果', null=True, blank=True)
+    transaction_id = models.UUIDField('投注交易ID', null=True, blank=True)
+    win_transaction_id = models.UUIDField('中奖交易ID', null=True, blank=True)
+    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    bet_time = models.DateTimeField('投注时间', default=timezone.now)
+    settled_at = models.DateTimeField('结算时间', null=True, blank=True)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     
     class Meta:
         verbose_name = '投注'
         verbose_name_plural = '投注'
+        indexes = [
+            # 开奖结算按期次读取待开奖投注
+            models.Index(fields=['draw'], condition=models.Q(status='PENDING'), name='bet_draw_pending_idx'),
+        ]
         
     def __str__(self):
-        return f"{self.user.username} - {self.game.name} - {self.bet_amount}"
\ No newline at end of file
+        return f"{self.user.username} - {self.game.name} - {self.bet_amount}"
+
+class DrawProfitRollup(models.Model):
+    """期次盈亏汇总模型（按游戏、小时/日聚合，结算时增量更新）"""
+    GRANULARITY_CHOICES = [
+        ('HOUR', '小时'),
+        ('DAY', '日'),
+    ]
+    
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, verbose_name='游戏', related_name='profit_rollups')
+    granularity = models.CharField('粒度', max_length=10, choices=GRANULARITY_CHOICES)
+    period_start = models.DateTimeField('时段开始时间')
+    total_draws = models.IntegerField('开奖期数', default=0)
+    total_bets = models.IntegerField('投注笔数', default=0)
+    total_winners = models.IntegerField('中奖笔数', default=0)
+    total_amount = models.DecimalField('投注金额', max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    total_payout = models.DecimalField('派彩金额', max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    profit = models.DecimalField('利润', max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+    
+    class Meta:
+        verbose_name = '期次盈亏汇总'
+        verbose_name_plural = '期次盈亏汇总'
+        unique_together = ['game', 'granularity', 'period_start']
+        ordering = ['period_start']
+        
+    def __str__(self):
+        return f"{self.game.name} - {self.get_granularity_display()} - {self.period_start}"
+    
+    @property
+    def profit_rate(self):
+        """利润率（小数）"""
+        if self.total_amount > 0:
+            return self.profit / self.total_amount
+        return Decimal('0.00')
@@ -0,0 +1,185 @@
+"""
+期次盈亏汇总服务
+结算时按游戏将每期投注额、派彩计入小时/日汇总行，利润分析按汇总行查询，耗时与时间跨度内期数无关
+"""
+
+import logging
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+from typing import Dict, List, Any, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, F
+from django.utils import timezone
+
+from .models import DrawProfitRollup
+
+logger = logging.getLogger(__name__)
+
+
+class DrawProfitRollupService:
+    """
+    期次盈亏汇总服务
+    """
+
+    GRANULARITIES = ('HOUR', 'DAY')
+
+    @staticmethod
+    def get_period_start(draw_time: datetime, granularity: str) -> datetime:
+        """
+        获取开奖时间所属时段的开始时间（按本地时区划分小时/日）
+        """
+        local_time = timezone.localtime(draw_time) if timezone.is_aware(draw_time) else draw_time
+        if granularity == 'HOUR':
+            return local_time.replace(minute=0, second=0, microsecond=0)
+        return local_time.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def record_draw(game, draw_time: datetime, total_bets: int, total_amount: Decimal,
+                    total_payout: Decimal, total_winners: int = 0):
+        """
+        将一期结算结果计入小时、日汇总
+        需在结算事务内调用，每期只计入一次
+        """
+        total_amount = total_amount or Decimal('0.00')
+        total_payout = total_payout or Decimal('0.00')
+
+        with transaction.atomic():
+            for granularity in DrawProfitRollupService.GRANULARITIES:
+                period_start = DrawProfitRollupService.get_period_start(draw_time, granularity)
+                rollup, _ = DrawProfitRollup.objects.get_or_create(
+                    game=game,
+                    granularity=granularity,
+                    period_start=period_start
+                )
+                # 原子累加，避免并发结算互相覆盖
+                DrawProfitRollup.objects.filter(pk=rollup.pk).update(
+                    total_draws=F('total_draws') + 1,
+                    total_bets=F('total_bets') + (total_bets or 0),
+                    total_winners=F('total_winners') + (total_winners or 0),
+                    total_amount=F('total_amount') + total_amount,
+                    total_payout=F('total_payout') + total_payout,
+                    profit=F('profit') + (total_amount - total_payout),
+                    updated_at=timezone.now()
+                )
+
+    @staticmethod
+    def get_rollups(game, start_date: date, end_date: date, granularity: str = 'DAY'):
+        """
+        获取日期范围内的汇总行（含首尾两天）
+        """
+        start = DrawProfitRollupService._start_of_day(start_date)
+        end = DrawProfitRollupService._start_of_day(end_date + timedelta(days=1))
+        return DrawProfitRollup.objects.filter(
+            game=game,
+            granularity=granularity,
+            period_start__gte=start,
+            period_start__lt=end
+        ).order_by('period_start')
+
+    @staticmethod
+    def aggregate(game, start_date: date, end_date: date, granularity: str = 'DAY') -> Dict[str, Any]:
+        """
+        汇总查询
+        返回区间合计及各时段明细（时段按时间正序）
+        """
+        rollups = DrawProfitRollupService.get_rollups(game, start_date, end_date, granularity)
+
+        totals = rollups.aggregate(
+            total_draws=Sum('total_draws'),
+            total_bets=Sum('total_bets'),
+            total_winners=Sum('total_winners'),
+            total_amount=Sum('total_amount'),
+            total_payout=Sum('total_payout'),
+            profit=Sum('profit'),
+        )
+        total_amount = totals['total_amount'] or Decimal('0.00')
+        profit = totals['profit'] or Decimal('0.00')
+
+        return {
+            'summary': {
+                'total_draws': totals['total_draws'] or 0,
+                'total_bets': totals['total_bets'] or 0,
+                'total_winners': totals['total_winners'] or 0,
+                'total_amount': total_amount,
+                'total_payout': totals['total_payout'] or Decimal('0.00'),
+                'profit': profit,
+                'profit_rate': (profit / total_amount) if total_amount > 0 else Decimal('0.00'),
+            },
+            'periods': [
+                DrawProfitRollupService._serialize(rollup) for rollup in rollups
+            ],
+        }
+
+    @staticmethod
+    def recent_profit_rates(game, granularity: str = 'HOUR', limit: int = 30) -> List[Decimal]:
+        """
+        获取最近limit个有投注时段的利润率（时间正序，最新在末尾）
+        """
+        rollups = DrawProfitRollup.objects.filter(
+            game=game,
+            granularity=granularity,
+            total_amount__gt=0
+        ).order_by('-period_start')[:limit]
+        return [rollup.profit_rate for rollup in reversed(list(rollups))]
+
+    @staticmethod
+    def rebuild(game, draws, granularity: Optional[str] = None) -> int:
+        """
+        按已结算期次重建汇总（用于历史数据回填或数据修复）
+        draws 为该游戏已结算期次的可迭代对象，元素需提供 draw_time、total_bets、total_amount、total_payout
+        返回写入的汇总行数
+        """
+        granularities = [granularity] if granularity else list(DrawProfitRollupService.GRANULARITIES)
+        buckets: Dict[tuple, Dict[str, Any]] = {}
+
+        for draw in draws:
+            for item in granularities:
+                key = (item, DrawProfitRollupService.get_period_start(draw.draw_time, item))
+                bucket = buckets.setdefault(key, {
+                    'total_draws': 0,
+                    'total_bets': 0,
+                    'total_winners': 0,
+                    'total_amount': Decimal('0.00'),
+                    'total_payout': Decimal('0.00'),
+                })
+                bucket['total_draws'] += 1
+                bucket['total_bets'] += getattr(draw, 'total_bets', 0) or 0
+                bucket['total_winners'] += getattr(draw, 'total_winners', 0) or 0
+                bucket['total_amount'] += draw.total_amount or Decimal('0.00')
+                bucket['total_payout'] += draw.total_payout or Decimal('0.00')
+
+        with transaction.atomic():
+            DrawProfitRollup.objects.filter(game=game, granularity__in=granularities).delete()
+            DrawProfitRollup.objects.bulk_create([
+                DrawProfitRollup(
+                    game=game,
+                    granularity=item,
+                    period_start=period_start,
+                    profit=bucket['total_amount'] - bucket['total_payout'],
+                    **bucket
+                )
+                for (item, period_start), bucket in buckets.items()
+            ], batch_size=1000)
+
+        logger.info(f"{game.name} 盈亏汇总重建完成: {len(buckets)} 行")
+        return len(buckets)
+
+    @staticmethod
+    def _start_of_day(day: date) -> datetime:
+        start = datetime.combine(day, time.min)
+        return timezone.make_aware(start) if settings.USE_TZ else start
+
+    @staticmethod
+    def _serialize(rollup: DrawProfitRollup) -> Dict[str, Any]:
+        return {
+            'period_start': rollup.period_start,
+            'total_draws': rollup.total_draws,
+            'total_bets': rollup.total_bets,
+            'total_winners': rollup.total_winners,
+            'total_amount': rollup.total_amount,
+            'total_payout': rollup.total_payout,
+            'profit': rollup.profit,
+            'profit_rate': rollup.profit_rate,
+        }
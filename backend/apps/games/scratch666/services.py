@@ -12,6 +12,7 @@ from django.core.cache import cache
 
 from apps.games.models import Game
 from apps.finance.models import Transaction, UserBalance
+from apps.rewards.turnover import DailyTurnoverService
 from .models import Scratch666Game, ScratchCard, ScratchStatistics, UserScratchPreference
 
 
@@ -75,7 +76,8 @@ class Scratch666Service:
             
             with transaction.atomic():
                 # 扣除余额
-                balance.deduct_balance(config.card_price, 'available', f'购买刮刮乐 {config.game.name}')
+                if not balance.deduct_balance(config.card_price, 'available', f'购买刮刮乐 {config.game.name}'):
+                    raise ValueError('扣除余额失败')
                 
                 # 创建购买交易记录
                 purchase_transaction = Transaction.objects.create(
@@ -293,6 +295,9 @@ class Scratch666Service:
         """
         处理卡片完成刮奖
         """
+        # 卡片刮开即计入当日有效流水
+        DailyTurnoverService.record(card.user_id, 'scratch666', card.price, card.purchased_at)
+        
         if not card.is_winner or card.total_winnings <= 0:
             return {
                 'is_winner': False,
@@ -497,8 +502,9 @@ class Scratch666Service:
             return {
                 'success': False,
                 'message': f'更新偏好设置失败: {str(e)}'
-            }  
-  @staticmethod
+            }
+    
+    @staticmethod
     def auto_scratch(user, count: int = 10, stop_on_win: bool = True) -> Dict[str, Any]:
         """
         自动连刮功能
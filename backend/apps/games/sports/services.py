@@ -13,6 +13,7 @@ from django.conf import settings
 import logging
 
 from apps.finance.models import Transaction, UserBalance
+from apps.rewards.turnover import DailyTurnoverService
 from .models import (
     SportsProvider, UserSportsWallet, SportsWalletTransaction,
     SportsBetRecord, SportsStatistics, SportsProviderConfig
@@ -192,7 +193,8 @@ class SportsProviderService:
             
             with transaction.atomic():
                 # 从主钱包扣除
-                main_balance.deduct_balance(amount, 'available', f'转账到{provider.name}')
+                if not main_balance.deduct_balance(amount, 'available', f'转账到{provider.name}'):
+                    raise ValueError('扣除余额失败')
                 
                 # 创建主钱包交易记录
                 main_transaction = Transaction.objects.create(
@@ -669,6 +671,9 @@ class SportsProviderService:
             bet_records = api_result['data']
             synced_count = 0
             
+            # 计入有效流水的结算状态
+            SETTLED_STATUSES = ('WON', 'LOST')
+            
             for record_data in bet_records:
                 try:
                     # 检查记录是否已存在
@@ -676,35 +681,45 @@ class SportsProviderService:
                         platform_bet_id=record_data['bet_id']
                     ).first()
                     
-                    if existing_record:
-                        # 更新现有记录
-                        existing_record.status = record_data['status']
-                        existing_record.actual_win = Decimal(str(record_data.get('actual_win', 0)))
-                        existing_record.settle_time = record_data.get('settle_time')
-                        existing_record.save()
-                    else:
-                        # 创建新记录
-                        user = User.objects.get(id=record_data['user_id'])
+                    with transaction.atomic():
+                        if existing_record:
+                            # 更新现有记录
+                            was_settled = existing_record.status in SETTLED_STATUSES
+                            existing_record.status = record_data['status']
+                            existing_record.actual_win = Decimal(str(record_data.get('actual_win', 0)))
+                            existing_record.settle_time = record_data.get('settle_time')
+                            existing_record.save()
+                            bet_record = existing_record
+                        else:
+                            # 创建新记录
+                            was_settled = False
+                            user = User.objects.get(id=record_data['user_id'])
+                            
+                            bet_record = SportsBetRecord.objects.create(
+                                user=user,
+                                provider=provider,
+                                platform_bet_id=record_data['bet_id'],
+                                platform_user_id=record_data['platform_user_id'],
+                                sport_type=record_data['sport_type'],
+                                league=record_data.get('league', ''),
+                                match_info=record_data.get('match_info', {}),
+                                bet_type=record_data['bet_type'],
+                                bet_details=record_data.get('bet_details', {}),
+                                bet_amount=Decimal(str(record_data['bet_amount'])),
+                                potential_win=Decimal(str(record_data.get('potential_win', 0))),
+                                actual_win=Decimal(str(record_data.get('actual_win', 0))),
+                                odds=Decimal(str(record_data.get('odds', 1.0))),
+                                status=record_data['status'],
+                                bet_time=record_data['bet_time'],
+                                settle_time=record_data.get('settle_time'),
+                                match_time=record_data.get('match_time'),
+                            )
                         
-                        SportsBetRecord.objects.create(
-                            user=user,
-                            provider=provider,
-                            platform_bet_id=record_data['bet_id'],
-                            platform_user_id=record_data['platform_user_id'],
-                            sport_type=record_data['sport_type'],
-                            league=record_data.get('league', ''),
-                            match_info=record_data.get('match_info', {}),
-                            bet_type=record_data['bet_type'],
-                            bet_details=record_data.get('bet_details', {}),
-                            bet_amount=Decimal(str(record_data['bet_amount'])),
-                            potential_win=Decimal(str(record_data.get('potential_win', 0))),
-                            actual_win=Decimal(str(record_data.get('actual_win', 0))),
-                            odds=Decimal(str(record_data.get('odds', 1.0))),
-                            status=record_data['status'],
-                            bet_time=record_data['bet_time'],
-                            settle_time=record_data.get('settle_time'),
-                            match_time=record_data.get('match_time'),
-                        )
+                        # 首次同步到结算状态时计入当日有效流水
+                        if not was_settled and bet_record.status in SETTLED_STATUSES:
+                            DailyTurnoverService.record(
+                                bet_record.user_id, 'sports', bet_record.bet_amount, bet_record.bet_time
+                            )
                     
                     synced_count += 1
                     
@@ -0,0 +1,79 @@
+"""
+大乐透复式/胆拖中奖计算基准测试
+对比逐注枚举与组合数计算
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.games.superlotto.prize_evaluator import SuperLottoPrizeEvaluator
+
+
+class Command(BaseCommand):
+    help = '大乐透复式/胆拖中奖计算基准测试（逐注枚举 vs 组合数计算）'
+
+    # (名称, 前区胆码数, 前区拖码数, 后区胆码数, 后区拖码数)
+    TICKET_SHAPES = [
+        ('复式 7+3', 0, 7, 0, 3),
+        ('复式 10+5', 0, 10, 0, 5),
+        ('复式 15+12', 0, 15, 0, 12),
+        ('胆拖 2胆10拖+1胆6拖', 2, 10, 1, 6),
+        ('胆拖 4胆20拖+1胆11拖', 4, 20, 1, 11),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tickets',
+            type=int,
+            default=20,
+            help='每种号码形态的投注数',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=25008,
+            help='随机种子',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        ticket_count = options['tickets']
+
+        self.stdout.write(f'{"号码形态":<24}{"拆分注数":>10}{"逐注枚举":>12}{"组合数计算":>12}{"加速比":>10}')
+
+        for name, front_dan_count, front_tuo_count, back_dan_count, back_tuo_count in self.TICKET_SHAPES:
+            tickets = []
+            for _ in range(ticket_count):
+                front = rng.sample(range(1, 36), front_dan_count + front_tuo_count)
+                back = rng.sample(range(1, 13), back_dan_count + back_tuo_count)
+                winning_front = sorted(rng.sample(range(1, 36), 5))
+                winning_back = sorted(rng.sample(range(1, 13), 2))
+                tickets.append((
+                    front[:front_dan_count], front[front_dan_count:],
+                    back[:back_dan_count], back[back_dan_count:],
+                    winning_front, winning_back,
+                ))
+
+            start = time.perf_counter()
+            expected = [SuperLottoPrizeEvaluator.enumerate_prize_levels(*ticket) for ticket in tickets]
+            enumerate_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = [SuperLottoPrizeEvaluator.evaluate(*ticket)['prize_levels'] for ticket in tickets]
+            evaluate_elapsed = time.perf_counter() - start
+
+            if results != expected:
+                self.stdout.write(self.style.ERROR(f'{name}: 组合数计算结果与逐注枚举不一致'))
+                continue
+
+            from math import comb
+            sub_tickets = comb(front_tuo_count, 5 - front_dan_count) * comb(back_tuo_count, 2 - back_dan_count)
+            speedup = enumerate_elapsed / evaluate_elapsed if evaluate_elapsed > 0 else 0
+            self.stdout.write(
+                f'{name:<24}{sub_tickets:>10}{enumerate_elapsed / ticket_count * 1000:>10.3f}ms'
+                f'{evaluate_elapsed / ticket_count * 1000:>10.3f}ms{speedup:>9.0f}x'
+            )
+
+        self.stdout.write(self.style.SUCCESS('基准测试完成'))
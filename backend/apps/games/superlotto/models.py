@@ -408,4 +408,91 @@ class SuperLottoStatistics(models.Model):
         """计算派彩率"""
         if self.total_sales_amount > 0:
             return float(self.total_winning_amount / self.total_sales_amount * 100)
-        return 0.0
\ No newline at end of file
+        return 0.0
+
+class SuperLottoSettlementJob(models.Model):
+    """
+    大乐透期次结算任务
+    投注按ID区间划分为批次，cursor记录已划分到的最后投注ID，中断后可继续
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    draw = models.OneToOneField(SuperLottoDraw, on_delete=models.CASCADE, related_name='settlement_job')
+    
+    STATUS_CHOICES = [
+        ('PLANNING', '划分批次中'),
+        ('RUNNING', '结算中'),
+        ('COMPLETED', '已完成'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PLANNING')
+    
+    # 批次信息
+    chunk_size = models.IntegerField(default=2000, help_text="每批投注数")
+    cursor = models.CharField(max_length=36, blank=True, default='', help_text="已划分批次的最后投注ID")
+    total_bets = models.IntegerField(default=0, help_text="待结算投注数")
+    total_chunks = models.IntegerField(default=0, help_text="批次数")
+    completed_chunks = models.IntegerField(default=0, help_text="已完成批次数")
+    
+    # 汇总结果
+    result = models.JSONField(default=dict, blank=True, help_text="结算汇总")
+    
+    # 时间戳
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'superlotto_settlement_job'
+        verbose_name = '大乐透结算任务'
+        verbose_name_plural = '大乐透结算任务'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.draw.draw_number}期结算 - {self.get_status_display()}"
+
+
+class SuperLottoSettlementChunk(models.Model):
+    """
+    大乐透结算批次
+    每批在一个事务内完成结算、派奖和分项统计，已完成批次重复执行直接跳过
+    """
+    job = models.ForeignKey(SuperLottoSettlementJob, on_delete=models.CASCADE, related_name='chunks')
+    chunk_index = models.IntegerField(help_text="批次序号")
+    
+    # 投注ID区间（含两端）
+    first_bet_id = models.UUIDField(help_text="起始投注ID")
+    last_bet_id = models.UUIDField(help_text="结束投注ID")
+    bet_count = models.IntegerField(default=0, help_text="投注数")
+    
+    STATUS_CHOICES = [
+        ('PENDING', '待处理'),
+        ('COMPLETED', '已完成'),
+        ('FAILED', '失败'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0, help_text="执行次数")
+    error_message = models.TextField(blank=True, default='')
+    
+    # 分项统计
+    settled_bets = models.IntegerField(default=0, help_text="已结算投注数")
+    winning_bets = models.IntegerField(default=0, help_text="中奖投注数")
+    winning_amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    prize_stats = models.JSONField(default=dict, blank=True, help_text="各奖级中奖注数及金额")
+    
+    # 时间戳
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'superlotto_settlement_chunk'
+        verbose_name = '大乐透结算批次'
+        verbose_name_plural = '大乐透结算批次'
+        unique_together = ['job', 'chunk_index']
+        indexes = [
+            models.Index(fields=['job', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.job.draw.draw_number}期 第{self.chunk_index + 1}批 - {self.get_status_display()}"
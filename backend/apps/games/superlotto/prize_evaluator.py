@@ -0,0 +1,154 @@
+"""
+大乐透复式/胆拖中奖计算器
+按前后区命中、未命中号码数用组合数直接统计各奖级中奖注数，无需逐注枚举
+"""
+
+from itertools import combinations
+from math import comb
+from typing import Dict, List, Optional, Tuple
+
+
+# 单注选号数量
+FRONT_PICK = 5
+BACK_PICK = 2
+
+
+class SuperLottoPrizeEvaluator:
+    """
+    大乐透中奖计算器
+    """
+
+    @staticmethod
+    def zone_match_distribution(dan: List[int], tuo: List[int], winning: List[int], pick: int) -> Dict[int, int]:
+        """
+        计算单区所有拆分组合的命中分布
+        胆码全部入选，从拖码中再选 pick-len(dan) 个；
+        命中k个拖码的组合数为 C(拖码命中数, k) × C(拖码未中数, 需选数-k)
+        返回 {命中号码数: 组合数}
+        """
+        dan = dan or []
+        tuo = tuo or []
+        need = pick - len(dan)
+        if need < 0 or need > len(tuo):
+            return {}
+
+        winning_set = set(winning or [])
+        dan_hits = sum(1 for num in dan if num in winning_set)
+        tuo_hits = sum(1 for num in tuo if num in winning_set)
+        tuo_misses = len(tuo) - tuo_hits
+
+        distribution = {}
+        for k in range(min(need, tuo_hits) + 1):
+            count = comb(tuo_hits, k) * comb(tuo_misses, need - k)
+            if count:
+                distribution[dan_hits + k] = count
+        return distribution
+
+    @staticmethod
+    def evaluate(front_dan: List[int], front_tuo: List[int], back_dan: List[int], back_tuo: List[int],
+                 winning_front: List[int], winning_back: List[int]) -> Dict[str, object]:
+        """
+        计算胆拖（复式为无胆码的胆拖）投注在各奖级的中奖注数
+        返回：
+        prize_levels {奖级: 中奖注数}
+        match_counts {(前区命中, 后区命中): 注数}
+        best_level 最高奖级
+        """
+        from .services import SuperLottoService
+
+        front_distribution = SuperLottoPrizeEvaluator.zone_match_distribution(
+            front_dan, front_tuo, winning_front, FRONT_PICK
+        )
+        back_distribution = SuperLottoPrizeEvaluator.zone_match_distribution(
+            back_dan, back_tuo, winning_back, BACK_PICK
+        )
+
+        prize_levels: Dict[int, int] = {}
+        match_counts: Dict[Tuple[int, int], int] = {}
+        for front_match, front_count in front_distribution.items():
+            for back_match, back_count in back_distribution.items():
+                count = front_count * back_count
+                match_counts[(front_match, back_match)] = count
+
+                level = SuperLottoService._get_prize_level(front_match, back_match)
+                if level is not None:
+                    prize_levels[level] = prize_levels.get(level, 0) + count
+
+        return {
+            'prize_levels': dict(sorted(prize_levels.items())),
+            'match_counts': match_counts,
+            'best_level': min(prize_levels) if prize_levels else None,
+        }
+
+    @staticmethod
+    def evaluate_bet(bet, winning_front: List[int], winning_back: List[int]) -> Dict[str, object]:
+        """
+        计算投注记录在各奖级的中奖注数
+        """
+        if bet.bet_type == 'SYSTEM':
+            return SuperLottoPrizeEvaluator.evaluate(
+                bet.front_dan_numbers, bet.front_tuo_numbers,
+                bet.back_dan_numbers, bet.back_tuo_numbers,
+                winning_front, winning_back
+            )
+
+        # 单式、复式：全部号码作为拖码
+        return SuperLottoPrizeEvaluator.evaluate(
+            [], bet.front_numbers, [], bet.back_numbers,
+            winning_front, winning_back
+        )
+
+    @staticmethod
+    def best_match(evaluation: Dict[str, object]) -> Optional[Tuple[int, int]]:
+        """
+        获取最高奖级对应的（前区命中, 后区命中）
+        """
+        from .services import SuperLottoService
+
+        best_level = evaluation['best_level']
+        if best_level is None:
+            return None
+
+        candidates = [
+            match for match in evaluation['match_counts']
+            if SuperLottoService._get_prize_level(*match) == best_level
+        ]
+        return max(candidates)
+
+    @staticmethod
+    def build_ticket(dan: List[int], tuo: List[int], winning: List[int], pick: int, matches: int) -> List[int]:
+        """
+        构造一个命中指定数量的拆分单注号码
+        """
+        dan = list(dan or [])
+        winning_set = set(winning or [])
+        tuo_hits = [num for num in (tuo or []) if num in winning_set]
+        tuo_misses = [num for num in (tuo or []) if num not in winning_set]
+
+        hit_need = matches - sum(1 for num in dan if num in winning_set)
+        miss_need = pick - len(dan) - hit_need
+        return sorted(dan + tuo_hits[:hit_need] + tuo_misses[:miss_need])
+
+    @staticmethod
+    def enumerate_prize_levels(front_dan: List[int], front_tuo: List[int], back_dan: List[int], back_tuo: List[int],
+                               winning_front: List[int], winning_back: List[int]) -> Dict[int, int]:
+        """
+        逐注枚举拆分组合统计各奖级注数（用于校验及基准测试）
+        """
+        from .services import SuperLottoService
+
+        front_dan = front_dan or []
+        back_dan = back_dan or []
+        winning_front_set = set(winning_front)
+        winning_back_set = set(winning_back)
+
+        prize_levels: Dict[int, int] = {}
+        for front_combo in combinations(front_tuo or [], FRONT_PICK - len(front_dan)):
+            front_match = len(winning_front_set.intersection(front_dan + list(front_combo)))
+            for back_combo in combinations(back_tuo or [], BACK_PICK - len(back_dan)):
+                back_match = len(winning_back_set.intersection(back_dan + list(back_combo)))
+                level = SuperLottoService._get_prize_level(front_match, back_match)
+                if level is not None:
+                    prize_levels[level] = prize_levels.get(level, 0) + 1
+
+        return dict(sorted(prize_levels.items()))
@@ -10,12 +10,16 @@ from datetime import datetime, timedelta
 from math import comb
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count, Sum
 from django.core.cache import cache
 import logging
 
 from apps.games.models import Game
 from apps.finance.models import Transaction, UserBalance
+from apps.finance.payouts import PayoutAccumulator
 from .models import SuperLottoGame, SuperLottoDraw, SuperLottoBet, SuperLottoStatistics
+from .prize_evaluator import SuperLottoPrizeEvaluator, FRONT_PICK, BACK_PICK
+from .settlement import SuperLottoSettlementService
 
 logger = logging.getLogger(__name__)
 
@@ -230,7 +234,8 @@ class SuperLottoService:
             
             with transaction.atomic():
                 # 扣除余额
-                balance.deduct_balance(total_amount, 'available', f'大乐透投注 {current_draw.draw_number}期')
+                if not balance.deduct_balance(total_amount, 'available', f'大乐透投注 {current_draw.draw_number}期'):
+                    raise ValueError('扣除余额失败')
                 
                 # 创建投注交易记录
                 bet_transaction = Transaction.objects.create(
@@ -506,9 +511,11 @@ class SuperLottoService:
             return {'success': False, 'message': f'生成失败: {str(e)}'}
     
     @staticmethod
-    def conduct_draw(draw_id: str, front_numbers: List[int] = None, back_numbers: List[int] = None) -> Dict[str, Any]:
+    def conduct_draw(draw_id: str, front_numbers: List[int] = None, back_numbers: List[int] = None,
+                     async_settlement: bool = False) -> Dict[str, Any]:
         """
         执行开奖
+        async_settlement=True 时结算批次提交到Celery并行执行
         """
         try:
             draw = SuperLottoDraw.objects.get(id=draw_id)
@@ -535,26 +542,25 @@ class SuperLottoService:
                 draw.back_numbers = back_numbers
                 draw.status = 'DRAWN'
                 draw.save()
-                
-                # 计算中奖情况
-                settlement_result = SuperLottoService._settle_draw(draw)
-                
-                if settlement_result['success']:
-                    draw.status = 'SETTLED'
-                    draw.save()
-                    
-                    return {
-                        'success': True,
-                        'message': '开奖完成',
-                        'data': {
-                            'draw_number': draw.draw_number,
-                            'front_numbers': front_numbers,
-                            'back_numbers': back_numbers,
-                            'settlement_result': settlement_result['data']
-                        }
+            
+            # 分批结算（全部批次完成后期次状态更新为已派奖）
+            settlement_result = SuperLottoSettlementService.start_settlement(
+                draw, dispatch=async_settlement
+            )
+            
+            if settlement_result['success']:
+                return {
+                    'success': True,
+                    'message': '开奖完成',
+                    'data': {
+                        'draw_number': draw.draw_number,
+                        'front_numbers': front_numbers,
+                        'back_numbers': back_numbers,
+                        'settlement_result': settlement_result['data']
                     }
-                else:
-                    return settlement_result
+                }
+            else:
+                return settlement_result
                 
         except SuperLottoDraw.DoesNotExist:
             return {'success': False, 'message': '期次不存在'}
@@ -566,94 +572,26 @@ class SuperLottoService:
     def _settle_draw(draw: SuperLottoDraw) -> Dict[str, Any]:
         """
         结算期次中奖情况
+        在当前进程依次执行各结算批次
         """
-        try:
-            config = SuperLottoService.get_game_config()
-            if not config:
-                return {'success': False, 'message': '游戏配置不存在'}
-            
-            # 获取所有投注记录
-            bets = SuperLottoBet.objects.filter(draw=draw, status='PENDING')
-            
-            # 统计各等奖中奖情况
-            prize_stats = {
-                1: {'count': 0, 'total_amount': Decimal('0.00')},
-                2: {'count': 0, 'total_amount': Decimal('0.00')},
-                3: {'count': 0, 'total_amount': Decimal('0.00')},
-                4: {'count': 0, 'total_amount': Decimal('0.00')},
-                5: {'count': 0, 'total_amount': Decimal('0.00')},
-                6: {'count': 0, 'total_amount': Decimal('0.00')},
-                7: {'count': 0, 'total_amount': Decimal('0.00')},
-                8: {'count': 0, 'total_amount': Decimal('0.00')},
-                9: {'count': 0, 'total_amount': Decimal('0.00')},
-            }
-            
-            total_winning_amount = Decimal('0.00')
-            
-            # 逐个检查投注记录
-            for bet in bets:
-                winning_result = SuperLottoService._check_bet_winning(bet, draw.front_numbers, draw.back_numbers)
-                
-                if winning_result['is_winner']:
-                    level = winning_result['level']
-                    amount = SuperLottoService._calculate_prize_amount(level, config, draw, bet.multiplier)
-                    
-                    # 更新投注记录
-                    bet.is_winner = True
-                    bet.winning_level = level
-                    bet.winning_amount = amount
-                    bet.winning_details = winning_result['details']
-                    bet.status = 'WINNING'
-                    
-                    # 统计中奖情况
-                    prize_stats[level]['count'] += 1
-                    prize_stats[level]['total_amount'] += amount
-                    total_winning_amount += amount
-                    
-                    # 派发奖金
-                    SuperLottoService._award_prize(bet, amount)
-                else:
-                    bet.status = 'LOSING'
-                
-                bet.save()
-            
-            # 更新期次中奖统计
-            draw.first_prize_winners = prize_stats[1]['count']
-            draw.first_prize_amount = prize_stats[1]['total_amount']
-            draw.second_prize_winners = prize_stats[2]['count']
-            draw.second_prize_amount = prize_stats[2]['total_amount']
-            draw.third_prize_winners = prize_stats[3]['count']
-            draw.fourth_prize_winners = prize_stats[4]['count']
-            draw.fifth_prize_winners = prize_stats[5]['count']
-            draw.sixth_prize_winners = prize_stats[6]['count']
-            draw.seventh_prize_winners = prize_stats[7]['count']
-            draw.eighth_prize_winners = prize_stats[8]['count']
-            draw.ninth_prize_winners = prize_stats[9]['count']
-            draw.save()
-            
-            # 更新统计数据
-            SuperLottoService._update_draw_statistics(draw, prize_stats, total_winning_amount)
-            
-            return {
-                'success': True,
-                'message': '结算完成',
-                'data': {
-                    'total_bets': bets.count(),
-                    'total_winners': sum(stats['count'] for stats in prize_stats.values()),
-                    'total_winning_amount': float(total_winning_amount),
-                    'prize_breakdown': {
-                        f'level_{level}': {
-                            'winners': stats['count'],
-                            'total_amount': float(stats['total_amount'])
-                        }
-                        for level, stats in prize_stats.items()
-                    }
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"结算期次失败: {str(e)}")
-            return {'success': False, 'message': f'结算失败: {str(e)}'}
+        return SuperLottoSettlementService.start_settlement(draw, dispatch=False)
+    
+    @staticmethod
+    def _apply_prize_stats(draw: SuperLottoDraw, prize_stats: Dict):
+        """
+        更新期次中奖统计
+        """
+        draw.first_prize_winners = prize_stats[1]['count']
+        draw.first_prize_amount = prize_stats[1]['total_amount']
+        draw.second_prize_winners = prize_stats[2]['count']
+        draw.second_prize_amount = prize_stats[2]['total_amount']
+        draw.third_prize_winners = prize_stats[3]['count']
+        draw.fourth_prize_winners = prize_stats[4]['count']
+        draw.fifth_prize_winners = prize_stats[5]['count']
+        draw.sixth_prize_winners = prize_stats[6]['count']
+        draw.seventh_prize_winners = prize_stats[7]['count']
+        draw.eighth_prize_winners = prize_stats[8]['count']
+        draw.ninth_prize_winners = prize_stats[9]['count']
     
     @staticmethod
     def _check_bet_winning(bet: SuperLottoBet, winning_front: List[int], winning_back: List[int]) -> Dict[str, Any]:
@@ -704,7 +642,8 @@ class SuperLottoService:
                 'front_match': front_match,
                 'back_match': back_match,
                 'front_numbers': front_nums,
-                'back_numbers': back_nums
+                'back_numbers': back_nums,
+                'prize_levels': {str(level): 1} if level is not None else {},
             }
         }
     
@@ -712,69 +651,48 @@ class SuperLottoService:
     def _check_multiple_winning(front_nums: List[int], back_nums: List[int],
                               winning_front: List[int], winning_back: List[int]) -> Dict[str, Any]:
         """
-        检查复式投注中奖（取最高奖级）
+        检查复式投注中奖
+        复式即无胆码的胆拖，按组合数统计各奖级中奖注数
         """
-        from itertools import combinations
-        
-        best_level = None
-        best_details = {}
-        
-        # 遍历所有前区组合
-        for front_combo in combinations(front_nums, 5):
-            # 遍历所有后区组合
-            for back_combo in combinations(back_nums, 2):
-                result = SuperLottoService._check_single_winning(
-                    list(front_combo), list(back_combo), winning_front, winning_back
-                )
-                
-                if result['is_winner']:
-                    if best_level is None or result['level'] < best_level:
-                        best_level = result['level']
-                        best_details = result['details']
-        
-        return {
-            'is_winner': best_level is not None,
-            'level': best_level,
-            'details': best_details
-        }
+        return SuperLottoService._check_system_winning(
+            [], front_nums, [], back_nums, winning_front, winning_back
+        )
     
     @staticmethod
     def _check_system_winning(front_dan: List[int], front_tuo: List[int],
                             back_dan: List[int], back_tuo: List[int],
                             winning_front: List[int], winning_back: List[int]) -> Dict[str, Any]:
         """
-        检查胆拖投注中奖（取最高奖级）
+        检查胆拖投注中奖
+        level 为最高奖级，details.prize_levels 为各奖级中奖注数
         """
-        from itertools import combinations
-        
-        best_level = None
-        best_details = {}
+        evaluation = SuperLottoPrizeEvaluator.evaluate(
+            front_dan, front_tuo, back_dan, back_tuo, winning_front, winning_back
+        )
         
-        # 前区需要从拖码中选择的数量
-        front_need = 5 - len(front_dan or [])
-        back_need = 2 - len(back_dan or [])
+        best_match = SuperLottoPrizeEvaluator.best_match(evaluation)
+        if best_match is None:
+            return {'is_winner': False, 'level': None, 'details': {}}
         
-        # 遍历前区拖码组合
-        for front_tuo_combo in combinations(front_tuo or [], front_need):
-            front_combo = (front_dan or []) + list(front_tuo_combo)
-            
-            # 遍历后区拖码组合
-            for back_tuo_combo in combinations(back_tuo or [], back_need):
-                back_combo = (back_dan or []) + list(back_tuo_combo)
-                
-                result = SuperLottoService._check_single_winning(
-                    front_combo, back_combo, winning_front, winning_back
-                )
-                
-                if result['is_winner']:
-                    if best_level is None or result['level'] < best_level:
-                        best_level = result['level']
-                        best_details = result['details']
+        front_match, back_match = best_match
         
         return {
-            'is_winner': best_level is not None,
-            'level': best_level,
-            'details': best_details
+            'is_winner': True,
+            'level': evaluation['best_level'],
+            'details': {
+                'front_match': front_match,
+                'back_match': back_match,
+                # 最高奖级的一注拆分号码
+                'front_numbers': SuperLottoPrizeEvaluator.build_ticket(
+                    front_dan, front_tuo, winning_front, FRONT_PICK, front_match
+                ),
+                'back_numbers': SuperLottoPrizeEvaluator.build_ticket(
+                    back_dan, back_tuo, winning_back, BACK_PICK, back_match
+                ),
+                'prize_levels': {
+                    str(level): count for level, count in evaluation['prize_levels'].items()
+                },
+            }
         }
     
     @staticmethod
@@ -841,42 +759,32 @@ class SuperLottoService:
             return Decimal('0.00')
     
     @staticmethod
-    def _award_prize(bet: SuperLottoBet, amount: Decimal):
+    def _build_payout_accumulator(draw: SuperLottoDraw) -> PayoutAccumulator:
+        """
+        创建期次派奖聚合器（每个用户生成一条中奖交易，逐注明细记录在 metadata.bets）
+        """
+        return PayoutAccumulator(
+            f'大乐透中奖 {draw.draw_number}期',
+            metadata={
+                'game_type': '彩票',
+                'game_name': '大乐透',
+                'draw_number': draw.draw_number,
+            }
+        )
+    
+    @staticmethod
+    def _award_prize(bet: SuperLottoBet, amount: Decimal, payouts: PayoutAccumulator):
         """
         派发奖金
+        奖金计入派奖聚合器，投注记录由调用方保存，结算结束时 flush 统一入账
         """
-        try:
-            with transaction.atomic():
-                # 添加奖金到用户余额
-                user_balance = bet.user.balance
-                user_balance.add_balance(amount, 'available', f'大乐透中奖 {bet.draw.draw_number}期')
-                
-                # 创建中奖交易记录
-                win_transaction = Transaction.objects.create(
-                    user=bet.user,
-                    type='WIN',
-                    amount=amount,
-                    fee=Decimal('0.00'),
-                    actual_amount=amount,
-                    status='COMPLETED',
-                    reference_id=str(uuid.uuid4()),
-                    description=f'大乐透中奖 {bet.draw.draw_number}期 {bet.winning_level}等奖',
-                    metadata={
-                        'game_type': '彩票',
-                        'game_name': '大乐透',
-                        'draw_number': bet.draw.draw_number,
-                        'bet_id': str(bet.id),
-                        'winning_level': bet.winning_level,
-                        'winning_amount': float(amount),
-                    }
-                )
-                
-                bet.win_transaction_id = win_transaction.id
-                bet.status = 'SETTLED'
-                bet.save()
-                
-        except Exception as e:
-            logger.error(f"派发奖金失败: {str(e)}")
+        bet.win_transaction_id = payouts.add(
+            bet.user_id,
+            amount,
+            bet.id,
+            winning_level=bet.winning_level,
+        )
+        bet.status = 'SETTLED'
     
     @staticmethod
     def _update_draw_statistics(draw: SuperLottoDraw, prize_stats: Dict, total_winning_amount: Decimal):
@@ -886,9 +794,14 @@ class SuperLottoService:
         try:
             # 计算销售统计
             bets = SuperLottoBet.objects.filter(draw=draw)
-            total_bets = bets.count()
-            total_bet_count = sum(bet.bet_count for bet in bets)
-            total_sales = sum(bet.total_amount for bet in bets)
+            sales = bets.aggregate(
+                total_bets=Count('id'),
+                total_bet_count=Sum('bet_count'),
+                total_sales=Sum('total_amount')
+            )
+            total_bets = sales['total_bets']
+            total_bet_count = sales['total_bet_count'] or 0
+            total_sales = sales['total_sales'] or Decimal('0.00')
             
             # 计算利润
             profit = total_sales - total_winning_amount
@@ -0,0 +1,463 @@
+"""
+大乐透分批结算
+按投注ID区间划分批次，每批独立事务提交，可由多个Celery worker并行执行，中断后可继续
+"""
+
+import logging
+from typing import Dict, List, Any, Optional, Iterable
+from decimal import Decimal, ROUND_DOWN
+from datetime import timedelta
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import F, Count, Sum
+
+from apps.games.profit_rollup import DrawProfitRollupService
+from apps.rewards.turnover import DailyTurnoverService
+from .models import SuperLottoDraw, SuperLottoBet, SuperLottoSettlementJob, SuperLottoSettlementChunk
+
+logger = logging.getLogger(__name__)
+
+
+PRIZE_LEVELS = range(1, 10)
+
+# 浮动奖级：奖池按全部批次合并后的中奖注数均分，其余奖级为固定奖金
+POOL_LEVELS = (1, 2)
+
+
+class SuperLottoSettlementService:
+    """
+    大乐透分批结算服务
+    """
+
+    # 每批结算的投注数
+    CHUNK_SIZE = 2000
+
+    @staticmethod
+    def start_settlement(draw: SuperLottoDraw, chunk_size: int = None, dispatch: bool = True) -> Dict[str, Any]:
+        """
+        启动（或继续）期次结算
+        dispatch=True 时各批次提交到Celery并行执行；否则在当前进程依次执行
+        """
+        try:
+            job, _ = SuperLottoSettlementJob.objects.get_or_create(
+                draw=draw,
+                defaults={'chunk_size': chunk_size or SuperLottoSettlementService.CHUNK_SIZE}
+            )
+
+            if job.status == 'COMPLETED':
+                return {'success': True, 'message': '结算已完成', 'data': job.result}
+
+            SuperLottoSettlementService.plan_chunks(job)
+
+            if dispatch:
+                dispatched = SuperLottoSettlementService.dispatch_chunks(job)
+                logger.info(f"大乐透期次 {draw.draw_number} 结算已提交: {dispatched}/{job.total_chunks} 批")
+            else:
+                for chunk_id in job.chunks.exclude(status='COMPLETED').order_by('chunk_index').values_list('id', flat=True):
+                    SuperLottoSettlementService.settle_chunk(chunk_id)
+
+            # 无待结算投注或批次已全部完成时直接汇总
+            SuperLottoSettlementService.finalize(job.id)
+            job.refresh_from_db()
+
+            if job.status == 'COMPLETED':
+                return {'success': True, 'message': '结算完成', 'data': job.result}
+
+            return {
+                'success': True,
+                'message': '结算进行中',
+                'data': SuperLottoSettlementService.get_progress(job)
+            }
+
+        except Exception as e:
+            logger.error(f"启动大乐透结算失败: {str(e)}")
+            return {'success': False, 'message': f'结算失败: {str(e)}'}
+
+    @staticmethod
+    def plan_chunks(job: SuperLottoSettlementJob) -> int:
+        """
+        按投注ID划分批次
+        每划分一批即提交并推进游标，中断后从游标处继续
+        """
+        if job.status != 'PLANNING':
+            return job.total_chunks
+
+        pending_bets = SuperLottoBet.objects.filter(draw_id=job.draw_id, status='PENDING')
+
+        # 无余额记录的用户无法派奖，投注不划入批次，保持待结算
+        skipped = pending_bets.filter(user__balance__isnull=True).count()
+        if skipped:
+            logger.error(f"大乐透期次结算 {job.draw_id}: {skipped} 注投注的用户余额信息不存在，保持待结算")
+        pending_bets = pending_bets.filter(user__balance__isnull=False).order_by('id')
+
+        while True:
+            queryset = pending_bets.filter(id__gt=job.cursor) if job.cursor else pending_bets
+            bet_ids = list(queryset.values_list('id', flat=True)[:job.chunk_size])
+            if not bet_ids:
+                break
+
+            with transaction.atomic():
+                SuperLottoSettlementChunk.objects.create(
+                    job=job,
+                    chunk_index=job.total_chunks,
+                    first_bet_id=bet_ids[0],
+                    last_bet_id=bet_ids[-1],
+                    bet_count=len(bet_ids)
+                )
+                job.cursor = str(bet_ids[-1])
+                job.total_chunks += 1
+                job.total_bets += len(bet_ids)
+                job.save(update_fields=['cursor', 'total_chunks', 'total_bets', 'updated_at'])
+
+        job.status = 'RUNNING'
+        job.save(update_fields=['status', 'updated_at'])
+
+        return job.total_chunks
+
+    @staticmethod
+    def dispatch_chunks(job: SuperLottoSettlementJob, stale_before=None) -> int:
+        """
+        提交未完成的批次到Celery
+        stale_before 设置时只提交该时间之前更新过的批次（用于恢复中断的结算）
+        """
+        from .tasks import settle_superlotto_chunk
+
+        chunks = job.chunks.exclude(status='COMPLETED')
+        if stale_before is not None:
+            chunks = chunks.filter(updated_at__lt=stale_before)
+
+        chunk_ids = list(chunks.order_by('chunk_index').values_list('id', flat=True))
+        for chunk_id in chunk_ids:
+            transaction.on_commit(lambda chunk_id=chunk_id: settle_superlotto_chunk.delay(chunk_id))
+
+        return len(chunk_ids)
+
+    @staticmethod
+    def settle_chunk(chunk_id: int) -> Dict[str, Any]:
+        """
+        结算单个批次
+        结算、派奖及分项统计在同一事务内提交；已完成的批次直接返回，重复执行不会重复派奖
+        """
+        from .services import SuperLottoService
+
+        SuperLottoSettlementChunk.objects.filter(id=chunk_id).update(
+            attempts=F('attempts') + 1,
+            updated_at=timezone.now()
+        )
+
+        try:
+            with transaction.atomic():
+                chunk = SuperLottoSettlementChunk.objects.select_for_update().select_related(
+                    'job__draw'
+                ).get(id=chunk_id)
+
+                if chunk.status == 'COMPLETED':
+                    return {'success': True, 'message': '批次已结算', 'data': {'chunk_index': chunk.chunk_index}}
+
+                draw = chunk.job.draw
+                config = SuperLottoService.get_game_config()
+                if not config:
+                    raise ValueError('游戏配置不存在')
+
+                # 各奖级单倍奖金
+                base_prizes = {
+                    level: SuperLottoService._calculate_prize_amount(level, config, draw, 1)
+                    for level in PRIZE_LEVELS
+                }
+
+                bets = list(
+                    SuperLottoBet.objects.select_for_update().filter(
+                        draw=draw,
+                        status='PENDING',
+                        user__balance__isnull=False,
+                        id__gte=chunk.first_bet_id,
+                        id__lte=chunk.last_bet_id
+                    ).order_by('id')
+                )
+
+                now = timezone.now()
+                prize_stats = {level: {'count': 0, 'total_amount': Decimal('0.00')} for level in PRIZE_LEVELS}
+                payouts = SuperLottoService._build_payout_accumulator(draw)
+                winning_bets = 0
+                winning_amount = Decimal('0.00')
+
+                for bet in bets:
+                    winning_result = SuperLottoService._check_bet_winning(bet, draw.front_numbers, draw.back_numbers)
+                    bet.updated_at = now
+
+                    if not winning_result['is_winner']:
+                        bet.status = 'LOSING'
+                        continue
+
+                    # 复式/胆拖按各奖级中奖注数分别计奖，倍投每倍计一注
+                    amount = Decimal('0.00')
+                    has_pool_prize = False
+                    for prize_level, count in winning_result['details']['prize_levels'].items():
+                        prize_level = int(prize_level)
+                        notes = count * bet.multiplier
+                        prize_stats[prize_level]['count'] += notes
+                        if prize_level in POOL_LEVELS:
+                            # 浮动奖金须等全部批次完成后按总注数分配
+                            has_pool_prize = True
+                            continue
+                        level_amount = base_prizes[prize_level] * notes
+                        prize_stats[prize_level]['total_amount'] += level_amount
+                        amount += level_amount
+
+                    if amount > 0:
+                        bet.win_transaction_id = payouts.add(
+                            bet.user_id,
+                            amount,
+                            bet.id,
+                            winning_level=winning_result['level'],
+                        )
+
+                    bet.is_winner = True
+                    bet.winning_level = winning_result['level']
+                    bet.winning_amount = amount
+                    bet.winning_details = winning_result['details']
+                    # 中浮动奖级的投注保持已中奖状态，汇总时派发浮动奖金后再标记已派奖
+                    bet.status = 'WINNING' if has_pool_prize else 'SETTLED'
+
+                    winning_bets += 1
+                    winning_amount += amount
+
+                SuperLottoBet.objects.bulk_update(
+                    bets,
+                    ['is_winner', 'winning_level', 'winning_amount', 'winning_details',
+                     'win_transaction_id', 'status', 'updated_at'],
+                    batch_size=500
+                )
+
+                payouts.flush()
+                DailyTurnoverService.record_many(
+                    'superlotto', [(bet.user_id, bet.created_at, bet.total_amount) for bet in bets]
+                )
+
+                chunk.status = 'COMPLETED'
+                chunk.error_message = ''
+                chunk.settled_bets = len(bets)
+                chunk.winning_bets = winning_bets
+                chunk.winning_amount = winning_amount
+                chunk.prize_stats = {
+                    str(level): {'count': stats['count'], 'total_amount': str(stats['total_amount'])}
+                    for level, stats in prize_stats.items()
+                }
+                chunk.finished_at = now
+                chunk.save()
+
+                job_id = chunk.job_id
+                result = {
+                    'chunk_index': chunk.chunk_index,
+                    'settled_bets': chunk.settled_bets,
+                    'winning_bets': chunk.winning_bets,
+                    'winning_amount': float(winning_amount),
+                }
+
+            SuperLottoSettlementService.finalize(job_id)
+
+            return {'success': True, 'message': '批次结算完成', 'data': result}
+
+        except Exception as e:
+            SuperLottoSettlementChunk.objects.filter(id=chunk_id).exclude(status='COMPLETED').update(
+                status='FAILED',
+                error_message=str(e),
+                updated_at=timezone.now()
+            )
+            logger.error(f"大乐透结算批次 {chunk_id} 失败: {str(e)}")
+            return {'success': False, 'message': f'批次结算失败: {str(e)}'}
+
+    @staticmethod
+    def merge_prize_stats(partials: Iterable[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """
+        合并各批次的分项统计
+        """
+        prize_stats = {level: {'count': 0, 'total_amount': Decimal('0.00')} for level in PRIZE_LEVELS}
+
+        for partial in partials:
+            for level, stats in (partial or {}).items():
+                level = int(level)
+                prize_stats[level]['count'] += stats['count']
+                prize_stats[level]['total_amount'] += Decimal(stats['total_amount'])
+
+        return prize_stats
+
+    @staticmethod
+    def pool_prize_per_note(draw: SuperLottoDraw, prize_stats: Dict[int, Dict[str, Any]]) -> Dict[int, Decimal]:
+        """
+        计算浮动奖级每注奖金
+        奖池按全部批次合并后的中奖注数均分，向下取整到分，合计不超过奖池
+        """
+        from .services import SuperLottoService
+
+        config = SuperLottoService.get_game_config()
+        if not config:
+            raise ValueError('游戏配置不存在')
+
+        per_note = {}
+        for level in POOL_LEVELS:
+            notes = prize_stats[level]['count']
+            if not notes:
+                continue
+            pool = SuperLottoService._calculate_prize_amount(level, config, draw, 1)
+            per_note[level] = (pool / notes).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+
+        return per_note
+
+    @staticmethod
+    def pay_pool_prizes(draw: SuperLottoDraw, prize_stats: Dict[int, Dict[str, Any]]) -> int:
+        """
+        派发浮动奖级奖金
+        在汇总事务内执行：按合并后的中奖注数计算每注奖金，派发给所有已中奖待派浮动奖金的投注，
+        并计入 prize_stats 的奖级金额；返回派奖投注数
+        """
+        from .services import SuperLottoService
+
+        per_note = SuperLottoSettlementService.pool_prize_per_note(draw, prize_stats)
+        if not per_note:
+            return 0
+
+        bets = list(
+            SuperLottoBet.objects.select_for_update().filter(draw=draw, status='WINNING').order_by('id')
+        )
+        payouts = SuperLottoService._build_payout_accumulator(draw)
+        now = timezone.now()
+
+        for bet in bets:
+            amount = Decimal('0.00')
+            for prize_level, count in bet.winning_details['prize_levels'].items():
+                prize_level = int(prize_level)
+                if prize_level not in per_note:
+                    continue
+                level_amount = per_note[prize_level] * count * bet.multiplier
+                prize_stats[prize_level]['total_amount'] += level_amount
+                amount += level_amount
+
+            win_transaction_id = payouts.add(
+                bet.user_id,
+                amount,
+                bet.id,
+                winning_level=bet.winning_level,
+            )
+            # 同时中固定奖级的投注保留批次派奖的交易ID，两笔交易的 metadata.bets 均记录该注
+            bet.win_transaction_id = bet.win_transaction_id or win_transaction_id
+            bet.winning_amount += amount
+            bet.status = 'SETTLED'
+            bet.updated_at = now
+
+        SuperLottoBet.objects.bulk_update(
+            bets, ['winning_amount', 'win_transaction_id', 'status', 'updated_at'], batch_size=500
+        )
+        payouts.flush()
+
+        return len(bets)
+
+    @staticmethod
+    def finalize(job_id) -> Optional[Dict[str, Any]]:
+        """
+        全部批次完成后汇总统计并更新期次
+        未全部完成时只更新进度，返回None
+        """
+        from .services import SuperLottoService
+
+        with transaction.atomic():
+            job = SuperLottoSettlementJob.objects.select_for_update().select_related('draw').get(id=job_id)
+
+            if job.status == 'COMPLETED':
+                return job.result
+
+            job.completed_chunks = job.chunks.filter(status='COMPLETED').count()
+
+            if job.status != 'RUNNING' or job.completed_chunks < job.total_chunks:
+                job.save(update_fields=['completed_chunks', 'updated_at'])
+                return None
+
+            prize_stats = SuperLottoSettlementService.merge_prize_stats(
+                job.chunks.values_list('prize_stats', flat=True)
+            )
+            SuperLottoSettlementService.pay_pool_prizes(job.draw, prize_stats)
+            total_winning_amount = sum(
+                (stats['total_amount'] for stats in prize_stats.values()), Decimal('0.00')
+            )
+
+            draw = job.draw
+            SuperLottoService._apply_prize_stats(draw, prize_stats)
+            draw.status = 'SETTLED'
+            draw.save()
+
+            # 更新统计数据
+            SuperLottoService._update_draw_statistics(draw, prize_stats, total_winning_amount)
+
+            job.result = {
+                'total_bets': job.total_bets,
+                'total_winners': sum(stats['count'] for stats in prize_stats.values()),
+                'total_winning_amount': float(total_winning_amount),
+                'prize_breakdown': {
+                    f'level_{level}': {
+                        'winners': stats['count'],
+                        'total_amount': float(stats['total_amount'])
+                    }
+                    for level, stats in prize_stats.items()
+                }
+            }
+
+            # 计入小时/日盈亏汇总
+            sales = SuperLottoBet.objects.filter(draw=draw).aggregate(
+                total_bets=Count('id'), total_sales=Sum('total_amount')
+            )
+            DrawProfitRollupService.record_draw(
+                draw.game, draw.draw_time, sales['total_bets'], sales['total_sales'],
+                total_winning_amount, job.result['total_winners']
+            )
+
+            job.status = 'COMPLETED'
+            job.finished_at = timezone.now()
+            job.save()
+
+        logger.info(f"大乐透期次 {draw.draw_number} 结算完成: {job.total_bets} 注, {job.total_chunks} 批")
+
+        return job.result
+
+    @staticmethod
+    def get_progress(job: SuperLottoSettlementJob) -> Dict[str, Any]:
+        """
+        获取结算进度
+        """
+        failed_chunks = job.chunks.filter(status='FAILED').count()
+
+        return {
+            'job_id': str(job.id),
+            'draw_number': job.draw.draw_number,
+            'status': job.status,
+            'total_bets': job.total_bets,
+            'total_chunks': job.total_chunks,
+            'completed_chunks': job.completed_chunks,
+            'failed_chunks': failed_chunks,
+            'result': job.result,
+        }
+
+    @staticmethod
+    def resume_settlements(stale_minutes: int = 10) -> List[str]:
+        """
+        恢复中断的结算
+        已开奖未派奖的期次继续划分批次，并重新提交长时间未完成的批次
+        """
+        stale_before = timezone.now() - timedelta(minutes=stale_minutes)
+        resumed = []
+
+        for draw in SuperLottoDraw.objects.filter(status='DRAWN'):
+            job = SuperLottoSettlementJob.objects.filter(draw=draw).first()
+
+            if job is None or job.status == 'PLANNING':
+                SuperLottoSettlementService.start_settlement(draw, dispatch=True)
+                resumed.append(draw.draw_number)
+                continue
+
+            if job.status == 'RUNNING':
+                with transaction.atomic():
+                    dispatched = SuperLottoSettlementService.dispatch_chunks(job, stale_before=stale_before)
+                SuperLottoSettlementService.finalize(job.id)
+                if dispatched:
+                    resumed.append(draw.draw_number)
+
+        return resumed
@@ -69,7 +69,7 @@ def auto_conduct_draw():
         
         conducted_count = 0
         for draw in draws_to_conduct:
-            result = SuperLottoService.conduct_draw(str(draw.id))
+            result = SuperLottoService.conduct_draw(str(draw.id), async_settlement=True)
             if result['success']:
                 conducted_count += 1
                 logger.info(f"自动开奖成功: {draw.draw_number}期")
@@ -94,6 +94,51 @@ def auto_conduct_draw():
         return {"success": False, "message": f"自动开奖出错: {str(e)}"}
 
 
+@shared_task
+def settle_superlotto_chunk(chunk_id):
+    """
+    结算批次任务
+    开奖后按批次并行执行，每批独立提交，重复执行不会重复派奖
+    """
+    try:
+        from .settlement import SuperLottoSettlementService
+        
+        result = SuperLottoSettlementService.settle_chunk(chunk_id)
+        
+        if not result['success']:
+            logger.error(f"大乐透结算批次 {chunk_id} 失败: {result['message']}")
+        
+        return result
+        
+    except Exception as e:
+        logger.error(f"大乐透结算批次任务出错: {str(e)}")
+        return {"success": False, "message": f"结算批次出错: {str(e)}"}
+
+
+@shared_task
+def resume_superlotto_settlements():
+    """
+    恢复中断的结算任务
+    每10分钟执行，继续划分批次并重新提交失败或长时间未完成的批次
+    """
+    try:
+        from .settlement import SuperLottoSettlementService
+        
+        resumed = SuperLottoSettlementService.resume_settlements()
+        
+        if resumed:
+            logger.info(f"恢复大乐透结算: {', '.join(resumed)}期")
+        
+        return {
+            "success": True,
+            "resumed_draws": resumed
+        }
+        
+    except Exception as e:
+        logger.error(f"恢复大乐透结算出错: {str(e)}")
+        return {"success": False, "message": f"恢复结算出错: {str(e)}"}
+
+
 @shared_task
 def update_jackpot_amount():
     """
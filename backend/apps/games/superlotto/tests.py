@@ -0,0 +1,304 @@
+"""
+大乐透测试
+"""
+
+import random
+from django.test import TestCase
+from django.utils import timezone
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from datetime import timedelta
+
+from apps.games.models import Game
+from apps.finance.models import UserBalance, Transaction
+from .models import SuperLottoGame, SuperLottoDraw, SuperLottoBet
+from .prize_evaluator import SuperLottoPrizeEvaluator
+from .services import SuperLottoService
+from .settlement import SuperLottoSettlementService
+
+User = get_user_model()
+
+
+class SuperLottoPrizeEvaluatorTest(TestCase):
+    """
+    大乐透中奖计算器测试
+    """
+
+    def test_evaluate_matches_enumeration(self):
+        """
+        测试组合数统计与逐注枚举结果一致
+        """
+        rng = random.Random(20250119)
+        winning_front = sorted(rng.sample(range(1, 36), 5))
+        winning_back = sorted(rng.sample(range(1, 13), 2))
+
+        for _ in range(50):
+            front = rng.sample(range(1, 36), rng.randint(5, 9))
+            back = rng.sample(range(1, 13), rng.randint(2, 4))
+            front_dan = front[:rng.randint(0, 3)]
+            front_tuo = [num for num in front if num not in front_dan]
+            back_dan = back[:rng.randint(0, 1)]
+            back_tuo = [num for num in back if num not in back_dan]
+
+            evaluation = SuperLottoPrizeEvaluator.evaluate(
+                front_dan, front_tuo, back_dan, back_tuo, winning_front, winning_back
+            )
+            expected = SuperLottoPrizeEvaluator.enumerate_prize_levels(
+                front_dan, front_tuo, back_dan, back_tuo, winning_front, winning_back
+            )
+            self.assertEqual(evaluation['prize_levels'], expected)
+            self.assertEqual(evaluation['best_level'], min(expected) if expected else None)
+
+    def test_multiple_ticket_levels(self):
+        """
+        测试复式投注各奖级注数
+        """
+        # 前区6个号码命中5个，后区2个全中：1注5+2，5注4+2
+        evaluation = SuperLottoPrizeEvaluator.evaluate(
+            [], [1, 2, 3, 4, 5, 6], [], [1, 2], [1, 2, 3, 4, 5], [1, 2]
+        )
+        self.assertEqual(evaluation['prize_levels'], {1: 1, 4: 5})
+        self.assertEqual(evaluation['best_level'], 1)
+
+
+class SuperLottoSettlementTest(TestCase):
+    """
+    大乐透分批结算测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        self.game = Game.objects.create(name='大乐透', code='superlotto', game_type='彩票')
+        self.config = SuperLottoGame.objects.create(game=self.game)
+        self.draw = SuperLottoDraw.objects.create(
+            game=self.game,
+            draw_number='25008',
+            draw_time=timezone.now(),
+            sales_end_time=timezone.now() - timedelta(minutes=30),
+            jackpot_amount=Decimal('1000000.00'),
+            front_numbers=[1, 2, 3, 4, 5],
+            back_numbers=[1, 2],
+            status='DRAWN'
+        )
+
+        self.users = []
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f'superlotto_user_{i}',
+                phone=f'+23480100002{i:02d}',
+                password='testpass123'
+            )
+            UserBalance.objects.create(user=user, main_balance=Decimal('0.00'))
+            self.users.append(user)
+
+    def create_bet(self, user, front_numbers, back_numbers, bet_type='SINGLE', multiplier=1):
+        """
+        创建投注
+        """
+        bet_count = SuperLottoService.calculate_bet_amount(bet_type, front_numbers, back_numbers)['bet_count'] \
+            if bet_type != 'SINGLE' else 1
+        return SuperLottoBet.objects.create(
+            user=user,
+            draw=self.draw,
+            bet_type=bet_type,
+            front_numbers=front_numbers,
+            back_numbers=back_numbers,
+            multiplier=multiplier,
+            bet_count=bet_count,
+            single_amount=Decimal('2.00'),
+            total_amount=Decimal('2.00') * bet_count * multiplier
+        )
+
+    def balance_of(self, user):
+        return UserBalance.objects.get(user=user).main_balance
+
+    def test_pool_prize_split_across_chunks(self):
+        """
+        测试一等奖奖池按全部批次的中奖注数均分，固定奖级按注数计奖
+        """
+        single = self.create_bet(self.users[0], [1, 2, 3, 4, 5], [1, 2])
+        doubled = self.create_bet(self.users[1], [1, 2, 3, 4, 5], [1, 2], multiplier=2)
+        multiple = self.create_bet(self.users[2], [1, 2, 3, 4, 5, 6], [1, 2], bet_type='MULTIPLE')
+        losing = self.create_bet(self.users[0], [30, 31, 32, 33, 34], [11, 12])
+
+        # 每批1注，浮动奖金须在全部批次合并后分配
+        result = SuperLottoSettlementService.start_settlement(self.draw, chunk_size=1, dispatch=False)
+        self.assertTrue(result['success'], result['message'])
+
+        # 一等奖注数：1 + 2倍 + 复式1注 = 4注，奖池75万每注18.75万
+        pool = self.draw.jackpot_amount * self.config.jackpot_allocation_rate
+        per_note = pool / 4
+        fourth_prize = self.config.fourth_prize_amount
+
+        for bet, expected in (
+            (single, per_note),
+            (doubled, per_note * 2),
+            (multiple, per_note + fourth_prize * 5),
+        ):
+            bet.refresh_from_db()
+            self.assertEqual(bet.status, 'SETTLED')
+            self.assertEqual(bet.winning_level, 1)
+            self.assertEqual(bet.winning_amount, expected)
+            self.assertIsNotNone(bet.win_transaction_id)
+
+        losing.refresh_from_db()
+        self.assertEqual(losing.status, 'LOSING')
+
+        # 奖池总派奖不超过奖池
+        self.draw.refresh_from_db()
+        self.assertEqual(self.draw.status, 'SETTLED')
+        self.assertEqual(self.draw.first_prize_winners, 4)
+        self.assertEqual(self.draw.first_prize_amount, pool)
+        self.assertEqual(self.draw.second_prize_amount, Decimal('0.00'))
+        self.assertEqual(self.draw.fourth_prize_winners, 5)
+
+        self.assertEqual(self.balance_of(self.users[0]), per_note)
+        self.assertEqual(self.balance_of(self.users[1]), per_note * 2)
+        self.assertEqual(self.balance_of(self.users[2]), per_note + fourth_prize * 5)
+
+        win_total = sum(
+            Transaction.objects.filter(type='WIN').values_list('amount', flat=True), Decimal('0.00')
+        )
+        self.assertEqual(win_total, pool + fourth_prize * 5)
+
+    def test_fixed_prizes_multiplied_by_notes(self):
+        """
+        测试固定奖级按中奖注数及倍数计奖
+        """
+        # 前区6个号码命中4个、后区命中2个：C(4,4)×C(2,1)=2注4+2，C(4,3)×C(2,2)=4注3+2
+        bet = self.create_bet(
+            self.users[0], [1, 2, 3, 4, 30, 31], [1, 2], bet_type='MULTIPLE', multiplier=3
+        )
+
+        SuperLottoSettlementService.start_settlement(self.draw, dispatch=False)
+
+        bet.refresh_from_db()
+        expected = (self.config.fourth_prize_amount * 2 + self.config.sixth_prize_amount * 4) * 3
+        self.assertEqual(bet.status, 'SETTLED')
+        self.assertEqual(bet.winning_amount, expected)
+        self.assertEqual(self.balance_of(self.users[0]), expected)
+
+        self.draw.refresh_from_db()
+        self.assertEqual(self.draw.first_prize_winners, 0)
+        self.assertEqual(self.draw.fourth_prize_winners, 6)
+        self.assertEqual(self.draw.sixth_prize_winners, 12)
+
+    def test_settlement_job_is_idempotent(self):
+        """
+        测试中断后继续结算及重复执行不会重复派奖
+        """
+        from .models import SuperLottoSettlementJob
+
+        bets = [
+            self.create_bet(self.users[i], [1, 2, 3, 4, 30], [1, 2])
+            for i in range(3)
+        ]
+        job = SuperLottoSettlementJob.objects.create(draw=self.draw, chunk_size=1)
+        self.assertEqual(SuperLottoSettlementService.plan_chunks(job), 3)
+
+        # 只完成第一批后中断
+        first_chunk = job.chunks.order_by('chunk_index').first()
+        self.assertTrue(SuperLottoSettlementService.settle_chunk(first_chunk.id)['success'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'RUNNING')
+        self.assertEqual(job.completed_chunks, 1)
+
+        # 已完成批次重复执行直接跳过
+        result = SuperLottoSettlementService.settle_chunk(first_chunk.id)
+        self.assertEqual(result['message'], '批次已结算')
+
+        # 继续结算剩余批次
+        result = SuperLottoSettlementService.start_settlement(self.draw, dispatch=False)
+        self.assertEqual(result['message'], '结算完成')
+        self.assertEqual(SuperLottoSettlementJob.objects.filter(draw=self.draw).count(), 1)
+
+        # 已完成的任务再次启动不重复派奖
+        result = SuperLottoSettlementService.start_settlement(self.draw, dispatch=False)
+        self.assertEqual(result['message'], '结算已完成')
+
+        fourth_prize = self.config.fourth_prize_amount
+        for user, bet in zip(self.users, bets):
+            bet.refresh_from_db()
+            self.assertEqual(bet.status, 'SETTLED')
+            self.assertEqual(self.balance_of(user), fourth_prize)
+        self.assertEqual(Transaction.objects.filter(type='WIN').count(), 3)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(job.result['total_winners'], 3)
+        self.assertEqual(job.result['prize_breakdown']['level_4']['total_amount'], float(fourth_prize * 3))
+
+    def test_merge_prize_stats(self):
+        """
+        测试合并各批次分项统计
+        """
+        prize_stats = SuperLottoSettlementService.merge_prize_stats([
+            {'4': {'count': 2, 'total_amount': '6000.00'}, '9': {'count': 1, 'total_amount': '5.00'}},
+            {'4': {'count': 1, 'total_amount': '3000.00'}},
+            {},
+            None,
+        ])
+
+        self.assertEqual(prize_stats[4], {'count': 3, 'total_amount': Decimal('9000.00')})
+        self.assertEqual(prize_stats[9], {'count': 1, 'total_amount': Decimal('5.00')})
+        self.assertEqual(prize_stats[1], {'count': 0, 'total_amount': Decimal('0.00')})
+
+    def test_resume_task_is_scheduled(self):
+        """
+        测试恢复结算任务已加入Celery定时调度
+        """
+        from lottery_platform.celery import app
+
+        tasks = {entry['task'] for entry in app.conf.beat_schedule.values()}
+        self.assertIn('apps.games.superlotto.tasks.resume_superlotto_settlements', tasks)
+
+    def test_place_bet_rolls_back_when_deduct_fails(self):
+        """
+        测试扣款失败时投注整体回滚
+        """
+        SuperLottoDraw.objects.create(
+            game=self.game,
+            draw_number='25009',
+            draw_time=timezone.now() + timedelta(days=1),
+            sales_end_time=timezone.now() + timedelta(hours=23),
+            status='OPEN'
+        )
+        user = self.users[0]
+        # 余额预检查读到并发扣款前的余额，扣款时数据库余额已不足
+        cache.delete(f'user_total_balance_{user.id}')
+        user.balance.main_balance = Decimal('10.00')
+
+        result = SuperLottoService.place_bet(user, {
+            'bet_type': 'SINGLE',
+            'front_numbers': [1, 2, 3, 4, 5],
+            'back_numbers': [1, 2],
+        })
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['message'], '投注失败: 扣除余额失败')
+        self.assertFalse(SuperLottoBet.objects.filter(user=user).exists())
+        self.assertFalse(Transaction.objects.filter(user=user, type='BET').exists())
+        self.assertEqual(self.balance_of(user), Decimal('0.00'))
+
+    def test_bets_of_users_without_balance_stay_pending(self):
+        """
+        测试无余额记录用户的投注不结算、不派奖，保持待结算
+        """
+        orphan = self.users[2]
+        UserBalance.objects.filter(user=orphan).delete()
+        paid = self.create_bet(self.users[0], [1, 2, 3, 4, 30], [1, 2])
+        held = self.create_bet(orphan, [1, 2, 3, 4, 30], [1, 2])
+
+        result = SuperLottoSettlementService.start_settlement(self.draw, dispatch=False)
+        self.assertEqual(result['message'], '结算完成')
+        self.assertEqual(result['data']['total_bets'], 1)
+
+        paid.refresh_from_db()
+        held.refresh_from_db()
+        self.assertEqual(paid.status, 'SETTLED')
+        self.assertEqual(held.status, 'PENDING')
+        self.assertIsNone(held.win_transaction_id)
+        self.assertFalse(Transaction.objects.filter(user=orphan).exists())
@@ -8,10 +8,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.core.cache import cache
 
+from apps.core.cache_manager import cache_api_response
 from .services import SuperLottoService
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=300, scope='public', stale_timeout=60)
 def game_info(request):
     """
     获取大乐透游戏信息
@@ -111,6 +113,7 @@ def draw_info(request, draw_number):
 
 
 @api_view(['GET'])
+@cache_api_response(timeout=60, scope='public', stale_timeout=60)
 def latest_draws(request):
     """
     获取最近开奖记录
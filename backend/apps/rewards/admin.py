@@ -10,7 +10,7 @@ from django.utils import timezone
 from .models import (
     VIPLevel, UserVIPStatus, RebateRecord, ReferralRelation,
     ReferralReward, ReferralRewardRecord, UserReferralStats, RewardStatistics,
-    RewardCalculation
+    RewardCalculation, UserDailyTurnover
 )
 
 
@@ -534,4 +534,23 @@ class RewardCalculationAdmin(admin.ModelAdmin):
         
         html += '</table>'
         return format_html(html)
-    reward_breakdown_display.short_description = '奖励明细'
\ No newline at end of file
+    reward_breakdown_display.short_description = '奖励明细'
+
+
+@admin.register(UserDailyTurnover)
+class UserDailyTurnoverAdmin(admin.ModelAdmin):
+    """
+    用户每日流水管理（由结算流程写入，只读）
+    """
+    list_display = ['user_phone', 'date', 'game', 'turnover', 'bet_count', 'updated_at']
+    list_filter = ['game', 'date']
+    search_fields = ['user__phone']
+    date_hierarchy = 'date'
+    readonly_fields = ['user', 'date', 'game', 'turnover', 'bet_count', 'updated_at']
+    
+    def user_phone(self, obj):
+        return obj.user.phone
+    user_phone.short_description = '用户手机'
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,46 @@
+"""
+重建用户每日流水
+按各游戏投注表回填每日流水账本（上线或数据修复时使用）
+"""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.rewards.turnover import DailyTurnoverService
+
+
+class Command(BaseCommand):
+    help = '按各游戏投注表重建用户每日流水'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='截止日期 YYYY-MM-DD，默认昨天',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='向前重建的天数（含截止日期）',
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                end_date = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('日期格式错误，应为 YYYY-MM-DD')
+        else:
+            end_date = timezone.localdate() - timedelta(days=1)
+
+        total = 0
+        for offset in range(options['days'] - 1, -1, -1):
+            day = end_date - timedelta(days=offset)
+            count = DailyTurnoverService.rebuild(day)
+            total += count
+            self.stdout.write(f'{day}: {count} 行')
+
+        self.stdout.write(self.style.SUCCESS(f'每日流水重建完成: {total} 行'))
@@ -0,0 +1,77 @@
+"""
+重建推荐关系闭包表
+按用户的 referred_by 补齐1-7级推荐关系并刷新推荐统计（上线或数据修复时使用）
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.rewards.models import ReferralRelation
+from apps.rewards.services import ReferralService
+
+
+class Command(BaseCommand):
+    help = '按用户推荐人重建1-7级推荐关系闭包表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='每批写入的推荐关系数',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        User = get_user_model()
+
+        # {用户ID: (推荐人ID, 推荐人推荐码)}
+        parents = {
+            user_id: (referrer_id, referral_code)
+            for user_id, referrer_id, referral_code in User.objects.filter(
+                referred_by__isnull=False
+            ).values_list('id', 'referred_by_id', 'referred_by__referral_code').iterator(chunk_size=5000)
+        }
+        self.stdout.write(f'有推荐人的用户: {len(parents)}')
+
+        processed = 0
+        relations = []
+        for referee_id, (referrer_id, referral_code) in parents.items():
+            ancestor_id = referrer_id
+            visited = {referee_id}
+            for level in range(1, ReferralService.MAX_REFERRAL_LEVEL + 1):
+                if ancestor_id is None or ancestor_id in visited:
+                    break
+                visited.add(ancestor_id)
+                relations.append(ReferralRelation(
+                    referrer_id=ancestor_id,
+                    referee_id=referee_id,
+                    level=level,
+                    referral_code=referral_code
+                ))
+                ancestor_id = parents.get(ancestor_id, (None, None))[0]
+
+            if len(relations) >= batch_size:
+                processed += self.flush(relations)
+                relations = []
+
+        processed += self.flush(relations)
+        self.stdout.write(f'推荐关系处理: {processed} 行（已存在的跳过）')
+
+        referrer_ids = list(
+            ReferralRelation.objects.values_list('referrer_id', flat=True).distinct()
+        )
+        for offset in range(0, len(referrer_ids), ReferralService.REWARD_BATCH_SIZE):
+            ReferralService._refresh_referral_stats(
+                referrer_ids[offset:offset + ReferralService.REWARD_BATCH_SIZE]
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'推荐关系重建完成，已刷新 {len(referrer_ids)} 位推荐人的统计'))
+
+    @staticmethod
+    def flush(relations):
+        """
+        写入一批推荐关系，（推荐人, 下级）已存在的跳过
+        """
+        ReferralRelation.objects.bulk_create(relations, batch_size=1000, ignore_conflicts=True)
+        return len(relations)
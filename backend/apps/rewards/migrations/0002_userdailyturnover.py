@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:06
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rewards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyTurnover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='投注日期')),
+                ('game', models.CharField(choices=[('lottery11x5', '11选5'), ('scratch666', '刮刮乐'), ('superlotto', '大乐透'), ('sports', '体育博彩')], help_text='游戏', max_length=20)),
+                ('turnover', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='有效流水', max_digits=15)),
+                ('bet_count', models.IntegerField(default=0, help_text='已结算投注数')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_turnovers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '用户每日流水',
+                'verbose_name_plural': '用户每日流水',
+                'db_table': 'user_daily_turnover',
+                'indexes': [models.Index(fields=['date', 'game'], name='user_daily__date_628428_idx')],
+                'unique_together': {('user', 'date', 'game')},
+            },
+        ),
+    ]
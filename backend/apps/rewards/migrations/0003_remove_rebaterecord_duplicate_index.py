@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0002_userdailyturnover'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='rebaterecord',
+            name='rebate_reco_user_id_46bece_idx',
+        ),
+    ]
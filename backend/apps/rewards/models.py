@@ -219,9 +219,9 @@ class RebateRecord(models.Model):
         verbose_name = '返水记录'
         verbose_name_plural = '返水记录'
         ordering = ['-period_date', '-created_at']
+        # 唯一约束的索引已覆盖 (user, period_date) 查询
         unique_together = ['user', 'period_date']
         indexes = [
-            models.Index(fields=['user', 'period_date']),
             models.Index(fields=['status', 'period_date']),
         ]
     
@@ -566,4 +566,42 @@ class RewardStatistics(models.Model):
         ordering = ['-date']
     
     def __str__(self):
-        return f"{self.date} - 总奖励₦{self.total_reward_amount}"
\ No newline at end of file
+        return f"{self.date} - 总奖励₦{self.total_reward_amount}"
+
+class UserDailyTurnover(models.Model):
+    """
+    用户每日有效流水
+    投注结算、刮刮乐刮开、体育投注同步结算时按投注日期累加，
+    返水、推荐奖励及综合奖励计算直接读取，无需扫描各游戏投注表
+    """
+    GAME_CHOICES = [
+        ('lottery11x5', '11选5'),
+        ('scratch666', '刮刮乐'),
+        ('superlotto', '大乐透'),
+        ('sports', '体育博彩'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_turnovers')
+    date = models.DateField(help_text="投注日期")
+    game = models.CharField(max_length=20, choices=GAME_CHOICES, help_text="游戏")
+    
+    turnover = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0.00'),
+        help_text="有效流水"
+    )
+    bet_count = models.IntegerField(default=0, help_text="已结算投注数")
+    
+    # 时间戳
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'user_daily_turnover'
+        verbose_name = '用户每日流水'
+        verbose_name_plural = '用户每日流水'
+        unique_together = ['user', 'date', 'game']
+        indexes = [
+            models.Index(fields=['date', 'game']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.phone} - {self.date} {self.get_game_display()} ₦{self.turnover}"
@@ -12,11 +12,13 @@ from django.core.cache import cache
 import logging
 
 from apps.finance.models import Transaction, UserBalance
+from apps.finance.services import TransactionAnalyticsService
 from .models import (
     VIPLevel, UserVIPStatus, RebateRecord, ReferralRelation,
     ReferralReward, ReferralRewardRecord, UserReferralStats, RewardStatistics,
     RewardCalculation
 )
+from .turnover import DailyTurnoverService
 
 logger = logging.getLogger(__name__)
 
@@ -352,6 +354,9 @@ class RebateService:
     返水计算服务
     """
     
+    # 批量返水每批用户数
+    REBATE_BATCH_SIZE = 1000
+    
     @staticmethod
     def calculate_daily_rebate(user, target_date: date = None) -> Dict[str, Any]:
         """
@@ -428,94 +433,9 @@ class RebateService:
     @staticmethod
     def _calculate_daily_turnover(user, target_date: date) -> Dict[str, Any]:
         """
-        计算用户当日有效流水
+        计算用户当日有效流水（读取每日流水账本）
         """
-        try:
-            from apps.games.lottery11x5.models import LotteryBet as Lottery11x5Bet
-            from apps.games.scratch666.models import ScratchCard
-            from apps.games.superlotto.models import SuperLottoBet
-            from apps.games.sports.models import SportsBetRecord
-            
-            # 计算日期范围
-            start_datetime = timezone.make_aware(
-                timezone.datetime.combine(target_date, timezone.datetime.min.time())
-            )
-            end_datetime = start_datetime + timedelta(days=1)
-            
-            game_breakdown = {}
-            total_turnover = Decimal('0.00')
-            
-            # 11选5彩票流水
-            try:
-                lottery11x5_turnover = Lottery11x5Bet.objects.filter(
-                    user=user,
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime,
-                    status__in=['WINNING', 'LOSING', 'SETTLED']  # 已结算的投注
-                ).aggregate(total=models.Sum('total_amount'))['total'] or Decimal('0.00')
-                
-                if lottery11x5_turnover > 0:
-                    game_breakdown['11选5'] = float(lottery11x5_turnover)
-                    total_turnover += lottery11x5_turnover
-            except:
-                pass  # 如果模型不存在，跳过
-            
-            # 刮刮乐流水
-            try:
-                scratch_turnover = ScratchCard.objects.filter(
-                    user=user,
-                    purchased_at__gte=start_datetime,
-                    purchased_at__lt=end_datetime,
-                    status__in=['SCRATCHED', 'COMPLETED']  # 已刮开的卡片
-                ).aggregate(total=models.Sum('price'))['total'] or Decimal('0.00')
-                
-                if scratch_turnover > 0:
-                    game_breakdown['刮刮乐'] = float(scratch_turnover)
-                    total_turnover += scratch_turnover
-            except:
-                pass
-            
-            # 大乐透流水
-            try:
-                superlotto_turnover = SuperLottoBet.objects.filter(
-                    user=user,
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime,
-                    status__in=['WINNING', 'LOSING', 'SETTLED']  # 已结算的投注
-                ).aggregate(total=models.Sum('total_amount'))['total'] or Decimal('0.00')
-                
-                if superlotto_turnover > 0:
-                    game_breakdown['大乐透'] = float(superlotto_turnover)
-                    total_turnover += superlotto_turnover
-            except:
-                pass
-            
-            # 体育博彩流水
-            try:
-                sports_turnover = SportsBetRecord.objects.filter(
-                    user=user,
-                    bet_time__gte=start_datetime,
-                    bet_time__lt=end_datetime,
-                    status__in=['WON', 'LOST']  # 已结算的投注
-                ).aggregate(total=models.Sum('bet_amount'))['total'] or Decimal('0.00')
-                
-                if sports_turnover > 0:
-                    game_breakdown['体育博彩'] = float(sports_turnover)
-                    total_turnover += sports_turnover
-            except:
-                pass
-            
-            return {
-                'total_turnover': total_turnover,
-                'game_breakdown': game_breakdown
-            }
-            
-        except Exception as e:
-            logger.error(f"计算每日流水失败: {str(e)}")
-            return {
-                'total_turnover': Decimal('0.00'),
-                'game_breakdown': {}
-            }
+        return DailyTurnoverService.get_user_turnover(user.id, target_date)
     
     @staticmethod
     def pay_rebate(record_id: str) -> Dict[str, Any]:
@@ -592,55 +512,44 @@ class RebateService:
     @staticmethod
     def batch_calculate_daily_rebates(target_date: date = None) -> Dict[str, Any]:
         """
-        批量计算每日返水
+        批量计算并发放每日返水
+        从每日流水账本读取当日各用户分游戏流水，按批关联VIP返水比例，
+        每批在一个事务内批量写入返水记录、交易记录并聚合入账奖金余额
+        已有返水记录的用户跳过，任务可重复执行
         """
         try:
             if target_date is None:
                 target_date = timezone.now().date() - timedelta(days=1)
             
-            # 获取所有活跃用户
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            
-            active_users = User.objects.filter(
-                is_active=True,
-                vip_status__isnull=False
-            ).select_related('vip_status')
+            turnover = DailyTurnoverService.grouped_turnover(target_date)
+            user_ids = sorted(turnover.keys(), key=str)
             
             calculated_count = 0
             paid_count = 0
             total_rebate_amount = Decimal('0.00')
             errors = []
             
-            for user in active_users:
+            batch_size = RebateService.REBATE_BATCH_SIZE
+            for offset in range(0, len(user_ids), batch_size):
+                batch_ids = user_ids[offset:offset + batch_size]
                 try:
-                    # 计算返水
-                    calc_result = RebateService.calculate_daily_rebate(user, target_date)
-                    
-                    if calc_result['success']:
-                        calculated_count += 1
-                        rebate_amount = Decimal(str(calc_result['data']['rebate_amount']))
-                        total_rebate_amount += rebate_amount
-                        
-                        # 自动发放返水
-                        record_id = calc_result['data']['record_id']
-                        pay_result = RebateService.pay_rebate(record_id)
-                        
-                        if pay_result['success']:
-                            paid_count += 1
-                        else:
-                            errors.append(f"用户 {user.phone} 返水发放失败: {pay_result['message']}")
-                    
+                    result = RebateService._settle_rebate_batch(target_date, batch_ids, turnover)
+                    calculated_count += result['calculated_count']
+                    paid_count += result['paid_count']
+                    total_rebate_amount += result['total_rebate_amount']
+                    errors.extend(result['errors'])
                 except Exception as e:
-                    errors.append(f"用户 {user.phone} 返水计算失败: {str(e)}")
-                    continue
+                    logger.error(f"返水批次 {offset // batch_size + 1} 处理失败: {str(e)}")
+                    errors.append(f"返水批次 {offset // batch_size + 1} 处理失败: {str(e)}")
+            
+            logger.info(f"{target_date} 返水完成: {calculated_count} 用户, 发放 {paid_count}, ₦{total_rebate_amount}")
             
             return {
                 'success': True,
                 'message': f'批量返水计算完成',
                 'data': {
                     'target_date': target_date.isoformat(),
-                    'total_users': len(active_users),
+                    'total_users': len(user_ids),
                     'calculated_count': calculated_count,
                     'paid_count': paid_count,
                     'total_rebate_amount': float(total_rebate_amount),
@@ -652,6 +561,129 @@ class RebateService:
             logger.error(f"批量计算返水失败: {str(e)}")
             return {'success': False, 'message': f'批量计算失败: {str(e)}'}
     
+    @staticmethod
+    def _settle_rebate_batch(target_date: date, user_ids: List[Any],
+                             turnover: Dict[Any, Dict[str, Decimal]]) -> Dict[str, Any]:
+        """
+        计算并发放一批用户的返水
+        无余额账户的用户生成待发放记录，其余用户直接发放
+        """
+        result = {
+            'calculated_count': 0,
+            'paid_count': 0,
+            'total_rebate_amount': Decimal('0.00'),
+            'errors': [],
+        }
+        
+        # 活跃用户的VIP返水比例
+        vip_rates = {
+            user_id: (level, rate)
+            for user_id, level, rate in UserVIPStatus.objects.filter(
+                user_id__in=user_ids,
+                user__is_active=True
+            ).values_list('user_id', 'current_level__level', 'current_level__rebate_rate')
+        }
+        
+        description = f'{target_date}返水'
+        now = timezone.now()
+        
+        with transaction.atomic():
+            existing = set(
+                RebateRecord.objects.filter(
+                    user_id__in=user_ids, period_date=target_date
+                ).values_list('user_id', flat=True)
+            )
+            
+            # 按用户ID顺序锁定余额，避免与其他入账互相死锁
+            with_balance = set(
+                UserBalance.objects.select_for_update().filter(
+                    user_id__in=vip_rates.keys()
+                ).order_by('user_id').values_list('user_id', flat=True)
+            )
+            
+            records = []
+            rebate_transactions = []
+            credits = {}
+            
+            for user_id in user_ids:
+                if user_id not in vip_rates or user_id in existing:
+                    continue
+                
+                game_turnover = turnover[user_id]
+                total_turnover = sum(game_turnover.values(), Decimal('0.00'))
+                if total_turnover < Decimal('1.00'):
+                    continue
+                
+                vip_level, rebate_rate = vip_rates[user_id]
+                rebate_amount = (total_turnover * rebate_rate).quantize(Decimal('0.01'))
+                record = RebateRecord(
+                    id=uuid.uuid4(),
+                    user_id=user_id,
+                    period_date=target_date,
+                    vip_level=vip_level,
+                    rebate_rate=rebate_rate,
+                    total_turnover=total_turnover,
+                    game_turnover_breakdown={name: float(amount) for name, amount in game_turnover.items()},
+                    rebate_amount=rebate_amount,
+                    status='PENDING'
+                )
+                records.append(record)
+                result['calculated_count'] += 1
+                result['total_rebate_amount'] += rebate_amount
+                
+                if user_id not in with_balance:
+                    result['errors'].append(f"用户 {user_id} 返水发放失败: 余额账户不存在")
+                    continue
+                if rebate_amount <= 0:
+                    continue
+                
+                rebate_transaction = Transaction(
+                    id=uuid.uuid4(),
+                    user_id=user_id,
+                    type='REBATE',
+                    amount=rebate_amount,
+                    fee=Decimal('0.00'),
+                    actual_amount=rebate_amount,
+                    status='COMPLETED',
+                    reference_id=str(uuid.uuid4()),
+                    description=description,
+                    metadata={
+                        'rebate_record_id': str(record.id),
+                        'period_date': target_date.isoformat(),
+                        'vip_level': vip_level,
+                        'rebate_rate': float(rebate_rate),
+                        'total_turnover': float(total_turnover),
+                    }
+                )
+                rebate_transactions.append(rebate_transaction)
+                
+                record.status = 'PAID'
+                record.paid_at = now
+                record.transaction_id = rebate_transaction.id
+                credits[user_id] = rebate_amount
+            
+            RebateRecord.objects.bulk_create(records, batch_size=500)
+            Transaction.objects.bulk_create(rebate_transactions, batch_size=500)
+            TransactionAnalyticsService.invalidate_users(credits.keys())
+            UserBalance.bulk_add_balance(credits, description, balance_type='bonus')
+            
+            if credits:
+                # 单条UPDATE累加VIP返水统计
+                received = models.Case(
+                    *[models.When(user_id=user_id, then=models.Value(amount))
+                      for user_id, amount in credits.items()],
+                    default=models.Value(Decimal('0.00')),
+                    output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                )
+                UserVIPStatus.objects.filter(user_id__in=credits.keys()).update(
+                    total_rebate_received=models.F('total_rebate_received') + received,
+                    monthly_rebate_received=models.F('monthly_rebate_received') + received,
+                )
+            
+            result['paid_count'] = len(credits)
+        
+        return result
+    
     @staticmethod
     def get_user_rebate_records(user, limit: int = 20) -> List[Dict[str, Any]]:
         """
@@ -779,16 +811,24 @@ class RebateService:
                 'daily_breakdown': []
             }
 
-class Re
-ferralService:
+class ReferralService:
     """
     推荐奖励服务
+    ReferralRelation 为推荐关系闭包表：每个下级与其1-7级上级各有一行，level 为层级，
+    团队查询、层级统计及奖励计算均直接关联该表，无需逐级遍历推荐树
     """
     
+    # 推荐关系最大层级
+    MAX_REFERRAL_LEVEL = 7
+    
+    # 推荐奖励计算每批下级用户数
+    REWARD_BATCH_SIZE = 1000
+    
     @staticmethod
     def create_referral_relation(referrer, referee, referral_code: str) -> Dict[str, Any]:
         """
         创建推荐关系
+        新用户的第N+1级上级即推荐人的第N级上级，由推荐人在闭包表中的上级链一次查询得到
         """
         try:
             # 检查是否已存在推荐关系
@@ -805,37 +845,33 @@ ferralService:
                 return {'success': False, 'message': '不能推荐自己'}
             
             with transaction.atomic():
-                # 创建直接推荐关系（一级）
-                ReferralRelation.objects.create(
+                ancestors = list(
+                    ReferralRelation.objects.filter(
+                        referee=referrer,
+                        level__lt=ReferralService.MAX_REFERRAL_LEVEL
+                    ).values_list('referrer_id', 'level')
+                )
+                
+                # 直接推荐关系（一级）及多级推荐关系（二级到七级）
+                relations = [ReferralRelation(
                     referrer=referrer,
                     referee=referee,
                     level=1,
                     referral_code=referral_code
-                )
-                
-                # 创建多级推荐关系（二级到七级）
-                current_referrer = referrer
-                for level in range(2, 8):  # 2-7级
-                    # 查找上级的推荐人
-                    upper_relation = ReferralRelation.objects.filter(
-                        referee=current_referrer, level=1
-                    ).first()
-                    
-                    if not upper_relation:
-                        break  # 没有更上级的推荐人
-                    
-                    # 创建多级推荐关系
-                    ReferralRelation.objects.create(
-                        referrer=upper_relation.referrer,
+                )]
+                relations.extend(
+                    ReferralRelation(
+                        referrer_id=ancestor_id,
                         referee=referee,
-                        level=level,
+                        level=level + 1,
                         referral_code=referral_code
                     )
-                    
-                    current_referrer = upper_relation.referrer
+                    for ancestor_id, level in ancestors
+                )
+                ReferralRelation.objects.bulk_create(relations)
                 
-                # 更新推荐人的统计数据
-                ReferralService._update_referrer_stats(referrer)
+                # 更新所有上级的统计数据
+                ReferralService._refresh_referral_stats([relation.referrer_id for relation in relations])
                 
                 logger.info(f"创建推荐关系成功: {referrer.phone} -> {referee.phone}")
                 
@@ -855,39 +891,69 @@ ferralService:
         """
         更新推荐人统计数据
         """
+        ReferralService._refresh_referral_stats([referrer.id])
+    
+    @staticmethod
+    def _refresh_referral_stats(user_ids: List[Any]):
+        """
+        批量更新推荐统计数据
+        各级推荐人数、活跃推荐人数分别由一条分组查询得到
+        """
         try:
-            stats, created = UserReferralStats.objects.get_or_create(user=referrer)
+            user_ids = list(set(user_ids))
+            if not user_ids:
+                return
             
             # 统计各级推荐人数
-            level_counts = {}
-            for level in range(1, 8):
-                count = ReferralRelation.objects.filter(
-                    referrer=referrer, level=level, is_active=True
-                ).count()
-                level_counts[level] = count
-            
-            # 更新统计数据
-            stats.total_referrals = sum(level_counts.values())
-            stats.level1_count = level_counts[1]
-            stats.level2_count = level_counts[2]
-            stats.level3_count = level_counts[3]
-            stats.level4_count = level_counts[4]
-            stats.level5_count = level_counts[5]
-            stats.level6_count = level_counts[6]
-            stats.level7_count = level_counts[7]
-            
-            # 统计活跃推荐人数（最近30天有流水的）
+            level_counts: Dict[Any, Dict[int, int]] = {}
+            for referrer_id, level, count in ReferralRelation.objects.filter(
+                referrer_id__in=user_ids, is_active=True
+            ).values('referrer_id', 'level').annotate(
+                count=models.Count('id')
+            ).values_list('referrer_id', 'level', 'count'):
+                level_counts.setdefault(referrer_id, {})[level] = count
+            
+            # 统计活跃推荐人数（最近30天登录的直接下级）
             thirty_days_ago = timezone.now().date() - timedelta(days=30)
+            active_counts = dict(
+                ReferralRelation.objects.filter(
+                    referrer_id__in=user_ids,
+                    level=1,
+                    is_active=True,
+                    referee__last_login__gte=thirty_days_ago
+                ).values('referrer_id').annotate(
+                    count=models.Count('id')
+                ).values_list('referrer_id', 'count')
+            )
             
-            active_referees = ReferralRelation.objects.filter(
-                referrer=referrer,
-                level=1,
-                is_active=True,
-                referee__last_login__gte=thirty_days_ago
-            ).values_list('referee_id', flat=True)
+            stats_by_user = {
+                stats.user_id: stats
+                for stats in UserReferralStats.objects.filter(user_id__in=user_ids)
+            }
+            missing = [user_id for user_id in user_ids if user_id not in stats_by_user]
+            if missing:
+                UserReferralStats.objects.bulk_create(
+                    [UserReferralStats(user_id=user_id) for user_id in missing],
+                    ignore_conflicts=True
+                )
+                stats_by_user.update({
+                    stats.user_id: stats
+                    for stats in UserReferralStats.objects.filter(user_id__in=missing)
+                })
             
-            stats.active_referrals = len(active_referees)
-            stats.save()
+            fields = ['total_referrals', 'active_referrals', 'updated_at']
+            fields += [f'level{level}_count' for level in range(1, ReferralService.MAX_REFERRAL_LEVEL + 1)]
+            
+            now = timezone.now()
+            for user_id, stats in stats_by_user.items():
+                counts = level_counts.get(user_id, {})
+                stats.total_referrals = sum(counts.values())
+                stats.active_referrals = active_counts.get(user_id, 0)
+                for level in range(1, ReferralService.MAX_REFERRAL_LEVEL + 1):
+                    setattr(stats, f'level{level}_count', counts.get(level, 0))
+                stats.updated_at = now
+            
+            UserReferralStats.objects.bulk_update(stats_by_user.values(), fields, batch_size=500)
             
         except Exception as e:
             logger.error(f"更新推荐人统计失败: {str(e)}")
@@ -896,86 +962,81 @@ ferralService:
     def calculate_daily_referral_rewards(date_obj=None) -> Dict[str, Any]:
         """
         计算每日推荐奖励
+        有流水的下级按批关联闭包表取得全部上级，已计算的（上级, 下级）跳过，
+        每批奖励记录一次bulk_create写入
         """
         try:
             if date_obj is None:
                 date_obj = timezone.now().date() - timedelta(days=1)  # 默认计算昨天的奖励
             
             # 获取推荐奖励配置
-            reward_configs = {}
-            for config in ReferralReward.objects.all():
-                reward_configs[config.level] = config.reward_rate
+            reward_configs = {
+                level: reward_rate
+                for level, reward_rate in ReferralReward.objects.values_list('level', 'reward_rate')
+            }
             
             if not reward_configs:
                 return {'success': False, 'message': '推荐奖励配置不存在'}
             
-            # 获取昨天有流水的用户
-            start_datetime = timezone.make_aware(timezone.datetime.combine(date_obj, timezone.datetime.min.time()))
-            end_datetime = start_datetime + timedelta(days=1)
-            
-            users_with_turnover = ReferralService._get_users_with_turnover_for_referral(start_datetime, end_datetime)
+            # 获取当日有流水的用户
+            users_with_turnover = DailyTurnoverService.user_totals(date_obj)
+            referee_ids = list(users_with_turnover.keys())
             
             total_records = 0
-            success_count = 0
             total_reward_amount = Decimal('0.00')
             
-            for user_id, turnover_amount in users_with_turnover.items():
+            batch_size = ReferralService.REWARD_BATCH_SIZE
+            for offset in range(0, len(referee_ids), batch_size):
+                batch_ids = referee_ids[offset:offset + batch_size]
                 try:
-                    from django.contrib.auth import get_user_model
-                    User = get_user_model()
-                    user = User.objects.get(id=user_id)
-                    
-                    # 获取该用户的所有推荐人
-                    referral_relations = ReferralRelation.objects.filter(
-                        referee=user, is_active=True
-                    ).select_related('referrer')
-                    
-                    for relation in referral_relations:
-                        # 检查是否已经计算过
-                        existing_record = ReferralRewardRecord.objects.filter(
-                            referrer=relation.referrer,
-                            referee=user,
-                            period_date=date_obj
-                        ).first()
-                        
-                        if existing_record:
-                            continue  # 已经计算过，跳过
-                        
-                        # 获取奖励比例
-                        reward_rate = reward_configs.get(relation.level, Decimal('0.00'))
-                        if reward_rate <= 0:
-                            continue
+                    with transaction.atomic():
+                        relations = ReferralRelation.objects.filter(
+                            referee_id__in=batch_ids, is_active=True
+                        ).values_list('referrer_id', 'referee_id', 'level')
                         
-                        # 计算奖励金额
-                        reward_amount = turnover_amount * reward_rate
+                        # 已经计算过的（上级, 下级）
+                        existing = set(
+                            ReferralRewardRecord.objects.filter(
+                                referee_id__in=batch_ids, period_date=date_obj
+                            ).values_list('referrer_id', 'referee_id')
+                        )
                         
-                        if reward_amount <= 0:
-                            continue
-                        
-                        # 创建推荐奖励记录
-                        with transaction.atomic():
-                            reward_record = ReferralRewardRecord.objects.create(
-                                referrer=relation.referrer,
-                                referee=user,
+                        records = []
+                        for referrer_id, referee_id, level in relations:
+                            if (referrer_id, referee_id) in existing:
+                                continue
+                            
+                            # 获取奖励比例
+                            reward_rate = reward_configs.get(level, Decimal('0.00'))
+                            if reward_rate <= 0:
+                                continue
+                            
+                            # 计算奖励金额
+                            turnover_amount = users_with_turnover[referee_id]
+                            reward_amount = (turnover_amount * reward_rate).quantize(Decimal('0.01'))
+                            if reward_amount <= 0:
+                                continue
+                            
+                            records.append(ReferralRewardRecord(
+                                referrer_id=referrer_id,
+                                referee_id=referee_id,
                                 period_date=date_obj,
-                                referral_level=relation.level,
+                                referral_level=level,
                                 reward_rate=reward_rate,
                                 referee_turnover=turnover_amount,
                                 reward_amount=reward_amount,
                                 status='PENDING'
-                            )
-                            
-                            total_records += 1
-                            success_count += 1
+                            ))
                             total_reward_amount += reward_amount
-                            
-                            logger.info(f"推荐奖励计算: {relation.referrer.phone} <- {user.phone} (L{relation.level}) ₦{reward_amount}")
+                        
+                        ReferralRewardRecord.objects.bulk_create(records, batch_size=500)
+                        total_records += len(records)
                     
                 except Exception as e:
-                    logger.error(f"计算用户推荐奖励失败 (用户ID: {user_id}): {str(e)}")
+                    logger.error(f"计算推荐奖励批次失败 (第{offset // batch_size + 1}批): {str(e)}")
                     continue
             
-            logger.info(f"{date_obj}推荐奖励计算完成: {success_count}条记录, 总金额₦{total_reward_amount}")
+            logger.info(f"{date_obj}推荐奖励计算完成: {total_records}条记录, 总金额₦{total_reward_amount}")
             
             return {
                 'success': True,
@@ -983,7 +1044,7 @@ ferralService:
                 'data': {
                     'date': date_obj.isoformat(),
                     'total_records': total_records,
-                    'success_count': success_count,
+                    'success_count': total_records,
                     'total_reward_amount': float(total_reward_amount),
                 }
             }
@@ -992,88 +1053,6 @@ ferralService:
             logger.error(f"计算推荐奖励失败: {str(e)}")
             return {'success': False, 'message': f'计算失败: {str(e)}'}
     
-    @staticmethod
-    def _get_users_with_turnover_for_referral(start_datetime, end_datetime) -> Dict[str, Decimal]:
-        """
-        获取指定时间段内有流水的用户及其流水金额
-        """
-        try:
-            user_turnover = {}
-            
-            # 11选5彩票流水
-            try:
-                from apps.games.lottery11x5.models import LotteryBet as Lottery11x5Bet
-                bets = Lottery11x5Bet.objects.filter(
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime,
-                    status__in=['WINNING', 'LOSING', 'SETTLED']
-                ).values('user_id').annotate(total=models.Sum('total_amount'))
-                
-                for bet in bets:
-                    user_id = str(bet['user_id'])
-                    amount = bet['total'] or Decimal('0.00')
-                    user_turnover[user_id] = user_turnover.get(user_id, Decimal('0.00')) + amount
-                    
-            except Exception as e:
-                logger.error(f"获取11选5推荐流水失败: {str(e)}")
-            
-            # 刮刮乐流水
-            try:
-                from apps.games.scratch666.models import ScratchCard
-                cards = ScratchCard.objects.filter(
-                    purchased_at__gte=start_datetime,
-                    purchased_at__lt=end_datetime,
-                    status__in=['SCRATCHED', 'COMPLETED']
-                ).values('user_id').annotate(total=models.Sum('price'))
-                
-                for card in cards:
-                    user_id = str(card['user_id'])
-                    amount = card['total'] or Decimal('0.00')
-                    user_turnover[user_id] = user_turnover.get(user_id, Decimal('0.00')) + amount
-                    
-            except Exception as e:
-                logger.error(f"获取刮刮乐推荐流水失败: {str(e)}")
-            
-            # 大乐透流水
-            try:
-                from apps.games.superlotto.models import SuperLottoBet
-                bets = SuperLottoBet.objects.filter(
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime,
-                    status__in=['WINNING', 'LOSING', 'SETTLED']
-                ).values('user_id').annotate(total=models.Sum('total_amount'))
-                
-                for bet in bets:
-                    user_id = str(bet['user_id'])
-                    amount = bet['total'] or Decimal('0.00')
-                    user_turnover[user_id] = user_turnover.get(user_id, Decimal('0.00')) + amount
-                    
-            except Exception as e:
-                logger.error(f"获取大乐透推荐流水失败: {str(e)}")
-            
-            # 体育博彩流水
-            try:
-                from apps.games.sports.models import SportsBetRecord
-                bets = SportsBetRecord.objects.filter(
-                    bet_time__gte=start_datetime,
-                    bet_time__lt=end_datetime,
-                    status__in=['WON', 'LOST']
-                ).values('user_id').annotate(total=models.Sum('bet_amount'))
-                
-                for bet in bets:
-                    user_id = str(bet['user_id'])
-                    amount = bet['total'] or Decimal('0.00')
-                    user_turnover[user_id] = user_turnover.get(user_id, Decimal('0.00')) + amount
-                    
-            except Exception as e:
-                logger.error(f"获取体育博彩推荐流水失败: {str(e)}")
-            
-            return user_turnover
-            
-        except Exception as e:
-            logger.error(f"获取推荐流水失败: {str(e)}")
-            return {}
-    
     @staticmethod
     def process_referral_reward_payment(record_id: str) -> Dict[str, Any]:
         """
@@ -1210,16 +1189,29 @@ ferralService:
             except UserReferralStats.DoesNotExist:
                 stats = UserReferralStats.objects.create(user=user)
             
-            # 获取推荐关系
+            # 获取推荐关系（下级及其VIP状态一次关联查询）
             relations_query = ReferralRelation.objects.filter(
                 referrer=user, is_active=True
-            ).select_related('referee')
+            ).select_related('referee', 'referee__vip_status')
             
             if level:
                 relations_query = relations_query.filter(level=level)
             
             relations = relations_query.order_by('level', '-created_at')
             
+            # 各下级、各层级贡献的奖励
+            paid_rewards = ReferralRewardRecord.objects.filter(referrer=user, status='PAID')
+            referee_contributions = dict(
+                paid_rewards.values('referee_id').annotate(
+                    total=models.Sum('reward_amount')
+                ).values_list('referee_id', 'total')
+            )
+            level_contributions = dict(
+                paid_rewards.values('referral_level').annotate(
+                    total=models.Sum('reward_amount')
+                ).values_list('referral_level', 'total')
+            )
+            
             # 构建团队数据
             team_data = []
             for relation in relations:
@@ -1227,20 +1219,13 @@ ferralService:
                 
                 # 获取下级用户的流水统计
                 try:
-                    referee_vip = UserVIPStatus.objects.get(user=referee)
+                    referee_vip = referee.vip_status
                     total_turnover = referee_vip.total_turnover
                     monthly_turnover = referee_vip.monthly_turnover
                 except UserVIPStatus.DoesNotExist:
                     total_turnover = Decimal('0.00')
                     monthly_turnover = Decimal('0.00')
                 
-                # 获取该下级贡献的奖励
-                total_contribution = ReferralRewardRecord.objects.filter(
-                    referrer=user,
-                    referee=referee,
-                    status='PAID'
-                ).aggregate(total=models.Sum('reward_amount'))['total'] or Decimal('0.00')
-                
                 team_data.append({
                     'user_id': str(referee.id),
                     'phone': referee.phone,
@@ -1249,26 +1234,17 @@ ferralService:
                     'join_date': relation.created_at.isoformat(),
                     'total_turnover': float(total_turnover),
                     'monthly_turnover': float(monthly_turnover),
-                    'total_contribution': float(total_contribution),
+                    'total_contribution': float(referee_contributions.get(referee.id) or Decimal('0.00')),
                     'is_active': referee.last_login and (timezone.now() - referee.last_login).days <= 7,
                 })
             
             # 获取各级统计
             level_stats = []
-            for level in range(1, 8):
-                count = getattr(stats, f'level{level}_count', 0)
-                
-                # 计算该级别的总贡献
-                level_contribution = ReferralRewardRecord.objects.filter(
-                    referrer=user,
-                    referral_level=level,
-                    status='PAID'
-                ).aggregate(total=models.Sum('reward_amount'))['total'] or Decimal('0.00')
-                
+            for level in range(1, ReferralService.MAX_REFERRAL_LEVEL + 1):
                 level_stats.append({
                     'level': level,
-                    'count': count,
-                    'contribution': float(level_contribution),
+                    'count': getattr(stats, f'level{level}_count', 0),
+                    'contribution': float(level_contributions.get(level) or Decimal('0.00')),
                 })
             
             return {
@@ -0,0 +1,302 @@
+"""
+奖励系统测试
+"""
+
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from datetime import timedelta
+
+User = get_user_model()
+
+
+class DailyTurnoverLedgerTest(TestCase):
+    """
+    用户每日流水账本测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        self.user = User.objects.create_user(
+            username='turnover_user',
+            phone='+2348010000100',
+            password='testpass123'
+        )
+
+    def test_record_many_accumulates_per_day_and_game(self):
+        """
+        测试结算流水按投注日期、游戏累加，重复累加不覆盖
+        """
+        from apps.rewards.turnover import DailyTurnoverService
+
+        bet_time = timezone.now()
+        day = timezone.localdate(bet_time)
+        previous_day = day - timedelta(days=1)
+
+        DailyTurnoverService.record_many('lottery11x5', [
+            (self.user.id, bet_time, Decimal('10.00')),
+            (self.user.id, bet_time, Decimal('6.00')),
+            (self.user.id, bet_time - timedelta(days=1), Decimal('4.00')),
+        ])
+        DailyTurnoverService.record(self.user.id, 'lottery11x5', Decimal('2.00'), bet_time)
+        DailyTurnoverService.record(self.user.id, 'superlotto', Decimal('30.00'), bet_time)
+
+        turnover = DailyTurnoverService.get_user_turnover(self.user.id, day)
+        self.assertEqual(turnover['total_turnover'], Decimal('48.00'))
+        self.assertEqual(turnover['game_breakdown'], {'11选5': 18.0, '大乐透': 30.0})
+
+        self.assertEqual(DailyTurnoverService.user_totals(day), {self.user.id: Decimal('48.00')})
+        self.assertEqual(DailyTurnoverService.user_totals(previous_day), {self.user.id: Decimal('4.00')})
+        self.assertEqual(
+            DailyTurnoverService.grouped_turnover(day)[self.user.id]['11选5'],
+            Decimal('18.00')
+        )
+
+
+class RebateBatchTest(TestCase):
+    """
+    批量每日返水测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备
+        """
+        from apps.finance.models import UserBalance
+        from apps.rewards.models import VIPLevel, UserVIPStatus
+        from apps.rewards.turnover import DailyTurnoverService
+
+        self.vip_level = VIPLevel.objects.create(level=1, name='VIP1', rebate_rate=Decimal('0.0050'))
+        self.users = []
+        for index in range(3):
+            user = User.objects.create_user(
+                username=f'rebate_user_{index}',
+                phone=f'+23480100007{index:02d}',
+                password='testpass123'
+            )
+            UserVIPStatus.objects.create(user=user, current_level=self.vip_level)
+            self.users.append(user)
+
+        # 最后一个用户没有余额账户
+        for user in self.users[:2]:
+            UserBalance.objects.get_or_create(user=user)
+        UserBalance.objects.filter(user=self.users[2]).delete()
+
+        bet_time = timezone.now() - timedelta(days=1)
+        self.day = timezone.localdate(bet_time)
+        DailyTurnoverService.record_many('lottery11x5', [
+            (user.id, bet_time, Decimal('1000.00')) for user in self.users
+        ])
+        DailyTurnoverService.record_many('superlotto', [(self.users[0].id, bet_time, Decimal('200.00'))])
+
+    def run_rebates(self):
+        from apps.rewards.services import RebateService
+
+        # 每批2位用户，覆盖多批处理
+        RebateService.REBATE_BATCH_SIZE, batch_size = 2, RebateService.REBATE_BATCH_SIZE
+        try:
+            return RebateService.batch_calculate_daily_rebates(self.day)
+        finally:
+            RebateService.REBATE_BATCH_SIZE = batch_size
+
+    def test_paid_batch(self):
+        """
+        测试按流水及VIP比例发放返水，入账奖金余额并累加VIP返水统计
+        """
+        from apps.finance.models import UserBalance, Transaction
+        from apps.rewards.models import RebateRecord, UserVIPStatus
+
+        result = self.run_rebates()
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['calculated_count'], 3)
+        self.assertEqual(result['data']['paid_count'], 2)
+        self.assertEqual(result['data']['total_rebate_amount'], 16.0)
+
+        record = RebateRecord.objects.get(user=self.users[0], period_date=self.day)
+        self.assertEqual(record.status, 'PAID')
+        self.assertEqual(record.total_turnover, Decimal('1200.00'))
+        self.assertEqual(record.rebate_amount, Decimal('6.00'))
+        self.assertEqual(record.vip_level, 1)
+        self.assertEqual(set(record.game_turnover_breakdown), {'11选5', '大乐透'})
+
+        rebate_transaction = Transaction.objects.get(id=record.transaction_id)
+        self.assertEqual((rebate_transaction.type, rebate_transaction.amount), ('REBATE', Decimal('6.00')))
+        self.assertEqual(UserBalance.objects.get(user=self.users[0]).bonus_balance, Decimal('6.00'))
+        self.assertEqual(UserBalance.objects.get(user=self.users[1]).bonus_balance, Decimal('5.00'))
+
+        vip_status = UserVIPStatus.objects.get(user=self.users[0])
+        self.assertEqual(vip_status.total_rebate_received, Decimal('6.00'))
+        self.assertEqual(vip_status.monthly_rebate_received, Decimal('6.00'))
+
+    def test_user_without_balance_left_pending(self):
+        """
+        测试无余额账户的用户生成待发放记录，不生成交易、不累加VIP统计
+        """
+        from apps.finance.models import Transaction
+        from apps.rewards.models import RebateRecord, UserVIPStatus
+
+        result = self.run_rebates()
+
+        record = RebateRecord.objects.get(user=self.users[2], period_date=self.day)
+        self.assertEqual(record.status, 'PENDING')
+        self.assertEqual(record.rebate_amount, Decimal('5.00'))
+        self.assertIsNone(record.transaction_id)
+        self.assertFalse(Transaction.objects.filter(user=self.users[2]).exists())
+        self.assertEqual(UserVIPStatus.objects.get(user=self.users[2]).total_rebate_received, Decimal('0.00'))
+        self.assertEqual(len(result['data']['errors']), 1)
+
+    def test_rerun_skips_existing_records(self):
+        """
+        测试重复执行跳过已有返水记录的用户，不重复发放
+        """
+        from apps.finance.models import UserBalance, Transaction
+        from apps.rewards.models import RebateRecord, UserVIPStatus
+
+        self.run_rebates()
+        result = self.run_rebates()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['calculated_count'], 0)
+        self.assertEqual(result['data']['paid_count'], 0)
+        self.assertEqual(RebateRecord.objects.filter(period_date=self.day).count(), 3)
+        self.assertEqual(Transaction.objects.filter(type='REBATE').count(), 2)
+        self.assertEqual(UserBalance.objects.get(user=self.users[0]).bonus_balance, Decimal('6.00'))
+        self.assertEqual(UserVIPStatus.objects.get(user=self.users[0]).total_rebate_received, Decimal('6.00'))
+
+
+class ReferralClosureTest(TestCase):
+    """
+    推荐关系闭包表测试
+    """
+
+    def setUp(self):
+        """
+        测试数据准备：9位用户组成的单链推荐关系，users[0] 为最上级
+        """
+        from apps.rewards.services import ReferralService
+
+        self.users = []
+        for index in range(9):
+            user = User.objects.create_user(
+                username=f'referral_user_{index}',
+                phone=f'+23480100008{index:02d}',
+                password='testpass123',
+                referred_by=self.users[-1] if self.users else None
+            )
+            if self.users:
+                referrer = self.users[-1]
+                result = ReferralService.create_referral_relation(referrer, user, referrer.referral_code)
+                self.assertTrue(result['success'], result['message'])
+            self.users.append(user)
+
+    def relation_set(self):
+        from apps.rewards.models import ReferralRelation
+
+        return set(ReferralRelation.objects.values_list('referrer_id', 'referee_id', 'level'))
+
+    def stats_of(self, user):
+        from apps.rewards.models import UserReferralStats
+
+        return UserReferralStats.objects.get(user=user)
+
+    def test_multi_level_chain(self):
+        """
+        测试新用户继承推荐人的上级链，最多7级
+        """
+        from apps.rewards.models import ReferralRelation
+        from apps.rewards.services import ReferralService
+
+        deepest = self.users[-1]
+        ancestors = dict(
+            ReferralRelation.objects.filter(referee=deepest).values_list('level', 'referrer_id')
+        )
+        self.assertEqual(ancestors, {level: self.users[8 - level].id for level in range(1, 8)})
+
+        tree = self.users[0].get_referral_tree()
+        self.assertEqual([node['level'] for node in tree], list(range(1, 8)))
+        self.assertEqual(tree[2]['user_id'], str(self.users[3].id))
+        self.assertEqual([node['level'] for node in self.users[0].get_referral_tree(max_depth=3)], [1, 2, 3])
+
+        # 不能重复建立推荐关系
+        result = ReferralService.create_referral_relation(self.users[0], deepest, self.users[0].referral_code)
+        self.assertFalse(result['success'])
+
+    def test_per_level_stats_refresh(self):
+        """
+        测试建立推荐关系后刷新所有上级的分级统计
+        """
+        from apps.rewards.services import ReferralService
+
+        top = self.stats_of(self.users[0])
+        self.assertEqual(top.total_referrals, 7)
+        self.assertEqual(
+            [getattr(top, f'level{level}_count') for level in range(1, 8)], [1] * 7
+        )
+        self.assertEqual(self.stats_of(self.users[7]).total_referrals, 1)
+
+        # users[1] 新增一位直接下级
+        newcomer = User.objects.create_user(
+            username='referral_newcomer',
+            phone='+2348010000899',
+            password='testpass123'
+        )
+        ReferralService.create_referral_relation(self.users[1], newcomer, self.users[1].referral_code)
+
+        self.assertEqual(self.stats_of(self.users[1]).level1_count, 2)
+        self.assertEqual(self.stats_of(self.users[1]).total_referrals, 8)
+        self.assertEqual(self.stats_of(self.users[0]).level2_count, 2)
+        self.assertEqual(self.stats_of(self.users[0]).total_referrals, 8)
+        self.assertEqual(self.stats_of(self.users[2]).total_referrals, 6)
+
+    def test_daily_rewards_skip_existing_pairs(self):
+        """
+        测试推荐奖励按级比例生成，已计算的（上级, 下级）重复执行时跳过
+        """
+        from apps.rewards.models import ReferralReward, ReferralRewardRecord
+        from apps.rewards.services import ReferralService
+        from apps.rewards.turnover import DailyTurnoverService
+
+        for level in range(1, 8):
+            ReferralReward.objects.create(
+                level=level, reward_rate=Decimal('0.0010'), name=f'L{level}', description=f'{level}级推荐奖励'
+            )
+        bet_time = timezone.now() - timedelta(days=1)
+        day = timezone.localdate(bet_time)
+        DailyTurnoverService.record_many('lottery11x5', [(self.users[8].id, bet_time, Decimal('5000.00'))])
+
+        result = ReferralService.calculate_daily_referral_rewards(day)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['total_records'], 7)
+        self.assertEqual(result['data']['total_reward_amount'], 35.0)
+
+        record = ReferralRewardRecord.objects.get(referrer=self.users[5], referee=self.users[8])
+        self.assertEqual((record.referral_level, record.reward_amount), (3, Decimal('5.00')))
+
+        # 重复执行不生成新记录；补算缺失的一对
+        self.assertEqual(ReferralService.calculate_daily_referral_rewards(day)['data']['total_records'], 0)
+        record.delete()
+        self.assertEqual(ReferralService.calculate_daily_referral_rewards(day)['data']['total_records'], 1)
+        self.assertEqual(ReferralRewardRecord.objects.filter(period_date=day).count(), 7)
+
+    def test_rebuild_is_idempotent(self):
+        """
+        测试按 referred_by 重建闭包表与逐个建立关系的结果一致，重复执行不变
+        """
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.rewards.models import ReferralRelation, UserReferralStats
+
+        expected = self.relation_set()
+        expected_stats = self.stats_of(self.users[0]).total_referrals
+
+        ReferralRelation.objects.all().delete()
+        UserReferralStats.objects.all().delete()
+
+        for _ in range(2):
+            call_command('rebuild_referral_relations', batch_size=5, stdout=StringIO())
+            self.assertEqual(self.relation_set(), expected)
+            self.assertEqual(ReferralRelation.objects.count(), len(expected))
+            self.assertEqual(self.stats_of(self.users[0]).total_referrals, expected_stats)
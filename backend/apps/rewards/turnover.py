@@ -0,0 +1,181 @@
+"""
+用户每日有效流水账本
+投注结算时按（用户, 投注日期, 游戏）累加流水，返水、推荐奖励及综合奖励计算直接读取汇总行，
+不再各自扫描11选5、刮刮乐、大乐透、体育博彩投注表
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Any, Iterable, Tuple, Optional
+
+from django.conf import settings
+from django.db import transaction, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import UserDailyTurnover
+
+logger = logging.getLogger(__name__)
+
+
+class DailyTurnoverService:
+    """
+    每日流水账本服务
+    """
+
+    GAME_NAMES = dict(UserDailyTurnover.GAME_CHOICES)
+
+    # 重建来源：(游戏, 投注模型, 投注时间字段, 流水金额, 已结算状态)
+    SOURCES = [
+        ('lottery11x5', 'apps.games.models.Bet', 'created_at',
+         models.F('amount') * models.F('lottery11x5_detail__multiple_count'), ['WON', 'LOST']),
+        ('scratch666', 'apps.games.scratch666.models.ScratchCard', 'purchased_at', 'price',
+         ['SCRATCHED', 'COMPLETED']),
+        ('superlotto', 'apps.games.superlotto.models.SuperLottoBet', 'created_at', 'total_amount',
+         ['WINNING', 'LOSING', 'SETTLED']),
+        ('sports', 'apps.games.sports.models.SportsBetRecord', 'bet_time', 'bet_amount',
+         ['WON', 'LOST']),
+    ]
+
+    @staticmethod
+    def record(user_id, game: str, amount: Decimal, bet_time, bet_count: int = 1):
+        """
+        累加单笔已结算投注的流水
+        """
+        DailyTurnoverService.record_many(game, [(user_id, bet_time, amount, bet_count)])
+
+    @staticmethod
+    def record_many(game: str, entries: Iterable[Tuple]):
+        """
+        批量累加已结算投注的流水
+        entries 元素为 (user_id, 投注时间, 流水金额) 或 (user_id, 投注时间, 流水金额, 投注数)，
+        按（投注日期, 用户）聚合后每个投注日期执行一条UPDATE；需在结算事务内调用，每笔投注只计入一次
+        """
+        buckets: Dict[date, Dict[Any, list]] = {}
+        for entry in entries:
+            user_id, bet_time, amount = entry[:3]
+            bet_count = entry[3] if len(entry) > 3 else 1
+            day = DailyTurnoverService.to_date(bet_time)
+            bucket = buckets.setdefault(day, {}).setdefault(user_id, [Decimal('0.00'), 0])
+            bucket[0] += amount or Decimal('0.00')
+            bucket[1] += bet_count
+
+        if not buckets:
+            return
+
+        with transaction.atomic():
+            for day, users in buckets.items():
+                # 补齐汇总行后单条UPDATE原子累加，避免并发结算互相覆盖
+                UserDailyTurnover.objects.bulk_create(
+                    [UserDailyTurnover(user_id=user_id, date=day, game=game) for user_id in users],
+                    ignore_conflicts=True
+                )
+                UserDailyTurnover.objects.filter(
+                    date=day, game=game, user_id__in=users.keys()
+                ).update(
+                    turnover=models.F('turnover') + models.Case(
+                        *[models.When(user_id=user_id, then=models.Value(amount))
+                          for user_id, (amount, _) in users.items()],
+                        default=models.Value(Decimal('0.00')),
+                        output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                    ),
+                    bet_count=models.F('bet_count') + models.Case(
+                        *[models.When(user_id=user_id, then=models.Value(count))
+                          for user_id, (_, count) in users.items()],
+                        default=models.Value(0),
+                        output_field=models.IntegerField(),
+                    ),
+                    updated_at=timezone.now()
+                )
+
+    @staticmethod
+    def get_user_turnover(user_id, day: date) -> Dict[str, Any]:
+        """
+        获取用户当日有效流水
+        返回 {'total_turnover': 合计, 'game_breakdown': {游戏名称: 流水}}
+        """
+        game_turnover = DailyTurnoverService.grouped_turnover(day, user_ids=[user_id]).get(user_id, {})
+        return {
+            'total_turnover': sum(game_turnover.values(), Decimal('0.00')),
+            'game_breakdown': {name: float(amount) for name, amount in game_turnover.items()}
+        }
+
+    @staticmethod
+    def grouped_turnover(day: date, user_ids: Optional[Iterable] = None) -> Dict[Any, Dict[str, Decimal]]:
+        """
+        获取当日各用户分游戏流水 {user_id: {游戏名称: 流水}}
+        """
+        queryset = UserDailyTurnover.objects.filter(date=day, turnover__gt=0)
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+
+        turnover: Dict[Any, Dict[str, Decimal]] = {}
+        for user_id, game, amount in queryset.values_list('user_id', 'game', 'turnover').iterator(chunk_size=5000):
+            turnover.setdefault(user_id, {})[DailyTurnoverService.GAME_NAMES.get(game, game)] = amount
+        return turnover
+
+    @staticmethod
+    def user_totals(day: date) -> Dict[Any, Decimal]:
+        """
+        获取当日各用户流水合计 {user_id: 流水}
+        """
+        return dict(
+            UserDailyTurnover.objects.filter(date=day, turnover__gt=0).values('user_id').annotate(
+                total=models.Sum('turnover')
+            ).values_list('user_id', 'total').iterator(chunk_size=5000)
+        )
+
+    @staticmethod
+    def rebuild(day: date) -> int:
+        """
+        按各游戏投注表重建当日流水（用于上线回填或数据修复）
+        每个游戏一条分组查询，返回写入的汇总行数
+        """
+        start_datetime = DailyTurnoverService._start_of_day(day)
+        end_datetime = start_datetime + timedelta(days=1)
+
+        rows = []
+        for game, model_path, time_field, amount, statuses in DailyTurnoverService.SOURCES:
+            try:
+                model = import_string(model_path)
+                grouped = model.objects.filter(**{
+                    f'{time_field}__gte': start_datetime,
+                    f'{time_field}__lt': end_datetime,
+                    'status__in': statuses,
+                }).values('user_id').annotate(
+                    total=models.Sum(amount, output_field=models.DecimalField(max_digits=15, decimal_places=2)),
+                    count=models.Count('pk')
+                ).values_list('user_id', 'total', 'count')
+
+                rows.extend(
+                    UserDailyTurnover(user_id=user_id, date=day, game=game, turnover=total, bet_count=count)
+                    for user_id, total, count in grouped if total
+                )
+            except Exception as e:
+                # 游戏模块不存在或字段不匹配时跳过该游戏
+                logger.warning(f"重建{DailyTurnoverService.GAME_NAMES[game]}流水失败: {str(e)}")
+
+        with transaction.atomic():
+            UserDailyTurnover.objects.filter(date=day).delete()
+            UserDailyTurnover.objects.bulk_create(rows, batch_size=1000)
+
+        logger.info(f"{day} 每日流水重建完成: {len(rows)} 行")
+        return len(rows)
+
+    @staticmethod
+    def to_date(value) -> date:
+        """
+        投注时间转为本地日期
+        """
+        if isinstance(value, str):
+            value = parse_datetime(value) or date.fromisoformat(value)
+        if isinstance(value, datetime):
+            return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+        return value
+
+    @staticmethod
+    def _start_of_day(day: date) -> datetime:
+        start = datetime.combine(day, time.min)
+        return timezone.make_aware(start) if settings.USE_TZ else start
@@ -9,6 +9,9 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Sum, Count
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+
+from apps.core.cache_manager import cache_api_response
 
 from .models import ReferralRewardRecord, RebateRecord, VIPLevel
 from .serializers import (
@@ -36,6 +39,8 @@ class RebateViewSet(viewsets.ReadOnlyModelViewSet):
         return RebateRecord.objects.filter(user=self.request.user)
 
 
+@method_decorator(cache_api_response(timeout=3600, scope='public', stale_timeout=300), name='list')
+@method_decorator(cache_api_response(timeout=3600, scope='public', stale_timeout=300), name='retrieve')
 class VipViewSet(viewsets.ReadOnlyModelViewSet):
     """VIP视图集"""
     serializer_class = VIPLevelSerializer
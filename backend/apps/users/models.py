@@ -163,29 +163,31 @@ class User(AbstractUser):
         return vip_info
     
     def get_referral_tree(self, max_depth=7):
-        """获取推荐关系树"""
-        cache_key = f'user_referral_tree_{self.id}'
+        """获取推荐关系树（按推荐关系闭包表一次查询各级下级）"""
+        from apps.rewards.models import ReferralRelation
+        
+        cache_key = f'user_referral_tree_{self.id}_{max_depth}'
         tree = cache.get(cache_key)
         
         if tree is None:
-            tree = []
-            current_level = [self]
+            relations = ReferralRelation.objects.filter(
+                referrer=self,
+                level__lte=max_depth,
+                is_active=True,
+                referee__is_active=True
+            ).select_related('referee').order_by('level', 'created_at')
             
-            for depth in range(1, max_depth + 1):
-                next_level = []
-                for user in current_level:
-                    referrals = User.objects.filter(referred_by=user, is_active=True)
-                    for referral in referrals:
-                        tree.append({
-                            'level': depth,
-                            'user_id': str(referral.id),
-                            'phone': referral.phone,
-                            'total_turnover': float(referral.total_turnover),
-                            'vip_level': referral.vip_level,
-                            'created_at': referral.created_at.isoformat(),
-                        })
-                        next_level.append(referral)
-                current_level = next_level
+            tree = [
+                {
+                    'level': relation.level,
+                    'user_id': str(relation.referee.id),
+                    'phone': relation.referee.phone,
+                    'total_turnover': float(relation.referee.total_turnover),
+                    'vip_level': relation.referee.vip_level,
+                    'created_at': relation.referee.created_at.isoformat(),
+                }
+                for relation in relations
+            ]
                 
             cache.set(cache_key, tree, 600)  # 缓存10分钟
             
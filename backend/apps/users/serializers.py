@@ -90,6 +90,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         # 创建用户资料
         UserProfile.objects.create(user=user)
         
+        # 写入推荐关系闭包表（一级至七级上级）
+        referrer = validated_data.get('referred_by')
+        if referrer:
+            from apps.rewards.services import ReferralService
+            ReferralService.create_referral_relation(referrer, user, referrer.referral_code)
+        
         return user
 
 
@@ -57,7 +57,6 @@ MIDDLEWARE = [
     'apps.core.middleware.SecurityHeadersMiddleware',  # 安全头部
     'apps.core.middleware.RateLimitMiddleware',  # 频率限制
     'apps.core.middleware.IPWhitelistMiddleware',  # IP白名单
-    'apps.core.middleware.DeviceTrackingMiddleware',  # 设备追踪
     'apps.core.middleware.RequestLoggingMiddleware',  # 请求日志
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -66,6 +65,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.DeviceTrackingMiddleware',  # 设备追踪
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -152,6 +152,13 @@ CACHES = {
     }
 }
 
+# CacheManager 缓存值序列化（SERIALIZER: orjson/msgpack/json，COMPRESSION: zlib/lz4/none）
+CACHE_SERIALIZATION = {
+    'SERIALIZER': config('CACHE_SERIALIZER', default='orjson'),
+    'COMPRESSION': config('CACHE_COMPRESSION', default='zlib'),
+    'COMPRESS_MIN_SIZE': config('CACHE_COMPRESS_MIN_SIZE', default=1024, cast=int),  # 超过该字节数才压缩
+}
+
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'sessions'
@@ -165,6 +172,21 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Celery定时任务
+from celery.schedules import crontab
+CELERY_BEAT_SCHEDULE = {
+    # 每天凌晨4点维护交易表分区
+    'finance-maintain-partitions': {
+        'task': 'apps.finance.tasks.maintain_partitions',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    # 每10分钟恢复中断的大乐透结算
+    'superlotto-resume-settlements': {
+        'task': 'apps.games.superlotto.tasks.resume_superlotto_settlements',
+        'schedule': crontab(minute='*/10'),
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -267,6 +289,26 @@ TWO_FACTOR_REQUIRED_FOR_ADMIN = config('TWO_FACTOR_REQUIRED_FOR_ADMIN', default=
 RISK_ASSESSMENT_ENABLE = config('RISK_ASSESSMENT_ENABLE', default=True, cast=bool)
 FRAUD_DETECTION_ENABLE = config('FRAUD_DETECTION_ENABLE', default=True, cast=bool)
 
+# 11选5单期最大亏损限额（按负债表最坏开奖结果计算，0表示不限制）
+LOTTERY11X5_MAX_DRAW_LOSS = config('LOTTERY11X5_MAX_DRAW_LOSS', default=0, cast=float)
+
+# 11选5负债表每期分片数（投注随机锁定一个分片）
+LOTTERY11X5_LIABILITY_SHARDS = config('LOTTERY11X5_LIABILITY_SHARDS', default=16, cast=int)
+
+# 交易表分区配置（PostgreSQL 按月范围分区）
+TRANSACTION_PARTITIONING = {
+    'PREMAKE_MONTHS': config('PARTITION_PREMAKE_MONTHS', default=3, cast=int),  # 预建未来分区月数
+    'RETENTION_MONTHS': config('PARTITION_RETENTION_MONTHS', default=0, cast=int),  # 保留月数，0表示不清理
+    'DROP_DETACHED': config('PARTITION_DROP_DETACHED', default=False, cast=bool),  # 过期分区分离后是否删除
+}
+
+# 余额对账配置
+BALANCE_RECONCILIATION = {
+    'CHUNKS': config('RECONCILIATION_CHUNKS', default=16, cast=int),  # 全量对账按用户ID区间分块数
+    'WORKERS': config('RECONCILIATION_WORKERS', default=4, cast=int),  # 并行线程数
+    'INCREMENTAL_BATCH_SIZE': config('RECONCILIATION_BATCH_SIZE', default=5000, cast=int),  # 增量对账每批用户数
+}
+
 # 审计日志配置
 AUDIT_LOG_RETENTION_DAYS = config('AUDIT_LOG_RETENTION_DAYS', default=90, cast=int)
 
@@ -277,6 +319,8 @@ PERFORMANCE_MONITORING = {
     'MAX_CONCURRENT_REQUESTS': config('MAX_CONCURRENT_REQUESTS', default=1000, cast=int),
     'MEMORY_THRESHOLD_PERCENT': config('MEMORY_THRESHOLD_PERCENT', default=80.0, cast=float),
     'ENABLE_QUERY_OPTIMIZATION': config('ENABLE_QUERY_OPTIMIZATION', default=True, cast=bool),
+    'METRICS_FLUSH_INTERVAL': config('METRICS_FLUSH_INTERVAL', default=10, cast=int),  # 秒，请求指标缓冲区写库间隔
+    'METRICS_MAX_KEYS': config('METRICS_MAX_KEYS', default=5000, cast=int),  # 缓冲区最多聚合的（分钟, 接口）数
 }
 
 # 数据库连接池优化